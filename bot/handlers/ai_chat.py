@@ -8,10 +8,13 @@ AI Chat Handler - интеграция с AI Chat Service.
 - /ai_limits - проверить лимиты запросов
 """
 
+import json
 import logging
 import os
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, AsyncIterator, Tuple
 from aiogram import Router, F
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
@@ -33,6 +36,12 @@ router = Router()
 # URL AI Chat Service (в составе gpt_integration)
 AI_CHAT_URL = getattr(config, "ai_chat_service_url", None) or os.getenv("AI_CHAT_SERVICE_URL", "http://gpt:9000")
 
+# Потоковый режим: ответ показывается по мере генерации (/v1/chat/send/stream)
+AI_CHAT_STREAMING = os.getenv("AI_CHAT_STREAMING", "false").lower() == "true"
+# Как часто обновлять сообщение с частичным ответом (лимиты Telegram на edit)
+AI_CHAT_STREAM_EDIT_INTERVAL = float(os.getenv("AI_CHAT_STREAM_EDIT_INTERVAL", "1.5"))
+TELEGRAM_MESSAGE_LIMIT = 4096
+
 
 # ============================================================================
 # Функции для получения пользовательского контекста
@@ -213,6 +222,101 @@ async def callback_cancel_chat(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
+# ============================================================================
+# Потоковый ответ AI
+# ============================================================================
+
+async def _iter_sse(resp: aiohttp.ClientResponse) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Разбор Server-Sent Events из ответа AI Chat Service."""
+    event, data_lines = None, []
+    async for raw_line in resp.content:
+        line = raw_line.decode("utf-8").rstrip("\r\n")
+        if not line:
+            if event and data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = None, []
+        elif line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            data_lines.append(line[len("data: "):])
+
+
+async def relay_ai_stream(
+    message: Message,
+    resp: aiohttp.ClientResponse,
+    telegram_id: int
+) -> Optional[Dict[str, Any]]:
+    """
+    Показывает потоковый ответ AI, редактируя одно сообщение.
+
+    Частичный текст выводится без разметки (HTML может быть незакрыт),
+    финальный ответ - с parse_mode=HTML.
+
+    Returns:
+        Данные события done или None, если сервис вернул ошибку
+    """
+    draft: Optional[Message] = None
+    text = ""
+    last_edit = 0.0
+
+    async def _drop_draft():
+        if draft is not None:
+            try:
+                await draft.delete()
+            except TelegramBadRequest:
+                pass
+
+    async for event, data in _iter_sse(resp):
+        if event == "delta":
+            text += data.get("text", "")
+            now = time.monotonic()
+            if text.strip() and now - last_edit >= AI_CHAT_STREAM_EDIT_INTERVAL:
+                preview = text[:TELEGRAM_MESSAGE_LIMIT - 2] + " ▌"
+                try:
+                    if draft is None:
+                        draft = await message.answer(preview)
+                    else:
+                        await draft.edit_text(preview)
+                except TelegramBadRequest as e:
+                    logger.debug(f"Stream preview update skipped for user {telegram_id}: {e}")
+                last_edit = now
+
+        elif event == "done":
+            final_text = data.get("response", text)
+            if draft is not None and len(final_text) <= TELEGRAM_MESSAGE_LIMIT:
+                try:
+                    await draft.edit_text(final_text, parse_mode="HTML")
+                    return data
+                except TelegramBadRequest as e:
+                    logger.warning(f"⚠️ Final stream edit failed for user {telegram_id}: {e}")
+            await _drop_draft()
+            await safe_send_message(message, final_text, user_id=telegram_id, parse_mode="HTML")
+            return data
+
+        elif event == "error":
+            await _drop_draft()
+            logger.error(f"❌ AI Chat Service stream error for user {telegram_id}: {data}")
+            await safe_send_message(
+                message,
+                f"❌ Произошла ошибка при обращении к AI сервису.\n\n"
+                f"<code>{str(data.get('message', 'Неизвестная ошибка'))[:200]}</code>\n\n"
+                "Попробуйте позже или обратитесь к администратору.",
+                user_id=telegram_id,
+                parse_mode="HTML"
+            )
+            return None
+
+    # Поток оборвался без done/error
+    await _drop_draft()
+    logger.error(f"❌ AI Chat Service stream ended unexpectedly for user {telegram_id}")
+    await safe_send_message(
+        message,
+        "❌ Ответ AI сервиса прервался.\nПопробуйте еще раз.",
+        user_id=telegram_id
+    )
+    return None
+
+
 # ============================================================================
 # Обработка текстовых сообщений в режиме AI чата
 # ============================================================================
@@ -247,7 +351,7 @@ async def process_ai_message(message: Message, state: FSMContext):
     user_context = await get_user_context(telegram_id)
     
     # Отправляем запрос к AI Chat Service
-    endpoint = f"{AI_CHAT_URL.rstrip('/')}/v1/chat/send"
+    endpoint = f"{AI_CHAT_URL.rstrip('/')}/v1/chat/send{'/stream' if AI_CHAT_STREAMING else ''}"
     payload = {
         "telegram_id": telegram_id,
         "message": user_message,
@@ -259,12 +363,25 @@ async def process_ai_message(message: Message, state: FSMContext):
     }
     
     try:
-        timeout = aiohttp.ClientTimeout(total=60)  # 60 секунд для OpenAI
+        if AI_CHAT_STREAMING:
+            # Общее время не ограничиваем, ограничиваем паузу между фрагментами
+            timeout = aiohttp.ClientTimeout(total=None, sock_read=60)
+        else:
+            timeout = aiohttp.ClientTimeout(total=60)  # 60 секунд для OpenAI
         async with aiohttp.ClientSession(timeout=timeout) as session:
             async with session.post(endpoint, json=payload, headers=headers) as resp:
                 
+                # Успешный потоковый ответ
+                if resp.status == 200 and AI_CHAT_STREAMING:
+                    data = await relay_ai_stream(message, resp, telegram_id)
+                    if data is not None:
+                        logger.info(
+                            f"✅ AI streamed response sent to user {telegram_id}: "
+                            f"{data.get('remaining_requests', 0)} requests remaining"
+                        )
+                
                 # Успешный ответ
-                if resp.status == 200:
+                elif resp.status == 200:
                     data = await resp.json()
                     response_text = data.get("response", "")
                     remaining = data.get("remaining_requests", 0)
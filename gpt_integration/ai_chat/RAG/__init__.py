@@ -11,6 +11,7 @@ from .indexer import RAGIndexer
 from .vector_search import VectorSearch
 from .context_builder import ContextBuilder
 from .prompt_enricher import enrich_prompt_with_rag, RAG_ENABLED
+from .retrieval_cache import RetrievalCache, retrieval_cache
 from .utils import get_cabinet_id_for_user
 from .database import get_rag_db, init_rag_db, RAGSessionLocal
 from .models import RAGMetadata, RAGEmbedding, RAGIndexStatus
@@ -21,6 +22,8 @@ __all__ = [
     'ContextBuilder',
     'enrich_prompt_with_rag',
     'RAG_ENABLED',
+    'RetrievalCache',
+    'retrieval_cache',
     'get_cabinet_id_for_user',
     'get_rag_db',
     'init_rag_db',
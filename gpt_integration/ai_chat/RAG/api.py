@@ -11,12 +11,16 @@ from fastapi import APIRouter, HTTPException, Depends, Header
 from pydantic import BaseModel
 import os
 
+from sqlalchemy import delete, select
+
 from .indexer import RAGIndexer
 from .database import RAGSessionLocal
-from .models import RAGIndexStatus
+from .models import RAGEmbedding, RAGMetadata, RAGIndexStatus
 
 logger = logging.getLogger(__name__)
 
+RAG_PURGE_CHUNK_SIZE = int(os.getenv("RAG_PURGE_CHUNK_SIZE", "1000"))
+
 router = APIRouter(prefix="/v1/rag", tags=["rag"])
 
 
@@ -243,6 +247,78 @@ async def get_indexing_status(
         db.close()
 
 
+def _purge_cabinet_index(cabinet_id: int) -> Dict[str, int]:
+    """
+    Порционное удаление RAG-индекса кабинета.
+
+    Эмбеддинги удаляются раньше метаданных, каждая порция - отдельная
+    транзакция, чтобы не блокировать индексацию других кабинетов.
+    """
+    db = RAGSessionLocal()
+    deleted = {"rag_embeddings": 0, "rag_metadata": 0, "rag_index_status": 0}
+    try:
+        for model in (RAGEmbedding, RAGMetadata):
+            while True:
+                ids = db.execute(
+                    select(model.id)
+                    .where(model.cabinet_id == cabinet_id)
+                    .order_by(model.id)
+                    .limit(RAG_PURGE_CHUNK_SIZE)
+                ).scalars().all()
+                if not ids:
+                    break
+                db.execute(delete(model).where(model.id.in_(ids)))
+                db.commit()
+                deleted[model.__tablename__] += len(ids)
+
+        deleted["rag_index_status"] = db.execute(
+            delete(RAGIndexStatus).where(RAGIndexStatus.cabinet_id == cabinet_id)
+        ).rowcount
+        db.commit()
+        return deleted
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@router.delete("/index/{cabinet_id}")
+async def purge_cabinet_index(
+    cabinet_id: int,
+    _: None = Depends(_verify_api_key)
+):
+    """
+    Удалить RAG-индекс кабинета (при удалении кабинета).
+
+    Args:
+        cabinet_id: ID кабинета Wildberries
+
+    Returns:
+        Количество удаленных строк по таблицам
+    """
+    logger.info(f"🗑️ Purging RAG index for cabinet {cabinet_id}")
+
+    try:
+        deleted = await asyncio.to_thread(_purge_cabinet_index, cabinet_id)
+    except Exception as e:
+        logger.error(f"❌ Error purging RAG index for cabinet {cabinet_id}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status": "error",
+                "message": f"Ошибка удаления индекса: {str(e)}"
+            }
+        )
+
+    logger.info(f"✅ RAG index purged for cabinet {cabinet_id}: {deleted}")
+    return {
+        "status": "success",
+        "cabinet_id": cabinet_id,
+        "deleted": deleted
+    }
+
+
 @router.get("/health")
 async def health_check():
     """
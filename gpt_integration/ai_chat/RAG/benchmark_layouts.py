@@ -0,0 +1,367 @@
+"""
+Бенчмарк раскладок векторного хранилища RAG: recall и latency на синтетических данных.
+
+Сравниваются три раскладки rag_embeddings:
+    - global_join:  единый HNSW индекс, фильтр по cabinet_id/chunk_type через JOIN с metadata
+                    (схема до миграции 002)
+    - partial:      cabinet_id/chunk_type в самой таблице, частичный HNSW индекс на каждый
+                    chunk_type, точный перебор по btree для маленьких кабинетов (текущая схема)
+    - partitioned:  LIST-партиционирование по бакету кабинета (cabinet_id % buckets),
+                    HNSW индекс в каждой партиции
+
+Данные генерируются в отдельной схеме rag_bench (удаляется после прогона, если не --keep):
+кластеризованные векторы и распределение кабинетов с перекосом (много маленьких, мало крупных).
+Recall@k считается относительно точного перебора.
+
+Использование:
+    python -m gpt_integration.ai_chat.RAG.benchmark_layouts [--rows 1000000] [--dim 1536]
+        [--cabinets 500] [--queries 200] [--k 5] [--ef-search 40] [--buckets 16] [--keep]
+
+Пример (быстрый прогон):
+    python -m gpt_integration.ai_chat.RAG.benchmark_layouts --rows 100000 --dim 256
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Добавляем корневую директорию в путь
+root_dir = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from sqlalchemy import text
+
+from gpt_integration.ai_chat.RAG.database import rag_engine
+from gpt_integration.ai_chat.RAG.models import CHUNK_TYPES
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SCHEMA = "rag_bench"
+LAYOUTS = ("global_join", "partial", "partitioned")
+INSERT_BATCH = 50_000
+
+
+def _vector_literal(values: List[float]) -> str:
+    return '[' + ','.join(f"{v:.6f}" for v in values) + ']'
+
+
+def generate_data(conn, rows: int, dim: int, cabinets: int, clusters: int = 256) -> None:
+    """Генерация синтетических векторов в rag_bench.items."""
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    conn.execute(text(f"""
+        CREATE TABLE {SCHEMA}.centroids AS
+        SELECT c AS id,
+               (SELECT array_agg(random() - 0.5)::vector FROM generate_series(1, {dim}) WHERE c > 0) AS embedding
+        FROM generate_series(1, {clusters}) c
+    """))
+    conn.execute(text(f"""
+        CREATE TABLE {SCHEMA}.items (
+            id INTEGER PRIMARY KEY,
+            cabinet_id INTEGER NOT NULL,
+            chunk_type VARCHAR(20) NOT NULL,
+            embedding vector({dim}) NOT NULL
+        )
+    """))
+    types_array = "ARRAY[" + ",".join(f"'{t}'" for t in CHUNK_TYPES) + "]"
+    for start in range(1, rows + 1, INSERT_BATCH):
+        end = min(start + INSERT_BATCH - 1, rows)
+        # power(random(), 3) дает перекос: кабинеты с маленькими id получают большую часть строк
+        conn.execute(text(f"""
+            INSERT INTO {SCHEMA}.items (id, cabinet_id, chunk_type, embedding)
+            SELECT g,
+                   1 + floor(power(random(), 3) * {cabinets})::int,
+                   ({types_array})[1 + floor(random() * {len(CHUNK_TYPES)})::int],
+                   c.embedding + (
+                       SELECT array_agg((random() - 0.5) * 0.3)::vector
+                       FROM generate_series(1, {dim}) WHERE g > 0
+                   )
+            FROM generate_series({start}, {end}) g
+            JOIN {SCHEMA}.centroids c ON c.id = 1 + (g % {clusters})
+        """))
+        conn.commit()
+        logger.info(f"📦 Generated {end}/{rows} vectors")
+    conn.execute(text(f"CREATE INDEX ON {SCHEMA}.items (cabinet_id, chunk_type)"))
+    conn.execute(text(f"ANALYZE {SCHEMA}.items"))
+    conn.commit()
+
+
+def build_layout(conn, layout: str, dim: int, buckets: int) -> float:
+    """Построение таблиц и индексов одной раскладки. Возвращает время построения (сек)."""
+    started = time.perf_counter()
+    hnsw = "USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+
+    if layout == "global_join":
+        conn.execute(text(f"""
+            CREATE TABLE {SCHEMA}.gj_metadata AS
+            SELECT id, cabinet_id, chunk_type FROM {SCHEMA}.items
+        """))
+        conn.execute(text(f"ALTER TABLE {SCHEMA}.gj_metadata ADD PRIMARY KEY (id)"))
+        conn.execute(text(f"CREATE INDEX ON {SCHEMA}.gj_metadata (cabinet_id, chunk_type)"))
+        conn.execute(text(f"""
+            CREATE TABLE {SCHEMA}.gj_embeddings AS
+            SELECT id, id AS metadata_id, embedding FROM {SCHEMA}.items
+        """))
+        conn.execute(text(f"ALTER TABLE {SCHEMA}.gj_embeddings ADD PRIMARY KEY (id)"))
+        conn.execute(text(f"CREATE INDEX ON {SCHEMA}.gj_embeddings {hnsw}"))
+
+    elif layout == "partial":
+        conn.execute(text(f"""
+            CREATE TABLE {SCHEMA}.pt_embeddings AS
+            SELECT id, cabinet_id, chunk_type, embedding FROM {SCHEMA}.items
+        """))
+        conn.execute(text(f"ALTER TABLE {SCHEMA}.pt_embeddings ADD PRIMARY KEY (id)"))
+        conn.execute(text(f"CREATE INDEX ON {SCHEMA}.pt_embeddings (cabinet_id, chunk_type)"))
+        for chunk_type in CHUNK_TYPES:
+            conn.execute(text(
+                f"CREATE INDEX ON {SCHEMA}.pt_embeddings {hnsw} WHERE chunk_type = '{chunk_type}'"
+            ))
+
+    elif layout == "partitioned":
+        conn.execute(text(f"""
+            CREATE TABLE {SCHEMA}.pn_embeddings (
+                id INTEGER NOT NULL,
+                cabinet_bucket INTEGER NOT NULL,
+                cabinet_id INTEGER NOT NULL,
+                chunk_type VARCHAR(20) NOT NULL,
+                embedding vector({dim}) NOT NULL
+            ) PARTITION BY LIST (cabinet_bucket)
+        """))
+        for bucket in range(buckets):
+            conn.execute(text(
+                f"CREATE TABLE {SCHEMA}.pn_embeddings_{bucket} "
+                f"PARTITION OF {SCHEMA}.pn_embeddings FOR VALUES IN ({bucket})"
+            ))
+        conn.execute(text(f"""
+            INSERT INTO {SCHEMA}.pn_embeddings
+            SELECT id, cabinet_id % {buckets}, cabinet_id, chunk_type, embedding FROM {SCHEMA}.items
+        """))
+        conn.execute(text(f"CREATE INDEX ON {SCHEMA}.pn_embeddings (cabinet_id, chunk_type)"))
+        conn.execute(text(f"CREATE INDEX ON {SCHEMA}.pn_embeddings {hnsw}"))
+
+    else:
+        raise ValueError(f"Unknown layout: {layout}")
+
+    for table in {"global_join": ("gj_metadata", "gj_embeddings"),
+                  "partial": ("pt_embeddings",),
+                  "partitioned": ("pn_embeddings",)}[layout]:
+        conn.execute(text(f"ANALYZE {SCHEMA}.{table}"))
+    conn.commit()
+    return time.perf_counter() - started
+
+
+def layout_index_size(conn, layout: str) -> int:
+    """Суммарный размер индексов раскладки в байтах."""
+    prefix = {"global_join": "gj_", "partial": "pt_", "partitioned": "pn_"}[layout]
+    return conn.execute(text("""
+        SELECT COALESCE(SUM(pg_relation_size(i.indexrelid)), 0)
+        FROM pg_index i
+        JOIN pg_class t ON t.oid = i.indrelid
+        JOIN pg_namespace n ON n.oid = t.relnamespace
+        WHERE n.nspname = :schema AND t.relname LIKE :prefix
+    """), {'schema': SCHEMA, 'prefix': f"{prefix}%"}).scalar()
+
+
+def layout_query(
+    layout: str,
+    vector: str,
+    chunk_type: Optional[str],
+    exact_cabinet: bool,
+    buckets: int
+) -> str:
+    """SQL поиска top-k для раскладки; форма запросов повторяет VectorSearch.search."""
+    distance = f"embedding <=> '{vector}'::vector"
+
+    if layout == "global_join":
+        type_filter = "AND m.chunk_type = :chunk_type" if chunk_type else ""
+        return f"""
+            SELECT e.id FROM {SCHEMA}.gj_embeddings e
+            JOIN {SCHEMA}.gj_metadata m ON e.metadata_id = m.id
+            WHERE m.cabinet_id = :cabinet_id {type_filter}
+            ORDER BY e.{distance} ASC LIMIT :k
+        """
+
+    if layout == "partial":
+        if exact_cabinet:
+            type_filter = "AND chunk_type = :chunk_type" if chunk_type else ""
+            return f"""
+                SELECT id FROM {SCHEMA}.pt_embeddings
+                WHERE cabinet_id = :cabinet_id {type_filter}
+                ORDER BY ({distance}) + 0 ASC LIMIT :k
+            """
+        branches = [
+            f"(SELECT id, {distance} AS distance FROM {SCHEMA}.pt_embeddings "
+            f"WHERE cabinet_id = :cabinet_id AND chunk_type = '{t}' "
+            f"ORDER BY {distance} ASC LIMIT :k)"
+            for t in ([chunk_type] if chunk_type else CHUNK_TYPES)
+        ]
+        return f"""
+            SELECT id FROM ({" UNION ALL ".join(branches)}) AS candidates
+            ORDER BY distance ASC LIMIT :k
+        """
+
+    if layout == "partitioned":
+        type_filter = "AND chunk_type = :chunk_type" if chunk_type else ""
+        return f"""
+            SELECT id FROM {SCHEMA}.pn_embeddings
+            WHERE cabinet_bucket = :cabinet_id % {buckets}
+              AND cabinet_id = :cabinet_id {type_filter}
+            ORDER BY {distance} ASC LIMIT :k
+        """
+
+    raise ValueError(f"Unknown layout: {layout}")
+
+
+def sample_queries(conn, count: int) -> List[Dict[str, Any]]:
+    """Запросы: вектор рядом с существующим элементом кабинета, половина - с фильтром по типу."""
+    rows = conn.execute(text(f"""
+        SELECT cabinet_id, chunk_type, embedding::text AS embedding
+        FROM {SCHEMA}.items TABLESAMPLE SYSTEM (1)
+        LIMIT :count
+    """), {'count': count}).fetchall()
+    sizes = dict(conn.execute(text(
+        f"SELECT cabinet_id, COUNT(*) FROM {SCHEMA}.items GROUP BY cabinet_id"
+    )).fetchall())
+
+    queries = []
+    for row in rows:
+        base = [float(v) for v in row.embedding.strip('[]').split(',')]
+        noisy = [v + random.uniform(-0.05, 0.05) for v in base]
+        queries.append({
+            'cabinet_id': row.cabinet_id,
+            'cabinet_size': sizes[row.cabinet_id],
+            'chunk_type': row.chunk_type if random.random() < 0.5 else None,
+            'vector': _vector_literal(noisy),
+        })
+    return queries
+
+
+def exact_top_k(conn, query: Dict[str, Any], k: int) -> List[int]:
+    """Эталонный результат точным перебором."""
+    type_filter = "AND chunk_type = :chunk_type" if query['chunk_type'] else ""
+    return [r[0] for r in conn.execute(text(f"""
+        SELECT id FROM {SCHEMA}.items
+        WHERE cabinet_id = :cabinet_id {type_filter}
+        ORDER BY (embedding <=> '{query['vector']}'::vector) + 0 ASC
+        LIMIT :k
+    """), {'cabinet_id': query['cabinet_id'], 'chunk_type': query['chunk_type'], 'k': k}).fetchall()]
+
+
+def run_layout(
+    conn,
+    layout: str,
+    queries: List[Dict[str, Any]],
+    expected: List[List[int]],
+    k: int,
+    ef_search: int,
+    buckets: int,
+    exact_max_chunks: int
+) -> Dict[str, Any]:
+    """Прогон запросов по раскладке: latency и recall@k, в целом и по размеру кабинета."""
+    latencies: List[Tuple[int, float]] = []
+    recalls: List[Tuple[int, float]] = []
+    for query, truth in zip(queries, expected):
+        sql = layout_query(
+            layout,
+            query['vector'],
+            query['chunk_type'],
+            exact_cabinet=query['cabinet_size'] <= exact_max_chunks,
+            buckets=buckets
+        )
+        conn.execute(text(f"SET LOCAL hnsw.ef_search = {ef_search}"))
+        started = time.perf_counter()
+        found = [r[0] for r in conn.execute(text(sql), {
+            'cabinet_id': query['cabinet_id'],
+            'chunk_type': query['chunk_type'],
+            'k': k
+        }).fetchall()]
+        latencies.append((query['cabinet_size'], (time.perf_counter() - started) * 1000))
+        recall = len(set(found) & set(truth)) / len(truth) if truth else 1.0
+        recalls.append((query['cabinet_size'], recall))
+        conn.rollback()
+
+    def _summary(selector) -> Dict[str, Any]:
+        lat = sorted(v for size, v in latencies if selector(size))
+        rec = [v for size, v in recalls if selector(size)]
+        if not lat:
+            return {'queries': 0}
+        return {
+            'queries': len(lat),
+            'p50_ms': statistics.median(lat),
+            'p95_ms': lat[min(len(lat) - 1, int(len(lat) * 0.95))],
+            'recall': statistics.mean(rec),
+        }
+
+    return {
+        'all': _summary(lambda size: True),
+        'small': _summary(lambda size: size <= exact_max_chunks),
+        'large': _summary(lambda size: size > exact_max_chunks),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG vector layout benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--cabinets", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--ef-search", type=int, default=40)
+    parser.add_argument("--buckets", type=int, default=16)
+    parser.add_argument("--exact-max-chunks", type=int, default=20000)
+    parser.add_argument("--layouts", default=",".join(LAYOUTS))
+    parser.add_argument("--keep", action="store_true", help="не удалять схему rag_bench")
+    args = parser.parse_args()
+
+    layouts = [l.strip() for l in args.layouts.split(",") if l.strip()]
+
+    with rag_engine.connect() as conn:
+        logger.info(f"🚀 Generating {args.rows} vectors (dim={args.dim}, cabinets={args.cabinets})...")
+        generate_data(conn, args.rows, args.dim, args.cabinets)
+
+        queries = sample_queries(conn, args.queries)
+        expected = [exact_top_k(conn, q, args.k) for q in queries]
+        conn.rollback()
+        logger.info(f"🎯 Sampled {len(queries)} queries, computed exact top-{args.k}")
+
+        results = {}
+        for layout in layouts:
+            build_seconds = build_layout(conn, layout, args.dim, args.buckets)
+            index_bytes = layout_index_size(conn, layout)
+            stats = run_layout(
+                conn, layout, queries, expected,
+                args.k, args.ef_search, args.buckets, args.exact_max_chunks
+            )
+            results[layout] = {'build_s': build_seconds, 'index_mb': index_bytes / 1024 / 1024, **stats}
+            logger.info(f"✅ Layout {layout} done in {build_seconds:.1f}s")
+
+        if not args.keep:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            conn.commit()
+
+    print()
+    print(f"{'layout':<12} {'build,s':>8} {'index,MB':>9} {'group':<6} {'n':>5} "
+          f"{'p50,ms':>8} {'p95,ms':>8} {'recall':>7}")
+    for layout, result in results.items():
+        for group in ('all', 'small', 'large'):
+            stats = result[group]
+            if not stats['queries']:
+                continue
+            print(
+                f"{layout:<12} {result['build_s']:>8.1f} {result['index_mb']:>9.1f} {group:<6} "
+                f"{stats['queries']:>5} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} "
+                f"{stats['recall']:>7.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,7 @@ from gpt_integration.comet_client import comet_client
 
 from .database import RAGSessionLocal
 from .models import RAGMetadata, RAGEmbedding, RAGIndexStatus
+from .retrieval_cache import retrieval_cache
 from ..tools.db_pool import get_asyncpg_pool
 
 logger = logging.getLogger(__name__)
@@ -649,13 +650,17 @@ class RAGIndexer:
 
                     if existing_embedding:
                         existing_embedding.embedding = embedding
+                        existing_embedding.cabinet_id = cabinet_id
+                        existing_embedding.chunk_type = chunk_meta['chunk_type']
                         from datetime import timezone
                         existing_embedding.updated_at = datetime.now(timezone.utc)
                     else:
                         # Создать новый embedding (если по какой-то причине его нет)
                         new_embedding = RAGEmbedding(
                             embedding=embedding,
-                            metadata_id=existing_metadata.id
+                            metadata_id=existing_metadata.id,
+                            cabinet_id=cabinet_id,
+                            chunk_type=chunk_meta['chunk_type']
                         )
                         db.add(new_embedding)
 
@@ -674,7 +679,9 @@ class RAGIndexer:
 
                     new_embedding = RAGEmbedding(
                         embedding=embedding,
-                        metadata_id=new_metadata.id
+                        metadata_id=new_metadata.id,
+                        cabinet_id=cabinet_id,
+                        chunk_type=chunk_meta['chunk_type']
                     )
                     db.add(new_embedding)
 
@@ -856,6 +863,7 @@ class RAGIndexer:
                 from datetime import timezone
                 index_status.last_indexed_at = datetime.now(timezone.utc)
                 db.commit()
+                retrieval_cache.invalidate_cabinet(cabinet_id)
                 result['success'] = True
                 return result
             
@@ -896,6 +904,9 @@ class RAGIndexer:
 
             db.commit()
 
+            # Контекст, закэшированный до индексации, больше не актуален
+            retrieval_cache.invalidate_cabinet(cabinet_id)
+
             result['success'] = True
             result['total_chunks'] = saved_count
             result['metrics']['embeddings_generated'] = len(embeddings)
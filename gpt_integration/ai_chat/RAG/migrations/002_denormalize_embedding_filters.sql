@@ -0,0 +1,72 @@
+-- Миграция: Денормализация cabinet_id / chunk_type в rag_embeddings
+-- Дата: 2026-10-18
+-- Версия: 1.1.0
+-- Описание: Векторный поиск всегда фильтрует по cabinet_id (и часто по chunk_type),
+--           но эти поля лежали только в rag_metadata, и фильтр применялся после
+--           обхода единого HNSW индекса через JOIN. Переносим поля в rag_embeddings
+--           и строим частичные HNSW индексы по каждому типу чанков.
+--
+-- Запуск: psql -f (без -1 / --single-transaction), т.к. CREATE INDEX CONCURRENTLY
+--         нельзя выполнять внутри транзакции.
+
+-- 1. Новые колонки
+ALTER TABLE rag_embeddings ADD COLUMN IF NOT EXISTS cabinet_id INTEGER;
+ALTER TABLE rag_embeddings ADD COLUMN IF NOT EXISTS chunk_type VARCHAR(20);
+
+-- 2. Заполнение из rag_metadata
+UPDATE rag_embeddings e
+SET cabinet_id = m.cabinet_id,
+    chunk_type = m.chunk_type
+FROM rag_metadata m
+WHERE e.metadata_id = m.id
+  AND (e.cabinet_id IS DISTINCT FROM m.cabinet_id OR e.chunk_type IS DISTINCT FROM m.chunk_type);
+
+ALTER TABLE rag_embeddings ALTER COLUMN cabinet_id SET NOT NULL;
+ALTER TABLE rag_embeddings ALTER COLUMN chunk_type SET NOT NULL;
+
+-- 3. btree индекс для точного поиска по маленьким кабинетам
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_rag_embeddings_cabinet_type
+    ON rag_embeddings(cabinet_id, chunk_type);
+
+-- 4. Частичные HNSW индексы по типам чанков (те же параметры, что у общего индекса)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_rag_embeddings_vector_order
+    ON rag_embeddings USING hnsw (embedding vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64)
+    WHERE chunk_type = 'order';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_rag_embeddings_vector_product
+    ON rag_embeddings USING hnsw (embedding vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64)
+    WHERE chunk_type = 'product';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_rag_embeddings_vector_stock
+    ON rag_embeddings USING hnsw (embedding vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64)
+    WHERE chunk_type = 'stock';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_rag_embeddings_vector_review
+    ON rag_embeddings USING hnsw (embedding vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64)
+    WHERE chunk_type = 'review';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_rag_embeddings_vector_sale
+    ON rag_embeddings USING hnsw (embedding vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64)
+    WHERE chunk_type = 'sale';
+
+-- 5. Общий HNSW индекс больше не используется поиском
+DROP INDEX CONCURRENTLY IF EXISTS idx_rag_embeddings_vector;
+
+-- Комментарии для документации
+COMMENT ON COLUMN rag_embeddings.cabinet_id IS 'Копия rag_metadata.cabinet_id для фильтрации без JOIN';
+COMMENT ON COLUMN rag_embeddings.chunk_type IS 'Копия rag_metadata.chunk_type, ключ частичных HNSW индексов';
+
+-- Проверка: все строки заполнены
+SELECT
+    COUNT(*) AS total_embeddings,
+    COUNT(*) FILTER (WHERE chunk_type = 'order') AS orders,
+    COUNT(*) FILTER (WHERE chunk_type = 'product') AS products,
+    COUNT(*) FILTER (WHERE chunk_type = 'stock') AS stocks,
+    COUNT(*) FILTER (WHERE chunk_type = 'review') AS reviews,
+    COUNT(*) FILTER (WHERE chunk_type = 'sale') AS sales
+FROM rag_embeddings;
@@ -11,12 +11,28 @@ from sqlalchemy import (
     Column, Integer, String, Text, DateTime, 
     ForeignKey, Index, UniqueConstraint
 )
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 from pgvector.sqlalchemy import Vector
 from .database import RAGBase
 
 
+# Типы чанков; для каждого строится частичный HNSW индекс по rag_embeddings
+CHUNK_TYPES = ('order', 'product', 'stock', 'review', 'sale')
+
+
+def _hnsw_partial_index(chunk_type: str) -> Index:
+    """Частичный HNSW индекс по эмбеддингам одного типа чанков."""
+    return Index(
+        f'idx_rag_embeddings_vector_{chunk_type}',
+        'embedding',
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'embedding': 'vector_cosine_ops'},
+        postgresql_where=text(f"chunk_type = '{chunk_type}'"),
+    )
+
+
 class RAGMetadata(RAGBase):
     """
     Метаданные и исходный текст чанков.
@@ -55,17 +71,29 @@ class RAGEmbedding(RAGBase):
     Векторные представления документов.
     
     Хранит embedding размерности 1536 (для OpenAI text-embedding-3-small).
+
+    cabinet_id и chunk_type денормализованы из rag_metadata, чтобы фильтрация
+    при векторном поиске шла по индексам самой таблицы, без JOIN.
     """
     __tablename__ = "rag_embeddings"
     
     id = Column(Integer, primary_key=True, index=True)
     embedding = Column(Vector(1536), nullable=False)
     metadata_id = Column(Integer, ForeignKey("rag_metadata.id", ondelete="CASCADE"), nullable=False, index=True)
+    cabinet_id = Column(Integer, nullable=False)
+    chunk_type = Column(String(20), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Связи
     rag_metadata = relationship("RAGMetadata", back_populates="embeddings")
+
+    # Индексы: btree для точного поиска по маленьким кабинетам
+    # и частичные HNSW индексы по каждому типу чанков
+    __table_args__ = (
+        Index('idx_rag_embeddings_cabinet_type', 'cabinet_id', 'chunk_type'),
+        *(_hnsw_partial_index(chunk_type) for chunk_type in CHUNK_TYPES),
+    )
     
     def __repr__(self) -> str:
         return f"<RAGEmbedding(id={self.id}, metadata_id={self.metadata_id})>"
@@ -8,6 +8,7 @@ from typing import Optional, List
 
 from .vector_search import VectorSearch
 from .context_builder import ContextBuilder
+from .retrieval_cache import RAG_CACHE_ENABLED, RetrievalCache, retrieval_cache, get_index_version
 
 logger = logging.getLogger(__name__)
 
@@ -27,8 +28,9 @@ async def enrich_prompt_with_rag(
     Asynchronously enriches a prompt with context from RAG.
     
     Process:
-    1. Search for relevant chunks via VectorSearch.
-    2. Build context via ContextBuilder.
+    0. Look up a cached context for this cabinet, query and index version.
+    1. Search for relevant chunks via VectorSearch (on cache miss).
+    2. Build context via ContextBuilder (on cache miss).
     3. Combine the original prompt with the context.
     """
     if not RAG_ENABLED:
@@ -45,32 +47,57 @@ async def enrich_prompt_with_rag(
             f"query='{user_message[:50]}...'"
         )
         
-        # 1. Search for relevant chunks
+        max_chunks = max_chunks or int(os.getenv("RAG_MAX_CHUNKS", "5"))
         vector_search = VectorSearch()
-        chunks = await vector_search.search_relevant_chunks(
-            query_text=user_message,
-            cabinet_id=cabinet_id,
-            chunk_types=chunk_types,
-            max_chunks=max_chunks or int(os.getenv("RAG_MAX_CHUNKS", "5"))
-        )
-        
-        if not chunks:
-            logger.info(
-                f"⚠️ No relevant chunks found for cabinet_id={cabinet_id}, "
-                f"returning original prompt"
-            )
-            return original_prompt
-        
-        # 2. Build context
-        context_builder = ContextBuilder()
-        context = context_builder.build_context(chunks)
-        
-        if not context or not context.strip():
-            logger.warning(
-                f"⚠️ Context is empty after building for cabinet_id={cabinet_id}, "
-                f"returning original prompt"
+
+        # 0. Retrieval cache: same question before the next indexing -> same context
+        cache_key = None
+        if RAG_CACHE_ENABLED:
+            try:
+                detected_types = (
+                    chunk_types if chunk_types is not None
+                    else vector_search._detect_chunk_types_from_query(user_message)
+                )
+                cache_key = RetrievalCache.make_key(
+                    cabinet_id, user_message, detected_types, max_chunks,
+                    get_index_version(cabinet_id)
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ RAG cache unavailable, searching without cache: {e}")
+
+        context = retrieval_cache.get(cache_key) if cache_key is not None else None
+        if context is not None:
+            logger.info(f"⚡ RAG cache hit: cabinet_id={cabinet_id}, context_length={len(context)}")
+        else:
+            # 1. Search for relevant chunks
+            chunks = await vector_search.search_relevant_chunks(
+                query_text=user_message,
+                cabinet_id=cabinet_id,
+                chunk_types=chunk_types,
+                max_chunks=max_chunks
             )
-            return original_prompt
+
+            if not chunks:
+                logger.info(
+                    f"⚠️ No relevant chunks found for cabinet_id={cabinet_id}, "
+                    f"returning original prompt"
+                )
+                return original_prompt
+
+            # 2. Build context
+            context_builder = ContextBuilder()
+            context = context_builder.build_context(chunks)
+
+            if not context or not context.strip():
+                logger.warning(
+                    f"⚠️ Context is empty after building for cabinet_id={cabinet_id}, "
+                    f"returning original prompt"
+                )
+                return original_prompt
+
+            # Empty results are not cached: search errors are also reported as []
+            if cache_key is not None:
+                retrieval_cache.set(cache_key, context)
         
         # 3. Combine prompt with context
         enriched_prompt = f"""{original_prompt}
@@ -87,7 +114,6 @@ async def enrich_prompt_with_rag(
         logger.info(
             f"✅ Prompt enriched with context: "
             f"context_length={len(context)}, "
-            f"chunks={len(chunks)}, "
             f"cabinet_id={cabinet_id}"
         )
         
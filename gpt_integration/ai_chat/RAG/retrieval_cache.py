@@ -0,0 +1,139 @@
+"""
+Retrieval Cache - кэш результатов RAG поиска.
+
+Хранит готовую строку контекста для (cabinet_id, нормализованный запрос,
+типы чанков, max_chunks, версия индекса). Версия индекса берется из
+rag_index_status (последняя полная или инкрементальная индексация), поэтому
+после переиндексации кабинета старые записи перестают совпадать по ключу,
+даже если индексация прошла в другом процессе. Индексатор дополнительно
+вызывает invalidate_cabinet(), чтобы сразу освободить память.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from .database import RAGSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+RAG_CACHE_ENABLED = os.getenv("RAG_CACHE_ENABLED", "true").lower() == "true"
+
+
+def normalize_query(query_text: str) -> str:
+    """
+    Нормализация запроса для ключа кэша.
+
+    Регистр, повторные пробелы и завершающая пунктуация не влияют на поиск
+    по смыслу, но давали бы разные ключи для одного и того же вопроса.
+    """
+    normalized = re.sub(r"\s+", " ", query_text.strip().lower())
+    return normalized.rstrip("?!.… ")
+
+
+def get_index_version(cabinet_id: int) -> Optional[str]:
+    """
+    Версия RAG индекса кабинета: время последней (полной или инкрементальной) индексации.
+
+    Returns:
+        ISO-строка времени или None, если кабинет еще не индексировался
+    """
+    db = RAGSessionLocal()
+    try:
+        row = db.execute(
+            text("""
+                SELECT last_indexed_at, last_incremental_at
+                FROM rag_index_status
+                WHERE cabinet_id = :cabinet_id
+            """),
+            {'cabinet_id': cabinet_id}
+        ).fetchone()
+    finally:
+        db.close()
+
+    if not row:
+        return None
+    timestamps = [ts for ts in (row.last_indexed_at, row.last_incremental_at) if ts is not None]
+    return max(timestamps).isoformat() if timestamps else None
+
+
+class RetrievalCache:
+    """
+    LRU кэш с TTL для готового RAG контекста.
+
+    TTL ограничивает устаревание для запросов с относительным временем
+    ("сегодня", "за неделю"), ответ на которые меняется без переиндексации.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries or int(os.getenv("RAG_CACHE_MAX_ENTRIES", "1000"))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("RAG_CACHE_TTL_SECONDS", "900"))
+        self._entries: "OrderedDict[Hashable, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(
+        cabinet_id: int,
+        query_text: str,
+        chunk_types: Optional[List[str]],
+        max_chunks: int,
+        index_version: Optional[str]
+    ) -> Tuple:
+        """Ключ кэша; порядок chunk_types не важен."""
+        types_key = tuple(sorted(chunk_types)) if chunk_types else None
+        return (cabinet_id, normalize_query(query_text), types_key, max_chunks, index_version)
+
+    def get(self, key: Tuple) -> Optional[str]:
+        """Контекст по ключу или None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Tuple, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_cabinet(self, cabinet_id: int) -> int:
+        """Удалить все записи кабинета. Returns: количество удаленных записей."""
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == cabinet_id]
+            for key in keys:
+                del self._entries[key]
+        if keys:
+            logger.info(f"🧹 RAG cache invalidated for cabinet_id={cabinet_id}: {len(keys)} entries")
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Общий экземпляр на процесс
+retrieval_cache = RetrievalCache()
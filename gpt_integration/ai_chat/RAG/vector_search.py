@@ -14,7 +14,7 @@ from sqlalchemy import text
 from gpt_integration.comet_client import comet_client
 
 from .database import RAGSessionLocal
-from .models import RAGEmbedding, RAGMetadata
+from .models import RAGEmbedding, RAGMetadata, CHUNK_TYPES
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +41,33 @@ class VectorSearch:
         self.similarity_threshold = similarity_threshold or float(
             os.getenv("RAG_SIMILARITY_THRESHOLD", "0.3")
         )
+        # Кабинеты с числом чанков не больше порога ищутся точным перебором
+        self.exact_search_max_chunks = int(
+            os.getenv("RAG_EXACT_SEARCH_MAX_CHUNKS", "20000")
+        )
+        # Режим hnsw.iterative_scan (pgvector >= 0.8): relaxed_order / strict_order
+        self.hnsw_iterative_scan = os.getenv("RAG_HNSW_ITERATIVE_SCAN", "").strip() or None
+        if self.hnsw_iterative_scan not in (None, "relaxed_order", "strict_order"):
+            logger.warning(
+                f"⚠️ Unknown RAG_HNSW_ITERATIVE_SCAN={self.hnsw_iterative_scan!r}, ignoring"
+            )
+            self.hnsw_iterative_scan = None
+
+    def _use_exact_search(self, db: Session, cabinet_id: int) -> bool:
+        """
+        Решает, искать ли точным перебором вместо HNSW.
+
+        Для маленьких кабинетов HNSW с пост-фильтром по cabinet_id теряет recall,
+        а перебор нескольких тысяч векторов по btree индексу быстрее обхода графа.
+        Размер кабинета берется из rag_index_status.total_chunks.
+        """
+        if self.exact_search_max_chunks <= 0:
+            return False
+        total_chunks = db.execute(
+            text("SELECT total_chunks FROM rag_index_status WHERE cabinet_id = :cabinet_id"),
+            {'cabinet_id': cabinet_id}
+        ).scalar()
+        return total_chunks is not None and total_chunks <= self.exact_search_max_chunks
     
     async def generate_query_embedding(self, query_text: str) -> List[float]:
         """
@@ -112,57 +139,73 @@ class VectorSearch:
             # Преобразовать список в строку для PostgreSQL vector
             embedding_str = '[' + ','.join(map(str, query_embedding)) + ']'
             
-            # Построить SQL запрос
-            # Используем inner product (<=>) для нормализованных векторов (OpenAI embeddings)
-            # Для нормализованных векторов: cosine similarity ≈ inner product
-            # pgvector возвращает NEGATIVE inner product с оператором <=>
-            # Значения в диапазоне [-1, 1], где -1 = наиболее похожие, 1 = наименее похожие
-            # Поэтому умножаем на -1 для получения similarity в диапазоне [0, 1]
-            # Сортируем по ASC (от меньшего к большему = от самого отрицательного к положительному)
+            # Используем cosine distance (<=>): similarity = 1 - distance.
             # Важно: используем f-string для embedding_str, так как SQLAlchemy не может правильно
             # обработать placeholder с ::vector из-за двойного двоеточия
+            #
+            # cabinet_id и chunk_type денормализованы в rag_embeddings, поэтому фильтр
+            # применяется без JOIN. Для каждого типа чанков есть свой частичный HNSW индекс,
+            # и планировщик выберет его, только если в WHERE стоит равенство с литералом типа -
+            # поэтому поиск по нескольким типам разбивается на UNION ALL по одному типу.
+            # Сортировка внутри ветки только по расстоянию: дополнительный ключ сортировки
+            # не дает использовать HNSW индекс. Tie-break по source_id - во внешнем запросе.
             filter_by_chunk_types = bool(chunk_types and len(chunk_types) > 0)
-            if filter_by_chunk_types:
-                query = text(f"""
-                    SELECT
+            search_types = list(chunk_types if filter_by_chunk_types else CHUNK_TYPES)
+            distance_expr = f"e.embedding <=> '{embedding_str}'::vector"
+            source_filter = "AND m.source_id = :source_id" if source_id is not None else ""
+            select_columns = f"""
                         e.id AS embedding_id,
                         e.metadata_id,
-                        (1 - (e.embedding <=> '{embedding_str}'::vector)) AS similarity,
-                        e.embedding <=> '{embedding_str}'::vector AS distance,
+                        (1 - ({distance_expr})) AS similarity,
+                        {distance_expr} AS distance,
                         m.source_id
+            """
+
+            params = {
+                'cabinet_id': cabinet_id,
+                'limit': limit
+            }
+            if source_id is not None:
+                params['source_id'] = source_id
+
+            use_exact_search = self._use_exact_search(db, cabinet_id)
+            if use_exact_search:
+                # Маленький кабинет: точный перебор по btree (cabinet_id, chunk_type)
+                # дешевле HNSW и дает 100% recall. "+ 0" в ORDER BY отключает HNSW индекс.
+                params['chunk_types'] = search_types
+                query = text(f"""
+                    SELECT {select_columns}
                     FROM rag_embeddings e
                     JOIN rag_metadata m ON e.metadata_id = m.id
-                    WHERE m.cabinet_id = :cabinet_id
-                      AND m.chunk_type = ANY(:chunk_types)
-                      {"AND m.source_id = :source_id" if source_id is not None else ""}
-                    ORDER BY e.embedding <=> '{embedding_str}'::vector ASC, m.source_id DESC
+                    WHERE e.cabinet_id = :cabinet_id
+                      AND e.chunk_type = ANY(:chunk_types)
+                      {source_filter}
+                    ORDER BY ({distance_expr}) + 0 ASC, m.source_id DESC
                     LIMIT :limit
                 """)
             else:
-                query = text(f"""
-                    SELECT
-                        e.id AS embedding_id,
-                        e.metadata_id,
-                        (1 - (e.embedding <=> '{embedding_str}'::vector)) AS similarity,
-                        e.embedding <=> '{embedding_str}'::vector AS distance,
-                        m.source_id
+                branches = []
+                for idx, chunk_type in enumerate(search_types):
+                    params[f'chunk_type_{idx}'] = chunk_type
+                    branches.append(f"""
+                    (SELECT {select_columns}
                     FROM rag_embeddings e
                     JOIN rag_metadata m ON e.metadata_id = m.id
-                    WHERE m.cabinet_id = :cabinet_id
-                      {"AND m.source_id = :source_id" if source_id is not None else ""}
-                    ORDER BY e.embedding <=> '{embedding_str}'::vector ASC, m.source_id DESC
+                    WHERE e.cabinet_id = :cabinet_id
+                      AND e.chunk_type = :chunk_type_{idx}
+                      {source_filter}
+                    ORDER BY {distance_expr} ASC
+                    LIMIT :limit)""")
+                query = text(f"""
+                    SELECT * FROM ({" UNION ALL ".join(branches)}) AS candidates
+                    ORDER BY distance ASC, source_id DESC
                     LIMIT :limit
                 """)
+                if self.hnsw_iterative_scan:
+                    # pgvector >= 0.8: продолжать обход графа, пока фильтр по кабинету
+                    # не наберет limit строк (иначе маленькие кабинеты теряют recall)
+                    db.execute(text(f"SET LOCAL hnsw.iterative_scan = {self.hnsw_iterative_scan}"))
 
-            params = {
-                'cabinet_id': cabinet_id,
-                'limit': limit
-            }
-            if filter_by_chunk_types:
-                params['chunk_types'] = chunk_types
-            if source_id is not None:
-                params['source_id'] = source_id
-            
             # Выполнить запрос
             logger.info(
                 f"📊 Executing vector search: "
@@ -170,7 +213,8 @@ class VectorSearch:
                 f"limit={limit}, "
                 f"chunk_types={chunk_types if chunk_types else 'all'}, "
                 f"similarity_threshold={self.similarity_threshold}, "
-                f"source_id_filter={source_id if source_id is not None else 'none'}"
+                f"source_id_filter={source_id if source_id is not None else 'none'}, "
+                f"mode={'exact' if use_exact_search else 'hnsw'}"
             )
             
             result = db.execute(query, params)
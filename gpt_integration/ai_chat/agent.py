@@ -1,4 +1,4 @@
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Dict, List
 import os
 import json
 import asyncio
@@ -58,6 +58,68 @@ async def _call_llm(
         logger.error(f"LLM call failed: {e}", exc_info=True)
         raise
 
+async def _stream_llm(
+    messages: List[Dict[str, Any]],
+    model: str,
+    usage: Dict[str, int]
+) -> AsyncIterator[str]:
+    """
+    Stream LLM answer with UniversalLLMClient.
+
+    Args:
+        messages: List of messages
+        model: Model ID (gpt-5.1, claude-sonnet-4.5)
+        usage: Filled with total_tokens when the stream ends
+    """
+    temperature = float(os.getenv("COMET_TEMPERATURE", "0.7"))
+    max_tokens = int(os.getenv("COMET_MAX_TOKENS", "2000"))
+
+    try:
+        async for delta in llm_client.chat_completion_stream(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            usage=usage
+        ):
+            yield delta
+    except Exception as e:
+        logger.error(f"LLM stream failed: {e}", exc_info=True)
+        raise
+
+
+async def run_agent_stream(
+    messages: List[Dict[str, Any]],
+    model: str = "gpt-5.1"
+) -> AsyncIterator[Dict[str, Any]]:
+    """Streaming variant of run_agent.
+
+    Tool calling is not wired into _call_llm yet, so the answer is a single
+    LLM call and its text is streamed as it is generated.
+
+    Yields:
+        {"type": "delta", "text": ...} for each fragment, then
+        {"type": "done", "final": ..., "tokens_used": ...}
+    """
+    enriched: List[Dict[str, Any]] = []
+    if not any(m.get("role") == "system" for m in messages):
+        enriched.append({"role": "system", "content": SYSTEM_PROMPT})
+    enriched.extend(messages)
+
+    usage: Dict[str, int] = {}
+    parts: List[str] = []
+    async for delta in _stream_llm(enriched, model=model, usage=usage):
+        parts.append(delta)
+        yield {"type": "delta", "text": delta}
+
+    logger.info("🧮 LLM stream tokens: total=%s", usage.get("total_tokens"))
+    yield {
+        "type": "done",
+        "final": "".join(parts),
+        "tokens_used": usage.get("total_tokens", 0),
+    }
+
+
 async def run_agent(
     messages: List[Dict[str, Any]], 
     model: str = "gpt-5.1"
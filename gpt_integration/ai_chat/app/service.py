@@ -19,9 +19,11 @@ else:
     # Пробуем загрузить из текущей директории (для обратной совместимости)
     load_dotenv(override=False)
 
+import json
+
 from fastapi import APIRouter, FastAPI, HTTPException, Header, Depends
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from openai import OpenAI
 
 from .database import Base, engine, get_db
 from .schemas import (
@@ -36,7 +38,7 @@ from .schemas import (
 )
 from .crud import AIChatCRUD, DAILY_LIMIT
 from .prompts import SYSTEM_PROMPT
-from ..agent import run_agent
+from ..agent import run_agent, run_agent_stream
 from ..tools.db_pool import init_pool as init_asyncpg_pool, close_pool as close_asyncpg_pool
 
 # Import user model helper (correct path)
@@ -107,77 +109,66 @@ def _verify_api_key(x_api_key: Optional[str] = Header(None, alias="X-API-KEY"))
         )
 
 
-def _get_openai_client() -> OpenAI:
-    """
-    Create OpenAI client.
-    
-    Returns:
-        OpenAI: Configured OpenAI client
-        
-    Raises:
-        HTTPException: If OpenAI API key not configured
-    """
-    if not OPENAI_API_KEY:
-        logger.error("❌ OPENAI_API_KEY not configured")
-        raise HTTPException(
-            status_code=500,
-            detail="OpenAI API key not configured"
-        )
-    
-    client_kwargs = {"api_key": OPENAI_API_KEY}
-    if OPENAI_BASE_URL and OPENAI_BASE_URL.strip():
-        client_kwargs["base_url"] = OPENAI_BASE_URL.strip()
-    
-    return OpenAI(**client_kwargs)
-
-
-def _call_openai(
-    messages: list,
-    model: str = OPENAI_MODEL,
-    max_tokens: int = OPENAI_MAX_TOKENS,
-    temperature: float = OPENAI_TEMPERATURE
-) -> tuple[str, int]:
+def _llm_error_to_http(error: RuntimeError, telegram_id: int) -> HTTPException:
     """
-    Call OpenAI API with messages.
+    Map an LLM RuntimeError to the HTTPException returned to the bot.
     
     Args:
-        messages: List of message dicts for OpenAI API
-        model: Model name (default from env)
-        max_tokens: Maximum tokens in response
-        temperature: Sampling temperature (0.0-2.0)
+        error: Error raised by the agent / LLM client
+        telegram_id: Telegram user ID (for logging)
         
     Returns:
-        tuple[str, int]: (response_text, tokens_used)
-        
-    Raises:
-        HTTPException: If API call fails
+        HTTPException: 503 for regional restrictions, 500 otherwise
     """
-    try:
-        client = _get_openai_client()
-        
-        logger.info(f"🤖 Calling OpenAI: model={model}, max_tokens={max_tokens}, temperature={temperature}, messages={len(messages)}")
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            max_tokens=max_tokens,
-            temperature=temperature
-        )
-        
-        response_text = response.choices[0].message.content
-        tokens_used = response.usage.total_tokens
-        
-        logger.info(f"✅ OpenAI response received: {len(response_text)} chars, {tokens_used} tokens")
-        
-        return (response_text, tokens_used)
-        
-    except Exception as e:
-        logger.error(f"❌ OpenAI API error: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"AI service error: {str(e)}"
+    error_msg = str(error)
+    if "недоступен в вашем регионе" in error_msg or "unsupported_country" in error_msg.lower():
+        logger.error(f"❌ Regional restriction error for telegram_id={telegram_id}: {error_msg}")
+        return HTTPException(
+            status_code=503,
+            detail={
+                "error": "OpenAI API unavailable",
+                "message": (
+                    "⚠️ OpenAI API недоступен в вашем регионе.\n\n"
+                    "Для решения проблемы необходимо настроить альтернативный API endpoint:\n"
+                    "1. Используйте прокси-сервер для OpenAI API\n"
+                    "2. Или используйте OpenAI-совместимый провайдер (Azure OpenAI, Anyscale и др.)\n"
+                    "3. Установите переменную окружения OPENAI_BASE_URL с адресом альтернативного endpoint\n\n"
+                    f"Технические детали: {error_msg}"
+                )
+            }
         )
 
+    logger.error(f"❌ Runtime error for telegram_id={telegram_id}: {error_msg}")
+    # Убираем дублирование, если сообщение уже содержит "Ошибка запроса к LLM"
+    if "Ошибка запроса к LLM:" in error_msg:
+        display_msg = error_msg
+    else:
+        display_msg = f"⚠️ Ошибка запроса к LLM: {error_msg}"
+    return HTTPException(
+        status_code=500,
+        detail={
+            "error": "LLM request failed",
+            "message": display_msg
+        }
+    )
+
+
+def _unexpected_llm_error(error: Exception, telegram_id: int) -> HTTPException:
+    """Generic 500 for unexpected agent failures."""
+    logger.error(f"❌ Unexpected error for telegram_id={telegram_id}: {error}", exc_info=True)
+    return HTTPException(
+        status_code=500,
+        detail={
+            "error": "Internal server error",
+            "message": "⚠️ Произошла внутренняя ошибка. Пожалуйста, повторите попытку позже."
+        }
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 
 router = APIRouter(tags=["ai-chat"])
 
@@ -195,6 +186,107 @@ async def health_check():
     }
 
 
+async def _prepare_chat(request: ChatSendRequest, crud: AIChatCRUD) -> tuple[int, str, list]:
+    """
+    Common part of /send and /send/stream: rate limit, user model, RAG and message list.
+    
+    Returns:
+        tuple[int, str, list]: (remaining_requests, user_model, messages)
+        
+    Raises:
+        HTTPException: 429 if the daily limit is exceeded
+    """
+    telegram_id = request.telegram_id
+    message = request.message
+    user_context = request.user_context
+    
+    # Check and update rate limit
+    can_request, remaining = crud.check_and_update_limit(telegram_id)
+    
+    if not can_request:
+        logger.warning(f"⛔ Rate limit exceeded for telegram_id={telegram_id}")
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "error": "Rate limit exceeded",
+                "message": (
+                    f"Вы исчерпали дневной лимит запросов ({DAILY_LIMIT}/день). "
+                    "Попробуйте завтра! 🌅"
+                ),
+                "daily_limit": DAILY_LIMIT,
+                "requests_today": DAILY_LIMIT,
+                "requests_remaining": 0
+            }
+        )
+    
+    # Get recent context for AI
+    context_messages = crud.get_recent_context(telegram_id, limit=5)
+    
+    # Получаем предпочитаемую модель пользователя
+    user_model = await get_user_preferred_model_async(telegram_id)
+    logger.info(f"🤖 Using AI model for user {telegram_id}: {user_model}")
+    
+    # RAG: Получить cabinet_id и обогатить промпт
+    system_prompt = SYSTEM_PROMPT
+    cabinet_id = None
+    
+    if RAG_ENABLED:
+        try:
+            cabinet_id = await get_cabinet_id_for_user(telegram_id)
+            if cabinet_id:
+                system_prompt = await enrich_prompt_with_rag(
+                    user_message=message,
+                    cabinet_id=cabinet_id,
+                    original_prompt=SYSTEM_PROMPT
+                )
+                logger.info(
+                    f"✅ Prompt enriched with RAG context for "
+                    f"telegram_id={telegram_id}, cabinet_id={cabinet_id}"
+                )
+            else:
+                logger.debug(
+                    f"⚠️ Cabinet not found for telegram_id={telegram_id}, "
+                    f"using original prompt"
+                )
+        except Exception as e:
+            logger.error(
+                f"❌ Error enriching prompt with RAG for "
+                f"telegram_id={telegram_id}: {e}",
+                exc_info=True
+            )
+            # Fallback на исходный промпт
+            system_prompt = SYSTEM_PROMPT
+    
+    # Build messages for OpenAI
+    # Добавляем telegram_id в system prompt, чтобы AI знал его и не запрашивал у пользователя
+    system_prompt_with_context = f"""{system_prompt}
+
+**КРИТИЧЕСКИ ВАЖНО - КОНТЕКСТ ПОЛЬЗОВАТЕЛЯ:**
+- Telegram ID пользователя: {telegram_id}
+- ❌ НИКОГДА не запрашивай Telegram ID у пользователя - он уже известен!
+- ✅ ВСЕГДА используй `telegram_id={telegram_id}` при вызове любого инструмента.
+- ✅ Например, вызов инструмента `run_report` должен выглядеть так: `run_report(report_name='top_products', params={{'telegram_id': {telegram_id}}})`. `telegram_id` должен быть внутри `params`.
+- ✅ Если пользователь спрашивает про свои данные, сразу используй инструменты с `telegram_id={telegram_id}`, НЕ спрашивая у пользователя."""
+    
+    messages = [
+        {"role": "system", "content": system_prompt_with_context},
+        *context_messages,
+    ]
+    
+    # Add user context if available
+    if user_context:
+        messages.append({
+            "role": "system",
+            "content": f"📊 ДАННЫЕ ПОЛЬЗОВАТЕЛЯ:\n{user_context}\n\nИспользуй эти данные для персонализированных ответов!"
+        })
+        logger.info(f"✅ Added user context: {len(user_context)} chars")
+    
+    # Add user message
+    messages.append({"role": "user", "content": message})
+    
+    return remaining, user_model, messages
+
+
 @router.post("/send", response_model=ChatSendResponse)
 async def send_message(
     request: ChatSendRequest,
@@ -215,90 +307,7 @@ async def send_message(
     try:
         # Initialize CRUD
         crud = AIChatCRUD(db)
-        
-        # Check and update rate limit
-        can_request, remaining = crud.check_and_update_limit(telegram_id)
-        
-        if not can_request:
-            logger.warning(f"⛔ Rate limit exceeded for telegram_id={telegram_id}")
-            raise HTTPException(
-                status_code=429,
-                detail={
-                    "error": "Rate limit exceeded",
-                    "message": (
-                        f"Вы исчерпали дневной лимит запросов ({DAILY_LIMIT}/день). "
-                        "Попробуйте завтра! 🌅"
-                    ),
-                    "daily_limit": DAILY_LIMIT,
-                    "requests_today": DAILY_LIMIT,
-                    "requests_remaining": 0
-                }
-            )
-        
-        # Get recent context for AI
-        context_messages = crud.get_recent_context(telegram_id, limit=5)
-        
-        # Получаем предпочитаемую модель пользователя
-        user_model = await get_user_preferred_model_async(telegram_id)
-        logger.info(f"🤖 Using AI model for user {telegram_id}: {user_model}")
-        
-        # RAG: Получить cabinet_id и обогатить промпт
-        system_prompt = SYSTEM_PROMPT
-        cabinet_id = None
-        
-        if RAG_ENABLED:
-            try:
-                cabinet_id = await get_cabinet_id_for_user(telegram_id)
-                if cabinet_id:
-                    system_prompt = await enrich_prompt_with_rag(
-                        user_message=message,
-                        cabinet_id=cabinet_id,
-                        original_prompt=SYSTEM_PROMPT
-                    )
-                    logger.info(
-                        f"✅ Prompt enriched with RAG context for "
-                        f"telegram_id={telegram_id}, cabinet_id={cabinet_id}"
-                    )
-                else:
-                    logger.debug(
-                        f"⚠️ Cabinet not found for telegram_id={telegram_id}, "
-                        f"using original prompt"
-                    )
-            except Exception as e:
-                logger.error(
-                    f"❌ Error enriching prompt with RAG for "
-                    f"telegram_id={telegram_id}: {e}",
-                    exc_info=True
-                )
-                # Fallback на исходный промпт
-                system_prompt = SYSTEM_PROMPT
-        
-        # Build messages for OpenAI
-        # Добавляем telegram_id в system prompt, чтобы AI знал его и не запрашивал у пользователя
-        system_prompt_with_context = f"""{system_prompt}
-
-**КРИТИЧЕСКИ ВАЖНО - КОНТЕКСТ ПОЛЬЗОВАТЕЛЯ:**
-- Telegram ID пользователя: {telegram_id}
-- ❌ НИКОГДА не запрашивай Telegram ID у пользователя - он уже известен!
-- ✅ ВСЕГДА используй `telegram_id={telegram_id}` при вызове любого инструмента.
-- ✅ Например, вызов инструмента `run_report` должен выглядеть так: `run_report(report_name='top_products', params={{'telegram_id': {telegram_id}}})`. `telegram_id` должен быть внутри `params`.
-- ✅ Если пользователь спрашивает про свои данные, сразу используй инструменты с `telegram_id={telegram_id}`, НЕ спрашивая у пользователя."""
-        
-        messages = [
-            {"role": "system", "content": system_prompt_with_context},
-            *context_messages,
-        ]
-        
-        # Add user context if available
-        if user_context:
-            messages.append({
-                "role": "system",
-                "content": f"📊 ДАННЫЕ ПОЛЬЗОВАТЕЛЯ:\n{user_context}\n\nИспользуй эти данные для персонализированных ответов!"
-            })
-            logger.info(f"✅ Added user context: {len(user_context)} chars")
-        
-        # Add user message
-        messages.append({"role": "user", "content": message})
+        remaining, user_model, messages = await _prepare_chat(request, crud)
         
         # Stage 1: Call internal agent (LLM + tools in next stage)
         try:
@@ -307,46 +316,9 @@ async def send_message(
             tokens_used = agent_result.get("tokens_used", 0)
         except RuntimeError as e:
             # Handle regional restriction and other runtime errors
-            error_msg = str(e)
-            if "недоступен в вашем регионе" in error_msg or "unsupported_country" in error_msg.lower():
-                logger.error(f"❌ Regional restriction error for telegram_id={telegram_id}: {error_msg}")
-                raise HTTPException(
-                    status_code=503,
-                    detail={
-                        "error": "OpenAI API unavailable",
-                        "message": (
-                            "⚠️ OpenAI API недоступен в вашем регионе.\n\n"
-                            "Для решения проблемы необходимо настроить альтернативный API endpoint:\n"
-                            "1. Используйте прокси-сервер для OpenAI API\n"
-                            "2. Или используйте OpenAI-совместимый провайдер (Azure OpenAI, Anyscale и др.)\n"
-                            "3. Установите переменную окружения OPENAI_BASE_URL с адресом альтернативного endpoint\n\n"
-                            f"Технические детали: {error_msg}"
-                        )
-                    }
-                )
-            else:
-                logger.error(f"❌ Runtime error for telegram_id={telegram_id}: {error_msg}")
-                # Убираем дублирование, если сообщение уже содержит "Ошибка запроса к LLM"
-                if "Ошибка запроса к LLM:" in error_msg:
-                    display_msg = error_msg
-                else:
-                    display_msg = f"⚠️ Ошибка запроса к LLM: {error_msg}"
-                raise HTTPException(
-                    status_code=500,
-                    detail={
-                        "error": "LLM request failed",
-                        "message": display_msg
-                    }
-                )
+            raise _llm_error_to_http(e, telegram_id)
         except Exception as e:
-            logger.error(f"❌ Unexpected error for telegram_id={telegram_id}: {e}", exc_info=True)
-            raise HTTPException(
-                status_code=500,
-                detail={
-                    "error": "Internal server error",
-                    "message": "⚠️ Произошла внутренняя ошибка. Пожалуйста, повторите попытку позже."
-                }
-            )
+            raise _unexpected_llm_error(e, telegram_id)
         
         # Save to database
         crud.save_chat_request(
@@ -379,6 +351,83 @@ async def send_message(
         )
 
 
+@router.post("/send/stream")
+async def send_message_stream(
+    request: ChatSendRequest,
+    db: Session = Depends(get_db),
+    _: None = Depends(_verify_api_key)
+):
+    """
+    Send message to AI and stream the response as Server-Sent Events.
+    
+    Rate limit and validation errors are returned as regular HTTP errors
+    before the stream starts. The stream then contains:
+    - ``delta`` events: {"text": "..."} with answer fragments
+    - one ``done`` event: same fields as ChatSendResponse
+    - or one ``error`` event: {"status_code", "error", "message"}
+    """
+    telegram_id = request.telegram_id
+    message = request.message
+    
+    logger.info(f"📨 Received streaming chat request: telegram_id={telegram_id}, message_length={len(message)}")
+    
+    try:
+        crud = AIChatCRUD(db)
+        remaining, user_model, messages = await _prepare_chat(request, crud)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Database/CRUD error for telegram_id={telegram_id}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": "Database error",
+                "message": f"⚠️ Ошибка работы с базой данных: {str(e)}"
+            }
+        )
+    
+    async def event_stream():
+        response_text = ""
+        tokens_used = 0
+        try:
+            async for event in run_agent_stream(messages, model=user_model):
+                if event["type"] == "delta":
+                    yield _sse("delta", {"text": event["text"]})
+                else:
+                    response_text = event["final"]
+                    tokens_used = event["tokens_used"]
+        except Exception as e:
+            error = _llm_error_to_http(e, telegram_id) if isinstance(e, RuntimeError) else _unexpected_llm_error(e, telegram_id)
+            yield _sse("error", {"status_code": error.status_code, **error.detail})
+            return
+        
+        # The get_db session is closed once the endpoint returns; a closed
+        # SQLAlchemy Session is reusable and opens a new transaction here.
+        try:
+            crud.save_chat_request(
+                telegram_id=telegram_id,
+                user_id=None,
+                message=message,
+                response=response_text,
+                tokens_used=tokens_used
+            )
+        except Exception as e:
+            logger.error(f"❌ Failed to save streamed chat for telegram_id={telegram_id}: {e}", exc_info=True)
+        
+        logger.info(f"✅ Streaming chat request completed: telegram_id={telegram_id}, remaining={remaining}")
+        yield _sse("done", {
+            "response": response_text,
+            "remaining_requests": remaining,
+            "tokens_used": tokens_used
+        })
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/history", response_model=ChatHistoryResponse)
 async def get_history(
     request: ChatHistoryRequest,
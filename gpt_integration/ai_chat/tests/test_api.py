@@ -2,6 +2,7 @@
 Integration tests for API endpoints.
 """
 
+import json
 from datetime import date
 from unittest.mock import AsyncMock, patch
 
@@ -98,6 +99,71 @@ class TestChatSendEndpoint:
         assert response.status_code == 422
 
 
+def _stream_events(response_text: str) -> list:
+    """Parse SSE body into (event, data) pairs."""
+    events = []
+    for block in response_text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def _fake_stream(*parts, error=None):
+    """Build a run_agent_stream replacement yielding the given parts."""
+    async def _stream(messages, model=None):
+        for part in parts:
+            yield {"type": "delta", "text": part}
+        if error:
+            raise error
+        yield {"type": "done", "final": "".join(parts), "tokens_used": 42}
+    return _stream
+
+
+class TestChatSendStreamEndpoint:
+    """Tests for POST /v1/chat/send/stream endpoint."""
+    
+    def test_stream_message_success(self, client, headers, sample_telegram_id, test_db_session):
+        """Should stream deltas, then a done event, and save the full answer."""
+        payload = {"telegram_id": sample_telegram_id, "message": "Как увеличить продажи?"}
+        
+        with patch("gpt_integration.ai_chat.app.service.run_agent_stream", _fake_stream("Это ", "ответ")):
+            response = client.post("/v1/chat/send/stream", json=payload, headers=headers)
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _stream_events(response.text)
+        assert [e for e, _ in events] == ["delta", "delta", "done"]
+        assert events[-1][1]["response"] == "Это ответ"
+        assert events[-1][1]["tokens_used"] == 42
+        
+        history = client.post(
+            "/v1/chat/history", json={"telegram_id": sample_telegram_id}, headers=headers
+        ).json()
+        assert history["total"] == 1
+        assert history["items"][0]["response"] == "Это ответ"
+    
+    def test_stream_message_llm_error(self, client, headers, sample_telegram_id):
+        """LLM failure after the stream started should be sent as an error event."""
+        payload = {"telegram_id": sample_telegram_id, "message": "Test"}
+        stream = _fake_stream("Част", error=RuntimeError("Ошибка запроса к LLM: timeout"))
+        
+        with patch("gpt_integration.ai_chat.app.service.run_agent_stream", stream):
+            response = client.post("/v1/chat/send/stream", json=payload, headers=headers)
+        
+        events = _stream_events(response.text)
+        assert events[-1][0] == "error"
+        assert events[-1][1]["status_code"] == 500
+        assert "timeout" in events[-1][1]["message"]
+    
+    def test_stream_message_without_api_key(self, client, sample_telegram_id):
+        """Should reject request without API key before streaming."""
+        payload = {"telegram_id": sample_telegram_id, "message": "Test"}
+        
+        response = client.post("/v1/chat/send/stream", json=payload)
+        
+        assert response.status_code == 403
+
+
 class TestChatHistoryEndpoint:
     """Tests for POST /v1/chat/history endpoint."""
     
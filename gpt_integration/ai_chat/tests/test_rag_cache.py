@@ -0,0 +1,120 @@
+"""
+Tests for the RAG retrieval cache.
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from gpt_integration.ai_chat.RAG import prompt_enricher
+from gpt_integration.ai_chat.RAG.retrieval_cache import RetrievalCache, normalize_query
+
+
+SAMPLE_CHUNKS = [{
+    "chunk_text": "Товар 123456: цена 1000 руб.",
+    "chunk_type": "product",
+    "similarity": 0.9,
+    "source_table": "wb_products",
+    "source_id": 123456,
+}]
+
+
+@pytest.fixture
+def fresh_cache():
+    """Isolated cache instance patched into the enricher."""
+    cache = RetrievalCache(max_entries=10, ttl_seconds=60)
+    with patch.object(prompt_enricher, "retrieval_cache", cache):
+        yield cache
+
+
+@pytest.fixture
+def mock_search():
+    """VectorSearch.search_relevant_chunks returning a fixed chunk list."""
+    with patch.object(
+        prompt_enricher.VectorSearch,
+        "search_relevant_chunks",
+        new_callable=AsyncMock,
+        return_value=SAMPLE_CHUNKS,
+    ) as search:
+        yield search
+
+
+class TestRetrievalCache:
+    """Tests for RetrievalCache itself."""
+
+    def test_normalize_query(self):
+        """Case, whitespace and trailing punctuation should not change the key."""
+        assert normalize_query("  Сколько   ОСТАТКОВ?? ") == "сколько остатков"
+
+    def test_key_ignores_chunk_type_order(self):
+        """Chunk type order should not produce different keys."""
+        key1 = RetrievalCache.make_key(1, "q", ["order", "sale"], 5, "v1")
+        key2 = RetrievalCache.make_key(1, "q", ["sale", "order"], 5, "v1")
+        assert key1 == key2
+
+    def test_lru_eviction(self):
+        """Oldest entries should be evicted over max_entries."""
+        cache = RetrievalCache(max_entries=2, ttl_seconds=60)
+        cache.set(("a",), "1")
+        cache.set(("b",), "2")
+        cache.get(("a",))
+        cache.set(("c",), "3")
+        assert cache.get(("b",)) is None
+        assert cache.get(("a",)) == "1"
+
+    def test_ttl_expiry(self):
+        """Expired entries should be treated as misses."""
+        cache = RetrievalCache(max_entries=2, ttl_seconds=60)
+        with patch("gpt_integration.ai_chat.RAG.retrieval_cache.time.monotonic", return_value=0):
+            cache.set(("a",), "1")
+        with patch("gpt_integration.ai_chat.RAG.retrieval_cache.time.monotonic", return_value=61):
+            assert cache.get(("a",)) is None
+
+    def test_invalidate_cabinet(self):
+        """Only the given cabinet's entries should be removed."""
+        cache = RetrievalCache(max_entries=10, ttl_seconds=60)
+        cache.set(RetrievalCache.make_key(1, "a", None, 5, "v1"), "1")
+        cache.set(RetrievalCache.make_key(1, "b", None, 5, "v1"), "2")
+        cache.set(RetrievalCache.make_key(2, "a", None, 5, "v1"), "3")
+        assert cache.invalidate_cabinet(1) == 2
+        assert len(cache) == 1
+
+
+class TestEnrichPromptCache:
+    """Tests for the cache integration in enrich_prompt_with_rag."""
+
+    async def test_repeated_question_hits_cache(self, fresh_cache, mock_search):
+        """Same question with the same index version should search once."""
+        with patch.object(prompt_enricher, "get_index_version", return_value="v1"):
+            first = await prompt_enricher.enrich_prompt_with_rag("Цена товара?", 1, "SYSTEM")
+            second = await prompt_enricher.enrich_prompt_with_rag("цена   товара", 1, "SYSTEM")
+
+        assert first == second
+        assert "Товар 123456" in first
+        assert mock_search.await_count == 1
+        assert fresh_cache.hits == 1
+
+    async def test_new_index_version_misses(self, fresh_cache, mock_search):
+        """Reindexing (new version) should bypass the old cached context."""
+        with patch.object(prompt_enricher, "get_index_version", side_effect=["v1", "v2"]):
+            await prompt_enricher.enrich_prompt_with_rag("Цена товара?", 1, "SYSTEM")
+            await prompt_enricher.enrich_prompt_with_rag("Цена товара?", 1, "SYSTEM")
+
+        assert mock_search.await_count == 2
+
+    async def test_empty_results_not_cached(self, fresh_cache, mock_search):
+        """Empty search results (possibly errors) should not be cached."""
+        mock_search.return_value = []
+        with patch.object(prompt_enricher, "get_index_version", return_value="v1"):
+            result = await prompt_enricher.enrich_prompt_with_rag("Цена товара?", 1, "SYSTEM")
+
+        assert result == "SYSTEM"
+        assert len(fresh_cache) == 0
+
+    async def test_version_lookup_failure_falls_back_to_search(self, fresh_cache, mock_search):
+        """A failing version lookup should not disable RAG."""
+        with patch.object(prompt_enricher, "get_index_version", side_effect=RuntimeError("db down")):
+            result = await prompt_enricher.enrich_prompt_with_rag("Цена товара?", 1, "SYSTEM")
+
+        assert "Товар 123456" in result
+        assert len(fresh_cache) == 0
@@ -175,6 +175,18 @@ async def _fetch_daily_trends(telegram_id: int, server_host: str, api_secret_key
         # Предпочитаем "data", фолбэк на daily_trends/analytics
         return data.get("data") or data.get("daily_trends") or data.get("analytics") or {}
 
+async def _fetch_chart_base64(chart_url: str, server_host: str, api_secret_key: str) -> str:
+    """Скачать изображение графика по ссылке из daily_trends.chart.url."""
+    import base64
+
+    url = f"{server_host.rstrip('/')}{chart_url}"
+    headers = {"X-API-SECRET-KEY": api_secret_key}
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        resp = await client.get(url, headers=headers)
+        if resp.status_code != 200:
+            raise HTTPException(status_code=resp.status_code, detail=resp.text)
+        return base64.b64encode(resp.content).decode("ascii")
+
 async def _fetch_stocks_critical(telegram_id: int, server_host: str, api_secret_key: str) -> Any:
     """Получить критические остатки с сервера."""
     url = f"{server_host.rstrip('/')}/api/v1/bot/stocks/critical"
@@ -363,6 +375,12 @@ async def orchestrate_analysis(telegram_id: int, period: str, validate_output: b
         chart_obj = daily_trends.get("chart") if isinstance(daily_trends, dict) else None
         chart_base64_data = chart_obj.get("data") if isinstance(chart_obj, dict) else None
         bot_token = os.getenv("BOT_TOKEN", "")
+        # Сервер отдает график ссылкой на закэшированное изображение
+        if not chart_base64_data and isinstance(chart_obj, dict) and chart_obj.get("url") and bot_token:
+            try:
+                chart_base64_data = await _fetch_chart_base64(chart_obj["url"], server_host, api_secret_key)
+            except Exception as chart_err:
+                logger.error(f"❌ Failed to fetch chart {chart_obj.get('url')}: {chart_err}")
         
         # 4.1) Отправка графика
         if isinstance(chart_base64_data, str) and chart_base64_data and bot_token:
@@ -376,7 +394,7 @@ async def orchestrate_analysis(telegram_id: int, period: str, validate_output: b
             if not chart_obj:
                 logger.warning(f"⚠️ No chart object in daily_trends data")
             elif not chart_base64_data:
-                logger.warning(f"⚠️ Chart object present but no 'data' base64 field")
+                logger.warning(f"⚠️ Chart object present but neither 'data' nor 'url' could be used")
             if not bot_token:
                 logger.warning(f"⚠️ BOT_TOKEN not set in environment, cannot send chart")
 
@@ -0,0 +1,294 @@
+"""
+Нормализация изображений перед отправкой в модели (vision, генерация).
+
+Фото с телефона приходят в полном разрешении (12+ Мп, 3-8 МБ) и часто
+повернуты через EXIF. Раньше они уходили в модели как есть: каждый запрос
+открывал новый httpx клиент, base64 раздувал и без того большой файл, а
+модели все равно уменьшают изображение на своей стороне.
+
+ImagePipeline:
+    - скачивает изображения через общий пул соединений;
+    - применяет EXIF orientation и убирает метаданные;
+    - уменьшает до IMAGE_MAX_EDGE по длинной стороне;
+    - перекодирует в JPEG/WebP с качеством IMAGE_QUALITY (если результат
+      не меньше исходника и менять нечего - оставляет исходный формат,
+      а метаданные убирает пересохранением с исходным качеством);
+    - хранит нормализованные байты в LRU кэше (IMAGE_CACHE_MB), повторная
+      загрузка того же фото не скачивает и не перекодирует его заново.
+"""
+
+import os
+import io
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import httpx
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "2048"))
+IMAGE_VISION_MAX_EDGE = int(os.getenv("IMAGE_VISION_MAX_EDGE", "1024"))
+IMAGE_OUTPUT_FORMAT = os.getenv("IMAGE_OUTPUT_FORMAT", "jpeg").lower()
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))
+IMAGE_CACHE_MB = int(os.getenv("IMAGE_CACHE_MB", "64"))
+IMAGE_DOWNLOAD_TIMEOUT = float(os.getenv("IMAGE_DOWNLOAD_TIMEOUT", "30"))
+IMAGE_DOWNLOAD_CONNECTIONS = int(os.getenv("IMAGE_DOWNLOAD_CONNECTIONS", "20"))
+
+OUTPUT_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+}
+
+EXIF_ORIENTATION = 0x0112
+# Ключи Image.info с метаданными (EXIF, в т.ч. GPS, XMP, комментарии)
+METADATA_KEYS = ("exif", "xmp", "XML:com.adobe.xmp", "comment", "photoshop")
+
+_pipeline: Optional["ImagePipeline"] = None
+
+
+@dataclass
+class NormalizedImage:
+    """Результат нормализации"""
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    original_size: int
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+@dataclass
+class PipelineStats:
+    """Счетчики пайплайна для логов и отчетов"""
+    cache_hits: int = 0
+    cache_misses: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    download_seconds: float = 0.0
+    normalize_seconds: float = 0.0
+    seconds_saved_by_cache: float = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return dict(self.__dict__)
+
+
+def normalize_image_bytes(
+    data: bytes,
+    max_edge: int = IMAGE_MAX_EDGE,
+    output_format: str = IMAGE_OUTPUT_FORMAT,
+    quality: int = IMAGE_QUALITY
+) -> NormalizedImage:
+    """
+    EXIF orientation, уменьшение до max_edge и перекодирование
+
+    Args:
+        data: Исходные байты изображения
+        max_edge: Максимальная длинная сторона в пикселях
+        output_format: jpeg или webp
+        quality: Качество кодирования (1-100)
+
+    Returns:
+        NormalizedImage
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format}")
+    pil_format, mime_type = OUTPUT_FORMATS[output_format]
+
+    image = source = Image.open(io.BytesIO(data))
+    source_format = image.format
+    source_mime = Image.MIME.get(source_format, "image/png")
+    needs_rotation = image.getexif().get(EXIF_ORIENTATION, 1) != 1
+    if needs_rotation:
+        image = ImageOps.exif_transpose(image)
+    needs_resize = max(image.size) > max_edge
+
+    if needs_resize:
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    if pil_format == "JPEG" and has_alpha:
+        # JPEG без альфа-канала: прозрачность на белом фоне
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image.convert("RGBA"), mask=image.convert("RGBA").split()[-1])
+        image = background
+    elif image.mode not in ("RGB", "RGBA") or (pil_format == "JPEG" and image.mode != "RGB"):
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    buf = io.BytesIO()
+    image.save(buf, format=pil_format, quality=quality, optimize=True)
+    encoded = buf.getvalue()
+
+    # Маленькое, правильно ориентированное фото перекодирование может только увеличить
+    if not needs_resize and not needs_rotation and len(encoded) >= len(data):
+        stripped = _strip_metadata(source, data)
+        if stripped is not None:
+            return NormalizedImage(stripped, source_mime, image.size[0], image.size[1], len(data))
+    return NormalizedImage(encoded, mime_type, image.size[0], image.size[1], len(data))
+
+
+def _has_metadata(image: Image.Image) -> bool:
+    return (
+        bool(image.getexif())
+        or any(key in image.info for key in METADATA_KEYS)
+        or bool(getattr(image, "text", None))
+    )
+
+
+def _strip_metadata(image: Image.Image, data: bytes) -> Optional[bytes]:
+    """
+    Исходное изображение без метаданных в исходном формате
+
+    JPEG пересохраняется с исходными таблицами квантования (quality="keep"),
+    остальные форматы - без потерь. None - формат не удается пересохранить,
+    нужно брать перекодированный вариант.
+    """
+    if not _has_metadata(image):
+        return data
+    params = {"quality": "keep"} if image.format in ("JPEG", "MPO") else {}
+    buf = io.BytesIO()
+    try:
+        # exif / pnginfo не передаются - Pillow записывает только переданные метаданные
+        image.save(buf, format=image.format, **params)
+    except (OSError, ValueError, KeyError) as e:
+        logger.debug(f"Could not re-save {image.format} without metadata: {e}")
+        return None
+    return buf.getvalue()
+
+
+class ImagePipeline:
+    """Загрузка и нормализация изображений с общим пулом соединений и LRU кэшем"""
+
+    def __init__(
+        self,
+        max_edge: int = IMAGE_MAX_EDGE,
+        output_format: str = IMAGE_OUTPUT_FORMAT,
+        quality: int = IMAGE_QUALITY,
+        cache_bytes: int = IMAGE_CACHE_MB * 1024 * 1024,
+        http_client: Optional[httpx.AsyncClient] = None
+    ):
+        self.max_edge = max_edge
+        self.output_format = output_format
+        self.quality = quality
+        self.cache_bytes = cache_bytes
+        self._client = http_client
+        self._cache: "OrderedDict[Tuple, Tuple[NormalizedImage, float]]" = OrderedDict()
+        self._cached_bytes = 0
+        self.stats = PipelineStats()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(IMAGE_DOWNLOAD_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=IMAGE_DOWNLOAD_CONNECTIONS,
+                    max_keepalive_connections=IMAGE_DOWNLOAD_CONNECTIONS,
+                ),
+                follow_redirects=True,
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def load(self, source: str, max_edge: Optional[int] = None) -> NormalizedImage:
+        """
+        Нормализованное изображение по URL или локальному пути
+
+        Args:
+            source: http(s) URL или путь к файлу
+            max_edge: Переопределить максимальную сторону (например, для vision)
+        """
+        max_edge = max_edge or self.max_edge
+        key = self._cache_key(source, max_edge)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        started = time.monotonic()
+        data = await self._read(source)
+        downloaded = time.monotonic()
+        try:
+            normalized = await asyncio.to_thread(
+                normalize_image_bytes, data, max_edge, self.output_format, self.quality
+            )
+        except Image.UnidentifiedImageError:
+            logger.warning(f"⚠️ Could not decode image {source}, passing original bytes")
+            normalized = NormalizedImage(data, "image/png", 0, 0, len(data))
+        finished = time.monotonic()
+
+        self.stats.cache_misses += 1
+        self.stats.bytes_in += normalized.original_size
+        self.stats.bytes_out += normalized.size
+        self.stats.download_seconds += downloaded - started
+        self.stats.normalize_seconds += finished - downloaded
+        self._cache_put(key, normalized, finished - started)
+        logger.debug(
+            "Normalized %s: %d -> %d bytes, %dx%d, %.0f ms",
+            source, normalized.original_size, normalized.size,
+            normalized.width, normalized.height, (finished - started) * 1000
+        )
+        return normalized
+
+    async def _read(self, source: str) -> bytes:
+        if source.startswith(("http://", "https://")):
+            response = await self.client.get(source)
+            response.raise_for_status()
+            return response.content
+        return await asyncio.to_thread(_read_file, source)
+
+    def _cache_key(self, source: str, max_edge: int) -> Tuple:
+        version = None
+        if not source.startswith(("http://", "https://")):
+            # Локальный файл могли перезаписать - учитываем mtime и размер
+            try:
+                stat = os.stat(source)
+                version = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                version = None
+        return (source, version, max_edge, self.output_format, self.quality)
+
+    def _cache_get(self, key: Tuple) -> Optional[NormalizedImage]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        self._cache.move_to_end(key)
+        normalized, cost = entry
+        self.stats.cache_hits += 1
+        self.stats.seconds_saved_by_cache += cost
+        return normalized
+
+    def _cache_put(self, key: Tuple, normalized: NormalizedImage, cost: float) -> None:
+        if normalized.size > self.cache_bytes:
+            return
+        previous = self._cache.pop(key, None)
+        if previous is not None:
+            self._cached_bytes -= previous[0].size
+        self._cache[key] = (normalized, cost)
+        self._cached_bytes += normalized.size
+        while self._cached_bytes > self.cache_bytes:
+            _, (evicted, _) = self._cache.popitem(last=False)
+            self._cached_bytes -= evicted.size
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def get_image_pipeline() -> ImagePipeline:
+    """Общий пайплайн процесса (один пул соединений и один кэш)"""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = ImagePipeline()
+    return _pipeline
@@ -4,7 +4,8 @@ Universal LLM Client для работы с разными AI моделями
 """
 import os
 import logging
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional
+import httpx
 from openai import AsyncOpenAI
 
 logger = logging.getLogger(__name__)
@@ -19,9 +20,18 @@ class UniversalLLMClient:
         self.openai_base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
         
         if self.openai_api_key:
+            # Один пул соединений на процесс: параллельные чаты переиспользуют
+            # keep-alive соединения вместо нового TLS-handshake на каждый запрос
             self.openai_client = AsyncOpenAI(
                 api_key=self.openai_api_key,
-                base_url=self.openai_base_url if self.openai_base_url.strip() else None
+                base_url=self.openai_base_url if self.openai_base_url.strip() else None,
+                timeout=float(os.getenv("LLM_TIMEOUT", "120")),
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+                        max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20")),
+                    ),
+                ),
             )
             logger.info("✅ OpenAI client initialized")
         else:
@@ -32,6 +42,7 @@ class UniversalLLMClient:
         self.vertex_project = os.getenv("GOOGLE_CLOUD_PROJECT")
         self.vertex_location = os.getenv("VERTEX_AI_LOCATION", "us-central1")
         self.vertex_client = None
+        self._anthropic_vertex = None
         
         if self.vertex_project:
             try:
@@ -72,6 +83,87 @@ class UniversalLLMClient:
         else:
             raise ValueError(f"Unsupported model: {model}")
     
+    async def chat_completion_stream(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        usage: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Потоковый chat completion: отдает текст по частям по мере генерации.
+
+        Args:
+            model: ID модели (gpt-5.1, claude-sonnet-4.5)
+            messages: Список сообщений в формате OpenAI
+            temperature: Температура генерации (0.0-2.0)
+            max_tokens: Максимум токенов в ответе
+            usage: Словарь, в который по завершении записывается total_tokens
+
+        Yields:
+            str: Очередной фрагмент ответа
+
+        Raises:
+            ValueError: Если модель не поддерживается
+            RuntimeError: Если произошла ошибка при запросе
+        """
+        if model.startswith("gpt"):
+            async for delta in self._openai_completion_stream(model, messages, temperature, max_tokens, usage):
+                yield delta
+        elif model.startswith("claude"):
+            # Claude через Vertex AI пока без стриминга: отдаем ответ одним фрагментом
+            response_text, tokens_used = await self._claude_completion(model, messages, temperature, max_tokens)
+            if usage is not None:
+                usage["total_tokens"] = tokens_used
+            yield response_text
+        else:
+            raise ValueError(f"Unsupported model: {model}")
+
+    async def _openai_completion_stream(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        usage: Optional[Dict[str, int]]
+    ) -> AsyncIterator[str]:
+        """OpenAI streaming completion (GPT-5.1)"""
+        if not self.openai_client:
+            raise RuntimeError("OpenAI client not initialized. Check OPENAI_API_KEY")
+
+        try:
+            logger.info(f"🤖 Streaming OpenAI: model={model}, messages={len(messages)}")
+
+            stream = await self.openai_client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+
+            chars = 0
+            async for chunk in stream:
+                if chunk.usage and usage is not None:
+                    usage["total_tokens"] = chunk.usage.total_tokens
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    chars += len(delta)
+                    yield delta
+
+            logger.info(
+                f"✅ OpenAI stream finished: {chars} chars, "
+                f"{usage.get('total_tokens', 0) if usage is not None else '?'} tokens"
+            )
+
+        except Exception as e:
+            logger.error(f"❌ OpenAI API error: {str(e)}")
+            raise RuntimeError(f"OpenAI API error: {str(e)}")
+
     async def _openai_completion(
         self,
         model: str,
@@ -133,13 +225,15 @@ class UniversalLLMClient:
                         "content": msg["content"]
                     })
             
-            # Используем Vertex AI Anthropic API
-            from anthropic import AnthropicVertex
-            
-            client = AnthropicVertex(
-                project_id=self.vertex_project,
-                region=self.vertex_location
-            )
+            # Используем Vertex AI Anthropic API (асинхронный клиент, создается один раз)
+            if self._anthropic_vertex is None:
+                from anthropic import AsyncAnthropicVertex
+
+                self._anthropic_vertex = AsyncAnthropicVertex(
+                    project_id=self.vertex_project,
+                    region=self.vertex_location
+                )
+            client = self._anthropic_vertex
             
             # Маппинг моделей
             vertex_model = "claude-sonnet-4-5@20250514" if model == "claude-sonnet-4.5" else model
@@ -0,0 +1,3 @@
+"""
+Core - Test Suite
+"""
@@ -0,0 +1,49 @@
+"""
+Pytest configuration and fixtures for core tests.
+"""
+
+import io
+import sys
+import pytest
+from pathlib import Path
+from PIL import Image
+
+# Add project root to path for imports
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+
+def make_photo(width, height, fmt="JPEG", mode="RGB", orientation=None, quality=95) -> bytes:
+    """Фото с шумом и градиентом: размер файла близок к реальным фото с телефона."""
+    noise = Image.effect_noise((width, height), 64).convert("L")
+    gradient = Image.linear_gradient("L").resize((width, height))
+    image = Image.merge("RGB", (noise, gradient, noise.transpose(Image.FLIP_LEFT_RIGHT)))
+    if mode == "RGBA":
+        # Прозрачный фон слева направо, как у вырезанного фото товара
+        image.putalpha(Image.linear_gradient("L").rotate(90).resize((width, height)))
+    buf = io.BytesIO()
+    kwargs = {"quality": quality} if fmt == "JPEG" else {}
+    if orientation:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        kwargs["exif"] = exif
+    image.save(buf, format=fmt, **kwargs)
+    return buf.getvalue()
+
+
+@pytest.fixture(scope="session")
+def photo_fixtures(tmp_path_factory):
+    """Набор фото: портрет с телефона (EXIF поворот), пейзаж, PNG с альфой, маленькое превью."""
+    photos = {
+        "phone_portrait.jpg": make_photo(4032, 3024, orientation=6),
+        "phone_landscape.jpg": make_photo(4000, 2250),
+        "product_alpha.png": make_photo(1800, 1800, fmt="PNG", mode="RGBA"),
+        "small_preview.jpg": make_photo(640, 480, quality=70),
+    }
+    tmp_path = tmp_path_factory.mktemp("photos")
+    paths = {}
+    for name, data in photos.items():
+        path = tmp_path / name
+        path.write_bytes(data)
+        paths[name] = str(path)
+    return paths
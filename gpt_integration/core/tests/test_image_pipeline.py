@@ -0,0 +1,146 @@
+"""
+Tests for image normalization pipeline.
+"""
+
+import io
+import os
+import time
+
+import httpx
+import pytest
+from PIL import Image
+
+from gpt_integration.core.image_pipeline import ImagePipeline, normalize_image_bytes
+
+
+def read(path) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class TestNormalizeImageBytes:
+    """Tests for normalize_image_bytes."""
+
+    def test_exif_orientation_applied_and_downscaled(self, photo_fixtures):
+        result = normalize_image_bytes(read(photo_fixtures["phone_portrait.jpg"]), max_edge=2048)
+
+        image = Image.open(io.BytesIO(result.data))
+        # Orientation=6: 4032x3024 на сенсоре - портрет после поворота
+        assert image.size == (1536, 2048) == (result.width, result.height)
+        assert 0x0112 not in image.getexif()
+        assert result.mime_type == "image/jpeg"
+        assert result.size < result.original_size / 3
+
+    def test_alpha_flattened_for_jpeg_and_kept_for_webp(self, photo_fixtures):
+        data = read(photo_fixtures["product_alpha.png"])
+
+        jpeg = normalize_image_bytes(data, max_edge=1024, output_format="jpeg")
+        webp = normalize_image_bytes(data, max_edge=1024, output_format="webp")
+
+        assert Image.open(io.BytesIO(jpeg.data)).mode == "RGB"
+        assert webp.mime_type == "image/webp"
+        assert Image.open(io.BytesIO(webp.data)).mode == "RGBA"
+
+    def test_small_image_not_inflated(self, photo_fixtures):
+        data = read(photo_fixtures["small_preview.jpg"])
+
+        result = normalize_image_bytes(data, max_edge=2048, quality=95)
+
+        assert result.data == data
+        assert (result.width, result.height) == (640, 480)
+
+    def test_small_image_metadata_stripped_without_reencoding(self):
+        exif = Image.Exif()
+        exif[0x010F] = "Phone"
+        exif.get_ifd(0x8825).update({1: "N", 2: (55.0, 45.0, 0.0)})  # GPS
+        buf = io.BytesIO()
+        Image.effect_noise((640, 480), 64).convert("RGB").save(buf, format="JPEG", quality=70, exif=exif)
+        data = buf.getvalue()
+
+        result = normalize_image_bytes(data, max_edge=2048, quality=95)
+
+        image = Image.open(io.BytesIO(result.data))
+        assert result.mime_type == "image/jpeg"
+        assert not image.getexif()
+        assert "exif" not in image.info
+        # Исходные таблицы квантования - размер почти не меняется
+        assert result.size <= len(data)
+
+    def test_small_png_text_chunks_stripped(self):
+        from PIL import PngImagePlugin
+
+        info = PngImagePlugin.PngInfo()
+        info.add_text("Author", "Ivan Petrov")
+        buf = io.BytesIO()
+        Image.new("RGB", (64, 64), (200, 30, 30)).save(buf, format="PNG", pnginfo=info)
+        data = buf.getvalue()
+
+        result = normalize_image_bytes(data, max_edge=2048, quality=95)
+
+        image = Image.open(io.BytesIO(result.data))
+        assert result.mime_type == "image/png"
+        assert not image.text
+        assert image.getpixel((0, 0)) == (200, 30, 30)
+
+
+class TestImagePipeline:
+    """Tests for ImagePipeline."""
+
+    @pytest.mark.asyncio
+    async def test_pooled_download_and_cache(self, photo_fixtures):
+        served = {"requests": 0}
+        photo = read(photo_fixtures["phone_landscape.jpg"])
+
+        def handler(request):
+            served["requests"] += 1
+            return httpx.Response(200, content=photo)
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        pipeline = ImagePipeline(max_edge=1024, http_client=client)
+        try:
+            first = await pipeline.load("https://api.telegram.org/file/bot/photo.jpg")
+            second = await pipeline.load("https://api.telegram.org/file/bot/photo.jpg")
+            vision = await pipeline.load("https://api.telegram.org/file/bot/photo.jpg", max_edge=512)
+        finally:
+            await pipeline.close()
+
+        assert first is second
+        assert served["requests"] == 2
+        assert max(vision.width, vision.height) == 512
+        assert pipeline.stats.cache_hits == 1
+
+    @pytest.mark.asyncio
+    async def test_cache_evicts_least_recently_used(self, photo_fixtures):
+        pipeline = ImagePipeline(max_edge=256)
+        a = await pipeline.load(photo_fixtures["phone_portrait.jpg"])
+        pipeline.cache_bytes = a.size + 1
+        await pipeline.load(photo_fixtures["phone_landscape.jpg"])
+        await pipeline.load(photo_fixtures["phone_portrait.jpg"])
+
+        assert pipeline.stats.cache_hits == 0
+        assert pipeline.stats.cache_misses == 3
+
+    @pytest.mark.asyncio
+    async def test_savings_report_on_fixture_set(self, photo_fixtures):
+        """Отчет по экономии размера и времени на наборе фото."""
+        pipeline = ImagePipeline(max_edge=2048, output_format="jpeg", quality=85)
+        rows = []
+        for name, path in photo_fixtures.items():
+            started = time.perf_counter()
+            cold = await pipeline.load(path)
+            cold_ms = (time.perf_counter() - started) * 1000
+            started = time.perf_counter()
+            await pipeline.load(path)
+            warm_ms = (time.perf_counter() - started) * 1000
+            rows.append((name, cold.original_size, cold.size, cold_ms, warm_ms))
+
+        total_in = sum(row[1] for row in rows)
+        total_out = sum(row[2] for row in rows)
+        print("\nфото                      исходно     после   холодный  из кэша")
+        for name, size_in, size_out, cold_ms, warm_ms in rows:
+            print(f"{name:24} {size_in / 1024:8.0f}K {size_out / 1024:8.0f}K {cold_ms:8.1f}мс {warm_ms:7.3f}мс")
+        print(f"итого: {total_in / 1024:.0f}K -> {total_out / 1024:.0f}K ({100 * (1 - total_out / total_in):.0f}% меньше)")
+
+        assert total_out < total_in / 2
+        assert all(warm_ms < cold_ms for _, _, _, cold_ms, warm_ms in rows)
+        assert pipeline.stats.cache_hits == len(rows)
@@ -9,6 +9,8 @@ import httpx
 from PIL import Image
 from tenacity import retry, wait_random_exponential, stop_after_attempt
 
+from gpt_integration.core.image_pipeline import get_image_pipeline
+
 logger = logging.getLogger(__name__)
 
 class ImageGenerationError(Exception):
@@ -82,7 +84,10 @@ class ImageGenerationClient:
         return f"data:{mime};base64,{b64}"
 
     async def _load_image_bytes(self, image_source: str) -> tuple[bytes, str]:
-        """Load image bytes and determine mime type from URL or local path.
+        """Load and normalize image from URL or local path.
+        
+        Изображение проходит общий пайплайн (пул соединений, EXIF orientation,
+        уменьшение до IMAGE_MAX_EDGE, перекодирование, LRU кэш).
         
         Args:
             image_source: URL or local path to image
@@ -90,46 +95,26 @@ class ImageGenerationClient:
         Returns:
             Tuple of (image_bytes, mime_type)
         """
-        image_bytes = None
-        mime_type = "image/png"  # Default mime type
-
-        if image_source.startswith(("http://", "https://")):
-            logger.debug("Downloading source image from URL: %s", image_source)
-            try:
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    response = await client.get(image_source)
-                    response.raise_for_status()
-                    image_bytes = response.content
-            except httpx.HTTPStatusError as e:
-                logger.error(f"HTTP error downloading image {image_source}: {e}")
-                raise ImageGenerationError(f"Failed to download image from URL: {image_source}") from e
-            except httpx.RequestError as e:
-                logger.error(f"Network error downloading image {image_source}: {e}")
-                raise ImageGenerationError(f"Network error downloading image from URL: {image_source}") from e
-        else:
-            logger.debug("Reading source image from local path: %s", image_source)
-            try:
-                with open(image_source, "rb") as f:
-                    image_bytes = f.read()
-            except FileNotFoundError as e:
-                logger.error(f"Local image file not found: {image_source}")
-                raise ImageGenerationError(f"Local image file not found: {image_source}") from e
-            except Exception as e:
-                logger.error(f"Error reading local image file {image_source}: {e}")
-                raise ImageGenerationError(f"Error reading local image file: {image_source}") from e
-        
-        if not image_bytes:
-            raise ImageGenerationError(f"No image data obtained for source: {image_source}")
-
         try:
-            # Try to determine mime type from image content
-            img = Image.open(io.BytesIO(image_bytes))
-            mime_type = Image.MIME.get(img.format, mime_type)
+            image = await get_image_pipeline().load(image_source)
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP error downloading image {image_source}: {e}")
+            raise ImageGenerationError(f"Failed to download image from URL: {image_source}") from e
+        except httpx.RequestError as e:
+            logger.error(f"Network error downloading image {image_source}: {e}")
+            raise ImageGenerationError(f"Network error downloading image from URL: {image_source}") from e
+        except FileNotFoundError as e:
+            logger.error(f"Local image file not found: {image_source}")
+            raise ImageGenerationError(f"Local image file not found: {image_source}") from e
         except Exception as e:
-            logger.warning(f"Could not determine mime type from image content, using default. Error: {e}")
+            logger.error(f"Error loading image {image_source}: {e}")
+            raise ImageGenerationError(f"Error loading image: {image_source}") from e
 
-        logger.debug("Input mime: %s, size: %d bytes", mime_type, len(image_bytes))
-        return image_bytes, mime_type
+        logger.debug(
+            "Input mime: %s, size: %d bytes (original %d bytes)",
+            image.mime_type, image.size, image.original_size
+        )
+        return image.data, image.mime_type
 
     async def _prepare_image_part(self, image_source: str, for_openai: bool = False):
         """Prepares an image (from URL or local path) for the API.
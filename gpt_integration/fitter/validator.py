@@ -1,11 +1,13 @@
 """
 Валидация фото пользователя через ChatGPT
 """
+import base64
 import logging
 import json
 from typing import Dict, Any
 
 from gpt_integration.gpt_client import GPTClient
+from gpt_integration.core.image_pipeline import IMAGE_VISION_MAX_EDGE, get_image_pipeline
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +30,19 @@ VALIDATION_PROMPT = """Проанализируй это изображение
 Если не подходит - укажи конкретную причину понятным языком."""
 
 
+async def _vision_image_url(image_url: str) -> str:
+    """
+    Уменьшенное фото (IMAGE_VISION_MAX_EDGE) как data URI для vision модели.
+    При ошибке загрузки отдаем исходный URL - модель скачает его сама.
+    """
+    try:
+        image = await get_image_pipeline().load(image_url, max_edge=IMAGE_VISION_MAX_EDGE)
+    except Exception as e:
+        logger.warning(f"Could not normalize photo for validation, using original URL: {e}")
+        return image_url
+    return f"data:{image.mime_type};base64,{base64.b64encode(image.data).decode('ascii')}"
+
+
 async def validate_photo(image_url: str) -> Dict[str, Any]:
     """
     Валидация фото через ChatGPT (модель gpt-4.1)
@@ -40,6 +55,7 @@ async def validate_photo(image_url: str) -> Dict[str, Any]:
     """
     try:
         client = GPTClient(model="gpt-4.1")
+        vision_url = await _vision_image_url(image_url)
 
         # ChatGPT Vision API требует специальный формат
         messages = [
@@ -49,7 +65,7 @@ async def validate_photo(image_url: str) -> Dict[str, Any]:
                     {"type": "text", "text": VALIDATION_PROMPT},
                     {
                         "type": "image_url",
-                        "image_url": {"url": image_url}
+                        "image_url": {"url": vision_url}
                     }
                 ]
             }
@@ -4,7 +4,7 @@ Photo Processing module - обработка фотографий через н
 Модуль предоставляет:
 - REST API для обработки фотографий по промпту
 - Интеграцию с сервисом генерации изображений
-- Сохранение результатов обработки
+- Сохранение результатов обработки (изображения - в blob store, в БД - ключи)
 - Историю обработанных фотографий
 """
 
@@ -12,6 +12,7 @@ from .database import Base, engine, SessionLocal, get_db, init_db
 from .models import PhotoProcessingResult
 from .service import process_photo, save_processing_result, get_processing_history
 from .image_client import ImageGenerationClient
+from .blob_store import BlobStore, LocalBlobStore, StoredImage, get_blob_store, store_image
 
 __all__ = [
     # Database
@@ -28,5 +29,11 @@ __all__ = [
     "get_processing_history",
     # Clients
     "ImageGenerationClient",
+    # Blob store
+    "BlobStore",
+    "LocalBlobStore",
+    "StoredImage",
+    "get_blob_store",
+    "store_image",
 ]
 
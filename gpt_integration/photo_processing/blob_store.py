@@ -0,0 +1,219 @@
+"""
+Хранилище обработанных изображений (blob store).
+
+Раньше результат обработки сохранялся в photo_processing_results.result_photo_url
+как data:image/...;base64 URI: строка на ~33% больше самого изображения, а
+каждая выборка истории тянула мегабайты из БД. Теперь изображение и превью
+лежат в blob store, в БД остаются только ключи и метаданные.
+
+Ключи адресуются содержимым (sha256): повторная генерация того же изображения
+не создает дубликатов, а запись идемпотентна.
+
+Бэкенды (PHOTO_BLOB_BACKEND):
+    - local: файловая система, каталог PHOTO_BLOB_ROOT
+    - S3-совместимый бэкенд добавляется реализацией BlobStore
+"""
+
+import os
+import io
+import base64
+import hashlib
+import logging
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+BLOB_BACKEND = os.getenv("PHOTO_BLOB_BACKEND", "local")
+BLOB_ROOT = os.getenv("PHOTO_BLOB_ROOT", "./photo_blobs")
+THUMBNAIL_SIZE = int(os.getenv("PHOTO_THUMBNAIL_SIZE", "256"))
+BLOB_URL = "/v1/photo/blobs/{key}"
+
+EXTENSIONS = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/webp": "webp",
+    "image/gif": "gif",
+}
+CONTENT_TYPES = {ext: mime for mime, ext in EXTENSIONS.items()}
+
+_store: Optional["BlobStore"] = None
+
+
+class BlobStore(ABC):
+    """Интерфейс хранилища: ключ -> байты"""
+
+    @abstractmethod
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+
+class LocalBlobStore(BlobStore):
+    """Хранение в файловой системе: <root>/<key>"""
+
+    def __init__(self, root: str):
+        self.root = Path(root).resolve()
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        # Ключ приходит из URL - не выпускаем его за пределы root
+        if self.root not in path.parents:
+            raise ValueError(f"Invalid blob key: {key}")
+        return path
+
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        path = self._path(key)
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Атомарная запись: временный файл в том же каталоге + rename
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        if not path.is_file():
+            return None
+        return path.read_bytes()
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def delete(self, key: str) -> None:
+        path = self._path(key)
+        if path.is_file():
+            path.unlink()
+
+
+@dataclass
+class StoredImage:
+    """Ключи и метаданные сохраненного изображения"""
+    key: str
+    thumbnail_key: Optional[str]
+    content_type: str
+    size_bytes: int
+    width: Optional[int]
+    height: Optional[int]
+
+    @property
+    def url(self) -> str:
+        return blob_url(self.key)
+
+    @property
+    def thumbnail_url(self) -> Optional[str]:
+        return blob_url(self.thumbnail_key) if self.thumbnail_key else None
+
+    def to_columns(self) -> Dict[str, Any]:
+        """Значения колонок photo_processing_results"""
+        return {
+            "result_photo_url": self.url,
+            "result_blob_key": self.key,
+            "result_thumbnail_key": self.thumbnail_key,
+            "result_content_type": self.content_type,
+            "result_size_bytes": self.size_bytes,
+            "result_width": self.width,
+            "result_height": self.height,
+        }
+
+
+def get_blob_store() -> BlobStore:
+    """Хранилище, настроенное через PHOTO_BLOB_BACKEND"""
+    global _store
+    if _store is None:
+        if BLOB_BACKEND == "local":
+            _store = LocalBlobStore(BLOB_ROOT)
+        else:
+            raise ValueError(f"Unsupported PHOTO_BLOB_BACKEND: {BLOB_BACKEND}")
+    return _store
+
+
+def blob_url(key: str) -> str:
+    return BLOB_URL.format(key=key)
+
+
+def content_type_for_key(key: str) -> str:
+    return CONTENT_TYPES.get(key.rsplit(".", 1)[-1], "application/octet-stream")
+
+
+def parse_data_uri(data_uri: str) -> Tuple[str, bytes]:
+    """data:image/png;base64,... -> (mime, bytes)"""
+    if not data_uri.startswith("data:") or "," not in data_uri:
+        raise ValueError("Not a base64 data URI")
+    header, payload = data_uri.split(",", 1)
+    mime = header[len("data:"):].split(";", 1)[0] or "image/png"
+    return mime, base64.b64decode(payload)
+
+
+def _content_key(prefix: str, digest: str, extension: str) -> str:
+    # Шардирование по первым символам хэша: не больше 256 записей на уровень
+    return f"{prefix}/{digest[:2]}/{digest[2:4]}/{digest}.{extension}"
+
+
+def store_image(store: BlobStore, data: bytes, content_type: str) -> StoredImage:
+    """
+    Сохраняет изображение и превью по адресу содержимого
+
+    Args:
+        store: Хранилище
+        data: Байты изображения
+        content_type: MIME тип изображения
+
+    Returns:
+        StoredImage с ключами и метаданными
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    key = _content_key("images", digest, EXTENSIONS.get(content_type, "bin"))
+    store.put(key, data, content_type)
+
+    width = height = None
+    thumbnail_key = None
+    try:
+        image = Image.open(io.BytesIO(data))
+        width, height = image.size
+        thumbnail_key = _content_key("thumbs", digest, "jpg")
+        if not store.exists(thumbnail_key):
+            store.put(thumbnail_key, _make_thumbnail(image), "image/jpeg")
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to build thumbnail for {key}: {e}")
+        thumbnail_key = None
+
+    return StoredImage(
+        key=key,
+        thumbnail_key=thumbnail_key,
+        content_type=content_type,
+        size_bytes=len(data),
+        width=width,
+        height=height,
+    )
+
+
+def _make_thumbnail(image: Image.Image) -> bytes:
+    thumbnail = image.convert("RGB")
+    thumbnail.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+    buf = io.BytesIO()
+    thumbnail.save(buf, format="JPEG", quality=85)
+    return buf.getvalue()
@@ -61,10 +61,14 @@ def init_db() -> None:
     """
     Initialize database by creating all tables.
     
-    Called on application startup.
+    Called on application startup. Also adds blob store columns
+    to an existing photo_processing_results table.
     """
     Base.metadata.create_all(bind=engine)
 
+    from .migrate_blobs import ensure_blob_columns
+    ensure_blob_columns(engine)
+
 
 
 
@@ -1,13 +1,14 @@
+import asyncio
 import base64
-import io
 import logging
 import time
 from typing import Optional
 
 import httpx
-from PIL import Image
 from tenacity import retry, wait_random_exponential, stop_after_attempt
 
+from gpt_integration.core.image_pipeline import get_image_pipeline
+
 logger = logging.getLogger(__name__)
 
 async def download_telegram_photo(file_url: str) -> bytes:
@@ -90,27 +91,18 @@ class ImageGenerationClient:
         # 1. Build the parts array
         parts = [{"text": prompt}]
         
-        for image_url in image_urls:
-            # download input image
-            logger.debug("Downloading source image: %s", image_url)
-            response = await self.client.get(image_url)
-            response.raise_for_status()
-            image_bytes = response.content
-
-            # determine mime type: image/png is safest fallback
-            try:
-                img = Image.open(io.BytesIO(image_bytes))
-                mime_type_in = Image.MIME.get(img.format, "image/png")
-            except Exception:
-                mime_type_in = "image/png"
-
-            image_b64 = self._encode_image_to_base64(image_bytes)
-            logger.debug("Input mime: %s, size: %d bytes", mime_type_in, len(image_bytes))
-
+        # download + normalize input images (shared pipeline: pooled download,
+        # EXIF orientation, downscale, re-encode, LRU cache)
+        pipeline = get_image_pipeline()
+        images = await asyncio.gather(*[pipeline.load(image_url) for image_url in image_urls])
+
+        for image in images:
+            logger.debug("Input mime: %s, size: %d bytes (original %d bytes)",
+                         image.mime_type, image.size, image.original_size)
             parts.append({
                 "inline_data": {
-                    "mime_type": mime_type_in,
-                    "data": image_b64
+                    "mime_type": image.mime_type,
+                    "data": self._encode_image_to_base64(image.data)
                 }
             })
 
@@ -0,0 +1,138 @@
+"""
+Перенос обработанных фото из БД (data URI) в blob store.
+
+Записи, сохраненные до появления blob store, держат изображение целиком в
+result_photo_url (data:image/...;base64,...). Миграция:
+
+1. добавляет колонки result_blob_key/... в существующую таблицу;
+2. батчами по id выбирает строки с data URI, кладет изображение и превью в
+   blob store и заменяет result_photo_url ссылкой на blob.
+
+Миграция идемпотентна: ключи адресуются содержимым, обработанные строки
+больше не содержат data URI. Прерванный запуск можно просто повторить.
+
+Запуск:
+    python -m gpt_integration.photo_processing.migrate_blobs [--batch-size 100] [--dry-run]
+"""
+
+import argparse
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .blob_store import BlobStore, get_blob_store, parse_data_uri, store_image
+from .models import PhotoProcessingResult
+
+logger = logging.getLogger(__name__)
+
+BLOB_COLUMNS = {
+    "result_blob_key": "VARCHAR(255)",
+    "result_thumbnail_key": "VARCHAR(255)",
+    "result_content_type": "VARCHAR(50)",
+    "result_size_bytes": "INTEGER",
+    "result_width": "INTEGER",
+    "result_height": "INTEGER",
+}
+
+
+def ensure_blob_columns(engine: Engine) -> list:
+    """Добавляет недостающие колонки blob store, возвращает список добавленных"""
+    table = PhotoProcessingResult.__tablename__
+    inspector = inspect(engine)
+    if not inspector.has_table(table):
+        return []
+    existing = {column["name"] for column in inspector.get_columns(table)}
+    added = [name for name in BLOB_COLUMNS if name not in existing]
+    if added:
+        with engine.begin() as conn:
+            for name in added:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {BLOB_COLUMNS[name]}"))
+        logger.info(f"✅ Added blob columns to {table}: {', '.join(added)}")
+    return added
+
+
+def migrate_data_uris(
+    session_factory: Callable[[], Session],
+    store: BlobStore,
+    batch_size: int = 100,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Переносит data URI из result_photo_url в blob store
+
+    Args:
+        session_factory: Фабрика сессий БД
+        store: Хранилище изображений
+        batch_size: Строк за одну транзакцию
+        dry_run: Только посчитать строки и объем, ничего не менять
+
+    Returns:
+        Статистика: migrated, failed, bytes_moved
+    """
+    stats = {"migrated": 0, "failed": 0, "bytes_moved": 0}
+    last_id = 0
+
+    while True:
+        db = session_factory()
+        try:
+            # Только id и data URI - без остальных колонок, которых может еще не быть в dry-run
+            rows = (
+                db.query(PhotoProcessingResult.id, PhotoProcessingResult.result_photo_url)
+                .filter(
+                    PhotoProcessingResult.id > last_id,
+                    PhotoProcessingResult.result_photo_url.like("data:%"),
+                )
+                .order_by(PhotoProcessingResult.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+
+            for row in rows:
+                last_id = row.id
+                try:
+                    mime, data = parse_data_uri(row.result_photo_url)
+                    if not dry_run:
+                        stored = store_image(store, data, mime)
+                        db.query(PhotoProcessingResult).filter(
+                            PhotoProcessingResult.id == row.id
+                        ).update(stored.to_columns(), synchronize_session=False)
+                    stats["migrated"] += 1
+                    stats["bytes_moved"] += len(row.result_photo_url)
+                except Exception as e:
+                    stats["failed"] += 1
+                    logger.error(f"❌ Failed to migrate photo result {row.id}: {e}")
+
+            if not dry_run:
+                db.commit()
+            logger.info(f"📦 Migrated up to id {last_id}: {stats}")
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    return stats
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Перенос обработанных фото из БД в blob store")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal, engine
+
+    logging.basicConfig(level=logging.INFO)
+    if not args.dry_run:
+        ensure_blob_columns(engine)
+    stats = migrate_data_uris(SessionLocal, get_blob_store(), batch_size=args.batch_size, dry_run=args.dry_run)
+    logger.info(f"✅ Migration finished: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@
 SQLAlchemy models for Photo Processing Service.
 
 Модели:
-    - PhotoProcessingResult: Хранение результатов обработки фотографий (Вариант 1: ссылки)
+    - PhotoProcessingResult: Хранение результатов обработки фотографий (ссылки и ключи blob store)
 """
 
 from sqlalchemy import Column, Integer, BigInteger, String, Text, Float, DateTime, Index
@@ -14,7 +14,8 @@ class PhotoProcessingResult(Base):
     """
     Результаты обработки фотографий (Вариант 1: Хранение ссылок).
     
-    Хранит URL обработанного изображения в БД.
+    Хранит URL обработанного изображения в БД. Само изображение и превью лежат
+    в blob store (см. blob_store.py), в строке - только ключи и метаданные.
     """
     __tablename__ = "photo_processing_results"
     
@@ -24,6 +25,12 @@ class PhotoProcessingResult(Base):
     original_photo_file_id = Column(String(255), nullable=False)  # Telegram file_id исходного фото
     prompt = Column(Text, nullable=False)  # Текст промпта
     result_photo_url = Column(Text, nullable=False)  # URL обработанного изображения
+    result_blob_key = Column(String(255), nullable=True)  # Ключ изображения в blob store
+    result_thumbnail_key = Column(String(255), nullable=True)  # Ключ превью в blob store
+    result_content_type = Column(String(50), nullable=True)  # MIME тип изображения
+    result_size_bytes = Column(Integer, nullable=True)  # Размер изображения в байтах
+    result_width = Column(Integer, nullable=True)
+    result_height = Column(Integer, nullable=True)
     processing_service = Column(String(100), nullable=True)  # Название сервиса генерации (например, "midjourney", "stable_diffusion")
     processing_time = Column(Float, nullable=True)  # Время обработки в секундах
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
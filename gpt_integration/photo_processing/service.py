@@ -8,6 +8,7 @@
 """
 
 import os
+import asyncio
 import logging
 import httpx
 from typing import Optional, Dict, Any
@@ -15,6 +16,7 @@ from datetime import datetime
 from sqlalchemy.orm import Session
 
 from .image_client import ImageGenerationClient
+from .blob_store import StoredImage, blob_url, get_blob_store, parse_data_uri, store_image
 from .database import SessionLocal
 from .models import PhotoProcessingResult
 
@@ -76,7 +78,6 @@ async def process_photo(
                 raise ValueError("BOT_TOKEN not set")
         
         # 2. Получаем URL-ы всех фото из Telegram
-        import asyncio
         image_urls = await asyncio.gather(
             *[_get_telegram_file_url(bot_token, file_id) for file_id in photo_file_ids]
         )
@@ -98,8 +99,10 @@ async def process_photo(
         logger.info(f"🎨 Processing images with prompt: {prompt[:50]}...")
         photo_data_uri = await client.process_image(image_urls, prompt)
         
-        # 5. Сохраняем результат в БД
-        photo_url = photo_data_uri 
+        # 5. Кладем изображение в blob store, в БД - только ключи
+        mime, image_bytes = parse_data_uri(photo_data_uri)
+        stored = await asyncio.to_thread(store_image, get_blob_store(), image_bytes, mime)
+        photo_url = photo_data_uri
         
         processing_time = (datetime.now() - start_time).total_seconds()
 
@@ -110,17 +113,21 @@ async def process_photo(
             telegram_id=telegram_id,
             original_photo_file_id=original_photos_str,
             prompt=prompt,
-            result_photo_url=photo_url,
+            result_photo_url=stored.url,
             processing_service=final_model,
             processing_time=processing_time,
-            user_id=user_id
+            user_id=user_id,
+            result_image=stored
         )
         
         total_time = (datetime.now() - start_time).total_seconds()
         logger.info(f"✅ Photo processed successfully in {total_time:.2f}s, result_id: {result_id}")
         
+        # photo_url (data URI) нужен боту для отправки фото, в БД он не сохраняется
         return {
             "photo_url": photo_url,
+            "blob_url": stored.url,
+            "thumbnail_url": stored.thumbnail_url,
             "processing_time": processing_time,
             "result_id": result_id
         }
@@ -145,7 +152,8 @@ async def save_processing_result(
     result_photo_url: str,
     processing_service: str,
     processing_time: float,
-    user_id: Optional[int] = None
+    user_id: Optional[int] = None,
+    result_image: Optional[StoredImage] = None
 ) -> Optional[int]:
     """
     Сохранить результат обработки фото в БД (Вариант 1: ссылки).
@@ -158,6 +166,7 @@ async def save_processing_result(
         processing_service: Название сервиса генерации
         processing_time: Время обработки в секундах
         user_id: ID пользователя в основной БД (опционально)
+        result_image: Изображение в blob store (ключи и метаданные)
     
     Returns:
         ID сохраненной записи или None в случае ошибки
@@ -176,6 +185,9 @@ async def save_processing_result(
             processing_service=processing_service,
             processing_time=processing_time
         )
+        if result_image:
+            for column, value in result_image.to_columns().items():
+                setattr(result, column, value)
         
         db.add(result)
         db.commit()
@@ -237,6 +249,7 @@ async def get_processing_history(
                 "original_photo_file_id": result.original_photo_file_id,
                 "prompt": result.prompt,
                 "result_photo_url": result.result_photo_url,
+                "thumbnail_url": blob_url(result.result_thumbnail_key) if result.result_thumbnail_key else None,
                 "processing_time": result.processing_time,
                 "created_at": result.created_at.isoformat() if result.created_at else None
             })
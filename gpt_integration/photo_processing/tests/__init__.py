@@ -0,0 +1,3 @@
+"""
+Photo Processing - Test Suite
+"""
@@ -0,0 +1,36 @@
+"""
+Pytest configuration and fixtures for Photo Processing tests.
+"""
+
+import sys
+import pytest
+from pathlib import Path
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add project root to path for imports
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from gpt_integration.photo_processing.database import Base
+from gpt_integration.photo_processing.blob_store import LocalBlobStore
+
+
+@pytest.fixture
+def blob_store(tmp_path):
+    """Blob store во временном каталоге."""
+    return LocalBlobStore(str(tmp_path / "blobs"))
+
+
+@pytest.fixture
+def test_db_engine(tmp_path):
+    """SQLite база во временном каталоге."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'photo_processing.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(test_db_engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=test_db_engine)
@@ -0,0 +1,130 @@
+"""
+Tests for blob store and migration of data URIs out of the database.
+"""
+
+import base64
+import io
+
+import pytest
+from PIL import Image
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from gpt_integration.photo_processing.blob_store import parse_data_uri, store_image
+from gpt_integration.photo_processing.migrate_blobs import ensure_blob_columns, migrate_data_uris
+from gpt_integration.photo_processing.models import PhotoProcessingResult
+
+
+def make_png(width=800, height=600, color=(200, 30, 30)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def data_uri(data: bytes, mime="image/png") -> str:
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}"
+
+
+class TestStoreImage:
+    """Tests for content-addressed storage."""
+
+    def test_image_and_thumbnail_stored_by_content(self, blob_store):
+        png = make_png()
+
+        stored = store_image(blob_store, png, "image/png")
+
+        assert stored.key.startswith("images/") and stored.key.endswith(".png")
+        assert blob_store.get(stored.key) == png
+        assert (stored.width, stored.height, stored.size_bytes) == (800, 600, len(png))
+        thumbnail = Image.open(io.BytesIO(blob_store.get(stored.thumbnail_key)))
+        assert max(thumbnail.size) == 256
+        assert stored.url == f"/v1/photo/blobs/{stored.key}"
+
+    def test_same_content_same_key(self, blob_store):
+        png = make_png()
+
+        first = store_image(blob_store, png, "image/png")
+        second = store_image(blob_store, png, "image/png")
+        other = store_image(blob_store, make_png(color=(0, 0, 255)), "image/png")
+
+        assert first == second
+        assert other.key != first.key
+        assert len(list(blob_store.root.rglob("*.png"))) == 2
+
+    def test_key_cannot_escape_root(self, blob_store):
+        with pytest.raises(ValueError):
+            blob_store.get("../../etc/passwd")
+
+    def test_parse_data_uri(self):
+        assert parse_data_uri(data_uri(b"abc", "image/jpeg")) == ("image/jpeg", b"abc")
+        with pytest.raises(ValueError):
+            parse_data_uri("https://example.com/photo.png")
+
+
+class TestMigrateDataUris:
+    """Tests for migration of existing rows."""
+
+    @pytest.fixture
+    def legacy_engine(self, tmp_path):
+        """Table as it was before blob store columns."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE photo_processing_results ("
+                "id INTEGER PRIMARY KEY, telegram_id BIGINT NOT NULL, user_id INTEGER, "
+                "original_photo_file_id VARCHAR(255) NOT NULL, prompt TEXT NOT NULL, "
+                "result_photo_url TEXT NOT NULL, processing_service VARCHAR(100), "
+                "processing_time FLOAT, created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL)"
+            ))
+        yield engine
+        engine.dispose()
+
+    def insert(self, engine, row_id, url):
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO photo_processing_results "
+                    "(id, telegram_id, original_photo_file_id, prompt, result_photo_url) "
+                    "VALUES (:id, 1, 'file', 'prompt', :url)"
+                ),
+                {"id": row_id, "url": url},
+            )
+
+    def test_rows_moved_to_blob_store(self, legacy_engine, blob_store):
+        pngs = {row_id: make_png(color=(row_id * 40, 0, 0)) for row_id in (1, 2, 3)}
+        for row_id, png in pngs.items():
+            self.insert(legacy_engine, row_id, data_uri(png))
+        self.insert(legacy_engine, 4, "https://cdn.example.com/already-a-link.png")
+        self.insert(legacy_engine, 5, "data:image/png;base64,%%%not-base64%%%")
+
+        added = ensure_blob_columns(legacy_engine)
+        stats = migrate_data_uris(sessionmaker(bind=legacy_engine), blob_store, batch_size=2)
+
+        assert "result_blob_key" in added
+        assert {c["name"] for c in inspect(legacy_engine).get_columns("photo_processing_results")} >= set(added)
+        assert (stats["migrated"], stats["failed"]) == (3, 1)
+
+        db = sessionmaker(bind=legacy_engine)()
+        rows = {row.id: row for row in db.query(PhotoProcessingResult)}
+        for row_id, png in pngs.items():
+            row = rows[row_id]
+            assert row.result_photo_url == f"/v1/photo/blobs/{row.result_blob_key}"
+            assert blob_store.get(row.result_blob_key) == png
+            assert row.result_thumbnail_key and row.result_size_bytes == len(png)
+        assert rows[4].result_photo_url == "https://cdn.example.com/already-a-link.png"
+        assert rows[4].result_blob_key is None
+        db.close()
+
+        # Повторный запуск ничего не переносит
+        assert migrate_data_uris(sessionmaker(bind=legacy_engine), blob_store)["migrated"] == 0
+
+    def test_dry_run_changes_nothing(self, legacy_engine, blob_store):
+        self.insert(legacy_engine, 1, data_uri(make_png()))
+
+        stats = migrate_data_uris(sessionmaker(bind=legacy_engine), blob_store, dry_run=True)
+
+        assert stats["migrated"] == 1
+        assert not blob_store.root.exists()
+        assert "result_blob_key" not in {
+            c["name"] for c in inspect(legacy_engine).get_columns("photo_processing_results")
+        }
@@ -1,12 +1,37 @@
 import os
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 from gpt_integration.gpt_client import GPTClient
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+MAP_CHUNK_SIZE = int(os.getenv("SEMANTIC_CORE_MAP_CHUNK_SIZE", "15"))
+MAP_CONCURRENCY = int(os.getenv("SEMANTIC_CORE_MAP_CONCURRENCY", "4"))
+MAP_CACHE_SIZE = int(os.getenv("SEMANTIC_CORE_MAP_CACHE_SIZE", "512"))
+
+GROUPS = (
+    "Характеристики товара",
+    "Преимущества и выгоды",
+    "Проблемы и решения",
+    "Сценарии использования",
+    "Эмоции и триггеры",
+)
+
+OUTPUT_FORMAT = """ФОРМАТ ВЫВОДА:
+**Группа:** [Название группы]
+  - **[Ключевая фраза 1]** (Частота: [высокая/средняя/низкая])
+    *Пример: "[Пример из текста]"*
+  - **[Ключевая фраза 2]** (Частота: [высокая/средняя/низкая])
+    *Пример: "[Пример из текста]"*
+
+**Группа:** [Название следующей группы]
+  - ..."""
+
 SEMANTIC_CORE_PROMPT_TEMPLATE = """
 Ты — опытный маркетолог, который анализирует товарные ниши. Проанализируй предоставленный список описаний товаров и составь подробное семантическое ядро.
 
@@ -35,6 +60,172 @@ SEMANTIC_CORE_PROMPT_TEMPLATE = """
 Список описаний для анализа:
 {descriptions_text}
 """
+# Map: кластеры ключевых фраз -> строки "группа | фраза | частота | пример"
+SEMANTIC_CORE_MAP_TEMPLATE = """
+Ты — опытный маркетолог. Ниже кластеры ключевых фраз, извлеченные из описаний товаров конкурентов{category}.
+Для каждого кластера указаны ведущее слово, вес (чем больше, тем чаще фразы встречаются в нише),
+число описаний с этим словом и самые весомые фразы.
+
+Отнеси значимые фразы к группам: {groups}.
+Объединяй синонимы и формы одной фразы, пропускай фразы без смысла для покупателя.
+Частоту оценивай по весу и числу описаний: высокая/средняя/низкая.
+
+Ответь только строками вида:
+Группа | ключевая фраза | частота | пример фразы из кластера
+
+Кластеры:
+{clusters}
+"""
+
+# Reduce: частичные результаты map -> итоговое ядро в формате для мессенджера
+SEMANTIC_CORE_REDUCE_TEMPLATE = """
+Ты — опытный маркетолог. Собери итоговое семантическое ядро товарной ниши{category}
+из частичных результатов анализа (строки "группа | фраза | частота | пример").
+
+ИНСТРУКЦИЯ:
+1. Объедини дубликаты и синонимы, при объединении бери более высокую частоту.
+2. Используй группы: {groups}.
+3. Внутри каждой группы оставь самые частотные и важные фразы, от высокой частоты к низкой.
+4. Представь результат в виде структурированного списка, удобного для чтения в мессенджере. Не используй таблицы.
+
+{output_format}
+
+Частичные результаты:
+{partials}
+"""
+
+# Один чанк кластеров: сразу итоговое ядро без шага reduce
+SEMANTIC_CORE_CLUSTERS_TEMPLATE = """
+Ты — опытный маркетолог, который анализирует товарные ниши. Ниже кластеры ключевых фраз, извлеченные
+из описаний товаров конкурентов{category}. Для каждого кластера указаны ведущее слово, вес (чем больше,
+тем чаще фразы встречаются в нише), число описаний с этим словом и самые весомые фразы.
+
+ИНСТРУКЦИЯ:
+1. Разбей фразы на группы: {groups}.
+2. Объедини синонимы, внутри каждой группы выдели самые частотные и важные фразы.
+3. Представь результат в виде структурированного списка, удобного для чтения в мессенджере. Не используй таблицы.
+
+{output_format}
+
+Кластеры:
+{clusters}
+"""
+
+CompleteFn = Callable[[List[Dict[str, str]]], Awaitable[str]]
+
+# Результаты map по хэшу промпта: повторная генерация по неизменной нише не идет в LLM
+_map_cache: "OrderedDict[str, str]" = OrderedDict()
+
+
+def format_clusters(clusters: List[Dict[str, Any]]) -> str:
+    """Компактное текстовое представление кластеров для промпта"""
+    lines = []
+    for cluster in clusters:
+        phrases = "; ".join(cluster.get("phrases") or [cluster["keyword"]])
+        lines.append(
+            f"- {cluster['keyword']} (вес {cluster.get('weight', 0)}, "
+            f"описаний {cluster.get('documents', 0)}): {phrases}"
+        )
+    return "\n".join(lines)
+
+
+def chunk_clusters(clusters: List[Dict[str, Any]], size: int = MAP_CHUNK_SIZE) -> List[List[Dict[str, Any]]]:
+    return [clusters[i:i + size] for i in range(0, len(clusters), size)]
+
+
+def _category_suffix(category_name: Optional[str]) -> str:
+    return f" (категория: {category_name})" if category_name else ""
+
+
+async def _complete_prompt(complete: CompleteFn, prompt: str) -> str:
+    return await complete([{"role": "user", "content": prompt}])
+
+
+async def _map_chunk(
+    complete: CompleteFn,
+    chunk: List[Dict[str, Any]],
+    category_name: Optional[str],
+    semaphore: asyncio.Semaphore
+) -> str:
+    prompt = SEMANTIC_CORE_MAP_TEMPLATE.format(
+        category=_category_suffix(category_name),
+        groups=", ".join(GROUPS),
+        clusters=format_clusters(chunk),
+    )
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    if digest in _map_cache:
+        _map_cache.move_to_end(digest)
+        return _map_cache[digest]
+
+    async with semaphore:
+        result = await _complete_prompt(complete, prompt)
+
+    _map_cache[digest] = result
+    while len(_map_cache) > MAP_CACHE_SIZE:
+        _map_cache.popitem(last=False)
+    return result
+
+
+async def generate_semantic_core_from_clusters(
+    clusters: List[Dict[str, Any]],
+    category_name: Optional[str] = None,
+    complete: Optional[CompleteFn] = None,
+    chunk_size: int = MAP_CHUNK_SIZE,
+    concurrency: int = MAP_CONCURRENCY
+) -> Dict[str, Any]:
+    """
+    Семантическое ядро по кластерам ключевых фраз (map-reduce)
+
+    Кластеры делятся на чанки, каждый чанк параллельно раскладывается по группам
+    (map), затем частичные результаты сводятся в итоговое ядро (reduce).
+    Если чанк один - ядро строится одним запросом.
+
+    Args:
+        clusters: Кластеры из server/app/features/semantic_core/keywords.py
+        category_name: Категория товаров (для контекста в промпте)
+        complete: Функция вызова LLM (по умолчанию GPTClient.complete_messages)
+        chunk_size: Кластеров в одном map-запросе
+        concurrency: Максимум одновременных map-запросов
+    """
+    if not clusters:
+        raise ValueError("No keyword clusters provided")
+    if complete is None:
+        complete = GPTClient.from_env().complete_messages
+
+    category = _category_suffix(category_name)
+    groups = ", ".join(GROUPS)
+    chunks = chunk_clusters(clusters, chunk_size)
+
+    try:
+        if len(chunks) == 1:
+            logger.info(f"💎 Generating semantic core from {len(clusters)} keyword clusters...")
+            core = await _complete_prompt(complete, SEMANTIC_CORE_CLUSTERS_TEMPLATE.format(
+                category=category,
+                groups=groups,
+                output_format=OUTPUT_FORMAT,
+                clusters=format_clusters(clusters),
+            ))
+        else:
+            logger.info(
+                f"💎 Generating semantic core: {len(clusters)} clusters, "
+                f"{len(chunks)} map steps (concurrency {concurrency})..."
+            )
+            semaphore = asyncio.Semaphore(max(1, concurrency))
+            partials = await asyncio.gather(*(
+                _map_chunk(complete, chunk, category_name, semaphore) for chunk in chunks
+            ))
+            core = await _complete_prompt(complete, SEMANTIC_CORE_REDUCE_TEMPLATE.format(
+                category=category,
+                groups=groups,
+                output_format=OUTPUT_FORMAT,
+                partials="\n".join(partial.strip() for partial in partials if partial and partial.strip()),
+            ))
+        logger.info("Semantic core generated successfully.")
+        return {"status": "success", "core": core}
+    except Exception as e:
+        logger.error(f"Error generating semantic core: {e}", exc_info=True)
+        raise
+
 
 async def generate_semantic_core(descriptions_text: str) -> Dict[str, Any]:
     """
@@ -0,0 +1,3 @@
+"""
+Semantic Core - Test Suite
+"""
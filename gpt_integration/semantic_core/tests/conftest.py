@@ -0,0 +1,25 @@
+"""
+Pytest configuration and fixtures for semantic core tests.
+"""
+
+import sys
+import pytest
+from pathlib import Path
+
+# Add project root to path for imports
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+
+@pytest.fixture
+def keyword_clusters():
+    """Кластеры в формате server/app/features/semantic_core/keywords.py"""
+    return [
+        {
+            "keyword": f"слово{i}",
+            "weight": 100.0 - i,
+            "documents": 50 - i,
+            "phrases": [f"слово{i}", f"фраза {i} из хлопка"],
+        }
+        for i in range(40)
+    ]
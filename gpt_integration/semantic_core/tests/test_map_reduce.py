@@ -0,0 +1,93 @@
+"""
+Tests for map-reduce semantic core generation with a stubbed LLM.
+"""
+
+import asyncio
+
+import pytest
+
+from gpt_integration.semantic_core import service
+from gpt_integration.semantic_core.service import generate_semantic_core_from_clusters
+
+
+class StubLLM:
+    """LLM stub: records prompts and tracks concurrent calls."""
+
+    def __init__(self, delay=0.01):
+        self.prompts = []
+        self.active = 0
+        self.max_active = 0
+        self.delay = delay
+
+    async def __call__(self, messages):
+        prompt = messages[-1]["content"]
+        self.prompts.append(prompt)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        if "Частичные результаты" in prompt:
+            return "**Группа:** Характеристики товара\n  - **хлопок** (Частота: высокая)"
+        return f"Характеристики товара | часть {len(self.prompts)} | высокая | пример"
+
+
+@pytest.fixture(autouse=True)
+def clear_map_cache():
+    service._map_cache.clear()
+    yield
+    service._map_cache.clear()
+
+
+class TestMapReduce:
+    """Tests for generate_semantic_core_from_clusters."""
+
+    @pytest.mark.asyncio
+    async def test_parallel_map_then_reduce(self, keyword_clusters):
+        llm = StubLLM()
+
+        result = await generate_semantic_core_from_clusters(
+            keyword_clusters, category_name="Платья", complete=llm, chunk_size=10, concurrency=3
+        )
+
+        map_prompts, reduce_prompt = llm.prompts[:-1], llm.prompts[-1]
+        assert result == {"status": "success", "core": "**Группа:** Характеристики товара\n  - **хлопок** (Частота: высокая)"}
+        assert len(map_prompts) == 4
+        assert llm.max_active == 3
+        # Каждый кластер попадает ровно в один map-запрос
+        for cluster in keyword_clusters:
+            assert sum(f"- {cluster['keyword']} (" in prompt for prompt in map_prompts) == 1
+        assert "Платья" in reduce_prompt
+        assert reduce_prompt.count("Характеристики товара | часть") == 4
+
+    @pytest.mark.asyncio
+    async def test_single_chunk_skips_reduce(self, keyword_clusters):
+        llm = StubLLM()
+
+        await generate_semantic_core_from_clusters(keyword_clusters[:5], complete=llm, chunk_size=10)
+
+        assert len(llm.prompts) == 1
+        assert "ФОРМАТ ВЫВОДА" in llm.prompts[0]
+        assert "слово4" in llm.prompts[0]
+
+    @pytest.mark.asyncio
+    async def test_unchanged_chunks_served_from_map_cache(self, keyword_clusters):
+        first, second = StubLLM(), StubLLM()
+
+        await generate_semantic_core_from_clusters(keyword_clusters, complete=first, chunk_size=10)
+        changed = keyword_clusters[:30] + [dict(keyword_clusters[30], weight=1.0)] + keyword_clusters[31:]
+        await generate_semantic_core_from_clusters(changed, complete=second, chunk_size=10)
+
+        # 4 map + reduce, затем только измененный чанк + reduce
+        assert len(first.prompts) == 5
+        assert len(second.prompts) == 2
+
+    @pytest.mark.asyncio
+    async def test_llm_error_propagates(self, keyword_clusters):
+        async def failing(messages):
+            raise RuntimeError("LLM unavailable")
+
+        with pytest.raises(RuntimeError):
+            await generate_semantic_core_from_clusters(keyword_clusters, complete=failing, chunk_size=10)
+
+        with pytest.raises(ValueError):
+            await generate_semantic_core_from_clusters([], complete=failing)
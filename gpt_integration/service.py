@@ -23,7 +23,7 @@ else:
     # Пробуем загрузить из текущей директории (для обратной совместимости)
     load_dotenv(override=False)
 
-from fastapi import FastAPI, Header, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Response
 from pydantic import BaseModel
 
 # Import modules
@@ -36,6 +36,7 @@ from gpt_integration.ai_chat.app.service import (
 )
 from gpt_integration.card_generation.service import generate_card as card_generation_service
 from gpt_integration.semantic_core.service import generate_semantic_core as semantic_core_service # New import
+from gpt_integration.semantic_core.service import generate_semantic_core_from_clusters
 from gpt_integration.ai_chat.RAG.api import router as rag_router
 
 logger = logging.getLogger(__name__)
@@ -108,7 +109,10 @@ class PhotoProcessingRequest(BaseModel):
 
       
 class SemanticCoreRequest(BaseModel): # New Pydantic model
-    descriptions_text: str
+    descriptions_text: Optional[str] = None
+    # Кластеры ключевых фраз, извлеченные на стороне сервера (map-reduce генерация)
+    keyword_clusters: Optional[List[Dict[str, Any]]] = None
+    category_name: Optional[str] = None
 
 
 class TryOnRequest(BaseModel):
@@ -336,6 +340,34 @@ async def photo_history(
             detail=f"Internal server error: {str(e)}"
         )
     
+@app.get("/v1/photo/blobs/{key:path}")
+async def photo_blob(
+    key: str,
+    x_api_key: Optional[str] = Header(None)
+) -> Response:
+    """
+    Обработанное изображение или превью из blob store (ссылки из истории).
+    """
+    expected_key = os.getenv("API_SECRET_KEY", "")
+    if not x_api_key or x_api_key != expected_key:
+        raise HTTPException(status_code=403, detail="Invalid or missing API key")
+
+    from gpt_integration.photo_processing.blob_store import content_type_for_key, get_blob_store
+
+    try:
+        data = await asyncio.to_thread(get_blob_store().get, key)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid blob key")
+    if data is None:
+        raise HTTPException(status_code=404, detail="Blob not found")
+
+    return Response(
+        content=data,
+        media_type=content_type_for_key(key),
+        # Ключ адресуется содержимым - изображение по ключу не меняется
+        headers={"Cache-Control": "private, max-age=31536000, immutable"}
+    )
+
 # ============================================================================
 # Semantic Core Endpoints
 # ============================================================================
@@ -354,8 +386,17 @@ async def semantic_core_generate(
     
     logger.info("💎 Generating semantic core...")
     
+    if not req.keyword_clusters and not req.descriptions_text:
+        raise HTTPException(status_code=400, detail="keyword_clusters or descriptions_text is required")
+
     try:
-        result = await semantic_core_service(descriptions_text=req.descriptions_text)
+        if req.keyword_clusters:
+            result = await generate_semantic_core_from_clusters(
+                req.keyword_clusters,
+                category_name=req.category_name,
+            )
+        else:
+            result = await semantic_core_service(descriptions_text=req.descriptions_text)
         
         if result.get("status") == "error":
             error_message = result.get("message", "Unknown error")
@@ -7,9 +7,15 @@
 - middleware: промежуточное ПО (CORS, логирование)
 """
 
+from app.utils.lazy import lazy_exports
 from .config import settings
 from .database import get_db, init_db
-from .middleware import setup_middleware, setup_exception_handlers
+
+# middleware тянет FastAPI - воркерам Celery он не нужен
+__getattr__ = lazy_exports(__name__, {
+    "setup_middleware": (".middleware", "setup_middleware"),
+    "setup_exception_handlers": (".middleware", "setup_exception_handlers"),
+})
 
 __all__ = [
     "settings",
@@ -0,0 +1,62 @@
+"""
+Запуск приложения без побочных эффектов при импорте.
+
+main.py вызывал init_db() (create_all) при импорте: каждый импорт - воркер
+uvicorn, форк Celery, сбор тестов - ходил в БД. Теперь схема создается
+при старте приложения (lifespan), если AUTO_CREATE_SCHEMA включен, или
+отдельной командой перед деплоем:
+
+    python -m app.core.bootstrap
+
+Изменения схемы существующей БД - нумерованные SQL миграции (migrations/).
+"""
+
+import os
+import logging
+import importlib
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+AUTO_CREATE_SCHEMA = os.getenv("AUTO_CREATE_SCHEMA", "true").lower() == "true"
+
+# Модули моделей: create_all создает только таблицы импортированных моделей
+MODEL_MODULES = (
+    "app.features.user.models",
+    "app.features.wb_api.models",
+    "app.features.wb_api.models_sales",
+    "app.features.notifications.models",
+    "app.features.stock_alerts.models",
+    "app.features.export.models",
+    "app.features.digest.models",
+    "app.features.competitors.models",
+    "app.features.semantic_core.models",
+    "app.features.user_photos.models",
+    "app.features.measurements.models",
+    "app.features.favorites.models",
+)
+
+
+def load_models() -> None:
+    for module in MODEL_MODULES:
+        importlib.import_module(module)
+
+
+def create_schema() -> None:
+    """Создать недостающие таблицы всех моделей"""
+    from .database import init_db
+
+    load_models()
+    init_db()
+    logger.info("✅ Database schema is up to date")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if AUTO_CREATE_SCHEMA:
+        create_schema()
+    yield
+
+
+if __name__ == "__main__":
+    create_schema()
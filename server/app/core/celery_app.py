@@ -53,12 +53,15 @@ celery_app = Celery(
     backend=redis_url,
     include=[
         "app.features.sync.tasks",
+        "app.features.notifications.tasks",
         "app.features.stock_alerts.tasks",
         "app.features.export.tasks",
         "app.features.digest.tasks",
         "app.features.competitors.tasks",
         "app.features.rag.tasks",
         "app.features.semantic_core.tasks",
+        "app.features.catalog.tasks",
+        "app.features.wb_api.tasks",
     ]
 )
 
@@ -81,6 +84,10 @@ celery_app.conf.update(
         # Синхронизация - отдельная очередь
         "app.features.sync.tasks.sync_all_cabinets": {"queue": "sync_queue"},
         "app.features.sync.tasks.sync_cabinet_data": {"queue": "sync_queue"},
+        "app.features.wb_api.tasks.teardown_cabinet_task": {"queue": "sync_queue"},
+        
+        # Уведомления по событиям синхронизации - отдельно от синхронизации
+        "app.features.notifications.tasks.consume_sync_events": {"queue": "notifications_queue"},
         
         # Алерты по остаткам - отдельная очередь
         "app.features.stock_alerts.tasks.aggregate_daily_sales_all_cabinets": {"queue": "alerts_queue"},
@@ -90,10 +97,12 @@ celery_app.conf.update(
         # Экспорт в Google Sheets
         "app.features.export.tasks.export_all_to_spreadsheets": {"queue": "export_queue"},
         "app.features.export.tasks.export_cabinet_to_spreadsheet": {"queue": "export_queue"},
+        "app.features.catalog.tasks.refresh_catalog_snapshot": {"queue": "export_queue"},
         
         # Отправка сводок в каналы
         "app.features.digest.tasks.check_digest_schedule": {"queue": "digest_queue"},
         "app.features.digest.tasks.send_digest_to_channel": {"queue": "digest_queue"},
+        "app.features.digest.tasks.send_digest_batch": {"queue": "digest_queue"},
         
         # Скрапинг конкурентов и связанные задачи - отдельная очередь
         "app.features.competitors.tasks.scrape_competitor_task": {
@@ -118,6 +127,10 @@ celery_app.conf.update(
             "task": "app.features.sync.tasks.sync_all_cabinets",
             "schedule": float(sync_interval),  # Используем переменную окружения SYNC_INTERVAL
         },
+        "consume-sync-events": {
+            "task": "app.features.notifications.tasks.consume_sync_events",
+            "schedule": 60.0,  # Подбирает зависшие сообщения потока событий синхронизации
+        },
         "aggregate-daily-sales": {
             "task": "app.features.stock_alerts.tasks.aggregate_daily_sales_all_cabinets",
             "schedule": crontab(hour=hour, minute=minute),  # Настраиваемое время из STOCK_ALERT_CHECK_TIME
@@ -130,6 +143,10 @@ celery_app.conf.update(
             "task": "app.features.export.tasks.export_all_to_spreadsheets",
             "schedule": float(export_interval),  # Экспорт в Google Sheets (использует SYNC_INTERVAL)
         },
+        "refresh-catalog-snapshot": {
+            "task": "app.features.catalog.tasks.refresh_catalog_snapshot",
+            "schedule": float(os.getenv("CATALOG_REFRESH_INTERVAL", "60")),  # Пересборка только при изменении таблицы
+        },
         "check-digest-schedule": {
             "task": "app.features.digest.tasks.check_digest_schedule",
             "schedule": crontab(minute='*'),  # Каждую минуту проверяем расписание
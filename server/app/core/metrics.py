@@ -0,0 +1,477 @@
+"""
+Метрики процесса в памяти.
+
+Собираются: частота и статусы HTTP запросов, гистограммы латентности по
+маршрутам, активные сессии бота, длительность этапов синхронизации; при
+сборе добавляются пул соединений БД и глубина очередей Celery.
+Отдаются в текстовом формате Prometheus (/stats/metrics) и сводкой
+в /stats/analytics.
+
+Запись метрики не берет блокировок: у каждого потока свой шард
+(threading.local), поток пишет только в свой шард. Блокировка нужна лишь
+при регистрации нового шарда и при сборе - сборщик копирует словари шардов
+(dict.copy атомарен под GIL) и суммирует их. В event loop API все запросы
+пишут в один шард без конкуренции.
+
+Процессы (воркеры uvicorn и Celery) публикуют снимок своих метрик в Redis
+(metrics:process:<host>:<pid>, не чаще METRICS_PUBLISH_INTERVAL) и
+добавляют ключ снимка в множество metrics:processes; сборщик складывает свои
+метрики со снимками остальных процессов. pid берется в момент публикации, а
+после fork (prefork-воркеры Celery) реестр в дочернем процессе обнуляется -
+иначе дочерние процессы публикуют под одним ключом и затирают друг друга.
+
+Из event loop обращения к Redis идут через publish_async и asyncio.to_thread.
+"""
+
+import os
+import json
+import time
+import socket
+import asyncio
+import logging
+import weakref
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_PUBLISH_INTERVAL = float(os.getenv("METRICS_PUBLISH_INTERVAL", "15"))
+# Снимок процесса, который перестал публиковать, пропадает через N секунд
+METRICS_SNAPSHOT_TTL = int(os.getenv("METRICS_SNAPSHOT_TTL", "120"))
+# Сессия активна, если от пользователя был запрос за последние N секунд
+ACTIVE_SESSION_WINDOW = int(os.getenv("ACTIVE_SESSION_WINDOW", "300"))
+CELERY_QUEUE_DEPTH_TTL = float(os.getenv("CELERY_QUEUE_DEPTH_TTL", "5"))
+
+SNAPSHOT_KEY = "metrics:process:{process}"
+SNAPSHOT_INDEX_KEY = "metrics:processes"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SYNC_STAGE_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+RATE_WINDOW = 60
+
+Labels = Tuple[str, ...]
+GaugeSample = Tuple[Dict[str, str], float]
+
+
+class _Shard:
+    """Метрики одного потока"""
+
+    __slots__ = ("counters", "histograms", "rate_counts", "rate_seconds", "sessions")
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        # [счетчики по корзинам..., +Inf, сумма]
+        self.histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        # Кольцо запросов по секундам за последнюю минуту
+        self.rate_counts = [0] * RATE_WINDOW
+        self.rate_seconds = [0] * RATE_WINDOW
+        self.sessions: Dict[str, float] = {}
+
+
+class Counter:
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, labelnames: Sequence[str]):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        counters = self.registry._shard().counters
+        key = (self.name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+
+class Histogram:
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str,
+                 labelnames: Sequence[str], buckets: Sequence[float]):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str) -> None:
+        histograms = self.registry._shard().histograms
+        key = (self.name, labels)
+        values = histograms.get(key)
+        if values is None:
+            values = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса с шардами по потокам"""
+
+    def __init__(self, redis_client=None, process_id: Optional[str] = None):
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._shards_lock = threading.Lock()
+        self._metrics: Dict[str, Any] = {}
+        self._gauges: Dict[str, Tuple[str, Callable[[], List[GaugeSample]]]] = {}
+        self._redis = redis_client
+        self._process_id = process_id
+        self.started_at = time.time()
+        self._published_at = 0.0
+        _registries.add(self)
+
+    @property
+    def process_id(self) -> str:
+        # pid читается при каждом обращении: реестр создается при импорте, до fork
+        return self._process_id or f"{socket.gethostname()}:{os.getpid()}"
+
+    def _after_fork(self) -> None:
+        """Дочерний процесс начинает с пустых метрик и своего подключения к Redis"""
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        self._redis = None
+        self.started_at = time.time()
+        self._published_at = 0.0
+
+    # --- Регистрация ---
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = self._metrics.setdefault(name, Counter(self, name, documentation, labelnames))
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = self._metrics.setdefault(name, Histogram(self, name, documentation, labelnames, buckets))
+        return metric
+
+    def gauge_callback(self, name: str, documentation: str, callback: Callable[[], List[GaugeSample]]) -> None:
+        """Gauge, значение которого читается только при сборе"""
+        self._gauges[name] = (documentation, callback)
+
+    # --- Запись (горячий путь) ---
+
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def mark_request(self, session_id: Optional[str] = None) -> None:
+        """Запрос в окно requests_per_minute и отметка активной сессии"""
+        shard = self._shard()
+        now = time.time()
+        second = int(now)
+        slot = second % RATE_WINDOW
+        if shard.rate_seconds[slot] != second:
+            shard.rate_seconds[slot] = second
+            shard.rate_counts[slot] = 0
+        shard.rate_counts[slot] += 1
+        if session_id is not None:
+            shard.sessions[session_id] = now
+
+    # --- Сбор ---
+
+    def local_snapshot(self) -> Dict[str, Any]:
+        """Сумма шардов процесса (формат снимка, который публикуется в Redis)"""
+        with self._shards_lock:
+            shards = list(self._shards)
+
+        now = time.time()
+        counters: Dict[Tuple[str, Labels], float] = {}
+        histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        rate: Dict[int, int] = {}
+        sessions: Dict[str, float] = {}
+        for shard in shards:
+            for key, value in shard.counters.copy().items():
+                counters[key] = counters.get(key, 0) + value
+            for key, values in shard.histograms.copy().items():
+                values = list(values)
+                merged = histograms.get(key)
+                histograms[key] = values if merged is None else [a + b for a, b in zip(merged, values)]
+            for second, count in zip(list(shard.rate_seconds), list(shard.rate_counts)):
+                if now - second < RATE_WINDOW:
+                    rate[second] = rate.get(second, 0) + count
+            expired = []
+            for session_id, seen_at in shard.sessions.copy().items():
+                if now - seen_at < ACTIVE_SESSION_WINDOW:
+                    sessions[session_id] = max(seen_at, sessions.get(session_id, 0))
+                else:
+                    expired.append(session_id)
+            for session_id in expired:
+                # Сессии, которые успели обновиться после копирования, не трогаем
+                if now - shard.sessions.get(session_id, now) >= ACTIVE_SESSION_WINDOW:
+                    shard.sessions.pop(session_id, None)
+
+        return {
+            "process": self.process_id,
+            "started_at": self.started_at,
+            "counters": [[name, list(labels), value] for (name, labels), value in counters.items()],
+            "histograms": [[name, list(labels), values] for (name, labels), values in histograms.items()],
+            "rate": [[second, count] for second, count in rate.items()],
+            "sessions": sessions,
+        }
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from .redis import get_redis_client
+            self._redis = get_redis_client()
+        return self._redis
+
+    def _claim_publish(self, force: bool) -> bool:
+        """Пора ли публиковать; отметка ставится сразу, чтобы не публиковать дважды"""
+        now = time.monotonic()
+        if not force and now - self._published_at < METRICS_PUBLISH_INTERVAL:
+            return False
+        self._published_at = now
+        return True
+
+    def _write_snapshot(self) -> None:
+        key = SNAPSHOT_KEY.format(process=self.process_id)
+        try:
+            pipe = self.redis.pipeline()
+            pipe.set(key, json.dumps(self.local_snapshot()), ex=METRICS_SNAPSHOT_TTL)
+            pipe.sadd(SNAPSHOT_INDEX_KEY, key)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to publish metrics snapshot: {e}")
+
+    def publish(self, force: bool = False) -> None:
+        """Снимок процесса в Redis для сборщика (не чаще METRICS_PUBLISH_INTERVAL)"""
+        if self._claim_publish(force):
+            self._write_snapshot()
+
+    async def publish_async(self, force: bool = False) -> None:
+        """publish для event loop: запись в Redis уходит в поток"""
+        if self._claim_publish(force):
+            await asyncio.to_thread(self._write_snapshot)
+
+    def _remote_snapshots(self) -> List[Dict[str, Any]]:
+        own_key = SNAPSHOT_KEY.format(process=self.process_id)
+        try:
+            keys = sorted(key for key in map(_text, self.redis.smembers(SNAPSHOT_INDEX_KEY)) if key != own_key)
+            raw = self.redis.mget(keys) if keys else []
+            # Снимки остановленных процессов истекли по TTL - убираем их из множества
+            stale = [key for key, item in zip(keys, raw) if not item]
+            if stale:
+                self.redis.srem(SNAPSHOT_INDEX_KEY, *stale)
+        except Exception as e:
+            logger.warning(f"⚠️ Metrics snapshots unavailable: {e}")
+            return []
+        return [json.loads(item) for item in raw if item]
+
+    def collect(self, include_remote: bool = True) -> Dict[str, Any]:
+        """Метрики всех процессов: счетчики и гистограммы складываются"""
+        snapshots = [self.local_snapshot()]
+        if include_remote:
+            snapshots += self._remote_snapshots()
+
+        counters: Dict[Tuple[str, Labels], float] = {}
+        histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        rate: Dict[int, int] = {}
+        sessions = set()
+        now = time.time()
+        for snapshot in snapshots:
+            for name, labels, value in snapshot["counters"]:
+                key = (name, tuple(labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, values in snapshot["histograms"]:
+                key = (name, tuple(labels))
+                merged = histograms.get(key)
+                histograms[key] = list(values) if merged is None else [a + b for a, b in zip(merged, values)]
+            for second, count in snapshot["rate"]:
+                if now - second < RATE_WINDOW:
+                    rate[second] = rate.get(second, 0) + count
+            sessions.update(
+                session_id for session_id, seen_at in snapshot["sessions"].items()
+                if now - seen_at < ACTIVE_SESSION_WINDOW
+            )
+
+        return {
+            "processes": len(snapshots),
+            "counters": counters,
+            "histograms": histograms,
+            "requests_per_minute": sum(rate.values()),
+            "active_sessions": len(sessions),
+            "gauges": self._collect_gauges(),
+        }
+
+    def _collect_gauges(self) -> Dict[str, List[GaugeSample]]:
+        gauges = {}
+        for name, (_, callback) in self._gauges.items():
+            try:
+                gauges[name] = callback()
+            except Exception as e:
+                logger.warning(f"⚠️ Gauge {name} failed: {e}")
+                gauges[name] = []
+        return gauges
+
+    def render_prometheus(self, collected: Optional[Dict[str, Any]] = None) -> str:
+        """Текстовый формат Prometheus 0.0.4"""
+        collected = collected or self.collect()
+        lines: List[str] = []
+
+        for name, metric in self._metrics.items():
+            if isinstance(metric, Counter):
+                lines += [f"# HELP {name} {metric.documentation}", f"# TYPE {name} counter"]
+                for (metric_name, labels), value in sorted(collected["counters"].items()):
+                    if metric_name == name:
+                        lines.append(f"{name}{_format_labels(metric.labelnames, labels)} {_format_value(value)}")
+            else:
+                lines += [f"# HELP {name} {metric.documentation}", f"# TYPE {name} histogram"]
+                for (metric_name, labels), values in sorted(collected["histograms"].items()):
+                    if metric_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + (float("inf"),), values[:-1]):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else _format_value(bound)
+                        bucket_labels = _format_labels(metric.labelnames + ("le",), labels + (le,))
+                        lines.append(f"{name}_bucket{bucket_labels} {_format_value(cumulative)}")
+                    plain = _format_labels(metric.labelnames, labels)
+                    lines.append(f"{name}_sum{plain} {_format_value(values[-1])}")
+                    lines.append(f"{name}_count{plain} {_format_value(cumulative)}")
+
+        process_gauges = [
+            ("app_requests_per_minute", "HTTP requests over the last 60 seconds", collected["requests_per_minute"]),
+            ("app_active_sessions", f"Distinct bot users seen in the last {ACTIVE_SESSION_WINDOW} seconds", collected["active_sessions"]),
+            ("app_uptime_seconds", "Seconds since the collecting process started", time.time() - self.started_at),
+            ("app_metric_processes", "Processes included in this scrape", collected["processes"]),
+        ]
+        for name, documentation, value in process_gauges:
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} gauge", f"{name} {_format_value(value)}"]
+
+        for name, samples in collected["gauges"].items():
+            lines += [f"# HELP {name} {self._gauges[name][0]}", f"# TYPE {name} gauge"]
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Сбросить накопленные значения (для тестов)"""
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.__init__()
+
+
+def _text(value) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def histogram_quantile(buckets: Sequence[float], values: Sequence[float], quantile: float) -> Optional[float]:
+    """Оценка квантиля по корзинам (верхняя граница корзины, как в Prometheus без интерполяции)"""
+    counts = values[:-1]
+    total = sum(counts)
+    if not total:
+        return None
+    rank = quantile * total
+    cumulative = 0
+    for bound, count in zip(tuple(buckets) + (float("inf"),), counts):
+        cumulative += count
+        if cumulative >= rank:
+            return bound if bound != float("inf") else buckets[-1]
+    return buckets[-1]
+
+
+_registries: "weakref.WeakSet[MetricsRegistry]" = weakref.WeakSet()
+
+
+def _reset_registries_after_fork() -> None:
+    for registry in list(_registries):
+        registry._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_registries_after_fork)
+
+
+# --- Метрики приложения ---
+
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by method, route template and status", ("method", "route", "status")
+)
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route")
+)
+SYNC_STAGE_DURATION = registry.histogram(
+    "wb_sync_stage_duration_seconds", "WB sync stage duration", ("stage",), buckets=SYNC_STAGE_BUCKETS
+)
+SYNC_STAGE_RESULTS = registry.counter(
+    "wb_sync_stage_results_total", "WB sync stage results by status", ("stage", "status")
+)
+
+
+def record_request(method: str, route: str, status: int, duration: float, session_id: Optional[str] = None) -> None:
+    """Запрос в метрики (вызывается из middleware на каждый запрос)"""
+    HTTP_REQUESTS.inc(method, route, str(status))
+    HTTP_LATENCY.observe(duration, method, route)
+    registry.mark_request(session_id)
+
+
+def db_pool_samples() -> List[GaugeSample]:
+    """Состояние пула соединений SQLAlchemy"""
+    from .database import engine
+
+    pool = engine.pool
+    samples = []
+    for state in ("size", "checkedout", "overflow", "checkedin"):
+        method = getattr(pool, state, None)
+        if callable(method):
+            samples.append(({"state": state}, float(method())))
+    return samples
+
+
+_queue_depth_cache: Tuple[float, List[GaugeSample]] = (0.0, [])
+
+
+def celery_queue_samples() -> List[GaugeSample]:
+    """Длина очередей Celery в брокере (LLEN), с кэшем на CELERY_QUEUE_DEPTH_TTL"""
+    global _queue_depth_cache
+    cached_at, samples = _queue_depth_cache
+    if time.monotonic() - cached_at < CELERY_QUEUE_DEPTH_TTL:
+        return samples
+
+    from .celery_app import celery_app
+
+    queues = {"celery"} | {route["queue"] for route in (celery_app.conf.task_routes or {}).values()
+                           if isinstance(route, dict) and "queue" in route}
+    client = registry.redis
+    pipe = client.pipeline()
+    ordered = sorted(queues)
+    for queue in ordered:
+        pipe.llen(queue)
+    samples = [({"queue": queue}, float(depth or 0)) for queue, depth in zip(ordered, pipe.execute())]
+    _queue_depth_cache = (time.monotonic(), samples)
+    return samples
+
+
+registry.gauge_callback("db_pool_connections", "SQLAlchemy pool connections by state", db_pool_samples)
+registry.gauge_callback("celery_queue_depth", "Pending messages in Celery broker queues", celery_queue_samples)
@@ -1,13 +1,218 @@
-from fastapi import FastAPI, Request, HTTPException, status
+"""
+Middleware приложения: проверка API ключа и журнал запросов.
+
+Раньше проверку ключа и логирование делала @app.middleware("http"):
+BaseHTTPMiddleware оборачивает каждый запрос в Request/StreamingResponse,
+ключ сравнивался обычным !=, а каждый запрос писал в лог две строки
+уровня INFO - под нагрузкой логирование занимало заметную долю CPU.
+
+APIKeyMiddleware - чистая ASGI middleware:
+    - ключ сравнивается за постоянное время (hmac.compare_digest по sha256,
+      так длина ключа тоже не утекает) со всеми действующими ключами -
+      API_SECRET_KEYS через запятую (при ротации: новый и старый) и
+      API_SECRET_KEY;
+    - пути из PUBLIC_PATHS / PUBLIC_PREFIXES доступны без ключа;
+    - журнал доступа (логгер app.access) - JSON строка на запрос:
+      5xx и исключения пишутся всегда, 4xx - с ограничением частоты,
+      успешные - выборкой ACCESS_LOG_SAMPLE_RATE и с ограничением частоты;
+      число пропущенных ограничителем записей попадает в следующую запись.
+"""
+
+import os
+import hmac
+import json
+import time
+import random
+import hashlib
+import logging
+from typing import Iterable, Optional, Tuple
+from urllib.parse import parse_qs
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
-import logging
-import time
-import os
+
+from . import metrics
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("app.access")
+
+API_KEY_HEADER = b"x-api-secret-key"
+PUBLIC_PATHS = frozenset({"/system/health", "/system/health/live", "/system/health/ready", "/openapi.json", "/redoc"})
+PUBLIC_PREFIXES = ("/docs",)
+
+# Доля успешных запросов, попадающих в журнал доступа
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "0.01"))
+# Записей в секунду для успешных запросов и, отдельно, для 4xx (5xx не ограничиваются)
+ACCESS_LOG_RATE_LIMIT = float(os.getenv("ACCESS_LOG_RATE_LIMIT", "20"))
+
+
+def load_api_keys() -> Tuple[str, ...]:
+    """Действующие API ключи из окружения (первым - основной)"""
+    from .config import settings
+
+    keys = []
+    for value in (os.getenv("API_SECRET_KEY") or settings.API_SECRET_KEY, os.getenv("API_SECRET_KEYS")):
+        for key in (value or "").split(","):
+            key = key.strip()
+            if key and key not in keys:
+                keys.append(key)
+    return tuple(keys)
+
+
+def _digest(value: bytes) -> bytes:
+    return hashlib.sha256(value).digest()
+
+
+class LogRateLimiter:
+    """Token bucket: не больше rate записей в секунду, всплеск до burst"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.suppressed = 0
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        self.suppressed += 1
+        return False
+
+
+class AccessLog:
+    """Структурированный журнал доступа с выборкой и ограничением частоты"""
+
+    def __init__(self, sample_rate: float = ACCESS_LOG_SAMPLE_RATE, rate_limit: float = ACCESS_LOG_RATE_LIMIT,
+                 log: logging.Logger = access_logger):
+        self.sample_rate = sample_rate
+        self.logger = log
+        self.success_limiter = LogRateLimiter(rate_limit)
+        self.client_error_limiter = LogRateLimiter(rate_limit)
+
+    def record(self, scope, status_code: int, duration: float, route: str, error: Optional[str] = None) -> None:
+        if status_code >= 500 or error is not None:
+            level, limiter = logging.ERROR, None
+        elif status_code >= 400:
+            level, limiter = logging.WARNING, self.client_error_limiter
+        else:
+            if self.sample_rate < 1 and random.random() >= self.sample_rate:
+                return
+            level, limiter = logging.INFO, self.success_limiter
+
+        if not self.logger.isEnabledFor(level) or (limiter is not None and not limiter.allow()):
+            return
+
+        client = scope.get("client")
+        entry = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": route,
+            "status": status_code,
+            "duration_ms": round(duration * 1000, 2),
+            "client": client[0] if client else None,
+        }
+        if error is not None:
+            entry["error"] = error
+        if level == logging.INFO:
+            entry["sample_rate"] = self.sample_rate
+        if limiter is not None and limiter.suppressed:
+            entry["suppressed"] = limiter.suppressed
+            limiter.suppressed = 0
+        self.logger.log(level, json.dumps(entry, ensure_ascii=False))
+
+
+class APIKeyMiddleware:
+    """Проверка X-API-SECRET-KEY, метрики и журнал доступа (чистая ASGI)"""
+
+    def __init__(self, app, api_keys: Optional[Iterable[str]] = None,
+                 public_paths: Iterable[str] = PUBLIC_PATHS, public_prefixes: Tuple[str, ...] = PUBLIC_PREFIXES,
+                 access_log: Optional[AccessLog] = None):
+        self.app = app
+        keys = tuple(api_keys) if api_keys is not None else load_api_keys()
+        if not keys:
+            logger.warning("⚠️ API_SECRET_KEY is not set - all protected requests will be rejected")
+        self._key_digests = tuple(_digest(key.encode("utf-8")) for key in keys)
+        self.public_paths = frozenset(public_paths)
+        self.public_prefixes = tuple(public_prefixes)
+        self.access_log = access_log or AccessLog()
+
+    def _authenticate(self, scope) -> Optional[str]:
+        """Причина отказа или None, если ключ подошел"""
+        path = scope["path"]
+        if path in self.public_paths or path.startswith(self.public_prefixes):
+            return None
+        provided = None
+        for name, value in scope["headers"]:
+            if name == API_KEY_HEADER:
+                provided = value
+                break
+        if provided is None:
+            return "Missing API Secret Key"
+        provided_digest = _digest(provided)
+        valid = False
+        # Сравниваем со всеми ключами без раннего выхода
+        for digest in self._key_digests:
+            valid |= hmac.compare_digest(provided_digest, digest)
+        return None if valid else "Invalid API Secret Key"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        reason = self._authenticate(scope)
+        if reason is not None:
+            response = JSONResponse(status_code=403, content={"detail": reason})
+            await response(scope, receive, send)
+            self._finish(scope, 403, started)
+            await metrics.registry.publish_async()
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception as e:
+            self._finish(scope, 500, started, error=f"{type(e).__name__}: {e}")
+            await metrics.registry.publish_async()
+            raise
+        self._finish(scope, status_code, started)
+        # Снимок в Redis - раз в METRICS_PUBLISH_INTERVAL и в потоке, не в event loop
+        await metrics.registry.publish_async()
+
+    def _finish(self, scope, status_code: int, started: float, error: Optional[str] = None) -> None:
+        duration = time.perf_counter() - started
+        # Шаблон маршрута, а не путь: у /orders/{order_id} одна серия метрик
+        route = getattr(scope.get("route"), "path", "unmatched")
+        metrics.record_request(scope["method"], route, status_code, duration, _session_id(scope))
+        self.access_log.record(scope, status_code, duration, route, error)
+
+
+def _session_id(scope) -> Optional[str]:
+    """telegram_id пользователя бота (для active_sessions)"""
+    path_params = scope.get("path_params")
+    if path_params and "telegram_id" in path_params:
+        return str(path_params["telegram_id"])
+    query_string = scope.get("query_string", b"")
+    if b"telegram_id=" not in query_string:
+        return None
+    values = parse_qs(query_string.decode("latin-1")).get("telegram_id")
+    return values[0] if values else None
 
 
 def setup_middleware(app: FastAPI):
@@ -16,70 +221,8 @@ def setup_middleware(app: FastAPI):
     """
     from .config import settings
 
-    # Единая middleware для логирования и проверки ключа
-    @app.middleware("http")
-    async def main_middleware(request: Request, call_next):
-        # 1. Логируем входящий запрос
-        start_time = time.time()
-        client_host = request.client.host if request.client else "unknown"
-        logger.info(f"Входящий запрос: {request.method} {request.url.path} от {client_host}")
-
-        # 2. Проверяем секретный ключ API, пропуская health-check и документацию
-        public_paths = ['/system/health', '/docs', '/openapi.json', '/redoc']
-        if request.url.path not in public_paths and not request.url.path.startswith('/docs'):
-            secret_header = request.headers.get("X-API-SECRET-KEY")
-            # Используем ключ из переменной окружения напрямую
-            expected_key = os.getenv('API_SECRET_KEY') or settings.API_SECRET_KEY
-            
-            if not secret_header:
-                logger.warning(
-                    f"❌ Неудачная попытка аутентификации: отсутствует API ключ | "
-                    f"Путь: {request.url.path} | IP: {client_host} | "
-                    f"User-Agent: {request.headers.get('user-agent', 'unknown')}"
-                )
-                return JSONResponse(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    content={"detail": "Missing API Secret Key"}
-                )
-            
-            if secret_header != expected_key:
-                logger.warning(
-                    f"❌ Неудачная попытка аутентификации: неверный API ключ | "
-                    f"Путь: {request.url.path} | IP: {client_host} | "
-                    f"Предоставленный ключ: {secret_header[:8]}... | "
-                    f"User-Agent: {request.headers.get('user-agent', 'unknown')}"
-                )
-                return JSONResponse(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    content={"detail": "Invalid API Secret Key"}
-                )
-            
-            logger.debug(f"✅ Аутентификация успешна для {request.url.path}")
-        
-        # 3. Передаем запрос дальше и получаем ответ
-        response = await call_next(request)
-
-        # 4. Логируем время выполнения и статус ответа
-        process_time = time.time() - start_time
-        
-        # Разный уровень логирования в зависимости от статуса
-        if response.status_code >= 500:
-            logger.error(
-                f"❌ Запрос {request.method} {request.url.path} завершился с ошибкой | "
-                f"Статус: {response.status_code} | Время: {process_time:.4f}s"
-            )
-        elif response.status_code >= 400:
-            logger.warning(
-                f"⚠️ Запрос {request.method} {request.url.path} завершился с ошибкой клиента | "
-                f"Статус: {response.status_code} | Время: {process_time:.4f}s"
-            )
-        else:
-            logger.info(
-                f"✅ Запрос {request.method} {request.url.path} выполнен успешно | "
-                f"Статус: {response.status_code} | Время: {process_time:.4f}s"
-            )
-
-        return response
+    # Проверка ключа, метрики и журнал доступа - ближе всех к приложению
+    app.add_middleware(APIKeyMiddleware)
 
     # CORS middleware
     app.add_middleware(
@@ -106,4 +249,4 @@ def setup_exception_handlers(app: FastAPI):
         return JSONResponse(
             status_code=500,
             content={"detail": "Внутренняя ошибка сервера"}
-        )
\ No newline at end of file
+        )
@@ -40,7 +40,9 @@ class MockRedisClient:
     def get(self, key):
         return self._data.get(key)
     
-    def set(self, key, value, ex=None):
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self._data:
+            return None
         self._data[key] = value
         return True
     
@@ -7,9 +7,15 @@
 - stats: статистика и аналитика
 """
 
-from .system.routes import system_router
-from .user.routes import user_router
-from .stats.routes import stats_router
+from app.utils.lazy import lazy_exports
+
+# Роутеры импортируются при обращении: импорт модели или задачи одной фичи
+# не должен подтягивать HTTP слой остальных
+__getattr__ = lazy_exports(__name__, {
+    "system_router": (".system.routes", "system_router"),
+    "user_router": (".user.routes", "user_router"),
+    "stats_router": (".stats.routes", "stats_router"),
+})
 
 __all__ = [
     "system_router",
@@ -2,9 +2,12 @@
 Bot API модуль для интеграции с Telegram ботом
 """
 
-from .routes import router as bot_router
-from .formatter import BotMessageFormatter
-from .service import BotAPIService
-# Webhook система для уведомлений
+from app.utils.lazy import lazy_exports
+
+__getattr__ = lazy_exports(__name__, {
+    "bot_router": (".routes", "router"),
+    "BotMessageFormatter": (".formatter", "BotMessageFormatter"),
+    "BotAPIService": (".service", "BotAPIService"),
+})
 
 __all__ = ["bot_router", "BotMessageFormatter", "BotAPIService"]
\ No newline at end of file
@@ -0,0 +1,217 @@
+"""
+Рендеринг графиков динамики (daily-trends) вне event loop с кэшированием.
+
+Раньше get_daily_trends строил matplotlib график на каждый запрос прямо в
+воркере API и возвращал его inline в base64: сотни миллисекунд CPU, во время
+которых event loop не обслуживал другие запросы. Теперь:
+
+- ключ графика - sha256 от (кабинет, период, данные, формат): одинаковые данные
+  дают тот же chart_id, новые данные после синхронизации - новый;
+- готовые графики хранятся в Redis с TTL, повторный запрос рендер не вызывает;
+- рендер выполняется в пуле процессов (CHART_RENDER_WORKERS, 0 - в потоке),
+  одновременные запросы одного графика ждут один рендер;
+- клиент получает ссылку /api/v1/bot/analytics/charts/{chart_id}, inline base64
+  остается опцией для обратной совместимости;
+- кроме PNG доступен векторный SVG - легче и не зависит от dpi.
+"""
+
+import os
+import io
+import json
+import base64
+import asyncio
+import hashlib
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHART_CACHE_TTL = int(os.getenv("CHART_CACHE_TTL", "86400"))
+CHART_RENDER_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", "2"))
+CHART_KEY = "bot_chart:{chart_id}"
+CHART_URL = "/api/v1/bot/analytics/charts/{chart_id}"
+
+MEDIA_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+SERIES = (
+    ("orders", "Заказы", "#1f77b4"),
+    ("buyouts", "Выкупы", "#2ca02c"),
+    ("returns", "Возвраты", "#d62728"),
+)
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+_redis_client = None
+
+
+def render_trends_chart(day_keys: List[str], series: Dict[str, List[int]], fmt: str = "png") -> bytes:
+    """
+    Строит график динамики и возвращает байты изображения
+
+    Функция чистая и выполняется в процессе пула - matplotlib импортируется здесь,
+    а не в воркере API.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    # 4:3 соотношение сторон (например, 8x6 дюймов)
+    fig, ax = plt.subplots(figsize=(8, 6))
+    try:
+        x = list(range(len(day_keys)))
+        for name, label, color in SERIES:
+            ax.plot(x, series[name], label=label, color=color)
+        ax.set_title("Динамика событий за период")
+        ax.set_xlabel("День")
+        ax.set_ylabel("Количество")
+        ax.set_xticks(x)
+        # метки DD.MM
+        ax.set_xticklabels([f"{k[8:10]}.{k[5:7]}" for k in day_keys], rotation=0)
+        ax.grid(True, which="major", linestyle="--", alpha=0.3)
+        ax.legend()
+        fig.tight_layout()
+        buf = io.BytesIO()
+        if fmt == "svg":
+            fig.savefig(buf, format="svg")
+        else:
+            fig.savefig(buf, format="png", dpi=150)
+        return buf.getvalue()
+    finally:
+        plt.close(fig)
+
+
+def chart_id_for(cabinet_id: int, day_keys: List[str], series: Dict[str, List[int]], fmt: str) -> str:
+    """Ключ графика: хэш от кабинета, периода, данных и формата"""
+    payload = json.dumps(
+        {"cabinet_id": cabinet_id, "days": day_keys, "series": series, "format": fmt},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def get_render_pool() -> Optional[ProcessPoolExecutor]:
+    """Общий пул процессов для рендера (None - рендер в потоке)"""
+    global _render_pool
+    if CHART_RENDER_WORKERS <= 0:
+        return None
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(max_workers=CHART_RENDER_WORKERS)
+    return _render_pool
+
+
+def shutdown_render_pool() -> None:
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown(wait=False, cancel_futures=True)
+        _render_pool = None
+
+
+class ChartRenderer:
+    """Кэширующий рендерер графиков daily-trends"""
+
+    # Рендеры в процессе: одновременные запросы одного графика ждут один рендер
+    _inflight: Dict[str, "asyncio.Future[bytes]"] = {}
+
+    def __init__(self, redis_client=None, executor: Optional[Executor] = None, ttl: Optional[int] = None):
+        self._redis = redis_client
+        self._executor = executor
+        self.ttl = ttl or CHART_CACHE_TTL
+
+    @property
+    def redis(self):
+        global _redis_client
+        if self._redis is None:
+            if _redis_client is None:
+                from app.core.redis import get_redis_client
+                _redis_client = get_redis_client()
+            self._redis = _redis_client
+        return self._redis
+
+    async def get_or_render(
+        self,
+        cabinet_id: int,
+        day_keys: List[str],
+        series: Dict[str, List[int]],
+        fmt: str = "png",
+        inline: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Возвращает описание графика (chart_id, url), при необходимости рендерит его
+
+        Args:
+            cabinet_id: ID кабинета
+            day_keys: Дни графика (YYYY-MM-DD)
+            series: Ряды orders/buyouts/returns по дням
+            fmt: png или svg
+            inline: Добавить изображение в ответ (base64) для старых клиентов
+
+        Returns:
+            {"format", "chart_id", "url", "media_type", "data"}
+        """
+        if fmt not in MEDIA_TYPES:
+            raise ValueError(f"Unsupported chart format: {fmt}")
+
+        chart_id = chart_id_for(cabinet_id, day_keys, series, fmt)
+        image = self._load(chart_id)
+        if image is None:
+            image = await self._render_once(chart_id, day_keys, series, fmt)
+            self._store(chart_id, fmt, image)
+
+        return {
+            "format": fmt,
+            "chart_id": chart_id,
+            "url": CHART_URL.format(chart_id=chart_id),
+            "media_type": MEDIA_TYPES[fmt],
+            "data": base64.b64encode(image).decode("ascii") if inline else None,
+        }
+
+    def get_chart(self, chart_id: str) -> Optional[Tuple[bytes, str]]:
+        """Изображение и media type из кэша (None, если истек TTL или не существовал)"""
+        try:
+            raw = self.redis.get(CHART_KEY.format(chart_id=chart_id))
+        except Exception as e:
+            logger.warning(f"⚠️ Chart cache unavailable: {e}")
+            return None
+        if not raw:
+            return None
+        entry = json.loads(raw)
+        return base64.b64decode(entry["data"]), MEDIA_TYPES[entry["format"]]
+
+    async def _render_once(self, chart_id: str, day_keys: List[str], series: Dict[str, List[int]], fmt: str) -> bytes:
+        future = self._inflight.get(chart_id)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inflight[chart_id] = future
+        try:
+            executor = self._executor or get_render_pool()
+            if executor is None:
+                image = await asyncio.to_thread(render_trends_chart, day_keys, series, fmt)
+            else:
+                image = await loop.run_in_executor(executor, render_trends_chart, day_keys, series, fmt)
+            future.set_result(image)
+            return image
+        except Exception as e:
+            future.set_exception(e)
+            # Помечаем исключение полученным, даже если других ожидающих нет
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(chart_id, None)
+
+    def _load(self, chart_id: str) -> Optional[bytes]:
+        cached = self.get_chart(chart_id)
+        return cached[0] if cached else None
+
+    def _store(self, chart_id: str, fmt: str, image: bytes) -> None:
+        entry = json.dumps({"format": fmt, "data": base64.b64encode(image).decode("ascii")})
+        try:
+            self.redis.set(CHART_KEY.format(chart_id=chart_id), entry, ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to cache chart {chart_id}: {e}")
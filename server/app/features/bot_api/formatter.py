@@ -6,6 +6,7 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone, timedelta
 import logging
 from app.utils.timezone import TimezoneUtils, MSK_TZ
+from app.features.wb_api.review_classifier import TOPICS
 
 logger = logging.getLogger(__name__)
 
@@ -369,6 +370,11 @@ class BotMessageFormatter:
                     if cons:
                         message += f"\n   ➖ {cons}"
                     
+                    # Темы отзыва (классификатор при синхронизации)
+                    topics = review.get("topics") or []
+                    if topics:
+                        message += f"\n   🏷 {', '.join(TOPICS.get(topic, topic) for topic in topics)}"
+                    
                     message += "\n\n"
             
             if unanswered_questions:
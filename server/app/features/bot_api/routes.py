@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.features.wb_api.cache_manager import WBCacheManager
 from app.features.wb_api.sync_service import WBSyncService
+from app.features.wb_api.review_classifier import SENTIMENTS, TOPICS
 from app.features.user.crud import UserCRUD
 from app.features.notifications.crud import NotificationSettingsCRUD
 from app.features.notifications.schemas import (
@@ -19,7 +20,9 @@ from app.features.notifications.schemas import (
 )
 from app.features.stock_alerts.ignore_crud import UserStockIgnoreCRUD
 from app.features.competitors.models import CompetitorLink  # New import
-from .service import BotAPIService
+from app.utils.pagination import InvalidCursorError, decode_cursor
+from .service import BotAPIService, STOCKS_CURSOR_KIND
+from .chart_renderer import ChartRenderer
 from .schemas import (
     DashboardResponse, OrdersResponse, CriticalStocksAPIResponse, DynamicCriticalStocksAPIResponse,
     AllStocksReportAPIResponse, ReviewsSummaryAPIResponse, AnalyticsSalesAPIResponse, SyncResponse, SyncStatusResponse,
@@ -205,10 +208,20 @@ async def get_all_stocks_report(
     warehouse: Optional[str] = Query(None, description="Фильтр по складу (можно несколько через запятую)"),
     size: Optional[str] = Query(None, description="Фильтр по размеру (можно несколько через запятую)"),
     search: Optional[str] = Query(None, description="Поиск по названию товара или артикулу"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (pagination.next_cursor)"),
     bot_service: BotAPIService = Depends(get_bot_service)
 ):
     """Получение отчета по всем остаткам с фильтрацией и поиском (кэшируется на 5 минут)"""
     try:
+        after = None
+        if cursor is not None:
+            if offset:
+                raise HTTPException(status_code=400, detail="Укажите cursor или offset, не оба")
+            try:
+                after = decode_cursor(STOCKS_CURSOR_KIND, cursor, timestamp_type=int)
+            except InvalidCursorError:
+                raise HTTPException(status_code=400, detail="Некорректный курсор")
+
         cabinet = await bot_service.get_user_cabinet(telegram_id)
         if not cabinet:
             raise HTTPException(status_code=404, detail="Кабинет WB не найден")
@@ -224,7 +237,8 @@ async def get_all_stocks_report(
             offset=offset,
             warehouse=warehouse,
             size=size,
-            search=search
+            search=search,
+            after=after
         )
         
         if not result["success"]:
@@ -253,6 +267,8 @@ async def get_reviews_summary(
     limit: int = Query(10, ge=1, le=100, description="Количество отзывов"),
     offset: int = Query(0, ge=0, description="Смещение для пагинации"),
     rating_threshold: Optional[int] = Query(None, ge=1, le=5, description="Фильтр по рейтингу (≤N звезд)"),
+    sentiment: Optional[str] = Query(None, pattern=f"^({'|'.join(SENTIMENTS)})$", description="Фильтр по тональности"),
+    topic: Optional[str] = Query(None, pattern=f"^({'|'.join(TOPICS)})$", description="Фильтр по теме отзыва"),
     bot_service: BotAPIService = Depends(get_bot_service)
 ):
     """Получение новых и проблемных отзывов"""
@@ -266,7 +282,7 @@ async def get_reviews_summary(
         if not user:
             raise HTTPException(status_code=500, detail="Ошибка создания пользователя")
         
-        result = await bot_service.get_reviews_summary(user, limit, offset, rating_threshold)
+        result = await bot_service.get_reviews_summary(user, limit, offset, rating_threshold, sentiment, topic)
         
         if not result["success"]:
             raise HTTPException(status_code=500, detail=result["error"])
@@ -328,6 +344,8 @@ async def get_analytics_sales(
 async def get_analytics_daily_trends(
     telegram_id: int = Query(..., description="Telegram ID пользователя"),
     days: Optional[int] = Query(None, ge=3, le=180, description="Окно дней для динамики (по умолчанию из .env)"),
+    chart_format: str = Query("png", pattern="^(png|svg)$", description="Формат графика: png или svg"),
+    chart_inline: bool = Query(False, description="Вернуть график в chart.data (base64) вместо только ссылки"),
     bot_service: BotAPIService = Depends(get_bot_service)
 ):
     """Получение ежедневной динамики событий (заказы, отмены, выкупы, возвраты)"""
@@ -340,7 +358,9 @@ async def get_analytics_daily_trends(
         if not user:
             raise HTTPException(status_code=500, detail="Ошибка создания пользователя")
         
-        result = await bot_service.get_daily_trends(user, days_override=days)
+        result = await bot_service.get_daily_trends(
+            user, days_override=days, chart_format=chart_format, chart_inline=chart_inline
+        )
         if not result["success"]:
             raise HTTPException(status_code=500, detail=result["error"])
         
@@ -357,6 +377,20 @@ async def get_analytics_daily_trends(
         logger.error(f"Ошибка получения daily-trends для telegram_id {telegram_id}: {e}")
         raise HTTPException(status_code=500, detail="Ошибка сервера")
 
+@router.get("/analytics/charts/{chart_id}")
+async def get_analytics_chart(chart_id: str):
+    """Изображение графика по ссылке из daily-trends (chart.url)"""
+    cached = ChartRenderer().get_chart(chart_id)
+    if not cached:
+        raise HTTPException(status_code=404, detail="График не найден или устарел")
+    image, media_type = cached
+    return Response(
+        content=image,
+        media_type=media_type,
+        # chart_id - хэш данных, содержимое по ссылке не меняется
+        headers={"Cache-Control": "private, max-age=86400, immutable"}
+    )
+
 @router.post("/sync/start", response_model=SyncResponse)
 async def start_sync(
     telegram_id: int = Query(..., description="Telegram ID пользователя"),
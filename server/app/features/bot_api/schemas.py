@@ -84,6 +84,7 @@ class PaginationData(BaseModel):
     offset: int
     total: int
     has_more: bool
+    next_cursor: Optional[str] = None  # Курсор следующей страницы (где поддерживается)
 
 
 class OrdersResponse(BaseModel):
@@ -150,6 +151,8 @@ class ReviewData(BaseModel):
     pros: Optional[str] = None
     cons: Optional[str] = None
     created_date: Optional[str] = None
+    sentiment: Optional[str] = None
+    topics: List[str] = []
 
 
 class QuestionData(BaseModel):
@@ -168,6 +171,8 @@ class ReviewsStatistics(BaseModel):
     answered_percent: float
     attention_needed: int
     new_today: int
+    sentiment: Dict[str, int] = {}
+    topics: Dict[str, int] = {}
 
 
 class ReviewsResponse(BaseModel):
@@ -590,9 +595,12 @@ class DailyTrendTopProduct(BaseModel):
 
 
 class ChartPayload(BaseModel):
-    """Изображение графика"""
-    format: str = "png_base64"
-    data: str
+    """График: ссылка на закэшированное изображение, data - base64 по запросу"""
+    format: str = "png"
+    chart_id: Optional[str] = None
+    url: Optional[str] = None
+    media_type: Optional[str] = None
+    data: Optional[str] = None
 
 
 class DailyTrendsMeta(BaseModel):
@@ -2,42 +2,41 @@
 Bot API сервис для интеграции с Telegram ботом
 """
 
+import bisect
 import logging
 import os
-import io
-import base64
 import json
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from sqlalchemy.orm import Session, joinedload, selectinload
 from app.features.wb_api.models import WBCabinet, WBOrder, WBProduct, WBStock, WBReview
-from sqlalchemy import func, and_, or_, text
+from sqlalchemy import func, and_, or_, text, case
 from datetime import datetime, timezone, timedelta
 from app.features.wb_api.cache_manager import WBCacheManager
 from app.features.wb_api.sync_service import WBSyncService
+from app.features.wb_api.review_classifier import SENTIMENTS, TOPICS, decode_topics, topic_filter
 from app.utils.timezone import TimezoneUtils
+from app.utils.pagination import encode_cursor
 from app.features.stock_alerts.stock_analyzer import DynamicStockAnalyzer
 from .formatter import BotMessageFormatter
 from app.features.wb_api.models_sales import WBSales
 from app.features.wb_api.models import WBReview
-
-# matplotlib импортируем лениво, чтобы не падать без зависимости при старте
-try:
-    import matplotlib
-    matplotlib.use("Agg")
-    import matplotlib.pyplot as plt
-except Exception:  # pragma: no cover
-    plt = None
+from .chart_renderer import ChartRenderer, SERIES
 
 logger = logging.getLogger(__name__)
 
+# Курсор /stocks/all: ключ (total_quantity, nm_id) последнего товара страницы
+STOCKS_CURSOR_KIND = "stocks_all"
+
 
 class BotAPIService:
     """Сервис для Bot API"""
     
-    def __init__(self, db: Session, cache_manager: WBCacheManager = None, sync_service: WBSyncService = None):
+    def __init__(self, db: Session, cache_manager: WBCacheManager = None, sync_service: WBSyncService = None,
+                 chart_renderer: ChartRenderer = None):
         self.db = db
         self.cache_manager = cache_manager or WBCacheManager(db)
         self.sync_service = sync_service or WBSyncService(db, self.cache_manager)
+        self.chart_renderer = chart_renderer or ChartRenderer()
         self.formatter = BotMessageFormatter()
         self.cache_ttl = 300  # 5 минут кэш
 
@@ -729,7 +728,8 @@ class BotAPIService:
                 "recommendations": ["Ошибка получения данных"]
             }
 
-    async def get_reviews_summary(self, user, limit: int = 10, offset: int = 0, rating_threshold: Optional[int] = None) -> Dict[str, Any]:
+    async def get_reviews_summary(self, user, limit: int = 10, offset: int = 0, rating_threshold: Optional[int] = None,
+                                  sentiment: Optional[str] = None, topic: Optional[str] = None) -> Dict[str, Any]:
         """Получение сводки по отзывам"""
         try:
             # Получаем telegram_id из объекта user
@@ -741,8 +741,8 @@ class BotAPIService:
                     "error": "Кабинет WB не найден"
                 }
             
-            # Получаем данные из БД с фильтром по рейтингу
-            reviews_data = await self._fetch_reviews_from_db(cabinet, limit, offset, rating_threshold)
+            # Получаем данные из БД с фильтром по рейтингу, тональности и теме
+            reviews_data = await self._fetch_reviews_from_db(cabinet, limit, offset, rating_threshold, sentiment, topic)
             
             # Форматируем Telegram сообщение
             telegram_text = self.formatter.format_reviews(reviews_data)
@@ -822,8 +822,18 @@ class BotAPIService:
                 "error": str(e)
             }
 
-    async def get_daily_trends(self, user: Dict[str, Any], days_override: Optional[int] = None) -> Dict[str, Any]:
-        """Динамика событий по дням (заказы, отмены, выкупы, возвраты, средний рейтинг) - ОПТИМИЗИРОВАННАЯ ВЕРСИЯ"""
+    async def get_daily_trends(
+        self,
+        user: Dict[str, Any],
+        days_override: Optional[int] = None,
+        chart_format: str = "png",
+        chart_inline: bool = False
+    ) -> Dict[str, Any]:
+        """Динамика событий по дням (заказы, отмены, выкупы, возвраты, средний рейтинг) - ОПТИМИЗИРОВАННАЯ ВЕРСИЯ
+
+        График отдается ссылкой (chart.url) на закэшированное изображение;
+        chart_inline=True дополнительно кладет его в chart.data (base64).
+        """
         try:
             telegram_id = user["telegram_id"] if isinstance(user, dict) else getattr(user, "telegram_id", None)
             cabinet = await self.get_user_cabinet(telegram_id)
@@ -908,9 +918,9 @@ class BotAPIService:
             top_products = self._get_top_products_for_period(cabinet.id, TimezoneUtils.to_utc(end_msk.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days_window)), end_utc)
             top_yesterday_products = self._get_top_products_for_period(cabinet.id, TimezoneUtils.to_utc(end_msk.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)), end_utc)
 
-            # Шаг 6: Генерация графика
+            # Шаг 6: График - из кэша или рендер в пуле процессов
             chart_keys = day_keys[-chart_days:]
-            chart_b64 = self._generate_trends_chart_base64(chart_keys, day_map) if plt else ""
+            chart = await self._get_trends_chart(cabinet.id, chart_keys, day_map, chart_format, chart_inline)
 
             # Шаг 7: Формирование ответа
             data = {
@@ -934,7 +944,7 @@ class BotAPIService:
                     "top_products": top_yesterday_products[:5]
                 },
                 "top_products": top_products[:5],
-                "chart": {"format": "png_base64", "data": chart_b64}
+                "chart": chart
             }
             
             return {"success": True, "data": data, "telegram_text": "Аналитика готова", "insights": []}
@@ -1041,36 +1051,22 @@ class BotAPIService:
         ]
 
 
-    def _generate_trends_chart_base64(self, day_keys: List[str], day_map: Dict[str, Dict[str, Any]]) -> str:
-        """Строит график и возвращает его в base64"""
+    async def _get_trends_chart(
+        self,
+        cabinet_id: int,
+        day_keys: List[str],
+        day_map: Dict[str, Dict[str, Any]],
+        chart_format: str,
+        chart_inline: bool
+    ) -> Dict[str, Any]:
+        """Описание графика динамики: chart_id и ссылка, опционально base64"""
+        series = {name: [day_map[d][name] for d in day_keys] for name, _, _ in SERIES}
         try:
-            # 4:3 соотношение сторон (например, 8x6 дюймов)
-            fig, ax = plt.subplots(figsize=(8, 6))
-            x = list(range(len(day_keys)))
-            orders = [day_map[d]["orders"] for d in day_keys]
-            buyouts = [day_map[d]["buyouts"] for d in day_keys]
-            returns = [day_map[d]["returns"] for d in day_keys]
-            ax.plot(x, orders, label="Заказы", color="#1f77b4")
-            ax.plot(x, buyouts, label="Выкупы", color="#2ca02c")
-            ax.plot(x, returns, label="Возвраты", color="#d62728")
-            ax.set_title("Динамика событий за период")
-            ax.set_xlabel("День")
-            ax.set_ylabel("Количество")
-            ax.set_xticks(x)
-            # метки DD.MM
-            labels = [f"{k[8:10]}.{k[5:7]}" for k in day_keys]
-            ax.set_xticklabels(labels, rotation=0)
-            ax.grid(True, which="major", linestyle="--", alpha=0.3)
-            ax.legend()
-            buf = io.BytesIO()
-            fig.tight_layout()
-            fig.savefig(buf, format="png", dpi=150)
-            plt.close(fig)
-            buf.seek(0)
-            return base64.b64encode(buf.read()).decode("utf-8")
+            return await self.chart_renderer.get_or_render(cabinet_id, day_keys, series, chart_format, inline=chart_inline)
         except Exception as e:
             logger.error(f"Ошибка генерации графика: {e}")
-            return ""
+            return {"format": chart_format, "chart_id": None, "url": None, "media_type": None, "data": None}
+
     async def start_sync(self, user: Dict[str, Any]) -> Dict[str, Any]:
         """Запуск синхронизации данных с инвалидацией кэша"""
         try:
@@ -2082,8 +2078,9 @@ class BotAPIService:
                 "recommendations": ["Ошибка получения данных"]
             }
 
-    async def _fetch_reviews_from_db(self, cabinet: WBCabinet, limit: int, offset: int, rating_threshold: Optional[int] = None) -> Dict[str, Any]:
-        """Получение отзывов из БД с фильтрацией по рейтингу"""
+    async def _fetch_reviews_from_db(self, cabinet: WBCabinet, limit: int, offset: int, rating_threshold: Optional[int] = None,
+                                     sentiment: Optional[str] = None, topic: Optional[str] = None) -> Dict[str, Any]:
+        """Получение отзывов из БД с фильтрацией по рейтингу, тональности и теме"""
         try:
             # Получаем отзывы
             reviews_query = self.db.query(WBReview).filter(
@@ -2093,6 +2090,11 @@ class BotAPIService:
             # Добавляем фильтр по рейтингу, если указан (≤ threshold)
             if rating_threshold is not None:
                 reviews_query = reviews_query.filter(WBReview.rating <= rating_threshold)
+            # Тональность и темы посчитаны при синхронизации (review_classifier)
+            if sentiment is not None:
+                reviews_query = reviews_query.filter(WBReview.sentiment == sentiment)
+            if topic is not None:
+                reviews_query = reviews_query.filter(topic_filter(WBReview.topics, topic))
             
             reviews_query = reviews_query.order_by(WBReview.created_date.desc())
             
@@ -2128,7 +2130,9 @@ class BotAPIService:
                     "matching_size": review.matching_size,
                     "was_viewed": review.was_viewed,
                     "supplier_feedback_valuation": review.supplier_feedback_valuation,
-                    "supplier_product_valuation": review.supplier_product_valuation
+                    "supplier_product_valuation": review.supplier_product_valuation,
+                    "sentiment": review.sentiment,
+                    "topics": decode_topics(review.topics)
                 })
             
             # Статистика рассчитывается для всех отзывов (без фильтра), а не только для отображаемых
@@ -2140,6 +2144,7 @@ class BotAPIService:
             new_reviews = len([r for r in all_reviews if r.created_date and r.created_date >= datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)])
             unanswered_reviews = len([r for r in all_reviews if not r.is_answered])
             avg_rating = sum(r.rating or 0 for r in all_reviews) / len(all_reviews) if all_reviews else 0.0
+            sentiment_stats, topic_stats = self._review_sentiment_stats(cabinet.id)
             
             return {
                 "new_reviews": reviews_list,  # Список отзывов (с фильтром)
@@ -2153,7 +2158,9 @@ class BotAPIService:
                     "average_rating": round(avg_rating, 1),
                     "answered_count": len(all_reviews) - unanswered_reviews,
                     "answered_percent": round((len(all_reviews) - unanswered_reviews) / len(all_reviews) * 100, 1) if all_reviews else 0.0,
-                    "attention_needed": len([r for r in all_reviews if r.rating and r.rating <= 3])
+                    "attention_needed": len([r for r in all_reviews if r.rating and r.rating <= 3]),
+                    "sentiment": sentiment_stats,  # {positive/neutral/negative: количество}
+                    "topics": topic_stats  # {тема: количество}, по убыванию
                 },
                 "recommendations": ["Все отзывы обработаны"] if unanswered_reviews == 0 else [f"Требуют ответа: {unanswered_reviews} отзывов"]
             }
@@ -2169,6 +2176,27 @@ class BotAPIService:
                 "pagination": {"limit": limit, "offset": offset, "total": 0}
             }
 
+    def _review_sentiment_stats(self, cabinet_id: int) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Распределение тональности и частота тем отзывов кабинета (агрегаты в SQL)"""
+        sentiment_rows = self.db.query(
+            WBReview.sentiment, func.count(WBReview.id)
+        ).filter(
+            WBReview.cabinet_id == cabinet_id,
+            WBReview.sentiment.isnot(None)
+        ).group_by(WBReview.sentiment).all()
+        sentiment_stats = {name: 0 for name in SENTIMENTS}
+        sentiment_stats.update({name: count for name, count in sentiment_rows})
+
+        topic_row = self.db.query(*(
+            func.sum(case((topic_filter(WBReview.topics, topic), 1), else_=0)).label(topic)
+            for topic in TOPICS
+        )).filter(
+            WBReview.cabinet_id == cabinet_id,
+            WBReview.topics.isnot(None)
+        ).one()
+        topic_stats = {topic: int(count or 0) for topic, count in zip(TOPICS, topic_row) if count}
+        return sentiment_stats, dict(sorted(topic_stats.items(), key=lambda item: -item[1]))
+
     async def _fetch_analytics_from_db(self, cabinet: WBCabinet, period: str) -> Dict[str, Any]:
         """Получение аналитики из БД"""
         try:
@@ -2429,7 +2457,8 @@ class BotAPIService:
         offset: int = 0,
         warehouse: Optional[str] = None,
         size: Optional[str] = None,
-        search: Optional[str] = None
+        search: Optional[str] = None,
+        after: Optional[Tuple[int, int]] = None
     ) -> Dict[str, Any]:
         """Получение отчета по всем остаткам с группировкой по товарам, складам и размерам (с кэшированием)
         
@@ -2440,6 +2469,8 @@ class BotAPIService:
             warehouse: Фильтр по складу (можно несколько через запятую)
             size: Фильтр по размеру (можно несколько через запятую)
             search: Поиск по названию товара или артикулу
+            after: Ключ (total_quantity, nm_id) последнего товара предыдущей страницы
+                (из pagination.next_cursor) - страница начинается после него
         """
         try:
             # Получаем telegram_id из объекта user
@@ -2464,6 +2495,8 @@ class BotAPIService:
                 cache_key_parts.append(f"size:{size}")
             if search:
                 cache_key_parts.append(f"search:{search}")
+            if after is not None:
+                cache_key_parts.append(f"after:{after[0]}:{after[1]}")
             
             cache_key = ":".join(cache_key_parts)
             
@@ -2563,9 +2596,10 @@ class BotAPIService:
                 products_dict[nm_id]["warehouses"][warehouse_name]["total_quantity"] += quantity
                 products_dict[nm_id]["total_quantity"] += quantity
             
-            # Преобразуем в список и сортируем по общему количеству остатков (убывание)
+            # Преобразуем в список и сортируем по общему количеству остатков (убывание),
+            # при равенстве - по nm_id, чтобы порядок страниц не зависел от порядка строк в БД
             products_list = list(products_dict.values())
-            products_list.sort(key=lambda p: p["total_quantity"], reverse=True)
+            products_list.sort(key=lambda p: (-p["total_quantity"], p["nm_id"]))
             
             # Сортируем склады внутри каждого товара по количеству остатков (убывание)
             for product in products_list:
@@ -2581,9 +2615,20 @@ class BotAPIService:
             
             total_products = len(products_list)
             
-            # Применяем пагинацию
-            paginated_products = products_list[offset:offset + limit]
-            has_more = offset + limit < total_products
+            # Применяем пагинацию: по курсору - строго после ключа последнего товара
+            # (товары, появившиеся после синхронизации, не сдвигают страницы), иначе по offset
+            if after is not None:
+                start = bisect.bisect_right(
+                    [(-p["total_quantity"], p["nm_id"]) for p in products_list], (-after[0], after[1])
+                )
+            else:
+                start = offset
+            paginated_products = products_list[start:start + limit]
+            has_more = start + limit < total_products
+            next_cursor = None
+            if has_more and paginated_products:
+                last = paginated_products[-1]
+                next_cursor = encode_cursor(STOCKS_CURSOR_KIND, (last["total_quantity"], last["nm_id"]))
             
             # Получаем список доступных складов и размеров для фильтров
             all_warehouses = set()
@@ -2599,7 +2644,8 @@ class BotAPIService:
                     "limit": limit,
                     "offset": offset,
                     "total": total_products,
-                    "has_more": has_more
+                    "has_more": has_more,
+                    "next_cursor": next_cursor
                 },
                 "filters": {
                     "warehouse": warehouse,
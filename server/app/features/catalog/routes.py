@@ -1,15 +1,16 @@
 """
 API endpoints для работы с каталогом товаров
 """
+import asyncio
+
 from fastapi import APIRouter, Query, HTTPException
 from typing import List, Optional
 
 from app.features.catalog.schemas import Product, Category
-from app.services.sheets_service import sheets_service
+from app.services.sheets_service import get_sheets_service
 import logging
 
 logger = logging.getLogger(__name__)
-logger.info("'app.services.sheets_service.sheets_service' imported and instantiated.")
 
 router = APIRouter(prefix="/catalog", tags=["catalog"])
 
@@ -17,7 +18,7 @@ router = APIRouter(prefix="/catalog", tags=["catalog"])
 @router.get("/categories", response_model=List[Category])
 async def get_categories():
     """Получить список категорий"""
-    categories = sheets_service.get_categories()
+    categories = get_sheets_service().get_categories()
     return categories
 
 
@@ -27,13 +28,13 @@ async def get_products(
 ):
     """Получить список товаров"""
     if category:
-        products = sheets_service.get_products_by_category(category)
+        products = get_sheets_service().get_products_by_category(category)
     else:
         # Возвращаем все товары
         all_products = []
-        categories = sheets_service.get_categories()
+        categories = get_sheets_service().get_categories()
         for cat in categories:
-            products = sheets_service.get_products_by_category(cat['category_id'])
+            products = get_sheets_service().get_products_by_category(cat['category_id'])
             all_products.extend(products)
         return all_products
 
@@ -43,7 +44,7 @@ async def get_products(
 @router.get("/products/{product_id}", response_model=Product)
 async def get_product(product_id: str):
     """Получить информацию о товаре"""
-    product = sheets_service.get_product_by_id(product_id)
+    product = get_sheets_service().get_product_by_id(product_id)
 
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
@@ -53,6 +54,7 @@ async def get_product(product_id: str):
 
 @router.post("/refresh-cache")
 async def refresh_cache():
-    """Очистить кеш Google Sheets"""
-    sheets_service.clear_cache()
+    """Перечитать каталог из Google Sheets (пересобрать снапшот)"""
+    # Полное чтение таблицы синхронное - не в event loop
+    await asyncio.to_thread(get_sheets_service().clear_cache)
     return {"status": "ok", "message": "Cache cleared"}
\ No newline at end of file
@@ -0,0 +1,25 @@
+"""
+Фоновое обновление снапшота каталога из Google Sheets
+"""
+import logging
+from typing import Dict, Any
+
+from app.core.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(bind=True)
+def refresh_catalog_snapshot(self) -> Dict[str, Any]:
+    """
+    Пересобирает снапшот каталога, если ревизия таблицы изменилась.
+    Без изменений стоит одного запроса метаданных в Drive API.
+    """
+    from app.services.sheets_service import get_sheets_service
+
+    try:
+        rebuilt = get_sheets_service().refresh_snapshot()
+        return {"status": "success", "rebuilt": rebuilt}
+    except Exception as e:
+        logger.error(f"Error refreshing catalog snapshot: {e}", exc_info=True)
+        return {"status": "error", "error": str(e)}
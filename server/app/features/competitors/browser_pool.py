@@ -0,0 +1,160 @@
+"""
+Пул прогретых браузеров для скрапинга конкурентов.
+
+Раньше каждая задача скрапинга запускала Xvfb и новый Chrome, а товары
+обходились последовательно одним драйвером. Пул держит несколько запущенных
+Chrome на процесс воркера и переиспользует их между задачами: запуск браузера
+(несколько секунд) оплачивается один раз, а страницы товаров обходятся
+параллельно — по одному драйверу на поток.
+
+WebDriver-сессия не потокобезопасна, поэтому параллелизм обеспечивается
+отдельными экземплярами браузера, а не вкладками одного браузера.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserPoolTimeout(Exception):
+    """Свободный браузер не появился за отведенное время"""
+    pass
+
+
+class BrowserPool:
+    """
+    Ограниченный пул WebDriver-ов.
+
+    - не больше size браузеров одновременно;
+    - браузер перезапускается после max_uses выдач (защита от утечек памяти Chrome);
+    - браузер, простоявший дольше idle_ttl секунд, закрывается при следующем обращении;
+    - браузер, не прошедший сброс после использования, считается сломанным и закрывается.
+    """
+
+    def __init__(
+        self,
+        driver_factory: Callable[[], Any],
+        size: Optional[int] = None,
+        max_uses: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+        use_virtual_display: Optional[bool] = None
+    ):
+        self.driver_factory = driver_factory
+        self.size = size or int(os.getenv("COMPETITOR_BROWSER_POOL_SIZE", "2"))
+        self.max_uses = max_uses or int(os.getenv("COMPETITOR_BROWSER_MAX_USES", "200"))
+        self.idle_ttl = idle_ttl or float(os.getenv("COMPETITOR_BROWSER_IDLE_TTL", "1800"))
+        if use_virtual_display is None:
+            use_virtual_display = os.getenv("COMPETITOR_SCRAPER_XVFB", "false").lower() == "true"
+        self.use_virtual_display = use_virtual_display
+
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        # (driver, количество выдач, время возврата в пул)
+        self._idle: Deque[Tuple[Any, int, float]] = deque()
+        self._display = None
+        self.created = 0
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Выдать браузер на время блока with.
+
+        Raises:
+            BrowserPoolTimeout: если за timeout секунд все браузеры заняты
+        """
+        if not self._slots.acquire(timeout=timeout):
+            raise BrowserPoolTimeout(f"Нет свободного браузера за {timeout} с")
+
+        driver, uses = None, 0
+        try:
+            driver, uses = self._take_idle()
+            if driver is None:
+                driver = self._create_driver()
+            yield driver
+        finally:
+            if driver is not None:
+                self._release(driver, uses + 1)
+            self._slots.release()
+
+    def _take_idle(self) -> Tuple[Optional[Any], int]:
+        now = time.monotonic()
+        expired = []
+        driver, uses = None, 0
+        with self._lock:
+            while self._idle:
+                candidate, candidate_uses, released_at = self._idle.pop()
+                if now - released_at > self.idle_ttl:
+                    expired.append(candidate)
+                    continue
+                driver, uses = candidate, candidate_uses
+                break
+            # Остальные простаивающие тоже могли устареть
+            while self._idle and now - self._idle[0][2] > self.idle_ttl:
+                expired.append(self._idle.popleft()[0])
+        for stale in expired:
+            self._quit(stale, reason="простой дольше idle_ttl")
+        return driver, uses
+
+    def _create_driver(self) -> Any:
+        if self.use_virtual_display:
+            self._ensure_display()
+        started = time.monotonic()
+        driver = self.driver_factory()
+        with self._lock:
+            self.created += 1
+        logger.info(f"🌐 Браузер запущен за {time.monotonic() - started:.1f} с (всего создано: {self.created})")
+        return driver
+
+    def _release(self, driver: Any, uses: int) -> None:
+        if uses >= self.max_uses:
+            self._quit(driver, reason=f"достигнут лимит {self.max_uses} выдач")
+            return
+        try:
+            # Останавливает незавершенную загрузку и проверяет, что сессия жива
+            driver.get("about:blank")
+        except Exception as e:
+            self._quit(driver, reason=f"браузер не отвечает: {e}")
+            return
+        with self._lock:
+            self._idle.append((driver, uses, time.monotonic()))
+
+    def _quit(self, driver: Any, reason: str) -> None:
+        logger.info(f"🔄 Закрываю браузер из пула: {reason}")
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"⚠️ Ошибка при закрытии браузера: {e}")
+
+    def _ensure_display(self) -> None:
+        with self._lock:
+            if self._display is not None:
+                return
+            from pyvirtualdisplay import Display
+            self._display = Display(visible=0, size=(1920, 1080))
+            self._display.start()
+        logger.info("Виртуальный дисплей запущен")
+
+    def close(self) -> None:
+        """Закрыть все простаивающие браузеры и виртуальный дисплей."""
+        with self._lock:
+            drivers = [entry[0] for entry in self._idle]
+            self._idle.clear()
+            display, self._display = self._display, None
+        for driver in drivers:
+            self._quit(driver, reason="закрытие пула")
+        if display is not None:
+            try:
+                display.stop()
+                logger.info("Виртуальный дисплей остановлен")
+            except Exception as e:
+                logger.error(f"Ошибка при остановке дисплея: {e}")
+
+    @property
+    def idle_count(self) -> int:
+        return len(self._idle)
@@ -6,7 +6,11 @@
 import os
 import re
 import time
+import atexit
+import asyncio
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import List, Dict, Any, Optional
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -15,10 +19,22 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from pyvirtualdisplay import Display
+
+from .browser_pool import BrowserPool, BrowserPoolTimeout
+from .wb_card_api import fetch_products_json
 
 logger = logging.getLogger(__name__)
 
+# Таймаут ожидания отдельных (необязательных) элементов страницы товара
+WAIT_TIMEOUT = float(os.getenv("COMPETITOR_SCRAPER_WAIT_TIMEOUT", "10"))
+# Общий бюджет времени на обход страниц товаров одного конкурента
+SCRAPE_TIME_BUDGET = float(os.getenv("COMPETITOR_SCRAPE_TIME_BUDGET", "300"))
+# json - данные товаров из JSON API WB, Selenium только для недобранных; selenium - только Selenium
+SCRAPE_MODE = os.getenv("COMPETITOR_SCRAPE_MODE", "json").lower()
+
+_browser_pool: Optional[BrowserPool] = None
+_browser_pool_lock = threading.Lock()
+
 
 def get_driver(headless: bool = True):
     """
@@ -28,6 +44,9 @@ def get_driver(headless: bool = True):
         headless: Запускать в headless режиме (по умолчанию True для сервера)
     """
     chrome_options = Options()
+    # Не ждем загрузки картинок и сторонних скриптов: нужные элементы
+    # дожидаемся явно через WebDriverWait
+    chrome_options.page_load_strategy = 'eager'
     
     if headless:
         chrome_options.add_argument('--headless=new')
@@ -76,7 +95,9 @@ def get_driver(headless: bool = True):
     
     # Устанавливаем таймаут загрузки страницы
     driver.set_page_load_timeout(60)  # Увеличено с 30 до 60
-    driver.implicitly_wait(10)  # Добавлено неявное ожидание
+    # Неявное ожидание отключено: иначе каждый find_elements по отсутствующему
+    # необязательному элементу (старая цена, рейтинг) блокировал бы страницу на 10 с
+    driver.implicitly_wait(0)
     
     # Скрываем признаки автоматизации
     driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
@@ -90,6 +111,25 @@ def get_driver(headless: bool = True):
     return driver
 
 
+def get_browser_pool() -> BrowserPool:
+    """Пул браузеров текущего процесса (создается при первом обращении)."""
+    global _browser_pool
+    with _browser_pool_lock:
+        if _browser_pool is None:
+            _browser_pool = BrowserPool(driver_factory=lambda: get_driver(headless=True))
+            atexit.register(close_browser_pool)
+        return _browser_pool
+
+
+def close_browser_pool() -> None:
+    """Закрыть браузеры пула процесса, если он создавался."""
+    global _browser_pool
+    with _browser_pool_lock:
+        pool, _browser_pool = _browser_pool, None
+    if pool is not None:
+        pool.close()
+
+
 def get_product_urls(brand_url: str, driver: webdriver.Chrome, count: int = 30) -> List[str]:
     """
     Получает HTML страницы бренда/селлера и находит ссылки на указанное количество товаров.
@@ -115,9 +155,6 @@ def get_product_urls(brand_url: str, driver: webdriver.Chrome, count: int = 30)
             EC.presence_of_element_located((By.XPATH, "//a[contains(@href, '/catalog/')]"))
         )
         
-        # Даем странице время на полную загрузку
-        time.sleep(2)
-        
         # Прокручиваем страницу, чтобы загрузить больше товаров
         last_height = driver.execute_script("return document.body.scrollHeight")
         scroll_attempts = 0
@@ -147,9 +184,8 @@ def get_product_urls(brand_url: str, driver: webdriver.Chrome, count: int = 30)
                 break
             
             driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(1)  # Даем время на подгрузку контента
             
-            # Ждем, пока высота страницы не увеличится
+            # Ждем, пока высота страницы не увеличится (подгрузка следующей порции)
             try:
                 WebDriverWait(driver, 5).until(
                     lambda d: d.execute_script("return document.body.scrollHeight") > last_height
@@ -199,14 +235,17 @@ def scrape_product_data(product_url: str, driver: webdriver.Chrome) -> Optional[
             EC.presence_of_element_located((By.XPATH, "//h1[contains(@class, 'product-page__title')] | //h3[contains(@class, 'productTitle')]"))
         )
         
-        # КРИТИЧЕСКИ ВАЖНО: даем время на загрузку всего динамического контента
-        time.sleep(3)
+        # Цена подгружается отдельным запросом после заголовка - ждем ее появления
+        try:
+            WebDriverWait(driver, WAIT_TIMEOUT).until(
+                EC.presence_of_element_located((By.XPATH, "//ins[contains(@class, 'priceBlockFinalPrice')] | //span[@class='price-block__final-price']"))
+            )
+        except TimeoutException:
+            logger.warning(f"Timeout при ожидании цены для {product_url}")
         
-        # Прокручиваем страницу вниз и вверх для триггера ленивой загрузки
+        # Прокрутка вниз запускает ленивую загрузку хлебных крошек и описания;
+        # сами элементы дожидаемся ниже явными ожиданиями
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(1)
-        driver.execute_script("window.scrollTo(0, 0);")
-        time.sleep(1)
         
         name, current_price, original_price, brand, category, rating, description = None, None, None, None, None, None, None
         
@@ -256,7 +295,7 @@ def scrape_product_data(product_url: str, driver: webdriver.Chrome) -> Optional[
         # Бренд из хлебных крошек
         try:
             # Ждем загрузки хлебных крошек
-            WebDriverWait(driver, 10).until(
+            WebDriverWait(driver, WAIT_TIMEOUT).until(
                 EC.presence_of_element_located((By.XPATH, "//div[contains(@class, 'breadcrumbs')]//span[@itemprop='name']"))
             )
             
@@ -280,7 +319,7 @@ def scrape_product_data(product_url: str, driver: webdriver.Chrome) -> Optional[
         # Категория
         try:
             # Ждем загрузки категории
-            WebDriverWait(driver, 10).until(
+            WebDriverWait(driver, WAIT_TIMEOUT).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, "span.categoryLinkCategory--VSJ8c"))
             )
             
@@ -317,17 +356,16 @@ def scrape_product_data(product_url: str, driver: webdriver.Chrome) -> Optional[
         # Описание
         try:
             # Ждем появления кнопки "Подробнее"
-            button = WebDriverWait(driver, 10).until(
+            button = WebDriverWait(driver, WAIT_TIMEOUT).until(
                 EC.element_to_be_clickable((By.CSS_SELECTOR, "button.btnDetail--im7UR"))
             )
             driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", button)
-            time.sleep(1)  # Даем время на прокрутку
             
-            # Кликаем через JavaScript для надежности
+            # Кликаем через JavaScript для надежности (прокрутка для клика не нужна)
             driver.execute_script("arguments[0].click();", button)
             
             # Ждем появления описания
-            description_element = WebDriverWait(driver, 10).until(
+            description_element = WebDriverWait(driver, WAIT_TIMEOUT).until(
                 EC.presence_of_element_located(
                     (By.XPATH, "//h3[text()='Описание']/following-sibling::p[contains(@class, 'descriptionText--Jq9n2')]")
                 )
@@ -363,7 +401,105 @@ def scrape_product_data(product_url: str, driver: webdriver.Chrome) -> Optional[
         return None
 
 
-def scrape_competitor(competitor_url: str, max_products: int = 30) -> Dict[str, Any]:
+def _scrape_product_with_pool(product_url: str, pool: BrowserPool, deadline: float) -> Optional[Dict[str, Any]]:
+    """Собрать один товар на браузере из пула, если бюджет времени еще не исчерпан."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        logger.warning(f"Бюджет времени исчерпан, товар пропущен: {product_url}")
+        return None
+    try:
+        with pool.acquire(timeout=remaining) as driver:
+            return scrape_product_data(product_url, driver)
+    except BrowserPoolTimeout:
+        logger.warning(f"Бюджет времени исчерпан в ожидании браузера, товар пропущен: {product_url}")
+        return None
+
+
+def scrape_products_concurrently(
+    product_urls: List[str],
+    pool: BrowserPool,
+    time_budget: Optional[float] = None
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Параллельный сбор данных по товарам: не больше pool.size страниц одновременно.
+    
+    Args:
+        product_urls: URL товаров
+        pool: Пул браузеров
+        time_budget: Бюджет времени в секундах (по умолчанию COMPETITOR_SCRAPE_TIME_BUDGET)
+        
+    Returns:
+        Результаты в порядке product_urls; None для ошибок и товаров, не
+        успевших начаться до окончания бюджета
+    """
+    budget = time_budget if time_budget is not None else SCRAPE_TIME_BUDGET
+    deadline = time.monotonic() + budget
+    results: List[Optional[Dict[str, Any]]] = [None] * len(product_urls)
+    
+    with ThreadPoolExecutor(max_workers=pool.size, thread_name_prefix="competitor-scraper") as executor:
+        futures = {
+            executor.submit(_scrape_product_with_pool, url, pool, deadline): index
+            for index, url in enumerate(product_urls)
+        }
+        done, not_done = wait(futures, timeout=budget)
+        for future in not_done:
+            future.cancel()
+        if not_done:
+            logger.warning(f"Бюджет {budget:.0f} с исчерпан: не завершено {len(not_done)} из {len(product_urls)} товаров")
+    
+    # Уже запущенные страницы дорабатывают при выходе из executor
+    for future, index in futures.items():
+        if future.cancelled():
+            continue
+        try:
+            results[index] = future.result()
+        except Exception as e:
+            logger.error(f"Ошибка при сборе товара {product_urls[index]}: {e}")
+    return results
+
+
+def has_essential_data(product_data: Optional[Dict[str, Any]]) -> bool:
+    """Заполнены ли основные поля товара."""
+    return bool(product_data) and all([
+        product_data.get('nm_id'),
+        product_data.get('name'),
+        product_data.get('current_price')
+    ])
+
+
+def scrape_products(
+    product_urls: List[str],
+    pool: BrowserPool,
+    mode: Optional[str] = None
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Сбор данных по товарам: сначала JSON API (режим json), затем Selenium
+    для товаров, по которым JSON недоступен или неполон.
+    
+    Returns:
+        Результаты в порядке product_urls
+    """
+    mode = mode or SCRAPE_MODE
+    results: List[Optional[Dict[str, Any]]] = [None] * len(product_urls)
+    
+    if mode == "json":
+        try:
+            json_products = asyncio.run(fetch_products_json(product_urls))
+            results = [json_products.get(url) for url in product_urls]
+        except Exception as e:
+            logger.warning(f"JSON API WB недоступен, переходим на Selenium: {e}")
+    
+    fallback_indexes = [i for i, product_data in enumerate(results) if not has_essential_data(product_data)]
+    if fallback_indexes:
+        if mode == "json":
+            logger.info(f"Selenium-добор для {len(fallback_indexes)} из {len(product_urls)} товаров")
+        fallback_results = scrape_products_concurrently([product_urls[i] for i in fallback_indexes], pool)
+        for index, product_data in zip(fallback_indexes, fallback_results):
+            results[index] = product_data
+    return results
+
+
+def scrape_competitor(competitor_url: str, max_products: int = 30, pool: Optional[BrowserPool] = None) -> Dict[str, Any]:
     """
     Основная функция скрапинга конкурента.
     Собирает данные о товарах конкурента и возвращает структурированные данные.
@@ -371,6 +507,7 @@ def scrape_competitor(competitor_url: str, max_products: int = 30) -> Dict[str,
     Args:
         competitor_url: URL страницы бренда или селлера
         max_products: Максимальное количество товаров для сбора
+        pool: Пул браузеров (по умолчанию общий пул процесса)
         
     Returns:
         Словарь с данными:
@@ -381,8 +518,7 @@ def scrape_competitor(competitor_url: str, max_products: int = 30) -> Dict[str,
             "error_count": int       # Количество ошибок
         }
     """
-    driver = None
-    display = None
+    pool = pool or get_browser_pool()
     result = {
         "competitor_name": None,
         "products": [],
@@ -391,41 +527,24 @@ def scrape_competitor(competitor_url: str, max_products: int = 30) -> Dict[str,
     }
     
     try:
+        started = time.monotonic()
         logger.info(f"Начало скрапинга конкурента: {competitor_url}")
         
-        # Запускаем виртуальный дисплей для headless режима
-        display = Display(visible=0, size=(1920, 1080))
-        display.start()
-        logger.info("Виртуальный дисплей запущен")
-        
-        # Запускаем драйвер в headless режиме
-        driver = get_driver(headless=True)
-        logger.info("WebDriver инициализирован")
-        
         # Получаем список URL товаров
-        product_urls = get_product_urls(competitor_url, driver, count=max_products)
+        with pool.acquire(timeout=SCRAPE_TIME_BUDGET) as driver:
+            product_urls = get_product_urls(competitor_url, driver, count=max_products)
         
         if not product_urls:
             logger.error(f"Не удалось найти товары на странице: {competitor_url}")
             return result
         
-        logger.info(f"Начинаю сбор данных для {len(product_urls)} товаров...")
+        logger.info(f"Начинаю сбор данных для {len(product_urls)} товаров (режим: {SCRAPE_MODE})...")
         
-        # Собираем данные по каждому товару
         competitor_name = None
-        for i, product_url in enumerate(product_urls):
-            logger.info(f"Обработка товара {i+1}/{len(product_urls)}")
-            product_data = scrape_product_data(product_url, driver)
-            
+        for product_data in scrape_products(product_urls, pool):
             if product_data:
                 # Проверяем что хотя бы основные поля заполнены
-                has_essential_data = all([
-                    product_data.get('nm_id'),
-                    product_data.get('name'),
-                    product_data.get('current_price')
-                ])
-                
-                if has_essential_data:
+                if has_essential_data(product_data):
                     # Извлекаем название конкурента из первого товара
                     if not competitor_name and product_data.get('brand'):
                         competitor_name = product_data.get('brand')
@@ -442,25 +561,13 @@ def scrape_competitor(competitor_url: str, max_products: int = 30) -> Dict[str,
                 logger.warning(f"✗ Не удалось собрать данные для товара")
         
         result["competitor_name"] = competitor_name
-        logger.info(f"Скрапинг завершен: успешно {result['success_count']}, ошибок {result['error_count']}")
+        logger.info(
+            f"Скрапинг завершен за {time.monotonic() - started:.1f} с: "
+            f"успешно {result['success_count']}, ошибок {result['error_count']}"
+        )
         
         return result
         
     except Exception as e:
         logger.error(f"Критическая ошибка при скрапинге конкурента {competitor_url}: {e}", exc_info=True)
         return result
-        
-    finally:
-        if driver:
-            try:
-                driver.quit()
-                logger.info("Браузер закрыт")
-            except Exception as e:
-                logger.error(f"Ошибка при закрытии браузера: {e}")
-        
-        if display:
-            try:
-                display.stop()
-                logger.info("Виртуальный дисплей остановлен")
-            except Exception as e:
-                logger.error(f"Ошибка при остановке дисплея: {e}")
\ No newline at end of file
@@ -7,6 +7,7 @@ import logging
 from typing import Dict, Any
 from datetime import datetime
 from celery import current_task
+from celery.signals import worker_process_shutdown
 from sqlalchemy.orm import Session
 
 from ...core.database import get_db
@@ -14,12 +15,18 @@ from ...core.celery_app import celery_app
 from .models import CompetitorLink, CompetitorProduct, CompetitorSemanticCore
 from ..wb_api.models import CabinetUser
 from .crud import CompetitorLinkCRUD, CompetitorProductCRUD, CompetitorSemanticCoreCRUD
-from .scraper import scrape_competitor
+from .scraper import scrape_competitor, close_browser_pool
 import requests # New import for making HTTP requests
 
 logger = logging.getLogger(__name__)
 
 
+@worker_process_shutdown.connect
+def _close_browser_pool_on_shutdown(**kwargs):
+    """Дочерние процессы prefork завершаются без atexit - закрываем Chrome явно."""
+    close_browser_pool()
+
+
 def send_semantic_core_completion_notification(semantic_core_id: int, status: str, competitor_name: str, category_name: str, error_message: str = None):
     """Отправляет уведомление о завершении генерации семантического ядра."""
     from ...features.user.crud import UserCRUD
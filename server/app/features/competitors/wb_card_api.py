@@ -0,0 +1,219 @@
+"""
+Сбор данных о товарах конкурентов через публичные JSON-эндпоинты Wildberries.
+
+Карточка товара на сайте сама собирается из двух JSON-ответов:
+- card.wb.ru/cards/.../detail - название, бренд, цены, рейтинг (пачкой до сотни nm_id);
+- basket-NN.wbbasket.ru/.../info/ru/card.json - описание и предмет (категория).
+
+Читать их напрямую в разы дешевле, чем рендерить страницу в Chrome.
+Товары, для которых JSON недоступен или неполон, scraper.py добирает
+через Selenium.
+"""
+
+import os
+import re
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+CARD_DETAIL_URL = os.getenv("WB_CARD_DETAIL_URL", "https://card.wb.ru/cards/v4/detail")
+CARD_DETAIL_PARAMS = {
+    "appType": "1",
+    "curr": "rub",
+    "dest": "-1257786",
+    "spp": "30",
+    "lang": "ru",
+}
+BATCH_SIZE = int(os.getenv("COMPETITOR_JSON_BATCH_SIZE", "50"))
+CONCURRENCY = int(os.getenv("COMPETITOR_JSON_CONCURRENCY", "10"))
+REQUEST_TIMEOUT = float(os.getenv("COMPETITOR_JSON_TIMEOUT", "15"))
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# Верхние границы vol (nm_id // 100000) для хостов basket-01 ... basket-25
+_BASKET_VOL_BOUNDS = [
+    143, 287, 431, 719, 1007, 1061, 1115, 1169, 1313, 1601, 1655, 1919, 2045,
+    2189, 2405, 2621, 2837, 3053, 3269, 3485, 3701, 3917, 4133, 4349, 4565,
+]
+
+
+def extract_nm_id(product_url: str) -> Optional[int]:
+    """nm_id из URL вида /catalog/<nm_id>/..."""
+    match = re.search(r'/catalog/(\d+)', product_url)
+    return int(match.group(1)) if match else None
+
+
+def basket_host(nm_id: int) -> str:
+    """Хост статики карточки для nm_id (шардирование WB по vol)."""
+    vol = nm_id // 100000
+    for index, bound in enumerate(_BASKET_VOL_BOUNDS, start=1):
+        if vol <= bound:
+            return f"basket-{index:02d}.wbbasket.ru"
+    return f"basket-{len(_BASKET_VOL_BOUNDS) + 1:02d}.wbbasket.ru"
+
+
+def card_info_url(nm_id: int) -> str:
+    vol = nm_id // 100000
+    part = nm_id // 1000
+    return f"https://{basket_host(nm_id)}/vol{vol}/part{part}/{nm_id}/info/ru/card.json"
+
+
+def _kopecks_to_rub(value: Any) -> Optional[float]:
+    if value in (None, 0):
+        return None
+    return float(value) / 100
+
+
+def parse_card_detail(payload: Dict[str, Any]) -> Dict[int, Dict[str, Any]]:
+    """
+    Разбор ответа cards/detail (v4: products на верхнем уровне, v1/v2: data.products).
+
+    Цены берутся из sizes[].price (v2+) или salePriceU/priceU (v1), в копейках.
+
+    Returns:
+        {nm_id: {name, brand, current_price, original_price, rating, category}}
+    """
+    products = payload.get("products")
+    if products is None:
+        products = (payload.get("data") or {}).get("products") or []
+
+    parsed = {}
+    for product in products:
+        nm_id = product.get("id")
+        if not nm_id:
+            continue
+
+        current_price, original_price = None, None
+        for size in product.get("sizes") or []:
+            price = size.get("price") or {}
+            if price.get("product"):
+                current_price = _kopecks_to_rub(price.get("product"))
+                original_price = _kopecks_to_rub(price.get("basic"))
+                break
+        if current_price is None:
+            current_price = _kopecks_to_rub(product.get("salePriceU"))
+            original_price = _kopecks_to_rub(product.get("priceU"))
+        # Как и на странице: старая цена только если есть скидка
+        if original_price is not None and current_price is not None and original_price <= current_price:
+            original_price = None
+
+        rating = product.get("reviewRating")
+        if rating is None:
+            rating = product.get("rating")
+
+        parsed[int(nm_id)] = {
+            "name": product.get("name") or None,
+            "brand": product.get("brand") or None,
+            "current_price": current_price,
+            "original_price": original_price,
+            "rating": float(rating) if rating else None,
+            "category": product.get("entity") or None,
+        }
+    return parsed
+
+
+def parse_card_info(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Разбор info/ru/card.json.
+
+    Returns:
+        {name, brand, category, description}
+    """
+    selling = payload.get("selling") or {}
+    return {
+        "name": payload.get("imt_name") or None,
+        "brand": selling.get("brand_name") or None,
+        "category": payload.get("subj_name") or None,
+        "description": (payload.get("description") or "").strip() or None,
+    }
+
+
+def build_product(
+    product_url: str,
+    nm_id: int,
+    detail: Optional[Dict[str, Any]],
+    info: Optional[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """Товар в формате scraper.scrape_product_data или None, если данных нет совсем."""
+    if not detail and not info:
+        return None
+    detail = detail or {}
+    info = info or {}
+    return {
+        "product_url": product_url,
+        "nm_id": str(nm_id),
+        "name": detail.get("name") or info.get("name"),
+        "current_price": detail.get("current_price"),
+        "original_price": detail.get("original_price"),
+        "brand": detail.get("brand") or info.get("brand"),
+        # subj_name совпадает с категорией на странице ("Платья"), entity - нет ("платье")
+        "category": info.get("category") or detail.get("category"),
+        "rating": detail.get("rating"),
+        "description": info.get("description"),
+    }
+
+
+def _batches(items: List[int], size: int) -> Iterable[List[int]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def _get_json(session: aiohttp.ClientSession, url: str, params: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
+    try:
+        async with session.get(url, params=params) as response:
+            if response.status != 200:
+                logger.warning(f"WB JSON {url}: HTTP {response.status}")
+                return None
+            return await response.json(content_type=None)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        logger.warning(f"WB JSON {url}: {e}")
+        return None
+
+
+async def fetch_products_json(product_urls: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Данные товаров из JSON API.
+
+    Returns:
+        {product_url: товар или None}; None - JSON недоступен, нужен Selenium
+    """
+    nm_ids_by_url = {url: extract_nm_id(url) for url in product_urls}
+    nm_ids = sorted({nm_id for nm_id in nm_ids_by_url.values() if nm_id})
+
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=CONCURRENCY)
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector, headers={"User-Agent": USER_AGENT}) as session:
+
+        async def fetch_details(batch: List[int]) -> Dict[int, Dict[str, Any]]:
+            params = dict(CARD_DETAIL_PARAMS, nm=";".join(str(nm_id) for nm_id in batch))
+            async with semaphore:
+                payload = await _get_json(session, CARD_DETAIL_URL, params)
+            return parse_card_detail(payload) if payload else {}
+
+        async def fetch_info(nm_id: int) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                payload = await _get_json(session, card_info_url(nm_id))
+            return parse_card_info(payload) if payload else None
+
+        detail_results, info_results = await asyncio.gather(
+            asyncio.gather(*(fetch_details(batch) for batch in _batches(nm_ids, BATCH_SIZE))),
+            asyncio.gather(*(fetch_info(nm_id) for nm_id in nm_ids)),
+        )
+
+    details: Dict[int, Dict[str, Any]] = {}
+    for batch_details in detail_results:
+        details.update(batch_details)
+    infos = dict(zip(nm_ids, info_results))
+
+    products = {}
+    for url, nm_id in nm_ids_by_url.items():
+        products[url] = build_product(url, nm_id, details.get(nm_id), infos.get(nm_id)) if nm_id else None
+
+    found = sum(1 for product in products.values() if product)
+    logger.info(f"📦 WB JSON: получено {found}/{len(product_urls)} товаров ({len(details)} из cards/detail)")
+    return products
@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_
 
 from .models import ChannelReport, DigestHistory
+from .schedule import reschedule
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +39,13 @@ class ChannelReportCRUD:
         """Получить все активные каналы"""
         return db.query(ChannelReport).filter(ChannelReport.is_active == True).all()
     
+    @staticmethod
+    def get_by_ids(db: Session, channel_ids: List[int]) -> List[ChannelReport]:
+        """Получить каналы по списку ID"""
+        if not channel_ids:
+            return []
+        return db.query(ChannelReport).filter(ChannelReport.id.in_(channel_ids)).all()
+    
     @staticmethod
     def get_active_by_time(db: Session, report_time: dt_time) -> List[ChannelReport]:
         """Получить все активные каналы для заданного времени"""
@@ -70,6 +78,7 @@ class ChannelReportCRUD:
             timezone=timezone,
             is_active=True
         )
+        reschedule(channel)
         db.add(channel)
         db.commit()
         db.refresh(channel)
@@ -86,6 +95,9 @@ class ChannelReportCRUD:
             if hasattr(channel, key) and value is not None:
                 setattr(channel, key, value)
         
+        if {"report_time", "timezone", "is_active"} & {k for k, v in kwargs.items() if v is not None}:
+            reschedule(channel)
+        
         db.commit()
         db.refresh(channel)
         return channel
@@ -20,12 +20,14 @@ class ChannelReport(Base):
     timezone = Column(String(50), nullable=False, default="Europe/Moscow")
     is_active = Column(Boolean, nullable=False, default=True)
     last_sent_at = Column(DateTime(timezone=True), nullable=True)
+    next_digest_at = Column(DateTime, nullable=True)  # Следующая отправка (UTC), см. schedule.py
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Индексы
     __table_args__ = (
-        Index('idx_active_time', 'is_active', 'report_time'),  # Для планировщика
+        Index('idx_active_time', 'is_active', 'report_time'),
+        Index('idx_active_next_digest', 'is_active', 'next_digest_at'),  # Для планировщика
         Index('idx_chat_cabinet', 'chat_id', 'cabinet_id', unique=True),  # Уникальность
     )
     
@@ -0,0 +1,150 @@
+"""
+Расписание ежедневных сводок: следующее время отправки в UTC.
+
+Раньше check_digest_schedule каждую минуту загружал все активные каналы и
+переводил текущее время в timezone каждого канала. Теперь для канала хранится
+next_digest_at - ближайший момент отправки в UTC (индекс is_active +
+next_digest_at), и тик планировщика читает только каналы, срок которых наступил.
+
+Почему момент времени, а не UTC минута суток: смещение timezone меняется при
+переходе на летнее/зимнее время, а локального времени в день перехода может не
+быть (02:30 при переводе вперед) или оно бывает дважды (при переводе назад).
+Момент следующей отправки вычисляется по правилам timezone на дату отправки:
+    - несуществующее время сдвигается вперед на величину перевода;
+    - повторяющееся время берется по первому наступлению;
+    - сводка уходит ровно один раз за локальные сутки.
+"""
+
+import os
+import logging
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import List, Optional
+
+import pytz
+from sqlalchemy.orm import Session
+
+from .models import ChannelReport
+
+logger = logging.getLogger(__name__)
+
+DIGEST_CLAIM_LIMIT = int(os.getenv("DIGEST_CLAIM_LIMIT", "5000"))
+DIGEST_BACKFILL_LIMIT = int(os.getenv("DIGEST_BACKFILL_LIMIT", "1000"))
+# Если планировщик простаивал дольше, пропущенную сводку не догоняем
+DIGEST_MISSED_GRACE_MINUTES = int(os.getenv("DIGEST_MISSED_GRACE_MINUTES", "60"))
+
+
+def occurrence_utc(report_time: dt_time, tz: pytz.BaseTzInfo, day: date) -> datetime:
+    """Момент report_time в локальную дату day (naive UTC)"""
+    naive = datetime.combine(day, report_time.replace(second=0, microsecond=0))
+    try:
+        local = tz.localize(naive, is_dst=None)
+    except pytz.NonExistentTimeError:
+        # 02:30 при переводе вперед: по старому смещению = 03:30 по новому
+        local = tz.localize(naive, is_dst=False)
+    except pytz.AmbiguousTimeError:
+        # 02:30 при переводе назад: первое наступление (еще летнее время)
+        local = tz.localize(naive, is_dst=True)
+    return local.astimezone(pytz.UTC).replace(tzinfo=None)
+
+
+def next_digest_at(report_time: dt_time, timezone: str, after: datetime) -> datetime:
+    """
+    Ближайший момент отправки строго после after
+
+    Args:
+        report_time: Локальное время отправки
+        timezone: Timezone канала (IANA)
+        after: Текущий момент (naive UTC)
+
+    Returns:
+        Момент отправки (naive UTC)
+    """
+    tz = pytz.timezone(timezone)
+    local_day = pytz.UTC.localize(after).astimezone(tz).date()
+    for offset in (-1, 0, 1, 2):
+        candidate = occurrence_utc(report_time, tz, local_day + timedelta(days=offset))
+        if candidate > after:
+            return candidate
+    raise ValueError(f"No digest occurrence after {after} for {timezone}")
+
+
+def safe_next_digest_at(report_time: dt_time, timezone: str, after: datetime) -> datetime:
+    """next_digest_at, а при неизвестном timezone - повторная проверка через сутки"""
+    try:
+        return next_digest_at(report_time, timezone, after)
+    except pytz.UnknownTimeZoneError:
+        logger.error(f"❌ Unknown digest timezone {timezone!r}, retrying in 24h")
+        return after + timedelta(days=1)
+
+
+def backfill_next_digest_at(db: Session, now: datetime, limit: int = DIGEST_BACKFILL_LIMIT) -> int:
+    """Заполняет next_digest_at для активных каналов без расписания (после миграции)"""
+    rows = (
+        db.query(ChannelReport.id, ChannelReport.report_time, ChannelReport.timezone)
+        .filter(ChannelReport.is_active == True, ChannelReport.next_digest_at.is_(None))
+        .limit(limit)
+        .all()
+    )
+    if not rows:
+        return 0
+    db.bulk_update_mappings(ChannelReport, [
+        {"id": row.id, "next_digest_at": safe_next_digest_at(row.report_time, row.timezone, now)}
+        for row in rows
+    ])
+    db.commit()
+    logger.info(f"🗓️ Backfilled next_digest_at for {len(rows)} channels")
+    return len(rows)
+
+
+def claim_due_channels(db: Session, now: datetime, limit: int = DIGEST_CLAIM_LIMIT) -> List[int]:
+    """
+    Каналы, срок отправки которых наступил, с переносом next_digest_at на следующие сутки
+
+    Перенос выполняется условным UPDATE (next_digest_at не изменился с момента
+    чтения) - если тик запущен дважды, канал достанется только одному.
+
+    Returns:
+        ID каналов для отправки (просроченные больше чем на
+        DIGEST_MISSED_GRACE_MINUTES только переносятся)
+    """
+    rows = (
+        db.query(
+            ChannelReport.id,
+            ChannelReport.report_time,
+            ChannelReport.timezone,
+            ChannelReport.next_digest_at,
+        )
+        .filter(ChannelReport.is_active == True, ChannelReport.next_digest_at <= now)
+        .order_by(ChannelReport.next_digest_at)
+        .limit(limit)
+        .all()
+    )
+    grace = timedelta(minutes=DIGEST_MISSED_GRACE_MINUTES)
+    claimed = []
+    for row in rows:
+        updated = (
+            db.query(ChannelReport)
+            .filter(ChannelReport.id == row.id, ChannelReport.next_digest_at == row.next_digest_at)
+            .update(
+                {"next_digest_at": safe_next_digest_at(row.report_time, row.timezone, now)},
+                synchronize_session=False,
+            )
+        )
+        if not updated:
+            continue
+        if now - row.next_digest_at > grace:
+            logger.warning(f"⚠️ Skipping missed digest for channel {row.id} (due {row.next_digest_at})")
+            continue
+        claimed.append(row.id)
+    db.commit()
+    return claimed
+
+
+def reschedule(channel: ChannelReport, now: Optional[datetime] = None) -> None:
+    """Пересчитать next_digest_at после изменения времени, timezone или активности"""
+    if not channel.is_active:
+        channel.next_digest_at = None
+        return
+    channel.next_digest_at = safe_next_digest_at(
+        channel.report_time, channel.timezone, now or datetime.utcnow()
+    )
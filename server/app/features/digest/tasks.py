@@ -3,8 +3,8 @@ Celery задачи для отправки сводок в каналы
 """
 import os
 import logging
-from datetime import datetime, timedelta
-from typing import List
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
 
 import aiohttp
 import asyncio
@@ -13,11 +13,16 @@ import pytz
 from app.core.celery_app import celery_app
 from app.core.database import SessionLocal
 from .crud import ChannelReportCRUD, DigestHistoryCRUD
+from .models import ChannelReport
+from .schedule import backfill_next_digest_at, claim_due_channels
 from .service import DigestService
 from .formatter import DigestFormatter
 
 logger = logging.getLogger(__name__)
 
+DIGEST_BATCH_SIZE = int(os.getenv("DIGEST_BATCH_SIZE", "50"))
+DIGEST_SEND_CONCURRENCY = int(os.getenv("DIGEST_SEND_CONCURRENCY", "10"))
+
 
 def get_bot_token() -> str:
     """Получить токен бота из переменных окружения"""
@@ -27,10 +32,23 @@ def get_bot_token() -> str:
     return token
 
 
-async def send_telegram_message(bot_token: str, chat_id: int, text: str) -> dict:
+async def _post_message(session: aiohttp.ClientSession, url: str, data: dict) -> dict:
+    async with session.post(url, json=data, timeout=aiohttp.ClientTimeout(total=10)) as resp:
+        return await resp.json()
+
+
+async def send_telegram_message(
+    bot_token: str,
+    chat_id: int,
+    text: str,
+    session: Optional[aiohttp.ClientSession] = None
+) -> dict:
     """
     Отправить сообщение через Telegram Bot API
     
+    Args:
+        session: Общая сессия (пул соединений); если не передана - создается своя
+    
     Returns:
         dict с результатом отправки
     """
@@ -42,78 +60,189 @@ async def send_telegram_message(bot_token: str, chat_id: int, text: str) -> dict
     }
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=data, timeout=aiohttp.ClientTimeout(total=10)) as resp:
-                result = await resp.json()
-                return result
+        if session is None:
+            async with aiohttp.ClientSession() as own_session:
+                return await _post_message(own_session, url, data)
+        return await _post_message(session, url, data)
     except Exception as e:
         logger.error(f"Error sending telegram message: {e}")
         return {"ok": False, "description": str(e)}
 
 
+async def send_telegram_messages(
+    bot_token: str,
+    messages: List[Tuple[int, str]],
+    concurrency: int = DIGEST_SEND_CONCURRENCY
+) -> List[dict]:
+    """
+    Отправить пачку сообщений через одну сессию с ограничением параллельности
+    
+    Args:
+        messages: Список (chat_id, text)
+        concurrency: Максимум одновременных запросов к Bot API
+    
+    Returns:
+        Результаты в порядке messages
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def send_one(chat_id: int, text: str) -> dict:
+            async with semaphore:
+                return await send_telegram_message(bot_token, chat_id, text, session=session)
+        
+        return await asyncio.gather(*(send_one(chat_id, text) for chat_id, text in messages))
+
+
+def _prepare_digest(db, channel: ChannelReport) -> Tuple[date, str]:
+    """Собрать текст сводки для канала. Возвращает (дата сводки, текст)"""
+    service = DigestService(db)
+    # Используем сегодняшнюю дату в timezone канала (дата отправки уведомления)
+    channel_tz = pytz.timezone(channel.timezone)
+    current_local = datetime.now(pytz.UTC).astimezone(channel_tz)
+    target_date = current_local.date()
+    
+    # Определяем временной диапазон последних 24 часов
+    end_datetime = current_local
+    start_datetime = end_datetime - timedelta(hours=24)
+    
+    logger.info(f"Using target_date: {target_date} for channel {channel.id} (current local time: {current_local.strftime('%Y-%m-%d %H:%M')})")
+    data = service.get_daily_digest(channel.cabinet_id, target_date, start_datetime, end_datetime)
+    
+    # Форматируем текст с учетом timezone канала
+    return target_date, DigestFormatter.format_daily_digest(data, channel.timezone)
+
+
+def _save_send_result(db, channel: ChannelReport, target_date: date, result: dict) -> Optional[str]:
+    """Записать результат отправки в историю. Возвращает текст ошибки или None"""
+    if result.get("ok"):
+        message_id = result.get("result", {}).get("message_id")
+        DigestHistoryCRUD.create(
+            db=db,
+            channel_report_id=channel.id,
+            cabinet_id=channel.cabinet_id,
+            chat_id=channel.chat_id,
+            digest_date=target_date,
+            status="sent",
+            message_id=message_id
+        )
+        # Обновляем время последней отправки
+        ChannelReportCRUD.update_last_sent(db, channel.id, datetime.utcnow())
+        logger.info(f"Successfully sent digest to channel {channel.id}")
+        return None
+    
+    error_msg = result.get("description", "Unknown error")
+    logger.error(f"Failed to send digest to channel {channel.id}: {error_msg}")
+    DigestHistoryCRUD.create(
+        db=db,
+        channel_report_id=channel.id,
+        cabinet_id=channel.cabinet_id,
+        chat_id=channel.chat_id,
+        digest_date=target_date,
+        status="failed",
+        error_message=error_msg
+    )
+    return error_msg
+
+
+def _is_retryable(error_msg: str) -> bool:
+    return "bot was blocked by the user" not in error_msg.lower()
+
+
 @celery_app.task(bind=True)
 def check_digest_schedule(self):
     """
     Задача выполняется каждую минуту.
-    Проверяет, есть ли каналы для отправки сводки в текущую минуту.
-    Учитывает timezone каждого канала.
+    Забирает каналы, у которых наступил next_digest_at (индекс is_active +
+    next_digest_at), переносит их расписание на следующие сутки и ставит
+    отправку пачками по DIGEST_BATCH_SIZE.
     """
     try:
         db = SessionLocal()
         
         try:
-            # Получаем текущее UTC время (timezone-aware)
-            utc_tz = pytz.UTC
-            current_utc = datetime.now(utc_tz)
-            
-            # Получаем все активные каналы
-            all_channels = ChannelReportCRUD.get_all_active(db)
-            
-            # Фильтруем каналы по времени с учетом их timezone
-            channels_to_process = []
-            for channel in all_channels:
-                try:
-                    # Конвертируем текущее UTC время в timezone канала
-                    channel_tz = pytz.timezone(channel.timezone)
-                    current_local = current_utc.astimezone(channel_tz)
-                    current_local_time = current_local.time().replace(second=0, microsecond=0)
-                    
-                    # Сравниваем с report_time канала
-                    if current_local_time == channel.report_time:
-                        channels_to_process.append(channel)
-                        logger.info(
-                            f"Channel {channel.id} matched: local time {current_local_time} "
-                            f"({channel.timezone}) == scheduled {channel.report_time}"
-                        )
-                except Exception as e:
-                    logger.error(f"Error checking channel {channel.id} timezone: {e}")
-                    continue
-            
-            channels = channels_to_process
-            
-            logger.info(
-                f"Found {len(channels)} channels to process. "
-                f"Current UTC: {current_utc.strftime('%H:%M')}, checked {len(all_channels)} active channels"
-            )
-            
-            # Отправляем задачи на отправку сводок
-            for channel in channels:
-                try:
-                    send_digest_to_channel.delay(channel.id)
-                    logger.info(f"Scheduled digest for channel {channel.id} ({channel.chat_title})")
-                except Exception as e:
-                    logger.error(f"Error scheduling digest for channel {channel.id}: {e}")
-            
+            now = datetime.utcnow()
+            backfill_next_digest_at(db, now)
+            channel_ids = claim_due_channels(db, now)
         finally:
             db.close()
         
-        return {"status": "success", "channels_scheduled": len(channels)}
+        logger.info(
+            f"Found {len(channel_ids)} channels to process. "
+            f"Current UTC: {now.strftime('%H:%M')}"
+        )
+        
+        # Отправляем задачи на отправку сводок
+        for start in range(0, len(channel_ids), DIGEST_BATCH_SIZE):
+            batch = channel_ids[start:start + DIGEST_BATCH_SIZE]
+            try:
+                send_digest_batch.delay(batch)
+            except Exception as e:
+                logger.error(f"Error scheduling digest batch {batch}: {e}")
+        
+        return {"status": "success", "channels_scheduled": len(channel_ids)}
         
     except Exception as e:
         logger.error(f"Error in check_digest_schedule: {e}")
         return {"status": "error", "error": str(e)}
 
 
+@celery_app.task(bind=True)
+def send_digest_batch(self, channel_report_ids: List[int]):
+    """
+    Отправка сводок в пачку каналов через одну HTTP сессию.
+    
+    Временные ошибки отправки повторяются задачей send_digest_to_channel.
+    
+    Args:
+        channel_report_ids: ID записей из channel_reports
+    """
+    db = SessionLocal()
+    
+    try:
+        prepared = []
+        retry_ids = []
+        for channel in ChannelReportCRUD.get_by_ids(db, channel_report_ids):
+            try:
+                target_date, text = _prepare_digest(db, channel)
+                prepared.append((channel, target_date, text))
+            except Exception as e:
+                logger.error(f"Error preparing digest for channel {channel.id}: {e}")
+                retry_ids.append(channel.id)
+        
+        sent = failed = 0
+        if prepared:
+            results = asyncio.run(send_telegram_messages(
+                get_bot_token(),
+                [(channel.chat_id, text) for channel, _, text in prepared]
+            ))
+            for (channel, target_date, _), result in zip(prepared, results):
+                error_msg = _save_send_result(db, channel, target_date, result)
+                if error_msg is None:
+                    sent += 1
+                elif _is_retryable(error_msg):
+                    retry_ids.append(channel.id)
+                else:
+                    failed += 1
+        
+        for channel_id in retry_ids:
+            send_digest_to_channel.apply_async((channel_id,), countdown=60)
+        
+        logger.info(
+            f"Digest batch done: sent {sent}, failed {failed}, retrying {len(retry_ids)} "
+            f"of {len(channel_report_ids)}"
+        )
+        return {"status": "success", "sent": sent, "failed": failed, "retrying": len(retry_ids)}
+    
+    except Exception as e:
+        logger.error(f"Error in send_digest_batch: {e}")
+        return {"status": "error", "error": str(e)}
+    
+    finally:
+        db.close()
+
+
 @celery_app.task(bind=True, max_retries=3, default_retry_delay=60)
 def send_digest_to_channel(self, channel_report_id: int):
     """
@@ -133,77 +262,22 @@ def send_digest_to_channel(self, channel_report_id: int):
         
         logger.info(f"Processing digest for channel {channel.id} ({channel.chat_title})")
         
-        # Получаем данные сводки
-        service = DigestService(db)
-        # Используем сегодняшнюю дату в timezone канала (дата отправки уведомления)
-        channel_tz = pytz.timezone(channel.timezone)
-        current_utc = datetime.now(pytz.UTC)
-        current_local = current_utc.astimezone(channel_tz)
-        # Сегодняшняя дата в timezone канала
-        target_date = current_local.date()
-        
-        # Определяем временной диапазон последних 24 часов
-        end_datetime = current_local
-        start_datetime = end_datetime - timedelta(hours=24)
-        
-        logger.info(f"Using target_date: {target_date} for channel {channel.id} (current local time: {current_local.strftime('%Y-%m-%d %H:%M')})")
-        data = service.get_daily_digest(channel.cabinet_id, target_date, start_datetime, end_datetime)
-        
-        # Форматируем текст с учетом timezone канала
-        telegram_text = DigestFormatter.format_daily_digest(data, channel.timezone)
+        target_date, telegram_text = _prepare_digest(db, channel)
         
         # Отправляем через Telegram Bot API
         bot_token = get_bot_token()
+        result = asyncio.run(send_telegram_message(bot_token, channel.chat_id, telegram_text))
         
-        # Используем asyncio для отправки
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(
-            send_telegram_message(bot_token, channel.chat_id, telegram_text)
-        )
-        loop.close()
-        
-        if result.get("ok"):
-            # Успешная отправка
+        error_msg = _save_send_result(db, channel, target_date, result)
+        if error_msg is None:
             message_id = result.get("result", {}).get("message_id")
-            
-            # Сохраняем в историю
-            DigestHistoryCRUD.create(
-                db=db,
-                channel_report_id=channel.id,
-                cabinet_id=channel.cabinet_id,
-                chat_id=channel.chat_id,
-                digest_date=target_date,
-                status="sent",
-                message_id=message_id
-            )
-            
-            # Обновляем время последней отправки
-            ChannelReportCRUD.update_last_sent(db, channel.id, datetime.utcnow())
-            
-            logger.info(f"Successfully sent digest to channel {channel.id}")
             return {"status": "success", "channel_id": channel.id, "message_id": message_id}
-        else:
-            # Ошибка отправки
-            error_msg = result.get("description", "Unknown error")
-            logger.error(f"Failed to send digest to channel {channel.id}: {error_msg}")
-            
-            # Сохраняем в историю с ошибкой
-            DigestHistoryCRUD.create(
-                db=db,
-                channel_report_id=channel.id,
-                cabinet_id=channel.cabinet_id,
-                chat_id=channel.chat_id,
-                digest_date=target_date,
-                status="failed",
-                error_message=error_msg
-            )
-            
-            # Retry если это временная ошибка
-            if "bot was blocked by the user" not in error_msg.lower():
-                raise self.retry(exc=Exception(error_msg))
-            
-            return {"status": "failed", "error": error_msg}
+        
+        # Retry если это временная ошибка
+        if _is_retryable(error_msg):
+            raise self.retry(exc=Exception(error_msg))
+        
+        return {"status": "failed", "error": error_msg}
     
     except Exception as e:
         logger.error(f"Error in send_digest_to_channel for channel {channel_report_id}: {e}")
@@ -2,6 +2,7 @@
 Модуль экспорта данных WB в Google Sheets
 """
 
+from app.utils.lazy import lazy_exports
 from .models import ExportToken, ExportLog
 from .schemas import (
     ExportTokenCreate,
@@ -10,10 +11,13 @@ from .schemas import (
     ExportLogResponse,
     GoogleSheetsTemplateResponse
 )
-from .service import ExportService
-from .routes import router
-from .template_routes import router as template_router
-from .google_sheets_generator import GoogleSheetsTemplateGenerator
+# Сервис, роутеры и генератор шаблонов (клиент Google API) - при обращении
+__getattr__ = lazy_exports(__name__, {
+    "ExportService": (".service", "ExportService"),
+    "router": (".routes", "router"),
+    "template_router": (".template_routes", "router"),
+    "GoogleSheetsTemplateGenerator": (".google_sheets_generator", "GoogleSheetsTemplateGenerator"),
+})
 
 __all__ = [
     "ExportToken",
@@ -6,8 +6,6 @@ import os
 import logging
 from typing import Dict, List, Any, Optional
 from datetime import datetime
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
 logger = logging.getLogger(__name__)
@@ -23,6 +21,9 @@ class GoogleSheetsTemplateGenerator:
 
     def _initialize_service(self):
         """Инициализирует Google Sheets и Drive API сервисы"""
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
+
         try:
             key_file = os.getenv('GOOGLE_SERVICE_ACCOUNT_FILE', 'config/wb-assist.json')
             scopes = os.getenv('GOOGLE_SCOPES', 'https://www.googleapis.com/auth/spreadsheets,https://www.googleapis.com/auth/drive').split(',')
@@ -10,8 +10,6 @@ from typing import List, Dict, Any, Optional, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func, desc
 
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
 from ...core.database import get_db
@@ -34,6 +32,10 @@ class ExportService:
     def _get_sheets_service(self):
         """Инициализирует Google Sheets API сервис"""
         if self._sheets_service is None:
+            # Клиент Google API тяжелый - импортируется при первом экспорте, а не при старте
+            from google.oauth2 import service_account
+            from googleapiclient.discovery import build
+
             try:
                 key_file = os.getenv('GOOGLE_SERVICE_ACCOUNT_FILE', 'config/wb-assist.json')
                 scopes = ['https://www.googleapis.com/auth/spreadsheets']
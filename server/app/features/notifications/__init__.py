@@ -1,3 +1,11 @@
 """
 Модуль системы уведомлений S3
 """
+
+from app.utils.lazy import lazy_exports
+
+__getattr__ = lazy_exports(__name__, {
+    "StreamQueueManager": (".stream_queue", "StreamQueueManager"),
+})
+
+__all__ = ["StreamQueueManager"]
@@ -21,9 +21,12 @@ from .models import NotificationSettings
 from app.features.bot_api.formatter import BotMessageFormatter
 from app.utils.timezone import TimezoneUtils
 from app.features.wb_api.models import WBOrder, WBCabinet, WBReview, WBProduct, WBStock
+from app.features.wb_api.review_classifier import NEGATIVE, TOPICS, decode_topics
 from app.features.notifications.models import NotificationHistory
 from app.features.user.models import User
 from .webhook_sender import WebhookSender
+from .product_snapshot import ProductSnapshot, empty_product_info
+from .sync_event_stream import DeliveryLedger
 
 logger = logging.getLogger(__name__)
 
@@ -36,9 +39,15 @@ class NotificationService:
         """Форматировать валюту с пробелами вместо запятых"""
         return f"{amount:,.0f}₽".replace(",", " ")
     
+    # Типы с уникальным ключом события, которые дедуплицируются между
+    # событиями потока синхронизаций (критичные остатки повторяются намеренно)
+    EVENT_DEDUP_TYPES = ("new_order", "order_buyout", "order_cancellation", "order_return", "negative_review")
+    
     def __init__(self, db: Session):
         self.db = db
         self._sync_locks = {}  # {cabinet_id: asyncio.Lock} - блокировки синхронизации
+        # Снимок товаров текущего прогона (см. process_sync_events_simple)
+        self._product_snapshot: Optional[ProductSnapshot] = None
         
         # Инициализируем только используемые компоненты
         self.message_formatter = BotMessageFormatter()
@@ -206,9 +215,18 @@ class NotificationService:
         user_id: int, 
         cabinet_id: int,
         last_sync_at: datetime,
-        bot_webhook_url: str = None
+        bot_webhook_url: str = None,
+        delivery_ledger: Optional[DeliveryLedger] = None
     ) -> Dict[str, Any]:
-        """Простая обработка событий синхронизации (гибридный подход)"""
+        """Простая обработка событий синхронизации (гибридный подход)
+        
+        Args:
+            delivery_ledger: Отметки доставки события из потока синхронизаций.
+                Если передан, уже отправленные при прошлой доставке события
+                уведомления пропускаются, а заказы/отзывы дополнительно
+                дедуплицируются через sent_notifications (окна соседних
+                событий могут пересекаться, пока consumer отстает)
+        """
         try:
             logger.info(f"🔧 [process_sync_events_simple] Starting for user {user_id}, cabinet {cabinet_id}")
             logger.info(f"🔧 [process_sync_events_simple] last_sync_at parameter: {last_sync_at}")
@@ -231,113 +249,49 @@ class NotificationService:
                 logger.info(f"Notifications disabled for user {user_id}")
                 return {"status": "disabled", "notifications_sent": 0}
             
-            notifications = []
-            
-            # 1. НОВЫЕ ЗАКАЗЫ (простая проверка)
-            if user_settings.new_orders_enabled:
-                new_orders = await self._check_new_orders_simple(cabinet_id, last_sync_at)
-                logger.info(f"🔧 [process_sync_events_simple] Processing {len(new_orders)} new orders")
-                for i, order in enumerate(new_orders):
-                    logger.info(f"🔧 [process_sync_events_simple] Processing order {i+1}/{len(new_orders)}: {order.order_id}")
-                    try:
-                        order_data = self._format_order_data_simple(order)
-                        logger.info(f"🔧 [process_sync_events_simple] Order data formatted successfully")
-                        telegram_text = self._format_new_order_notification_simple(order)
-                        logger.info(f"🔧 [process_sync_events_simple] Telegram text formatted successfully")
-                        notifications.append({
-                            "type": "new_order",
-                            "user_id": user_id,
-                            "order_id": order.order_id,
-                            "data": order_data,
-                            "telegram_text": telegram_text
-                        })
-                        logger.info(f"🔧 [process_sync_events_simple] Notification added successfully")
-                    except Exception as e:
-                        logger.error(f"🔧 [process_sync_events_simple] Error processing order {order.order_id}: {e}")
-                        raise
-            
-            # 2. ВЫКУПЫ (простая проверка)
-            if user_settings.order_buyouts_enabled:
-                logger.info(f"🔧 [process_sync_events_simple] Checking buyouts (enabled={user_settings.order_buyouts_enabled})")
-                buyouts = await self._check_buyouts_simple(cabinet_id, last_sync_at)
-                logger.info(f"🔧 [process_sync_events_simple] Processing {len(buyouts)} buyouts")
-                for i, order in enumerate(buyouts):
-                    try:
-                        logger.info(f"🔧 [process_sync_events_simple] Processing buyout {i+1}/{len(buyouts)}: {order.sale_id}")
-                        notifications.append({
-                            "type": "order_buyout",
-                            "user_id": user_id,
-                            "order_id": order.sale_id,
-                            "data": self._format_sale_data_simple(order),
-                            "telegram_text": self._format_buyout_notification_simple(order)
-                        })
-                        logger.info(f"🔧 [process_sync_events_simple] Buyout notification added successfully")
-                    except Exception as e:
-                        logger.error(f"🔧 [process_sync_events_simple] Error processing buyout {order.sale_id}: {e}")
-            else:
-                logger.info(f"🔧 [process_sync_events_simple] Buyouts disabled for user {user_id}")
+            # Сначала выбираем события, затем одним снимком загружаем данные
+            # всех затронутых товаров для форматтеров
+            new_orders = await self._check_new_orders_simple(cabinet_id, last_sync_at) if user_settings.new_orders_enabled else []
+            buyouts = await self._check_buyouts_simple(cabinet_id, last_sync_at) if user_settings.order_buyouts_enabled else []
+            cancellations = await self._check_cancellations_simple(cabinet_id, last_sync_at) if user_settings.order_cancellations_enabled else []
+            returns = await self._check_returns_simple(cabinet_id, last_sync_at) if user_settings.order_returns_enabled else []
             
-            # 3. ОТМЕНЫ (простая проверка)
-            if user_settings.order_cancellations_enabled:
-                cancellations = await self._check_cancellations_simple(cabinet_id, last_sync_at)
-                for order in cancellations:
-                    notifications.append({
-                        "type": "order_cancellation",
-                        "user_id": user_id,
-                        "order_id": order.order_id,
-                        "data": self._format_order_data_simple(order),
-                        "telegram_text": self._format_cancellation_notification_simple(order)
-                    })
-            
-            # 4. ВОЗВРАТЫ (простая проверка)
-            if user_settings.order_returns_enabled:
-                logger.info(f"🔧 [process_sync_events_simple] Checking returns (enabled={user_settings.order_returns_enabled})")
-                returns = await self._check_returns_simple(cabinet_id, last_sync_at)
-                logger.info(f"🔧 [process_sync_events_simple] Processing {len(returns)} returns")
-                for i, order in enumerate(returns):
-                    try:
-                        logger.info(f"🔧 [process_sync_events_simple] Processing return {i+1}/{len(returns)}: {order.sale_id}")
-                        notifications.append({
-                            "type": "order_return",
-                            "user_id": user_id,
-                            "order_id": order.sale_id,
-                            "data": self._format_sale_data_simple(order),
-                            "telegram_text": self._format_return_notification_simple(order)
-                        })
-                        logger.info(f"🔧 [process_sync_events_simple] Return notification added successfully")
-                    except Exception as e:
-                        logger.error(f"🔧 [process_sync_events_simple] Error processing return {order.sale_id}: {e}")
-            else:
-                logger.info(f"🔧 [process_sync_events_simple] Returns disabled for user {user_id}")
-            
-            # 5. КРИТИЧНЫЕ ОСТАТКИ (новая логика) - ВКЛЮЧЕНО
-            if user_settings.critical_stocks_enabled:
-                critical_stocks = await self._get_critical_stocks(user_id, [cabinet_id], last_sync_at)
-                if critical_stocks:
-                    notifications.extend(critical_stocks)
-            
-            # 6. НЕГАТИВНЫЕ ОТЗЫВЫ (простая проверка с регулируемым порогом)
+            negative_reviews = []
             if user_settings.negative_reviews_enabled:
                 # Получаем порог из настроек (по умолчанию 3, если поле еще не добавлено)
                 threshold = getattr(user_settings, 'review_rating_threshold', 3)
                 logger.info(f"🔧 [process_sync_events_simple] Review threshold for user {user_id}: {threshold}")
                 negative_reviews = await self._check_negative_reviews_simple(cabinet_id, last_sync_at, threshold)
-                for review in negative_reviews:
-                    notifications.append({
-                        "type": "negative_review",
-                        "user_id": user_id,
-                        "review_id": review.review_id,
-                        "data": self._format_review_data_simple(review),
-                        "telegram_text": self._format_negative_review_notification_simple(review)
-                    })
+            
+            self._product_snapshot = ProductSnapshot.build(
+                self.db,
+                [(item.cabinet_id, item.nm_id) for item in (*new_orders, *buyouts, *cancellations, *returns, *negative_reviews)]
+            )
+            try:
+                notifications = await self._build_simple_notifications(
+                    user_id, cabinet_id, last_sync_at, user_settings,
+                    new_orders, buyouts, cancellations, returns, negative_reviews
+                )
+            finally:
+                self._product_snapshot = None
             
             # Отправляем все уведомления
             notifications_sent = 0
             for notification in notifications:
                 try:
+                    delivery_key = None
+                    if delivery_ledger is not None:
+                        delivery_key = f"{user_id}:{notification.get('type')}:{self._extract_unique_key(notification)}"
+                        if delivery_ledger.is_delivered(delivery_key) or self._is_sent_by_previous_event(user_id, notification):
+                            logger.info(f"⏭️ Notification {delivery_key} already delivered, skipping")
+                            continue
                     result = await self._send_simple_notification(user_id, notification, bot_webhook_url)
                     if result.get("success", False):
                         notifications_sent += 1
+                        if delivery_key:
+                            delivery_ledger.mark_delivered(delivery_key)
+                            if notification.get("type") in self.EVENT_DEDUP_TYPES:
+                                await self._mark_as_sent_in_redis(user_id, notification)
                         # Сохраняем в историю
                         self._save_notification_to_history(user_id, notification, result)
                 except Exception as e:
@@ -356,6 +310,117 @@ class NotificationService:
             logger.error(f"Error in process_sync_events_simple: {e}")
             return {"status": "error", "error": str(e)}
     
+    def _is_sent_by_previous_event(self, user_id: int, notification: Dict[str, Any]) -> bool:
+        """Отправлено ли уведомление о заказе/отзыве при обработке другого события синхронизации"""
+        if notification.get("type") not in self.EVENT_DEDUP_TYPES:
+            return False
+        return bool(self._is_duplicate_in_redis(user_id, notification))
+    
+    async def _build_simple_notifications(
+        self,
+        user_id: int,
+        cabinet_id: int,
+        last_sync_at: datetime,
+        user_settings,
+        new_orders: List,
+        buyouts: List,
+        cancellations: List,
+        returns: List,
+        negative_reviews: List
+    ) -> List[Dict[str, Any]]:
+        """Формирование уведомлений process_sync_events_simple по выбранным событиям"""
+        notifications = []
+        
+        # 1. НОВЫЕ ЗАКАЗЫ (простая проверка)
+        if user_settings.new_orders_enabled:
+            logger.info(f"🔧 [process_sync_events_simple] Processing {len(new_orders)} new orders")
+            for i, order in enumerate(new_orders):
+                logger.info(f"🔧 [process_sync_events_simple] Processing order {i+1}/{len(new_orders)}: {order.order_id}")
+                try:
+                    order_data = self._format_order_data_simple(order)
+                    logger.info(f"🔧 [process_sync_events_simple] Order data formatted successfully")
+                    telegram_text = self._format_new_order_notification_simple(order)
+                    logger.info(f"🔧 [process_sync_events_simple] Telegram text formatted successfully")
+                    notifications.append({
+                        "type": "new_order",
+                        "user_id": user_id,
+                        "order_id": order.order_id,
+                        "data": order_data,
+                        "telegram_text": telegram_text
+                    })
+                    logger.info(f"🔧 [process_sync_events_simple] Notification added successfully")
+                except Exception as e:
+                    logger.error(f"🔧 [process_sync_events_simple] Error processing order {order.order_id}: {e}")
+                    raise
+        
+        # 2. ВЫКУПЫ (простая проверка)
+        if user_settings.order_buyouts_enabled:
+            logger.info(f"🔧 [process_sync_events_simple] Processing {len(buyouts)} buyouts")
+            for i, order in enumerate(buyouts):
+                try:
+                    logger.info(f"🔧 [process_sync_events_simple] Processing buyout {i+1}/{len(buyouts)}: {order.sale_id}")
+                    notifications.append({
+                        "type": "order_buyout",
+                        "user_id": user_id,
+                        "order_id": order.sale_id,
+                        "data": self._format_sale_data_simple(order),
+                        "telegram_text": self._format_buyout_notification_simple(order)
+                    })
+                    logger.info(f"🔧 [process_sync_events_simple] Buyout notification added successfully")
+                except Exception as e:
+                    logger.error(f"🔧 [process_sync_events_simple] Error processing buyout {order.sale_id}: {e}")
+        else:
+            logger.info(f"🔧 [process_sync_events_simple] Buyouts disabled for user {user_id}")
+        
+        # 3. ОТМЕНЫ (простая проверка)
+        if user_settings.order_cancellations_enabled:
+            for order in cancellations:
+                notifications.append({
+                    "type": "order_cancellation",
+                    "user_id": user_id,
+                    "order_id": order.order_id,
+                    "data": self._format_order_data_simple(order),
+                    "telegram_text": self._format_cancellation_notification_simple(order)
+                })
+        
+        # 4. ВОЗВРАТЫ (простая проверка)
+        if user_settings.order_returns_enabled:
+            logger.info(f"🔧 [process_sync_events_simple] Processing {len(returns)} returns")
+            for i, order in enumerate(returns):
+                try:
+                    logger.info(f"🔧 [process_sync_events_simple] Processing return {i+1}/{len(returns)}: {order.sale_id}")
+                    notifications.append({
+                        "type": "order_return",
+                        "user_id": user_id,
+                        "order_id": order.sale_id,
+                        "data": self._format_sale_data_simple(order),
+                        "telegram_text": self._format_return_notification_simple(order)
+                    })
+                    logger.info(f"🔧 [process_sync_events_simple] Return notification added successfully")
+                except Exception as e:
+                    logger.error(f"🔧 [process_sync_events_simple] Error processing return {order.sale_id}: {e}")
+        else:
+            logger.info(f"🔧 [process_sync_events_simple] Returns disabled for user {user_id}")
+        
+        # 5. КРИТИЧНЫЕ ОСТАТКИ (новая логика) - ВКЛЮЧЕНО
+        if user_settings.critical_stocks_enabled:
+            critical_stocks = await self._get_critical_stocks(user_id, [cabinet_id], last_sync_at)
+            if critical_stocks:
+                notifications.extend(critical_stocks)
+        
+        # 6. НЕГАТИВНЫЕ ОТЗЫВЫ (простая проверка с регулируемым порогом)
+        if user_settings.negative_reviews_enabled:
+            for review in negative_reviews:
+                notifications.append({
+                    "type": "negative_review",
+                    "user_id": user_id,
+                    "review_id": review.review_id,
+                    "data": self._format_review_data_simple(review),
+                    "telegram_text": self._format_negative_review_notification_simple(review)
+                })
+        
+        return notifications
+    
     def _clean_datetime_objects(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Очистка datetime объектов для JSON сериализации"""
         import datetime
@@ -446,10 +511,10 @@ class NotificationService:
             # Получаем ID предыдущих отзывов
             previous_review_ids = {review["review_id"] for review in previous_reviews}
             
-            # Находим новые отзывы с рейтингом <= threshold
+            # Находим новые отзывы с рейтингом <= threshold или с негативной тональностью
             for review in current_reviews:
                 if (review["review_id"] not in previous_review_ids and 
-                    review.get("rating", 0) <= threshold):
+                    (review.get("rating", 0) <= threshold or review.get("sentiment") == NEGATIVE)):
                     
                     event = {
                         "type": "negative_review",
@@ -1012,10 +1077,13 @@ class NotificationService:
                 )
             ).all()
             
+            # Данные всех товаров заказов одним снимком вместо запросов на каждый заказ
+            snapshot = ProductSnapshot.build(self.db, [(order.cabinet_id, order.nm_id) for order in orders])
+            
             events = []
             for order in orders:
                 # Обогащаем данные заказа для форматтера
-                product = self.db.query(WBProduct).filter(WBProduct.nm_id == order.nm_id).first()
+                product = snapshot.get_product(order.cabinet_id, order.nm_id)
                 rating = (product.rating or 0.0) if product else 0.0
                 reviews_cnt = (product.reviews_count or 0) if product else 0
                 image_url = product.image_url if product and getattr(product, "image_url", None) else None
@@ -1025,20 +1093,11 @@ class NotificationService:
                     logger.info(f"🖼️ Found image for order {order.order_id}: {image_url}")
                 else:
                     logger.warning(f"⚠️ No image found for order {order.order_id}, product: {product}")
-                # Быстрый точный расчёт из WBReview (перебивает продуктовый рейтинг, если есть отзывы)
-                try:
-                    avg_cnt = self.db.query(func.avg(WBReview.rating), func.count(WBReview.id)).filter(
-                        WBReview.cabinet_id == order.cabinet_id,
-                        WBReview.nm_id == order.nm_id,
-                        WBReview.rating.isnot(None)
-                    ).one()
-                    avg_rating = avg_cnt[0] or 0.0
-                    cnt_reviews = avg_cnt[1] or 0
-                    if cnt_reviews > 0:
-                        rating = round(float(avg_rating), 1)
-                        reviews_cnt = int(cnt_reviews)
-                except Exception:
-                    pass
+                # Точный расчёт из WBReview (перебивает продуктовый рейтинг, если есть отзывы)
+                avg_rating, cnt_reviews = snapshot.get_review_rating(order.cabinet_id, order.nm_id)
+                if cnt_reviews > 0:
+                    rating = round(float(avg_rating), 1)
+                    reviews_cnt = int(cnt_reviews)
                 order_data = {
                     "id": order.id,
                     "order_id": order.order_id,
@@ -1148,8 +1207,8 @@ class NotificationService:
             
             events = []
             for review in reviews:
-                # Создаем события для отзывов с рейтингом <= threshold (если threshold > 0)
-                if threshold > 0 and review.rating and review.rating <= threshold:
+                # Создаем события для отзывов с рейтингом <= threshold или негативным текстом (если threshold > 0)
+                if threshold > 0 and review.rating and (review.rating <= threshold or review.sentiment == NEGATIVE):
                     events.append({
                         "type": "negative_review",
                         "user_id": user_id,
@@ -1157,6 +1216,8 @@ class NotificationService:
                             "review_id": review.review_id,
                             "rating": review.rating,
                             "text": review.text,
+                            "sentiment": review.sentiment,
+                            "topics": decode_topics(review.topics),
                             "product_name": f"Товар {review.nm_id}",  # Можно улучшить, получив название товара
                             "user_name": review.user_name,
                             "created_at": review.created_date.isoformat() if review.created_date else None
@@ -1164,7 +1225,7 @@ class NotificationService:
                         "created_at": TimezoneUtils.format_for_user(review.created_date or TimezoneUtils.now_msk()),
                         "priority": "HIGH"
                     })
-                # Положительные отзывы (4-5 звезд) игнорируем - уведомления не нужны
+                # Отзывы выше порога без негативного текста игнорируем - уведомления не нужны
             
             return events
             
@@ -1313,6 +1374,8 @@ class NotificationService:
                 WBOrder.status.in_(['buyout', 'canceled', 'return'])
             ).all()
             
+            snapshot = ProductSnapshot.build(self.db, [(order.cabinet_id, order.nm_id) for order in orders])
+            
             events = []
             for order in orders:
                 if order.status == 'buyout':
@@ -1328,18 +1391,8 @@ class NotificationService:
                     continue
                 
                 # Получаем image_url из связанного товара
-                image_url = None
-                try:
-                    product = self.db.query(WBProduct).filter(
-                        and_(
-                            WBProduct.cabinet_id == order.cabinet_id,
-                            WBProduct.nm_id == order.nm_id
-                        )
-                    ).first()
-                    if product:
-                        image_url = product.image_url
-                except Exception as e:
-                    logger.error(f"Error getting image_url for order {order.order_id}: {e}")
+                product = snapshot.get_product(order.cabinet_id, order.nm_id)
+                image_url = product.image_url if product else None
                 
                 events.append({
                     "type": event_type,
@@ -2018,6 +2071,106 @@ class NotificationService:
             logger.error(f"Error getting duplicate stats: {e}")
             return {}
     
+    async def process_sync_completed(
+        self,
+        cabinet_id: int,
+        previous_sync_at: Optional[datetime] = None,
+        delivery_ledger: Optional[DeliveryLedger] = None
+    ) -> Dict[str, Any]:
+        """
+        Уведомления по завершенной синхронизации кабинета для всех его пользователей
+        
+        Вызывается consumer-ом потока событий синхронизации (или синхронно из
+        WBSyncService, если событие не удалось опубликовать). Не коммитит:
+        коммит делает вызывающий код.
+        
+        Args:
+            cabinet_id: ID кабинета
+            previous_sync_at: Время предыдущей синхронизации (ДО текущей)
+            delivery_ledger: Отметки доставки события (идемпотентность при повторной доставке)
+            
+        Returns:
+            {"users": количество пользователей, "notifications_sent": отправлено уведомлений о событиях}
+        """
+        logger.info(f"🔧 [process_sync_completed] cabinet_id={cabinet_id}, previous_sync_at={previous_sync_at}")
+        from app.features.wb_api.crud_cabinet_users import CabinetUserCRUD
+        from app.features.wb_api.models_cabinet_users import CabinetUser
+        import uuid
+        
+        user_ids = CabinetUserCRUD().get_cabinet_users(self.db, cabinet_id)
+        notifications_sent = 0
+        
+        for user_id in user_ids:
+            # Проверяем, это ли первая синхронизация для конкретного пользователя
+            cabinet_user = self.db.query(CabinetUser).filter(
+                CabinetUser.cabinet_id == cabinet_id,
+                CabinetUser.user_id == user_id
+            ).first()
+            
+            is_first_sync = not cabinet_user.first_sync_completed if cabinet_user else True
+            
+            completion_key = f"{user_id}:sync_completed"
+            if delivery_ledger is not None and delivery_ledger.is_delivered(completion_key):
+                logger.info(f"⏭️ Sync completion for user {user_id} already delivered, skipping")
+            else:
+                notification_data = {
+                    "type": "sync_completed",
+                    "cabinet_id": cabinet_id,
+                    "message": "Синхронизация завершена! Данные готовы к использованию.",
+                    "timestamp": TimezoneUtils.now_msk().isoformat(),
+                    "is_first_sync": is_first_sync
+                }
+                
+                try:
+                    webhook_result = await self.send_sync_completion_notification(
+                        user_id=user_id,
+                        cabinet_id=cabinet_id,
+                        is_first_sync=is_first_sync
+                    )
+                    logger.info(f"📢 Webhook notification sent for user {user_id}: {webhook_result}")
+                except Exception as e:
+                    logger.error(f"❌ Failed to send webhook notification for user {user_id}: {e}")
+                
+                # Сохраняем уведомление в историю
+                self.db.add(NotificationHistory(
+                    id=f"sync_completed_{uuid.uuid4().hex[:8]}",
+                    user_id=user_id,
+                    notification_type="sync_completed",
+                    priority="HIGH",
+                    title="Синхронизация завершена",
+                    content=json.dumps(notification_data),
+                    sent_at=TimezoneUtils.to_utc(TimezoneUtils.now_msk()),
+                    status="delivered"
+                ))
+                if delivery_ledger is not None:
+                    delivery_ledger.mark_delivered(completion_key)
+                logger.info(f"📢 Sync completion notification created for user {user_id}")
+            
+            # Если это первая синхронизация для пользователя, устанавливаем флаг
+            if is_first_sync and cabinet_user:
+                cabinet_user.first_sync_completed = True
+                logger.info(f"🏁 First sync completed for user {user_id} in cabinet {cabinet_id}")
+            
+            # Обрабатываем уведомления о новых событиях (ПРОСТАЯ ЛОГИКА)
+            if previous_sync_at:
+                try:
+                    events_result = await self.process_sync_events_simple(
+                        user_id=user_id,
+                        cabinet_id=cabinet_id,
+                        last_sync_at=previous_sync_at,
+                        delivery_ledger=delivery_ledger
+                    )
+                    notifications_sent += events_result.get("notifications_sent", 0)
+                    logger.info(
+                        f"📢 [Simple] Processed sync events for user {user_id}: "
+                        f"status={events_result.get('status', 'unknown')}, "
+                        f"sent={events_result.get('notifications_sent', 0)}"
+                    )
+                except Exception as e:
+                    logger.error(f"❌ [Simple] Failed to process sync events for user {user_id}: {e}")
+        
+        return {"users": len(user_ids), "notifications_sent": notifications_sent}
+    
     async def send_sync_completion_notification(
         self,
         user_id: int,
@@ -2251,11 +2404,17 @@ class NotificationService:
                 logger.info(f"🔍 [_check_negative_reviews_simple] Reviews disabled (threshold=0)")
                 return []
             
-            # Ищем отзывы с рейтингом <= threshold, которые были ДОБАВЛЕНЫ в БД после последней синхронизации
+            # Ищем отзывы с рейтингом <= threshold, которые были ДОБАВЛЕНЫ в БД после последней синхронизации,
+            # а также отзывы с высокой оценкой, но негативным текстом (тональность посчитана при синхронизации)
+            from sqlalchemy import or_
             negative_reviews = self.db.query(WBReview).filter(
                 WBReview.cabinet_id == cabinet_id,
                 WBReview.created_at > last_sync_at,  # ИСПРАВЛЕНО: created_at вместо created_date
-                WBReview.rating <= threshold  # ИСПОЛЬЗУЕМ РЕГУЛИРУЕМЫЙ ПОРОГ
+                WBReview.rating.isnot(None),
+                or_(
+                    WBReview.rating <= threshold,  # ИСПОЛЬЗУЕМ РЕГУЛИРУЕМЫЙ ПОРОГ
+                    WBReview.sentiment == NEGATIVE
+                )
             ).all()
             
             logger.info(f"🔍 [_check_negative_reviews_simple] Found {len(negative_reviews)} reviews with rating <= {threshold} for cabinet {cabinet_id}")
@@ -2596,6 +2755,8 @@ class NotificationService:
             "product_name": f"Товар {review.nm_id}",  # Используем nm_id, так как product_name нет
             "rating": review.rating,
             "text": review.text,
+            "sentiment": review.sentiment,
+            "topics": decode_topics(review.topics),
             "created_at": review.created_at.isoformat() if review.created_at else None
         }
     
@@ -2619,10 +2780,13 @@ class NotificationService:
         stars_display = filled_stars + empty_stars
         
         # Получаем информацию о товаре
-        product = self.db.query(WBProduct).filter(
-            WBProduct.cabinet_id == review.cabinet_id,
-            WBProduct.nm_id == review.nm_id
-        ).first()
+        if self._product_snapshot and self._product_snapshot.covers(review.cabinet_id, review.nm_id):
+            product = self._product_snapshot.get_product(review.cabinet_id, review.nm_id)
+        else:
+            product = self.db.query(WBProduct).filter(
+                WBProduct.cabinet_id == review.cabinet_id,
+                WBProduct.nm_id == review.nm_id
+            ).first()
         
         # Получаем последний заказ по этому товару
         last_order = self.db.query(WBOrder).filter(
@@ -2677,6 +2841,11 @@ class NotificationService:
         if cons:
             message += f"\n   ➖ {cons}"
         
+        # Темы отзыва (классификатор при синхронизации)
+        topics = decode_topics(review.topics)
+        if topics:
+            message += f"\n   🏷 {', '.join(TOPICS.get(topic, topic) for topic in topics)}"
+        
         # Добавляем текст отзыва если есть
         if review.text:
             message += f"\n   💬 {review.text[:200]}{'...' if len(review.text) > 200 else ''}"
@@ -2684,202 +2853,16 @@ class NotificationService:
         return message
     
     def _get_full_product_info(self, cabinet_id: int, nm_id: int) -> Dict[str, Any]:
-        """Получение полной информации о товаре для уведомлений"""
+        """Получение полной информации о товаре для уведомлений (из снимка прогона, если он есть)"""
         try:
-            from app.features.wb_api.models import WBProduct, WBStock, WBReview
-            from app.features.wb_api.models_sales import WBSales
-            from sqlalchemy import func, and_
-            from datetime import datetime, timedelta, timezone
-            
-            # Получаем информацию о товаре
-            product = self.db.query(WBProduct).filter(
-                and_(
-                    WBProduct.cabinet_id == cabinet_id,
-                    WBProduct.nm_id == nm_id
-                )
-            ).first()
-            
-            if not product:
-                logger.warning(f"🔧 [_get_full_product_info] Product not found: cabinet_id={cabinet_id}, nm_id={nm_id}")
-                return {
-                    "stocks": {},
-                    "stocks_by_warehouse": {},
-                    "sales_periods": {"7_days": 0, "14_days": 0, "30_days": 0},
-                    "orders_stats": {"total_orders": 0, "active_orders": 0, "canceled_orders": 0, "buyout_orders": 0, "return_orders": 0},
-                    "avg_rating": 0.0,
-                    "reviews_count": 0,
-                    "rating_distribution": {5: 0, 4: 0, 3: 0, 2: 0, 1: 0}
-                }
-            
-            # Получаем остатки по размерам
-            stocks = self.db.query(WBStock).filter(
-                and_(
-                    WBStock.cabinet_id == cabinet_id,
-                    WBStock.nm_id == nm_id
-                )
-            ).all()
-            
-            # Формируем остатки по размерам (суммируем по всем складам)
-            stocks_dict = {}
-            # Детализация по складам и размерам
-            stocks_by_warehouse = {}
-
-            for stock in stocks:
-                size = stock.size or "ONE SIZE"
-                quantity = stock.quantity or 0
-                warehouse_name = stock.warehouse_name or "Неизвестный склад"
-
-                # Суммируем остатки по всем складам для одного размера
-                if size in stocks_dict:
-                    stocks_dict[size] += quantity
-                else:
-                    stocks_dict[size] = quantity
-
-                # Детализация по складам и размерам
-                if warehouse_name not in stocks_by_warehouse:
-                    stocks_by_warehouse[warehouse_name] = {}
-
-                if size in stocks_by_warehouse[warehouse_name]:
-                    stocks_by_warehouse[warehouse_name][size] += quantity
-                else:
-                    stocks_by_warehouse[warehouse_name][size] = quantity
-            
-            # Получаем количество отзывов
-            reviews_count = self.db.query(WBReview).filter(
-                and_(
-                    WBReview.cabinet_id == cabinet_id,
-                    WBReview.nm_id == nm_id
-                )
-            ).count()
-            
-            # Получаем средний рейтинг
-            avg_rating_result = self.db.query(func.avg(WBReview.rating)).filter(
-                and_(
-                    WBReview.cabinet_id == cabinet_id,
-                    WBReview.nm_id == nm_id,
-                    WBReview.rating.isnot(None)
-                )
-            ).scalar()
-            avg_rating = float(avg_rating_result) if avg_rating_result else 0.0
-            
-            # Получаем распределение рейтингов
-            rating_distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-            if reviews_count > 0:
-                for rating in [1, 2, 3, 4, 5]:
-                    count = self.db.query(WBReview).filter(
-                        and_(
-                            WBReview.cabinet_id == cabinet_id,
-                            WBReview.nm_id == nm_id,
-                            WBReview.rating == rating
-                        )
-                    ).count()
-                    rating_distribution[rating] = (count / reviews_count) * 100
-            
-            # Получаем статистику заказов
-            from app.features.wb_api.models import WBOrder
-            orders_stats = {
-                "total_orders": 0,
-                "active_orders": 0,
-                "canceled_orders": 0,
-                "buyout_orders": 0,
-                "return_orders": 0
-            }
-            
-            # Статистика заказов
-            total_orders = self.db.query(WBOrder).filter(
-                and_(
-                    WBOrder.cabinet_id == cabinet_id,
-                    WBOrder.nm_id == nm_id
-                )
-            ).count()
-            
-            active_orders = self.db.query(WBOrder).filter(
-                and_(
-                    WBOrder.cabinet_id == cabinet_id,
-                    WBOrder.nm_id == nm_id,
-                    WBOrder.status == 'active'
-                )
-            ).count()
-            
-            canceled_orders = self.db.query(WBOrder).filter(
-                and_(
-                    WBOrder.cabinet_id == cabinet_id,
-                    WBOrder.nm_id == nm_id,
-                    WBOrder.status == 'canceled'
-                )
-            ).count()
-            
-            # Статистика продаж
-            buyout_orders = self.db.query(WBSales).filter(
-                and_(
-                    WBSales.cabinet_id == cabinet_id,
-                    WBSales.nm_id == nm_id,
-                    WBSales.type == 'buyout',
-                    WBSales.is_cancel == False
-                )
-            ).count()
-            
-            return_orders = self.db.query(WBSales).filter(
-                and_(
-                    WBSales.cabinet_id == cabinet_id,
-                    WBSales.nm_id == nm_id,
-                    WBSales.type == 'return',
-                    WBSales.is_cancel == False
-                )
-            ).count()
-            
-            orders_stats = {
-                "total_orders": total_orders,
-                "active_orders": active_orders,
-                "canceled_orders": canceled_orders,
-                "buyout_orders": buyout_orders,
-                "return_orders": return_orders
-            }
-            
-            # Получаем выкупы за периоды
-            now = datetime.now(timezone.utc)
-            periods = {
-                "7_days": now - timedelta(days=7),
-                "14_days": now - timedelta(days=14),
-                "30_days": now - timedelta(days=30)
-            }
-            
-            sales_periods = {}
-            for period_name, start_date in periods.items():
-                buyouts = self.db.query(WBSales).filter(
-                    and_(
-                        WBSales.cabinet_id == cabinet_id,
-                        WBSales.nm_id == nm_id,
-                        WBSales.sale_date >= start_date,
-                        WBSales.type == 'buyout',
-                        WBSales.is_cancel == False
-                    )
-                ).count()
-                sales_periods[period_name] = buyouts
-            
-            return {
-                "stocks": stocks_dict,
-                "stocks_by_warehouse": stocks_by_warehouse,
-                "reviews_count": reviews_count,
-                "avg_rating": avg_rating,
-                "rating_distribution": rating_distribution,
-                "orders_stats": orders_stats,
-                "sales_periods": sales_periods,
-                "image_url": product.image_url if product and hasattr(product, 'image_url') else None
-            }
+            snapshot = self._product_snapshot
+            if snapshot is None or not snapshot.covers(cabinet_id, nm_id):
+                snapshot = ProductSnapshot.build(self.db, [(cabinet_id, nm_id)])
+            return snapshot.get_full_info(cabinet_id, nm_id)
             
         except Exception as e:
             logger.error(f"Ошибка получения полной информации о товаре: {e}")
-            return {
-                "stocks": {},
-                "stocks_by_warehouse": {},
-                "reviews_count": 0,
-                "avg_rating": 0.0,
-                "rating_distribution": {1: 0, 2: 0, 3: 0, 4: 0, 5: 0},
-                "orders_stats": {"total_orders": 0, "active_orders": 0, "canceled_orders": 0, "buyout_orders": 0, "return_orders": 0},
-                "sales_periods": {"7_days": 0, "14_days": 0, "30_days": 0},
-                "image_url": None
-            }
+            return empty_product_info()
     
     def _format_stocks_for_notification(self, stocks_by_warehouse: Dict[str, Dict[str, int]]) -> str:
         """Форматирование остатков для уведомлений по складам и размерам"""
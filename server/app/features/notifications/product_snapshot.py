@@ -0,0 +1,204 @@
+"""
+Снимок данных товаров для уведомлений одного прогона синхронизации.
+
+Уведомления о заказах, выкупах и возвратах обогащаются карточкой товара,
+остатками, отзывами и статистикой заказов/выкупов. Раньше это делалось
+отдельными запросами на каждое уведомление (около десятка на товар), и
+большая синхронизация превращалась в тысячи мелких запросов. Снимок
+собирает те же данные для всех (cabinet_id, nm_id) прогона несколькими
+агрегирующими запросами, а форматтеры читают их из памяти.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, case, func
+from sqlalchemy.orm import Session
+
+from app.features.wb_api.models import WBOrder, WBProduct, WBReview, WBStock
+from app.features.wb_api.models_sales import WBSales
+
+logger = logging.getLogger(__name__)
+
+ProductKey = Tuple[int, int]
+
+# Ограничение размера IN (...) в одном запросе
+NM_ID_CHUNK_SIZE = 1000
+
+SALES_PERIODS = {"7_days": 7, "14_days": 14, "30_days": 30}
+
+
+def empty_product_info() -> Dict[str, Any]:
+    """Информация о товаре, если товара нет в БД."""
+    return {
+        "stocks": {},
+        "stocks_by_warehouse": {},
+        "sales_periods": {"7_days": 0, "14_days": 0, "30_days": 0},
+        "orders_stats": {"total_orders": 0, "active_orders": 0, "canceled_orders": 0, "buyout_orders": 0, "return_orders": 0},
+        "avg_rating": 0.0,
+        "reviews_count": 0,
+        "rating_distribution": {5: 0, 4: 0, 3: 0, 2: 0, 1: 0},
+        "image_url": None
+    }
+
+
+class ProductSnapshot:
+    """Данные товаров, загруженные одним набором запросов на весь прогон"""
+
+    def __init__(self, keys: Iterable[ProductKey]):
+        self.keys: Set[ProductKey] = {(int(cabinet_id), int(nm_id)) for cabinet_id, nm_id in keys if nm_id is not None}
+        self.products: Dict[ProductKey, WBProduct] = {}
+        self.stocks: Dict[ProductKey, List[Tuple[str, str, int]]] = {}
+        # {key: {"total": все отзывы, "rated": с оценкой, "rating_sum": сумма оценок, "by_rating": {оценка: кол-во}}}
+        self.reviews: Dict[ProductKey, Dict[str, Any]] = {}
+        self.orders: Dict[ProductKey, Dict[str, int]] = {}
+        self.sales: Dict[ProductKey, Dict[str, int]] = {}
+
+    @classmethod
+    def build(cls, db: Session, keys: Iterable[ProductKey], now: Optional[datetime] = None) -> "ProductSnapshot":
+        """Загрузить снимок для набора (cabinet_id, nm_id)."""
+        snapshot = cls(keys)
+        if not snapshot.keys:
+            return snapshot
+
+        now = now or datetime.now(timezone.utc)
+        cabinet_ids = sorted({cabinet_id for cabinet_id, _ in snapshot.keys})
+        nm_ids = sorted({nm_id for _, nm_id in snapshot.keys})
+        for start in range(0, len(nm_ids), NM_ID_CHUNK_SIZE):
+            snapshot._load(db, cabinet_ids, nm_ids[start:start + NM_ID_CHUNK_SIZE], now)
+
+        logger.info(f"📸 Product snapshot built for {len(snapshot.keys)} products ({len(snapshot.products)} found)")
+        return snapshot
+
+    def _load(self, db: Session, cabinet_ids: List[int], nm_ids: List[int], now: datetime) -> None:
+        # Фильтр по cabinet_id IN и nm_id IN шире набора ключей (декартово
+        # произведение), лишние строки отбрасываются в _wanted
+        def scope(model):
+            return and_(model.cabinet_id.in_(cabinet_ids), model.nm_id.in_(nm_ids))
+
+        for product in db.query(WBProduct).filter(scope(WBProduct)).all():
+            key = (product.cabinet_id, product.nm_id)
+            if self._wanted(key):
+                self.products.setdefault(key, product)
+
+        stock_rows = db.query(
+            WBStock.cabinet_id, WBStock.nm_id, WBStock.warehouse_name, WBStock.size,
+            func.sum(WBStock.quantity)
+        ).filter(scope(WBStock)).group_by(
+            WBStock.cabinet_id, WBStock.nm_id, WBStock.warehouse_name, WBStock.size
+        ).all()
+        for cabinet_id, nm_id, warehouse_name, size, quantity in stock_rows:
+            key = (cabinet_id, nm_id)
+            if self._wanted(key):
+                self.stocks.setdefault(key, []).append((warehouse_name, size, int(quantity or 0)))
+
+        review_rows = db.query(
+            WBReview.cabinet_id, WBReview.nm_id, WBReview.rating, func.count(WBReview.id)
+        ).filter(scope(WBReview)).group_by(
+            WBReview.cabinet_id, WBReview.nm_id, WBReview.rating
+        ).all()
+        for cabinet_id, nm_id, rating, count in review_rows:
+            key = (cabinet_id, nm_id)
+            if not self._wanted(key):
+                continue
+            stats = self.reviews.setdefault(key, {"total": 0, "rated": 0, "rating_sum": 0, "by_rating": {}})
+            stats["total"] += count
+            if rating is not None:
+                stats["rated"] += count
+                stats["rating_sum"] += rating * count
+                stats["by_rating"][rating] = count
+
+        order_rows = db.query(
+            WBOrder.cabinet_id, WBOrder.nm_id,
+            func.count(WBOrder.id),
+            func.sum(case((WBOrder.status == 'active', 1), else_=0)),
+            func.sum(case((WBOrder.status == 'canceled', 1), else_=0))
+        ).filter(scope(WBOrder)).group_by(WBOrder.cabinet_id, WBOrder.nm_id).all()
+        for cabinet_id, nm_id, total, active, canceled in order_rows:
+            key = (cabinet_id, nm_id)
+            if self._wanted(key):
+                self.orders[key] = {"total": total or 0, "active": int(active or 0), "canceled": int(canceled or 0)}
+
+        is_buyout = and_(WBSales.type == 'buyout', WBSales.is_cancel == False)
+        is_return = and_(WBSales.type == 'return', WBSales.is_cancel == False)
+        period_columns = [
+            func.sum(case((and_(is_buyout, WBSales.sale_date >= now - timedelta(days=days)), 1), else_=0))
+            for days in SALES_PERIODS.values()
+        ]
+        sales_rows = db.query(
+            WBSales.cabinet_id, WBSales.nm_id,
+            func.sum(case((is_buyout, 1), else_=0)),
+            func.sum(case((is_return, 1), else_=0)),
+            *period_columns
+        ).filter(scope(WBSales)).group_by(WBSales.cabinet_id, WBSales.nm_id).all()
+        for cabinet_id, nm_id, buyouts, returns, *periods in sales_rows:
+            key = (cabinet_id, nm_id)
+            if self._wanted(key):
+                stats = {"buyouts": int(buyouts or 0), "returns": int(returns or 0)}
+                for period_name, value in zip(SALES_PERIODS, periods):
+                    stats[period_name] = int(value or 0)
+                self.sales[key] = stats
+
+    def _wanted(self, key: ProductKey) -> bool:
+        return key in self.keys
+
+    def covers(self, cabinet_id: int, nm_id: int) -> bool:
+        """Загружен ли товар в снимок (даже если его нет в БД)."""
+        return nm_id is not None and (cabinet_id, int(nm_id)) in self.keys
+
+    def get_product(self, cabinet_id: int, nm_id: int) -> Optional[WBProduct]:
+        return self.products.get((cabinet_id, nm_id))
+
+    def get_review_rating(self, cabinet_id: int, nm_id: int) -> Tuple[float, int]:
+        """(средняя оценка, количество отзывов с оценкой)."""
+        stats = self.reviews.get((cabinet_id, nm_id))
+        if not stats or not stats["rated"]:
+            return 0.0, 0
+        return stats["rating_sum"] / stats["rated"], stats["rated"]
+
+    def get_full_info(self, cabinet_id: int, nm_id: int) -> Dict[str, Any]:
+        """Полная информация о товаре в формате NotificationService._get_full_product_info."""
+        key = (cabinet_id, nm_id)
+        product = self.products.get(key)
+        if not product:
+            logger.warning(f"🔧 [ProductSnapshot] Product not found: cabinet_id={cabinet_id}, nm_id={nm_id}")
+            return empty_product_info()
+
+        # Остатки по размерам (сумма по складам) и детализация по складам и размерам
+        stocks_dict: Dict[str, int] = {}
+        stocks_by_warehouse: Dict[str, Dict[str, int]] = {}
+        for warehouse_name, size, quantity in self.stocks.get(key, []):
+            size = size or "ONE SIZE"
+            warehouse_name = warehouse_name or "Неизвестный склад"
+            stocks_dict[size] = stocks_dict.get(size, 0) + quantity
+            warehouse_sizes = stocks_by_warehouse.setdefault(warehouse_name, {})
+            warehouse_sizes[size] = warehouse_sizes.get(size, 0) + quantity
+
+        review_stats = self.reviews.get(key, {"total": 0, "by_rating": {}})
+        reviews_count = review_stats["total"]
+        avg_rating, _ = self.get_review_rating(cabinet_id, nm_id)
+        rating_distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+        if reviews_count > 0:
+            for rating in rating_distribution:
+                rating_distribution[rating] = (review_stats["by_rating"].get(rating, 0) / reviews_count) * 100
+
+        orders = self.orders.get(key, {})
+        sales = self.sales.get(key, {})
+
+        return {
+            "stocks": stocks_dict,
+            "stocks_by_warehouse": stocks_by_warehouse,
+            "reviews_count": reviews_count,
+            "avg_rating": float(avg_rating),
+            "rating_distribution": rating_distribution,
+            "orders_stats": {
+                "total_orders": orders.get("total", 0),
+                "active_orders": orders.get("active", 0),
+                "canceled_orders": orders.get("canceled", 0),
+                "buyout_orders": sales.get("buyouts", 0),
+                "return_orders": sales.get("returns", 0)
+            },
+            "sales_periods": {period_name: sales.get(period_name, 0) for period_name in SALES_PERIODS},
+            "image_url": product.image_url
+        }
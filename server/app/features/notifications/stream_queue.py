@@ -0,0 +1,337 @@
+"""
+Приоритетная очередь уведомлений на Redis Streams.
+
+Заменяет списочный QueueManager (queue_manager.py удален): он хранил
+уведомления в четырех списках и забирал их через rpop - если worker падал
+между rpop и отправкой, уведомление терялось; следующий элемент стоил до
+четырех запросов к Redis (по списку на приоритет), а сколько уведомлений ждет
+и как давно - видно не было.
+
+StreamQueueManager:
+    - поток на приоритет (notification_stream:<priority>) и общая consumer
+      group: выданное сообщение остается в PEL до XACK, сообщения упавшего
+      worker-а забираются другим через XAUTOCLAIM (reclaim_stale);
+    - read_batch(N) - N уведомлений за один pipeline (дочитывание - только
+      если часть потоков пуста): места в пачке распределяются между приоритетами
+      по весам (smooth weighted round-robin), так что LOW не голодает при
+      постоянном потоке CRITICAL, а места пустых потоков достаются остальным
+      по порядку приоритета;
+    - подтвержденные сообщения удаляются (XACK + XDEL), поэтому длина потока
+      = ожидающие выдачи + выданные и не подтвержденные;
+    - get_metrics: backlog, lag, pending и возраст самого старого сообщения
+      по каждому приоритету за один pipeline;
+    - сообщения, выданные больше max_deliveries раз, и уведомления,
+      исчерпавшие повторы, переносятся в dead-letter поток.
+"""
+
+import os
+import json
+import time
+import socket
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = ("CRITICAL", "HIGH", "MEDIUM", "LOW")
+STREAM_KEY = "notification_stream:{priority}"
+DEAD_LETTER_STREAM_KEY = "notification_stream:dead"
+CONSUMER_GROUP = os.getenv("NOTIFICATION_QUEUE_GROUP", "notification_workers")
+DEFAULT_WEIGHTS = os.getenv("NOTIFICATION_QUEUE_WEIGHTS", "CRITICAL=8,HIGH=4,MEDIUM=2,LOW=1")
+CLAIM_MIN_IDLE_MS = int(os.getenv("NOTIFICATION_QUEUE_CLAIM_IDLE_MS", "60000"))
+MAX_DELIVERIES = int(os.getenv("NOTIFICATION_QUEUE_MAX_DELIVERIES", "5"))
+BATCH_SIZE = int(os.getenv("NOTIFICATION_QUEUE_BATCH_SIZE", "50"))
+DEAD_LETTER_MAXLEN = 10000
+
+
+def parse_weights(spec: str) -> Dict[str, int]:
+    """'CRITICAL=8,HIGH=4,...' -> {priority: weight}; неуказанные приоритеты - вес 1"""
+    weights = {priority: 1 for priority in PRIORITIES}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        priority, _, weight = item.partition("=")
+        if priority.strip().upper() in weights:
+            weights[priority.strip().upper()] = max(1, int(weight))
+    return weights
+
+
+def _to_str(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+@dataclass
+class QueuedNotification:
+    """Уведомление, выданное consumer-у; подтверждается через ack"""
+    priority: str
+    entry_id: str
+    notification: Dict[str, Any]
+
+
+class StreamQueueManager:
+    """Очередь уведомлений с приоритетами на Redis Streams (at-least-once)"""
+
+    def __init__(
+        self,
+        redis_client,
+        consumer_name: Optional[str] = None,
+        weights: Optional[Dict[str, int]] = None,
+        claim_min_idle_ms: int = CLAIM_MIN_IDLE_MS,
+        max_deliveries: int = MAX_DELIVERIES,
+    ):
+        self.redis_client = redis_client
+        self.consumer_name = consumer_name or f"{socket.gethostname()}:{os.getpid()}"
+        self.weights = weights or parse_weights(DEFAULT_WEIGHTS)
+        self.claim_min_idle_ms = claim_min_idle_ms
+        self.max_deliveries = max_deliveries
+        self.streams = {priority: STREAM_KEY.format(priority=priority.lower()) for priority in PRIORITIES}
+        self._credits = {priority: 0 for priority in PRIORITIES}
+        self._groups_ready = False
+
+    def ensure_groups(self) -> None:
+        """Создать потоки и consumer group, если их еще нет"""
+        if self._groups_ready:
+            return
+        for stream in self.streams.values():
+            try:
+                self.redis_client.xgroup_create(stream, CONSUMER_GROUP, id="0", mkstream=True)
+            except Exception as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+        self._groups_ready = True
+
+    # ===== Запись =====
+
+    def enqueue(self, notification: Dict[str, Any]) -> str:
+        """
+        Добавить уведомление в поток его приоритета
+
+        Returns:
+            ID сообщения в потоке
+        """
+        priority = notification.get("priority", "MEDIUM")
+        if priority not in self.streams:
+            priority = "MEDIUM"
+        notification.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+        notification.setdefault("retry_count", 0)
+        notification.setdefault("max_retries", 3)
+
+        self.ensure_groups()
+        entry_id = _to_str(self.redis_client.xadd(self.streams[priority], {"data": json.dumps(notification)}))
+        logger.debug(f"Added notification {notification.get('id', 'unknown')} to {priority} stream")
+        return entry_id
+
+    # ===== Чтение =====
+
+    def _plan(self, count: int) -> Dict[str, int]:
+        """Распределение мест в пачке по весам (smooth weighted round-robin)"""
+        total = sum(self.weights.values())
+        plan = {priority: 0 for priority in PRIORITIES}
+        for _ in range(count):
+            for priority in PRIORITIES:
+                self._credits[priority] += self.weights[priority]
+            chosen = max(PRIORITIES, key=lambda p: self._credits[p])
+            self._credits[chosen] -= total
+            plan[chosen] += 1
+        return plan
+
+    def _read(self, plan: Dict[str, int]) -> Dict[str, List[Tuple[str, Dict]]]:
+        """XREADGROUP по каждому потоку с ненулевой квотой - один pipeline"""
+        priorities = [priority for priority in PRIORITIES if plan[priority] > 0]
+        pipe = self.redis_client.pipeline(transaction=False)
+        for priority in priorities:
+            pipe.xreadgroup(CONSUMER_GROUP, self.consumer_name, {self.streams[priority]: ">"}, count=plan[priority])
+        result = {}
+        for priority, response in zip(priorities, pipe.execute()):
+            result[priority] = [message for _, messages in response or [] for message in messages]
+        return result
+
+    def read_batch(self, count: int = BATCH_SIZE) -> List[QueuedNotification]:
+        """
+        До count уведомлений для этого consumer-а
+
+        Сначала каждый приоритет получает свою долю пачки; места, которые
+        пустые потоки не заполнили, добираются из потоков, где сообщения
+        остались, по порядку приоритета.
+        """
+        self.ensure_groups()
+        plan = self._plan(count)
+        read = self._read(plan)
+
+        missing = count - sum(len(messages) for messages in read.values())
+        # Добираем по порядку приоритета из потоков, которые не оказались пустыми:
+        # не читавшихся в этой пачке и отдавших всю квоту
+        for priority in PRIORITIES:
+            if missing <= 0:
+                break
+            if len(read.setdefault(priority, [])) == plan[priority]:
+                extra = self._read({p: missing if p == priority else 0 for p in PRIORITIES})[priority]
+                read[priority].extend(extra)
+                missing -= len(extra)
+
+        batch = []
+        for priority in PRIORITIES:
+            for entry_id, fields in read.get(priority, []):
+                entry = self._decode(priority, entry_id, fields)
+                if entry is not None:
+                    batch.append(entry)
+        return batch
+
+    def _decode(self, priority: str, entry_id: Any, fields: Dict) -> Optional[QueuedNotification]:
+        entry_id = _to_str(entry_id)
+        try:
+            notification = json.loads(_to_str(fields.get("data") or fields.get(b"data")))
+        except (TypeError, ValueError) as e:
+            logger.error(f"Failed to parse notification {entry_id} from {priority} stream: {e}")
+            self._dead_letter(priority, entry_id, fields, reason="invalid_json")
+            return None
+        return QueuedNotification(priority=priority, entry_id=entry_id, notification=notification)
+
+    # ===== Подтверждение и повторы =====
+
+    def ack(self, entries: List[QueuedNotification]) -> int:
+        """Подтвердить обработку и удалить сообщения из потоков - один pipeline"""
+        if not entries:
+            return 0
+        pipe = self.redis_client.pipeline(transaction=False)
+        for entry in entries:
+            stream = self.streams[entry.priority]
+            pipe.xack(stream, CONSUMER_GROUP, entry.entry_id)
+            pipe.xdel(stream, entry.entry_id)
+        results = pipe.execute()
+        return sum(int(acked) for acked in results[::2])
+
+    def requeue(self, entry: QueuedNotification) -> bool:
+        """
+        Повторить уведомление позже (retry_count + 1)
+
+        Returns:
+            False, если повторы исчерпаны (уведомление ушло в dead-letter поток)
+        """
+        notification = entry.notification
+        retry_count = notification.get("retry_count", 0)
+        if retry_count >= notification.get("max_retries", 3):
+            logger.warning(f"Notification {notification.get('id', 'unknown')} exceeded max retries")
+            self._dead_letter(entry.priority, entry.entry_id, {"data": json.dumps(notification)}, reason="max_retries")
+            return False
+
+        notification["retry_count"] = retry_count + 1
+        stream = self.streams[entry.priority]
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.xadd(stream, {"data": json.dumps(notification)})
+        pipe.xack(stream, CONSUMER_GROUP, entry.entry_id)
+        pipe.xdel(stream, entry.entry_id)
+        pipe.execute()
+        return True
+
+    def reclaim_stale(self, count: int = BATCH_SIZE) -> List[QueuedNotification]:
+        """
+        Забрать сообщения, зависшие у упавших consumer-ов дольше claim_min_idle_ms
+
+        Сообщения, выданные больше max_deliveries раз (worker падает на них
+        каждый раз), переносятся в dead-letter поток.
+        """
+        self.ensure_groups()
+        reclaimed = []
+        for priority in PRIORITIES:
+            stream = self.streams[priority]
+            start_id = "0-0"
+            while True:
+                next_id, claimed = self.redis_client.xautoclaim(
+                    stream, CONSUMER_GROUP, self.consumer_name,
+                    min_idle_time=self.claim_min_idle_ms, start_id=start_id, count=count
+                )[:2]
+                # Удаленные из потока сообщения приходят как None
+                claimed = [message for message in claimed if message and message[1]]
+                deliveries = self._deliveries(stream, claimed)
+                for entry_id, fields in claimed:
+                    entry_id = _to_str(entry_id)
+                    if deliveries.get(entry_id, 0) > self.max_deliveries:
+                        logger.error(f"☠️ Notification {entry_id} delivered {deliveries[entry_id]} times, dead-lettering")
+                        self._dead_letter(priority, entry_id, fields, reason="max_deliveries")
+                        continue
+                    entry = self._decode(priority, entry_id, fields)
+                    if entry is not None:
+                        reclaimed.append(entry)
+                next_id = _to_str(next_id)
+                if next_id == "0-0" or not claimed:
+                    break
+                start_id = next_id
+
+        if reclaimed:
+            logger.warning(f"♻️ Consumer {self.consumer_name} reclaimed {len(reclaimed)} stale notifications")
+        return reclaimed
+
+    def _deliveries(self, stream: str, claimed: List[Tuple[str, Dict]]) -> Dict[str, int]:
+        """Число выдач каждого забранного сообщения (XPENDING по диапазону ID)"""
+        if not claimed:
+            return {}
+        ids = [_to_str(entry_id) for entry_id, _ in claimed]
+        pending = self.redis_client.xpending_range(
+            stream, CONSUMER_GROUP, min=ids[0], max=ids[-1], count=len(ids) * 2,
+            consumername=self.consumer_name,
+        )
+        return {_to_str(item["message_id"]): item["times_delivered"] for item in pending}
+
+    def _dead_letter(self, priority: str, entry_id: str, fields: Dict, reason: str) -> None:
+        stream = self.streams[priority]
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.xadd(
+            DEAD_LETTER_STREAM_KEY,
+            {**{_to_str(k): _to_str(v) for k, v in fields.items()}, "priority": priority, "entry_id": entry_id, "reason": reason},
+            maxlen=DEAD_LETTER_MAXLEN, approximate=True,
+        )
+        pipe.xack(stream, CONSUMER_GROUP, entry_id)
+        pipe.xdel(stream, entry_id)
+        pipe.execute()
+
+    # ===== Метрики =====
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Состояние очереди по приоритетам - один pipeline
+
+        backlog - сообщений в потоке (ожидают выдачи + не подтверждены),
+        lag - еще не выданы ни одному consumer-у, pending - выданы и не
+        подтверждены, oldest_age_seconds - возраст самого старого сообщения.
+        """
+        self.ensure_groups()
+        pipe = self.redis_client.pipeline(transaction=False)
+        for priority in PRIORITIES:
+            stream = self.streams[priority]
+            pipe.xlen(stream)
+            pipe.xpending(stream, CONSUMER_GROUP)
+            pipe.xinfo_groups(stream)
+            pipe.xrange(stream, count=1)
+        pipe.xlen(DEAD_LETTER_STREAM_KEY)
+        results = pipe.execute()
+
+        now_ms = time.time() * 1000
+        metrics: Dict[str, Any] = {}
+        totals = {"backlog": 0, "lag": 0, "pending": 0}
+        for index, priority in enumerate(PRIORITIES):
+            backlog, pending, groups, oldest = results[index * 4:index * 4 + 4]
+            pending_count = pending.get("pending", 0) if isinstance(pending, dict) else 0
+            group = next((g for g in groups if _to_str(g.get("name")) == CONSUMER_GROUP), {})
+            lag = group.get("lag")
+            if lag is None:
+                # Redis < 7: подтвержденные удаляются, значит не выданные = длина - pending
+                lag = max(0, backlog - pending_count)
+            oldest_age = None
+            if oldest:
+                oldest_ms = int(_to_str(oldest[0][0]).split("-")[0])
+                oldest_age = round(max(0.0, now_ms - oldest_ms) / 1000, 3)
+            metrics[priority.lower()] = {
+                "backlog": backlog,
+                "lag": lag,
+                "pending": pending_count,
+                "oldest_age_seconds": oldest_age,
+            }
+            totals["backlog"] += backlog
+            totals["lag"] += lag
+            totals["pending"] += pending_count
+
+        metrics["total"] = totals
+        metrics["dead_letter"] = results[-1]
+        metrics["timestamp"] = datetime.now(timezone.utc).isoformat()
+        return metrics
@@ -0,0 +1,238 @@
+"""
+Поток событий синхронизации для обработки уведомлений вне блокировки синхронизации.
+
+Раньше уведомления (webhook о завершении, новые заказы, выкупы, отзывы...)
+отправлялись внутри _perform_sync_with_lock: блокировка кабинета держалась,
+пока не отработают все webhook-и, и медленный бот задерживал следующую
+синхронизацию. Теперь синхронизация коммитит данные, публикует компактное
+событие в Redis Stream и сразу отпускает блокировку, а уведомления
+обрабатывает consumer group в отдельной Celery задаче.
+
+Гарантии:
+- at-least-once: сообщение подтверждается (XACK) только после успешной
+  обработки; сообщения упавшего consumer-а забираются через XAUTOCLAIM,
+  когда простаивают дольше CLAIM_MIN_IDLE_MS;
+- идемпотентность: отправленные в рамках события уведомления записываются
+  в DeliveryLedger, и при повторной доставке не отправляются снова;
+- сообщения, упавшие больше MAX_DELIVERIES раз, переносятся в dead-letter поток.
+"""
+
+import os
+import json
+import socket
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = os.getenv("SYNC_EVENTS_STREAM", "stream:sync_events")
+DEAD_LETTER_STREAM_KEY = f"{STREAM_KEY}:dead"
+CONSUMER_GROUP = os.getenv("SYNC_EVENTS_GROUP", "notifications")
+STREAM_MAXLEN = int(os.getenv("SYNC_EVENTS_MAXLEN", "10000"))
+CLAIM_MIN_IDLE_MS = int(os.getenv("SYNC_EVENTS_CLAIM_IDLE_MS", "300000"))
+MAX_DELIVERIES = int(os.getenv("SYNC_EVENTS_MAX_DELIVERIES", "5"))
+BATCH_SIZE = int(os.getenv("SYNC_EVENTS_BATCH_SIZE", "10"))
+# Сколько хранятся отметки об отправке и обработке события
+DELIVERY_TTL = int(os.getenv("SYNC_EVENTS_DELIVERY_TTL", str(7 * 24 * 3600)))
+
+DONE_KEY = "sync_events:done:{event_id}"
+LEDGER_KEY = "sync_events:delivered:{event_id}"
+ATTEMPTS_KEY = "sync_events:attempts"
+
+SyncEvent = Dict[str, Any]
+
+
+def publish_sync_event(
+    redis_client,
+    cabinet_id: int,
+    previous_sync_at: Optional[datetime],
+    synced_at: datetime,
+    is_first_sync: bool,
+    change_counts: Optional[Dict[str, int]] = None
+) -> str:
+    """
+    Опубликовать событие завершения синхронизации кабинета.
+
+    Событие несет только окно синхронизации и счетчики изменений: сами
+    заказы/отзывы consumer выбирает из БД, куда они уже закоммичены.
+
+    Returns:
+        ID сообщения в потоке
+
+    Raises:
+        Exception: если Redis недоступен (вызывающий код обрабатывает синхронно)
+    """
+    fields = {
+        "cabinet_id": str(cabinet_id),
+        "previous_sync_at": previous_sync_at.isoformat() if previous_sync_at else "",
+        "synced_at": synced_at.isoformat(),
+        "is_first_sync": "1" if is_first_sync else "0",
+        "changes": json.dumps(change_counts or {}),
+    }
+    event_id = redis_client.xadd(STREAM_KEY, fields, maxlen=STREAM_MAXLEN, approximate=True)
+    if isinstance(event_id, bytes):
+        event_id = event_id.decode()
+    logger.info(f"📤 Sync event {event_id} published for cabinet {cabinet_id}")
+    return event_id
+
+
+def decode_sync_event(event_id: str, fields: Dict[Any, Any]) -> SyncEvent:
+    """Поля сообщения потока -> событие с типизированными значениями."""
+    fields = {_to_str(key): _to_str(value) for key, value in fields.items()}
+    previous_sync_at = fields.get("previous_sync_at") or None
+    return {
+        "event_id": event_id,
+        "cabinet_id": int(fields["cabinet_id"]),
+        "previous_sync_at": datetime.fromisoformat(previous_sync_at) if previous_sync_at else None,
+        "synced_at": datetime.fromisoformat(fields["synced_at"]),
+        "is_first_sync": fields.get("is_first_sync") == "1",
+        "changes": json.loads(fields.get("changes") or "{}"),
+    }
+
+
+def _to_str(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+class DeliveryLedger:
+    """
+    Отметки об уведомлениях, уже отправленных при обработке одного события.
+
+    При повторной доставке события (падение consumer-а после отправки части
+    webhook-ов) уже отправленные уведомления пропускаются.
+    """
+
+    def __init__(self, redis_client, event_id: str):
+        self.redis_client = redis_client
+        self.key = LEDGER_KEY.format(event_id=event_id)
+
+    def is_delivered(self, member: str) -> bool:
+        return bool(self.redis_client.sismember(self.key, member))
+
+    def mark_delivered(self, member: str) -> None:
+        self.redis_client.sadd(self.key, member)
+        self.redis_client.expire(self.key, DELIVERY_TTL)
+
+
+SyncEventHandler = Callable[[SyncEvent, DeliveryLedger], Awaitable[None]]
+
+
+class SyncEventConsumer:
+    """Consumer группы CONSUMER_GROUP потока событий синхронизации"""
+
+    def __init__(
+        self,
+        redis_client,
+        handler: SyncEventHandler,
+        consumer_name: Optional[str] = None,
+        claim_min_idle_ms: Optional[int] = None,
+        max_deliveries: Optional[int] = None
+    ):
+        self.redis_client = redis_client
+        self.handler = handler
+        self.consumer_name = consumer_name or f"{socket.gethostname()}:{os.getpid()}"
+        self.claim_min_idle_ms = CLAIM_MIN_IDLE_MS if claim_min_idle_ms is None else claim_min_idle_ms
+        self.max_deliveries = max_deliveries or MAX_DELIVERIES
+
+    def ensure_group(self) -> None:
+        """Создать consumer group (и поток), если их еще нет."""
+        try:
+            self.redis_client.xgroup_create(STREAM_KEY, CONSUMER_GROUP, id="0", mkstream=True)
+            logger.info(f"📡 Consumer group {CONSUMER_GROUP} created for {STREAM_KEY}")
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def read_new(self, count: int = BATCH_SIZE, block_ms: Optional[int] = None) -> List[Tuple[str, Dict]]:
+        """Новые сообщения, еще не выданные ни одному consumer-у группы."""
+        response = self.redis_client.xreadgroup(
+            CONSUMER_GROUP, self.consumer_name, {STREAM_KEY: ">"}, count=count, block=block_ms
+        )
+        messages = []
+        for _, stream_messages in response or []:
+            messages.extend(stream_messages)
+        return messages
+
+    def claim_stale(self, count: int = BATCH_SIZE) -> List[Tuple[str, Dict]]:
+        """Сообщения, зависшие у упавших consumer-ов дольше claim_min_idle_ms."""
+        messages = []
+        start_id = "0-0"
+        while True:
+            response = self.redis_client.xautoclaim(
+                STREAM_KEY, CONSUMER_GROUP, self.consumer_name,
+                min_idle_time=self.claim_min_idle_ms, start_id=start_id, count=count
+            )
+            next_id, claimed = _to_str(response[0]), response[1]
+            # Удаленные из потока (MAXLEN) сообщения приходят как None
+            messages.extend(message for message in claimed if message and message[1])
+            if next_id == "0-0" or not claimed:
+                return messages
+            start_id = next_id
+
+    async def consume(self, count: int = BATCH_SIZE) -> Dict[str, int]:
+        """
+        Обработать зависшие и новые сообщения и выйти.
+
+        Returns:
+            {"processed", "skipped", "failed", "dead_lettered"}
+        """
+        self.ensure_group()
+        stats = {"processed": 0, "skipped": 0, "failed": 0, "dead_lettered": 0}
+
+        for event_id, fields in self.claim_stale(count):
+            stats[await self._process(_to_str(event_id), fields)] += 1
+        while True:
+            messages = self.read_new(count)
+            if not messages:
+                break
+            for event_id, fields in messages:
+                stats[await self._process(_to_str(event_id), fields)] += 1
+
+        if any(stats.values()):
+            logger.info(f"📥 Sync events consumer {self.consumer_name}: {stats}")
+        return stats
+
+    async def _process(self, event_id: str, fields: Dict) -> str:
+        done_key = DONE_KEY.format(event_id=event_id)
+        if self.redis_client.exists(done_key):
+            # Обработано, но упали до XACK
+            self._ack(event_id)
+            return "skipped"
+
+        attempts = self.redis_client.hincrby(ATTEMPTS_KEY, event_id, 1)
+        if attempts > self.max_deliveries:
+            logger.error(f"☠️ Sync event {event_id} failed {attempts - 1} times, moving to {DEAD_LETTER_STREAM_KEY}")
+            self.redis_client.xadd(DEAD_LETTER_STREAM_KEY, dict(fields, event_id=event_id), maxlen=STREAM_MAXLEN, approximate=True)
+            self._ack(event_id)
+            return "dead_lettered"
+
+        try:
+            event = decode_sync_event(event_id, fields)
+            await self.handler(event, DeliveryLedger(self.redis_client, event_id))
+        except Exception as e:
+            # Не подтверждаем: сообщение останется в PEL и будет забрано повторно
+            logger.error(f"❌ Sync event {event_id} processing failed (attempt {attempts}): {e}")
+            return "failed"
+
+        self.redis_client.set(done_key, "1", ex=DELIVERY_TTL)
+        self._ack(event_id)
+        return "processed"
+
+    def _ack(self, event_id: str) -> None:
+        self.redis_client.xack(STREAM_KEY, CONSUMER_GROUP, event_id)
+        self.redis_client.hdel(ATTEMPTS_KEY, event_id)
+
+    def get_lag(self) -> Dict[str, Any]:
+        """Состояние группы: недоставленные (lag) и неподтвержденные (pending) сообщения."""
+        self.ensure_group()
+        for group in self.redis_client.xinfo_groups(STREAM_KEY):
+            group = {_to_str(key): value for key, value in group.items()}
+            if _to_str(group.get("name")) == CONSUMER_GROUP:
+                return {
+                    "lag": group.get("lag"),
+                    "pending": group.get("pending", 0),
+                    "consumers": group.get("consumers", 0),
+                    "last_delivered_id": _to_str(group.get("last-delivered-id")),
+                }
+        return {"lag": None, "pending": 0, "consumers": 0, "last_delivered_id": None}
@@ -0,0 +1,47 @@
+"""
+Celery задачи обработки уведомлений по событиям синхронизации
+"""
+import asyncio
+import logging
+from typing import Any, Dict
+
+from app.core.celery_app import celery_app
+from app.core.database import SessionLocal
+from app.core.redis import get_redis_client
+from .notification_service import NotificationService
+from .sync_event_stream import DeliveryLedger, SyncEvent, SyncEventConsumer
+
+logger = logging.getLogger(__name__)
+
+
+async def _handle_sync_event(event: SyncEvent, ledger: DeliveryLedger) -> None:
+    """Уведомления по одному событию синхронизации, в своей сессии БД"""
+    db = SessionLocal()
+    try:
+        result = await NotificationService(db).process_sync_completed(
+            event["cabinet_id"], event["previous_sync_at"], delivery_ledger=ledger
+        )
+        db.commit()
+        logger.info(f"📢 Sync event {event['event_id']} for cabinet {event['cabinet_id']} processed: {result}")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@celery_app.task(bind=True)
+def consume_sync_events(self) -> Dict[str, Any]:
+    """
+    Обработка потока событий синхронизации.
+
+    Запускается после каждой синхронизации и периодически (beat) - чтобы
+    забрать сообщения упавших воркеров и события, для которых триггер потерялся.
+    """
+    consumer = SyncEventConsumer(get_redis_client(), _handle_sync_event)
+    try:
+        stats = asyncio.run(consumer.consume())
+        return {"status": "success", **stats}
+    except Exception as e:
+        logger.error(f"❌ Sync events consumer failed: {e}")
+        return {"status": "error", "error": str(e)}
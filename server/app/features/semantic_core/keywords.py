@@ -0,0 +1,270 @@
+"""
+Локальное извлечение ключевых фраз для семантического ядра.
+
+Раньше в GPT уходили все описания товаров конкурентов одним текстом: промпт
+упирался в лимит контекста (и обрезался), стоил дорого и полностью
+пересчитывался при каждой генерации. Теперь до вызова LLM:
+
+1. из каждого описания извлекаются кандидаты - n-граммы 1-3 слов с частотами,
+   ключом служит последовательность основ слов (платья/платье -> одна фраза).
+   Результат кэшируется в Redis по sha256 описания - неизменные описания
+   повторно не разбираются;
+2. фразы ранжируются по корпусу категории: TF с насыщением BM25 и
+   сглаженным IDF, суммарно по описаниям - частотные для ниши фразы
+   остаются наверху, случайные фразы из одного описания отсекаются;
+3. фразы группируются в кластеры по ведущей основе, в LLM уходят только
+   компактные кластеры (см. gpt_integration/semantic_core).
+"""
+
+import os
+import re
+import json
+import math
+import hashlib
+import logging
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_CACHE_TTL = int(os.getenv("SEMANTIC_CORE_EXTRACTION_TTL", str(30 * 24 * 3600)))
+MAX_CLUSTERS = int(os.getenv("SEMANTIC_CORE_MAX_CLUSTERS", "60"))
+PHRASES_PER_CLUSTER = int(os.getenv("SEMANTIC_CORE_PHRASES_PER_CLUSTER", "8"))
+EXTRACTION_KEY = "semantic_core:extract:{digest}"
+# Версия алгоритма извлечения: при изменении токенизации старый кэш не используется
+EXTRACTION_VERSION = 1
+
+MAX_NGRAM = 3
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_RE = re.compile(r"[a-zа-я0-9]+(?:-[a-zа-я0-9]+)*")
+# Границы фраз: n-граммы не пересекают знаки препинания
+PHRASE_SPLIT_RE = re.compile(r"[.,;:!?()\[\]{}\"«»•\n\r\t/|]+")
+
+STOPWORDS = frozenset("""
+и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по только ее мне было
+вот от меня еще нет о из ему теперь когда даже ну вдруг ли если уже или ни быть был него до вас
+нибудь опять уж вам ведь там потом себя ничего ей может они тут где есть надо ней для мы тебя их
+чем была сам чтоб без будто чего раз тоже себе под будет ж тогда кто этот того потому этого какой
+совсем ним здесь этом один почти мой тем чтобы нее сейчас были куда зачем всех никогда можно при
+наконец два об другой хоть после над больше тот через эти нас про всего них какая много разве три
+эту моя впрочем хорошо свою этой перед иногда лучше чуть том нельзя такой им более всегда конечно
+всю между это также который которая которые которое которых вашего ваш ваша ваше ваши очень
+товар товара товаров шт см мм это
+the and for with of to in on a an is are
+""".split())
+
+# Окончания для грубого стемминга (от длинных к коротким)
+RU_ENDINGS = (
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ей", "ий", "ый", "ой", "ая", "яя",
+    "ое", "ее", "ые", "ие", "ам", "ям", "ах", "ях", "ом", "ем", "ов", "ев", "ую", "юю",
+    "а", "я", "ы", "и", "о", "е", "у", "ю", "ь",
+)
+MIN_STEM_LENGTH = 4
+
+_redis_client = None
+
+
+def tokenize(text: str) -> List[List[str]]:
+    """Текст -> фразовые сегменты -> токены без стоп-слов"""
+    segments = []
+    for segment in PHRASE_SPLIT_RE.split(text.lower().replace("ё", "е")):
+        tokens = [
+            token for token in TOKEN_RE.findall(segment)
+            if token not in STOPWORDS and (len(token) >= 3 or any(ch.isdigit() for ch in token))
+        ]
+        if tokens:
+            segments.append(tokens)
+    return segments
+
+
+def stem(token: str) -> str:
+    """Грубая основа слова: отрезает типичное окончание, если основа остается не короче 4 букв"""
+    for ending in RU_ENDINGS:
+        if token.endswith(ending) and len(token) - len(ending) >= MIN_STEM_LENGTH:
+            return token[:-len(ending)]
+    return token
+
+
+def extract_candidates(description: str) -> Dict[str, Any]:
+    """
+    Кандидаты в ключевые фразы одного описания
+
+    Returns:
+        {"length": число токенов, "terms": {ключ основ: [фраза, частота]}}
+    """
+    counts: Counter = Counter()
+    surfaces: Dict[str, Counter] = defaultdict(Counter)
+    length = 0
+    for tokens in tokenize(description):
+        length += len(tokens)
+        stems = [stem(token) for token in tokens]
+        for n in range(1, MAX_NGRAM + 1):
+            for start in range(len(tokens) - n + 1):
+                key = " ".join(stems[start:start + n])
+                counts[key] += 1
+                surfaces[key][" ".join(tokens[start:start + n])] += 1
+    return {
+        "length": length,
+        "terms": {key: [surfaces[key].most_common(1)[0][0], count] for key, count in counts.items()},
+    }
+
+
+def description_digest(description: str) -> str:
+    return hashlib.sha256(f"v{EXTRACTION_VERSION}:{description}".encode("utf-8")).hexdigest()
+
+
+class KeywordExtractor:
+    """Извлечение кандидатов с кэшем по хэшу описания"""
+
+    def __init__(self, redis_client=None, ttl: Optional[int] = None):
+        self._redis = redis_client
+        self.ttl = ttl or EXTRACTION_CACHE_TTL
+        self.stats = {"cached": 0, "extracted": 0}
+
+    @property
+    def redis(self):
+        global _redis_client
+        if self._redis is None:
+            if _redis_client is None:
+                from app.core.redis import get_redis_client
+                _redis_client = get_redis_client()
+            self._redis = _redis_client
+        return self._redis
+
+    def extract_many(self, descriptions: Iterable[str]) -> List[Dict[str, Any]]:
+        """Кандидаты для каждого описания (одинаковые описания разбираются один раз)"""
+        unique = list(dict.fromkeys(descriptions))
+        digests = [description_digest(description) for description in unique]
+        cached = self._load(digests)
+
+        extractions = []
+        to_store = {}
+        for description, digest in zip(unique, digests):
+            extraction = cached.get(digest)
+            if extraction is None:
+                extraction = extract_candidates(description)
+                to_store[digest] = extraction
+                self.stats["extracted"] += 1
+            else:
+                self.stats["cached"] += 1
+            extractions.append(extraction)
+
+        self._store(to_store)
+        return extractions
+
+    def _load(self, digests: List[str]) -> Dict[str, Dict[str, Any]]:
+        if not digests:
+            return {}
+        try:
+            values = self.redis.mget([EXTRACTION_KEY.format(digest=digest) for digest in digests])
+        except Exception as e:
+            logger.warning(f"⚠️ Semantic core extraction cache unavailable: {e}")
+            return {}
+        return {digest: json.loads(value) for digest, value in zip(digests, values) if value}
+
+    def _store(self, extractions: Dict[str, Dict[str, Any]]) -> None:
+        if not extractions:
+            return
+        try:
+            pipe = self.redis.pipeline()
+            for digest, extraction in extractions.items():
+                pipe.set(EXTRACTION_KEY.format(digest=digest), json.dumps(extraction, ensure_ascii=False), ex=self.ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to cache semantic core extractions: {e}")
+
+
+def score_terms(extractions: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Вес фраз по корпусу: сумма по описаниям BM25-насыщенной частоты, умноженная
+    на сглаженный IDF (ln((1 + N) / (1 + df)) + 1)
+
+    Фразы, встретившиеся только в одном описании, отбрасываются, если описаний
+    больше двух.
+    """
+    total = len(extractions)
+    if not total:
+        return {}
+    avg_length = sum(e["length"] for e in extractions) / total or 1.0
+    min_df = 2 if total > 2 else 1
+
+    df: Counter = Counter()
+    for extraction in extractions:
+        df.update(extraction["terms"].keys())
+
+    scores: Dict[str, float] = defaultdict(float)
+    surfaces: Dict[str, Counter] = defaultdict(Counter)
+    for extraction in extractions:
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * extraction["length"] / avg_length)
+        for key, (surface, tf) in extraction["terms"].items():
+            if df[key] < min_df:
+                continue
+            scores[key] += tf * (BM25_K1 + 1) / (tf + norm)
+            surfaces[key][surface] += tf
+
+    return {
+        key: {
+            "phrase": surfaces[key].most_common(1)[0][0],
+            "score": score * (math.log((1 + total) / (1 + df[key])) + 1),
+            "documents": df[key],
+        }
+        for key, score in scores.items()
+    }
+
+
+def cluster_terms(
+    terms: Dict[str, Dict[str, Any]],
+    max_clusters: int = MAX_CLUSTERS,
+    phrases_per_cluster: int = PHRASES_PER_CLUSTER
+) -> List[Dict[str, Any]]:
+    """
+    Группирует фразы по ведущей основе: многословная фраза попадает в кластер
+    своего самого весомого слова. Возвращает кластеры по убыванию веса.
+    """
+    unigram_score = {key: term["score"] for key, term in terms.items() if " " not in key}
+    groups: Dict[str, List[Tuple[str, Dict[str, Any]]]] = defaultdict(list)
+    for key, term in terms.items():
+        stems = key.split(" ")
+        head = max(stems, key=lambda s: unigram_score.get(s, 0.0))
+        if head not in unigram_score:
+            continue
+        groups[head].append((key, term))
+
+    clusters = []
+    for head, members in groups.items():
+        members.sort(key=lambda item: item[1]["score"], reverse=True)
+        phrases = []
+        seen = set()
+        for _, term in members:
+            if term["phrase"] not in seen:
+                seen.add(term["phrase"])
+                phrases.append(term["phrase"])
+            if len(phrases) >= phrases_per_cluster:
+                break
+        clusters.append({
+            "keyword": terms[head]["phrase"],
+            "weight": round(sum(term["score"] for _, term in members), 2),
+            "documents": terms[head]["documents"],
+            "phrases": phrases,
+        })
+
+    clusters.sort(key=lambda cluster: cluster["weight"], reverse=True)
+    return clusters[:max_clusters]
+
+
+def build_keyword_clusters(
+    descriptions: List[str],
+    extractor: Optional[KeywordExtractor] = None,
+    max_clusters: int = MAX_CLUSTERS
+) -> List[Dict[str, Any]]:
+    """Описания товаров -> компактные кластеры ключевых фраз для LLM"""
+    extractor = extractor or KeywordExtractor()
+    extractions = extractor.extract_many(descriptions)
+    clusters = cluster_terms(score_terms(extractions), max_clusters=max_clusters)
+    logger.info(
+        f"🔑 Keyword clusters: {len(descriptions)} descriptions -> {len(clusters)} clusters "
+        f"(extracted {extractor.stats['extracted']}, from cache {extractor.stats['cached']})"
+    )
+    return clusters
@@ -3,6 +3,8 @@ Celery-задачи для генерации агрегированного с
 
 Логика аналогична generate_semantic_core_task из features.competitors.tasks,
 но вместо одного конкурента используется весь кабинет WB и категория.
+Описаний по кабинету много, поэтому ключевые фразы извлекаются локально
+(features.semantic_core.keywords), а GPT получает только их кластеры.
 """
 
 import logging
@@ -16,6 +18,7 @@ from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.celery_app import celery_app
 from app.features.semantic_core.crud import CabinetSemanticCoreCRUD
+from app.features.semantic_core.keywords import build_keyword_clusters
 from app.features.semantic_core.models import CabinetSemanticCore
 from app.features.competitors.models import CompetitorLink, CompetitorProduct
 from app.features.wb_api.models import CabinetUser
@@ -203,19 +206,19 @@ def generate_cabinet_semantic_core_task(self, core_id: int) -> Dict[str, Any]:
             )
             return {"status": "error", "message": error_msg}
 
-        descriptions_text = "\n---\n".join(descriptions)
-
-        # Контроль токенов
-        max_text_length = int(os.getenv("SEMANTIC_CORE_MAX_TEXT_LENGTH", "15000"))
-        if len(descriptions_text) > max_text_length:
-            logger.warning(
-                "Текст описаний для cabinet semantic core ID %s превышает лимит (%s > %s). "
-                "Обрезаем.",
-                core_id,
-                len(descriptions_text),
-                max_text_length,
+        # Локальное извлечение ключевых фраз: в GPT уходят только компактные кластеры
+        keyword_clusters = build_keyword_clusters(descriptions)
+        if not keyword_clusters:
+            error_msg = "Не удалось выделить ключевые фразы из описаний товаров."
+            CabinetSemanticCoreCRUD.update_status(db, core_id, "error", error_msg)
+            logger.warning("Cabinet semantic core ID %s: %s", core_id, error_msg)
+            send_cabinet_semantic_core_completion_notification(
+                core_id=core_id,
+                status="error",
+                category_name=category_name,
+                error_message=error_msg,
             )
-            descriptions_text = descriptions_text[:max_text_length]
+            return {"status": "error", "message": error_msg}
 
         # Вызов GPT-сервиса
         gpt_service_url = os.getenv("GPT_INTEGRATION_URL")
@@ -227,7 +230,10 @@ def generate_cabinet_semantic_core_task(self, core_id: int) -> Dict[str, Any]:
             raise ValueError("Переменная окружения API_SECRET_KEY не установлена.")
 
         headers = {"X-API-Key": gpt_api_key}
-        payload = {"descriptions_text": descriptions_text}
+        payload = {
+            "keyword_clusters": keyword_clusters,
+            "category_name": category_name,
+        }
 
         logger.info(
             "Отправка запроса в GPT-сервис для cabinet semantic core ID %s...", core_id
@@ -2,9 +2,11 @@
 Статистика и аналитика.
 
 Этот модуль содержит:
-- routes: маршруты для получения статистики (/stats, /analytics)
+- routes: маршруты для получения статистики (/stats, /analytics, /metrics)
 """
 
-from .routes import stats_router
+from app.utils.lazy import lazy_exports
+
+__getattr__ = lazy_exports(__name__, {"stats_router": (".routes", "stats_router")})
 
 __all__ = ["stats_router"]
\ No newline at end of file
@@ -2,22 +2,36 @@
 Маршруты для статистики и аналитики.
 """
 
+import os
+import time
+import asyncio
+from datetime import timedelta
+
 from fastapi import APIRouter, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy.orm import Session
+from ...core import metrics
 from ...core.database import get_db
 from ..user.crud import UserCRUD
 
 stats_router = APIRouter(prefix="/stats", tags=["statistics"])
 
+# Число пользователей меняется редко - не считаем его на каждый запрос
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "60"))
+_total_users_cache = {"value": None, "expires_at": 0.0}
+
 
 @stats_router.get("/")
 async def get_stats(db: Session = Depends(get_db)):
     """
     Получение общей статистики системы.
     """
-    user_crud = UserCRUD(db)
-    total_users = user_crud.get_total_users()
+    now = time.monotonic()
+    if _total_users_cache["value"] is None or now >= _total_users_cache["expires_at"]:
+        user_crud = UserCRUD(db)
+        _total_users_cache["value"] = user_crud.get_total_users()
+        _total_users_cache["expires_at"] = now + STATS_CACHE_TTL
+    total_users = _total_users_cache["value"]
     
     return JSONResponse(
         status_code=200,
@@ -31,15 +45,64 @@ async def get_stats(db: Session = Depends(get_db)):
 @stats_router.get("/analytics")
 async def get_analytics():
     """
-    Получение аналитических данных.
+    Получение аналитических данных: нагрузка, латентность маршрутов,
+    пул соединений БД, очереди Celery и этапы синхронизации.
     """
+    # Сбор читает Redis (снимки процессов, очереди Celery) - не в event loop
+    collected = await asyncio.to_thread(metrics.registry.collect)
+    uptime_seconds = int(time.time() - metrics.registry.started_at)
+
+    routes = {}
+    for (name, labels), values in collected["histograms"].items():
+        if name == metrics.HTTP_LATENCY.name:
+            method, route = labels
+            routes[f"{method} {route}"] = _latency_summary(metrics.HTTP_LATENCY.buckets, values)
+    errors = sum(
+        value for (name, labels), value in collected["counters"].items()
+        if name == metrics.HTTP_REQUESTS.name and int(labels[2]) >= 500
+    )
+    sync_stages = {
+        labels[0]: _latency_summary(metrics.SYNC_STAGE_DURATION.buckets, values)
+        for (name, labels), values in collected["histograms"].items()
+        if name == metrics.SYNC_STAGE_DURATION.name
+    }
+
     return JSONResponse(
         status_code=200,
         content={
             "analytics": {
-                "active_sessions": 0,
-                "requests_per_minute": 0,
-                "uptime": "running"
+                "active_sessions": collected["active_sessions"],
+                "requests_per_minute": collected["requests_per_minute"],
+                "uptime": str(timedelta(seconds=uptime_seconds)),
+                "uptime_seconds": uptime_seconds,
+                "processes": collected["processes"],
+                "server_errors": int(errors),
+                "routes": routes,
+                "db_pool": {labels["state"]: value for labels, value in collected["gauges"].get("db_pool_connections", [])},
+                "celery_queues": {labels["queue"]: value for labels, value in collected["gauges"].get("celery_queue_depth", [])},
+                "sync_stages": sync_stages,
             }
         }
-    )
\ No newline at end of file
+    )
+
+
+@stats_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Метрики в текстовом формате Prometheus.
+    """
+    text = await asyncio.to_thread(metrics.registry.render_prometheus)
+    return PlainTextResponse(
+        text,
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def _latency_summary(buckets, values):
+    count = int(sum(values[:-1]))
+    return {
+        "count": count,
+        "avg_seconds": round(values[-1] / count, 6) if count else None,
+        "p50_seconds": metrics.histogram_quantile(buckets, values, 0.5),
+        "p95_seconds": metrics.histogram_quantile(buckets, values, 0.95),
+    }
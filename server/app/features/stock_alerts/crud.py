@@ -13,10 +13,59 @@ from .schemas import DailySalesAnalyticsCreate, StockAlertHistoryCreate
 
 logger = logging.getLogger(__name__)
 
+# Строк в одном INSERT: 7 параметров на строку, лимит SQLite - 32766 параметров
+BULK_UPSERT_CHUNK_SIZE = 2000
+
+DAILY_ANALYTICS_KEY = ['cabinet_id', 'nm_id', 'warehouse_name', 'size', 'date']
+
 
 class DailySalesAnalyticsCRUD:
     """CRUD операции для daily_sales_analytics"""
     
+    @staticmethod
+    def bulk_upsert(
+        db: Session,
+        rows: List[Dict[str, Any]],
+        chunk_size: int = BULK_UPSERT_CHUNK_SIZE
+    ) -> int:
+        """
+        Вставить или обновить записи аналитики пачкой (INSERT ... ON CONFLICT)
+        
+        Args:
+            rows: Словари с полями DailySalesAnalyticsCreate
+        
+        Returns:
+            Количество записанных строк
+        """
+        if not rows:
+            return 0
+        
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            for row in rows:
+                DailySalesAnalyticsCRUD.create_or_update(db, DailySalesAnalyticsCreate(**row))
+            return len(rows)
+        
+        updated_at = datetime.utcnow()
+        for start in range(0, len(rows), chunk_size):
+            stmt = insert(DailySalesAnalytics).values(rows[start:start + chunk_size])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=DAILY_ANALYTICS_KEY,
+                set_={
+                    'orders_count': stmt.excluded.orders_count,
+                    'quantity_ordered': stmt.excluded.quantity_ordered,
+                    'updated_at': updated_at
+                }
+            )
+            db.execute(stmt)
+        
+        db.commit()
+        return len(rows)
+    
     @staticmethod
     def create_or_update(
         db: Session, 
@@ -0,0 +1,199 @@
+"""
+Ежедневная агрегация продаж и проверка алертов по остаткам для всех кабинетов.
+
+Раньше aggregate_daily_sales_all_cabinets обходил кабинеты и их пользователей
+последовательно, вызывая asyncio.run на каждый шаг, и время ежедневной задачи
+росло линейно с числом клиентов. DailySalesRunner обрабатывает кабинеты
+параллельно в одном event loop:
+
+- не больше concurrency кабинетов одновременно, каждый кабинет занимает ровно
+  один слот (его пользователи обрабатываются по очереди) - крупный продавец
+  не может занять все слоты и задержать остальных;
+- у кабинета есть бюджет времени на алерты: он проверяется перед каждым
+  пользователем, по его истечении кабинет помечается timeout, а слот
+  освобождается для следующего;
+- в потоках выполняется только синхронная работа с БД: агрегация (GROUP BY +
+  upsert), анализ остатков с фильтрами (prepare_alerts) и запись истории
+  алертов - в общем event loop эти запросы выстроили бы кабинеты в очередь.
+  Подготовленные алерты возвращаются в event loop раннера, и webhook-и
+  отправляются из него; сессии БД берутся из общего пула SessionLocal.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.features.user.models import User
+from app.features.wb_api.crud_cabinet_users import CabinetUserCRUD
+from app.features.wb_api.models import WBCabinet
+from .notification_service import StockAlertNotificationService
+from .sales_aggregator import DailySalesAggregator
+
+logger = logging.getLogger(__name__)
+
+CONCURRENCY = int(os.getenv("STOCK_ALERTS_CONCURRENCY", "4"))
+CABINET_TIME_BUDGET = float(os.getenv("STOCK_ALERTS_CABINET_TIME_BUDGET", "600"))
+
+
+class DailySalesRunner:
+    """Параллельная обработка кабинетов с ограничением и бюджетом времени на кабинет"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        concurrency: Optional[int] = None,
+        cabinet_time_budget: Optional[float] = None
+    ):
+        self.session_factory = session_factory
+        self.concurrency = concurrency or CONCURRENCY
+        self.cabinet_time_budget = cabinet_time_budget or CABINET_TIME_BUDGET
+
+    async def run(self, target_date: date, cabinet_ids: Optional[List[int]] = None) -> Dict[str, Any]:
+        """
+        Агрегирует продажи за target_date и проверяет алерты для кабинетов
+
+        Args:
+            target_date: Дата агрегации
+            cabinet_ids: Кабинеты для обработки (по умолчанию - все активные)
+
+        Returns:
+            Сводка и отчет по каждому кабинету (статус, время, ошибки)
+        """
+        started = time.monotonic()
+        if cabinet_ids is None:
+            cabinet_ids = self._active_cabinet_ids()
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        reports = await asyncio.gather(*(
+            self._process_cabinet(cabinet_id, target_date, semaphore) for cabinet_id in cabinet_ids
+        ))
+
+        summary = self._summarize(reports)
+        summary.update({
+            "status": "success",
+            "date": str(target_date),
+            "concurrency": self.concurrency,
+            "duration_ms": int((time.monotonic() - started) * 1000),
+            "cabinets": reports,
+        })
+        logger.info(
+            f"Daily aggregation and alerts completed in {summary['duration_ms']} ms: "
+            f"{summary['aggregation']}, {summary['alerts']}"
+        )
+        return summary
+
+    def _active_cabinet_ids(self) -> List[int]:
+        db = self.session_factory()
+        try:
+            return [row.id for row in db.query(WBCabinet.id).filter(WBCabinet.is_active == True).order_by(WBCabinet.id)]
+        finally:
+            db.close()
+
+    async def _process_cabinet(self, cabinet_id: int, target_date: date, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        report: Dict[str, Any] = {
+            "cabinet_id": cabinet_id,
+            "status": "success",
+            "aggregation": None,
+            "alerts_sent": 0,
+            "users_checked": 0,
+            "users_failed": 0,
+            "error": None,
+        }
+        async with semaphore:
+            started = time.monotonic()
+            try:
+                # 1. Агрегация за дату
+                aggregation = await asyncio.to_thread(self._aggregate, cabinet_id, target_date)
+                report["aggregation"] = aggregation
+                if aggregation.get("status") != "success":
+                    report["status"] = "aggregation_failed"
+                    report["error"] = aggregation.get("error")
+                    return report
+
+                # 2. Алерты по остаткам в пределах бюджета времени кабинета
+                deadline = started + self.cabinet_time_budget
+                await self._check_alerts(cabinet_id, report, deadline)
+            except asyncio.TimeoutError:
+                report["status"] = "timeout"
+                report["error"] = f"Cabinet time budget {self.cabinet_time_budget:.0f}s exceeded"
+                logger.warning(f"⏱️ Cabinet {cabinet_id}: stock alerts stopped after {self.cabinet_time_budget:.0f}s budget")
+            except Exception as e:
+                report["status"] = "error"
+                report["error"] = str(e)
+                logger.error(f"Error processing cabinet {cabinet_id}: {e}")
+            finally:
+                report["duration_ms"] = int((time.monotonic() - started) * 1000)
+        return report
+
+    def _aggregate(self, cabinet_id: int, target_date: date) -> Dict[str, Any]:
+        db = self.session_factory()
+        try:
+            return DailySalesAggregator(db).aggregate_date_range_sync(cabinet_id, target_date, target_date)
+        finally:
+            db.close()
+
+    async def _check_alerts(self, cabinet_id: int, report: Dict[str, Any], deadline: float) -> None:
+        """
+        Алерты кабинета: пользователи по очереди, бюджет проверяется перед каждым.
+
+        Сессия кабинета используется последовательно из потоков to_thread
+        (одновременно к ней обращается только один поток).
+        """
+        db = self.session_factory()
+        try:
+            users = await asyncio.to_thread(self._cabinet_users, db, cabinet_id)
+            notification_service = StockAlertNotificationService(db)
+
+            for user_id, bot_webhook_url in users:
+                if time.monotonic() >= deadline:
+                    raise asyncio.TimeoutError()
+                if not bot_webhook_url:
+                    logger.warning(f"No webhook URL for user {user_id}")
+                    continue
+                try:
+                    prepared = await asyncio.to_thread(notification_service.prepare_alerts, cabinet_id, user_id)
+                    sent_positions = await notification_service.send_alerts(user_id, bot_webhook_url, prepared)
+                    if sent_positions:
+                        await asyncio.to_thread(notification_service.record_alerts, cabinet_id, user_id, sent_positions)
+                    report["users_checked"] += 1
+                    report["alerts_sent"] += len(sent_positions)
+                except Exception as e:
+                    logger.error(f"Error checking alerts for user {user_id}: {e}")
+                    report["users_failed"] += 1
+        finally:
+            await asyncio.to_thread(db.close)
+
+    @staticmethod
+    def _cabinet_users(db: Session, cabinet_id: int) -> List[Tuple[int, Optional[str]]]:
+        """(id, bot_webhook_url) пользователей кабинета - без ORM объектов в event loop"""
+        user_ids = CabinetUserCRUD().get_cabinet_users(db, cabinet_id)
+        if not user_ids:
+            return []
+        return [tuple(row) for row in db.query(User.id, User.bot_webhook_url).filter(User.id.in_(user_ids))]
+
+    @staticmethod
+    def _summarize(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+        aggregated = [r for r in reports if r["aggregation"] and r["aggregation"].get("status") == "success"]
+        alerts_done = [r for r in reports if r["status"] == "success"]
+        return {
+            "aggregation": {
+                "cabinets_processed": len(aggregated),
+                "cabinets_failed": len(reports) - len(aggregated),
+            },
+            "alerts": {
+                "cabinets_processed": len(alerts_done),
+                "cabinets_failed": len(aggregated) - len(alerts_done),
+                "users_failed": sum(r["users_failed"] for r in reports),
+                "total_alerts_sent": sum(r["alerts_sent"] for r in reports),
+            },
+            "slowest_cabinets": [
+                {"cabinet_id": r["cabinet_id"], "duration_ms": r["duration_ms"]}
+                for r in sorted(reports, key=lambda r: r["duration_ms"], reverse=True)[:5]
+            ],
+        }
@@ -58,106 +58,144 @@ class StockAlertNotificationService:
             Статистика отправки уведомлений
         """
         try:
-            logger.info(f"Checking stock alerts for cabinet {cabinet_id}, user {user_id}")
-            
-            # Проверяем настройки пользователя
-            user_settings = self.db.query(NotificationSettings).filter(
-                NotificationSettings.user_id == user_id
-            ).first()
-            
-            if not user_settings or not user_settings.critical_stocks_enabled:
-                logger.info(f"Stock alerts disabled for user {user_id}")
-                return {
-                    "status": "disabled",
-                    "alerts_sent": 0,
-                    "alerts_skipped": 0,
-                    "positions_analyzed": 0
-                }
+            prepared = self.prepare_alerts(cabinet_id, user_id)
+            if prepared["status"] != "success" or not prepared["positions"]:
+                return self._alerts_result(prepared, 0)
 
-            # Получаем игнор-лист пользователя
-            ignore_list = self.ignore_crud.get_by_user(self.db, user_id)
-            ignore_set = set(ignore_list)
-            
-            # Получаем период перспективы из настроек пользователя (по умолчанию 3 дня)
-            perspective_days = getattr(user_settings, 'stock_analysis_days', 3)
-            
-            # Получаем рисковые позиции
-            at_risk_positions = await self.analyzer.analyze_stock_positions(cabinet_id, perspective_days=perspective_days)
+            sent_positions = await self.send_alerts(user_id, bot_webhook_url, prepared)
+            self.record_alerts(cabinet_id, user_id, sent_positions)
+            return self._alerts_result(prepared, len(sent_positions))
             
-            if not at_risk_positions:
-                logger.info(f"No at-risk positions found for cabinet {cabinet_id}")
-                return {"status": "success", "alerts_sent": 0, "alerts_skipped": 0, "positions_analyzed": 0}
+        except Exception as e:
+            logger.error(f"Error in check_and_send_alerts: {e}")
+            return {"status": "error", "error": str(e), "alerts_sent": 0, "alerts_skipped": 0, "positions_analyzed": 0}
 
-            initial_count = len(at_risk_positions)
-            
-            # Фильтруем по игнор-листу
-            filtered_positions = [p for p in at_risk_positions if p['nm_id'] not in ignore_set]
-            
-            skipped_due_to_ignore = initial_count - len(filtered_positions)
-            if skipped_due_to_ignore > 0:
-                logger.info(f"Skipped {skipped_due_to_ignore} positions from user's ignore list.")
+    def prepare_alerts(self, cabinet_id: int, user_id: int) -> Dict[str, Any]:
+        """
+        Позиции для уведомления (шаги 1-3 check_and_send_alerts)
 
-            if not filtered_positions:
-                logger.info(f"All at-risk positions are in the user's ignore list.")
-                return {"status": "success", "alerts_sent": 0, "alerts_skipped": skipped_due_to_ignore, "positions_analyzed": initial_count}
-            
-            logger.info(f"Found {len(filtered_positions)} positions for notification after ignore list filtering.")
-            
-            alerts_sent = 0
-            alerts_skipped_cooldown = 0
-            
-            # Обрабатываем каждую позицию
-            for position in filtered_positions:
-                try:
-                    # Проверяем, нужно ли отправлять уведомление (cooldown)
-                    if not await self.should_send_alert(
-                        cabinet_id=cabinet_id,
-                        nm_id=position["nm_id"],
-                        warehouse_name=position["warehouse_name"],
-                        size=position["size"]
-                    ):
-                        alerts_skipped_cooldown += 1
-                        logger.info(f"Skipping alert for nm_id={position['nm_id']} (cooldown active)")
-                        continue
-                    
-                    # Формируем уведомление
-                    notification_data = self._format_notification_data(position, perspective_days=perspective_days)
-                    
-                    # Отправляем через webhook
-                    if bot_webhook_url:
-                        await self.send_webhook_notification(
-                            user_id=user_id,
-                            webhook_url=bot_webhook_url,
-                            notification_data=notification_data
-                        )
-                    
-                    # Сохраняем в историю
-                    await self.save_alert_history(cabinet_id, user_id, position)
-                    
-                    alerts_sent += 1
-                    logger.info(f"Sent alert for nm_id={position['nm_id']}, warehouse={position['warehouse_name']}, size={position['size']}")
-                    
-                except Exception as e:
-                    logger.error(f"Error processing alert for position: {e}")
-                    continue
-            
-            total_skipped = skipped_due_to_ignore + alerts_skipped_cooldown
+        Только синхронные запросы к БД: DailySalesRunner выполняет этот шаг в
+        потоке, а webhook-и (send_alerts) отправляет в своем event loop.
+
+        Returns:
+            status, positions (к отправке), perspective_days, alerts_skipped,
+            positions_analyzed
+        """
+        logger.info(f"Checking stock alerts for cabinet {cabinet_id}, user {user_id}")
+        prepared = {"status": "success", "positions": [], "perspective_days": 3, "alerts_skipped": 0, "positions_analyzed": 0}
+
+        # Проверяем настройки пользователя
+        user_settings = self.db.query(NotificationSettings).filter(
+            NotificationSettings.user_id == user_id
+        ).first()
+        
+        if not user_settings or not user_settings.critical_stocks_enabled:
+            logger.info(f"Stock alerts disabled for user {user_id}")
+            prepared["status"] = "disabled"
+            return prepared
+
+        # Получаем игнор-лист пользователя
+        ignore_list = self.ignore_crud.get_by_user(self.db, user_id)
+        ignore_set = set(ignore_list)
+        
+        # Получаем период перспективы из настроек пользователя (по умолчанию 3 дня)
+        perspective_days = getattr(user_settings, 'stock_analysis_days', 3)
+        prepared["perspective_days"] = perspective_days
+        
+        # Получаем рисковые позиции
+        at_risk_positions = self.analyzer.analyze_stock_positions_sync(cabinet_id, perspective_days=perspective_days)
+        
+        if not at_risk_positions:
+            logger.info(f"No at-risk positions found for cabinet {cabinet_id}")
+            return prepared
+
+        initial_count = len(at_risk_positions)
+        prepared["positions_analyzed"] = initial_count
+        
+        # Фильтруем по игнор-листу
+        filtered_positions = [p for p in at_risk_positions if p['nm_id'] not in ignore_set]
+        
+        skipped_due_to_ignore = initial_count - len(filtered_positions)
+        if skipped_due_to_ignore > 0:
+            logger.info(f"Skipped {skipped_due_to_ignore} positions from user's ignore list.")
+
+        if not filtered_positions:
+            logger.info(f"All at-risk positions are in the user's ignore list.")
+            prepared["alerts_skipped"] = skipped_due_to_ignore
+            return prepared
+        
+        logger.info(f"Found {len(filtered_positions)} positions for notification after ignore list filtering.")
+        
+        # Отфильтровываем позиции, по которым недавно было уведомление (cooldown)
+        alerts_skipped_cooldown = 0
+        for position in filtered_positions:
+            if not self._should_send_alert_sync(
+                cabinet_id=cabinet_id,
+                nm_id=position["nm_id"],
+                warehouse_name=position["warehouse_name"],
+                size=position["size"]
+            ):
+                alerts_skipped_cooldown += 1
+                logger.info(f"Skipping alert for nm_id={position['nm_id']} (cooldown active)")
+                continue
+            prepared["positions"].append(position)
+
+        prepared["alerts_skipped"] = skipped_due_to_ignore + alerts_skipped_cooldown
+        return prepared
+
+    async def send_alerts(
+        self,
+        user_id: int,
+        bot_webhook_url: str,
+        prepared: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """
+        Отправка подготовленных уведомлений через webhook (без запросов к БД)
+
+        Returns:
+            Обработанные позиции - их нужно записать в историю (record_alerts)
+        """
+        sent_positions = []
+        for position in prepared["positions"]:
+            try:
+                # Формируем уведомление
+                notification_data = self._format_notification_data(position, perspective_days=prepared["perspective_days"])
+                
+                # Отправляем через webhook
+                if bot_webhook_url:
+                    await self.send_webhook_notification(
+                        user_id=user_id,
+                        webhook_url=bot_webhook_url,
+                        notification_data=notification_data
+                    )
+                
+                sent_positions.append(position)
+                logger.info(f"Sent alert for nm_id={position['nm_id']}, warehouse={position['warehouse_name']}, size={position['size']}")
+                
+            except Exception as e:
+                logger.error(f"Error processing alert for position: {e}")
+                continue
+        return sent_positions
+
+    def record_alerts(self, cabinet_id: int, user_id: int, positions: List[Dict[str, Any]]) -> None:
+        """Запись отправленных уведомлений в stock_alert_history"""
+        for position in positions:
+            self._save_alert_history_sync(cabinet_id, user_id, position)
+
+    @staticmethod
+    def _alerts_result(prepared: Dict[str, Any], alerts_sent: int) -> Dict[str, Any]:
+        if prepared["status"] == "success":
             logger.info(
                 f"Stock alerts completed: {alerts_sent} sent, "
-                f"{total_skipped} skipped ({skipped_due_to_ignore} ignored, {alerts_skipped_cooldown} on cooldown), "
-                f"{initial_count} analyzed"
+                f"{prepared['alerts_skipped']} skipped, "
+                f"{prepared['positions_analyzed']} analyzed"
             )
-            
-            return {
-                "status": "success",
-                "alerts_sent": alerts_sent,
-                "alerts_skipped": total_skipped,
-                "positions_analyzed": initial_count
-            }
-            
-        except Exception as e:
-            logger.error(f"Error in check_and_send_alerts: {e}")
-            return {"status": "error", "error": str(e), "alerts_sent": 0, "alerts_skipped": 0, "positions_analyzed": 0}
+        return {
+            "status": prepared["status"],
+            "alerts_sent": alerts_sent,
+            "alerts_skipped": prepared["alerts_skipped"],
+            "positions_analyzed": prepared["positions_analyzed"]
+        }
     
     async def should_send_alert(
         self,
@@ -183,6 +221,15 @@ class StockAlertNotificationService:
         Returns:
             True если нужно отправить, False если нет
         """
+        return self._should_send_alert_sync(cabinet_id, nm_id, warehouse_name, size)
+
+    def _should_send_alert_sync(
+        self,
+        cabinet_id: int,
+        nm_id: int,
+        warehouse_name: str,
+        size: str
+    ) -> bool:
         try:
             # Проверяем историю уведомлений (cooldown)
             recent_alert = self.alert_crud.get_recent_alert(
@@ -299,6 +346,14 @@ class StockAlertNotificationService:
             user_id: ID пользователя
             position_data: Данные позиции
         """
+        self._save_alert_history_sync(cabinet_id, user_id, position_data)
+
+    def _save_alert_history_sync(
+        self,
+        cabinet_id: int,
+        user_id: int,
+        position_data: Dict[str, Any]
+    ) -> None:
         try:
             alert_data = StockAlertHistoryCreate(
                 cabinet_id=cabinet_id,
@@ -9,12 +9,13 @@ from typing import Dict, Any, List
 import logging
 
 from app.features.wb_api.models import WBOrder
-from .models import DailySalesAnalytics
-from .schemas import DailySalesAnalyticsCreate
 from .crud import DailySalesAnalyticsCRUD
 
 logger = logging.getLogger(__name__)
 
+UNKNOWN_WAREHOUSE = "Неизвестный склад"
+DEFAULT_SIZE = "ONE SIZE"
+
 
 class DailySalesAggregator:
     """Агрегация данных о заказах для анализа остатков"""
@@ -31,12 +32,6 @@ class DailySalesAggregator:
         """
         Агрегирует заказы за указанную дату
         
-        Логика:
-        1. Получить все заказы за дату из WBOrder
-        2. Группировать по (nm_id, warehouse_name, size)
-        3. Подсчитать orders_count и quantity_ordered
-        4. Записать/обновить в daily_sales_analytics
-        
         Args:
             cabinet_id: ID кабинета
             target_date: Дата для агрегации
@@ -44,87 +39,114 @@ class DailySalesAggregator:
         Returns:
             Статистика обработки
         """
+        result = await self.aggregate_date_range(cabinet_id, target_date, target_date)
+        if result["status"] != "success":
+            return {"status": "error", "date": str(target_date), "error": result.get("error")}
+        
+        return {
+            "status": "success",
+            "date": str(target_date),
+            "records_processed": result["records_processed"],
+            "unique_positions": result["unique_positions"]
+        }
+    
+    async def aggregate_date_range(
+        self,
+        cabinet_id: int,
+        date_from: date,
+        date_to: date
+    ) -> Dict[str, Any]:
+        """Агрегирует заказы за период [date_from, date_to] (см. aggregate_date_range_sync)"""
+        return self.aggregate_date_range_sync(cabinet_id, date_from, date_to)
+    
+    def aggregate_date_range_sync(
+        self,
+        cabinet_id: int,
+        date_from: date,
+        date_to: date
+    ) -> Dict[str, Any]:
+        """
+        Агрегирует заказы за период [date_from, date_to] одним проходом
+        
+        Синхронная версия - для запуска в потоке (asyncio.to_thread), чтобы
+        запросы агрегации не блокировали event loop.
+        
+        Логика:
+        1. Один GROUP BY по (дата, nm_id, склад, размер) в БД - без загрузки заказов
+        2. Один INSERT ... ON CONFLICT DO UPDATE в daily_sales_analytics
+        
+        Args:
+            cabinet_id: ID кабинета
+            date_from: Первая дата (включительно)
+            date_to: Последняя дата (включительно)
+        
+        Returns:
+            Статистика обработки с разбивкой по дням
+        """
         try:
-            logger.info(f"Starting aggregation for cabinet {cabinet_id}, date {target_date}")
-            
-            # Получаем все заказы за указанную дату
-            next_date = target_date + timedelta(days=1)
-            
-            orders = self.db.query(WBOrder).filter(
+            logger.info(f"Starting aggregation for cabinet {cabinet_id}, {date_from} - {date_to}")
+            
+            # Склад по warehouse_from (откуда отправляется товар), как в WBOrder
+            order_day = func.date(WBOrder.order_date)
+            warehouse_name = func.coalesce(func.nullif(WBOrder.warehouse_from, ""), UNKNOWN_WAREHOUSE)
+            size = func.coalesce(func.nullif(WBOrder.size, ""), DEFAULT_SIZE)
+            # Количество единиц товара в заказе (в WBOrder обычно не заполнено = 1)
+            quantity = func.coalesce(func.nullif(WBOrder.quantity, 0), 1)
+            
+            rows = self.db.query(
+                order_day, WBOrder.nm_id, warehouse_name, size,
+                func.count(WBOrder.id), func.sum(quantity)
+            ).filter(
                 and_(
                     WBOrder.cabinet_id == cabinet_id,
-                    WBOrder.order_date >= datetime.combine(target_date, datetime.min.time()),
-                    WBOrder.order_date < datetime.combine(next_date, datetime.min.time())
-                )
-            ).all()
-            
-            if not orders:
-                logger.info(f"No orders found for cabinet {cabinet_id} on {target_date}")
-                return {
-                    "status": "success",
-                    "date": str(target_date),
-                    "records_processed": 0,
-                    "unique_positions": 0
-                }
-            
-            # Группируем по (nm_id, warehouse_name, size)
-            aggregated = {}
-            
-            for order in orders:
-                # Получаем данные о товаре из заказа
-                nm_id = order.nm_id
-                # Используем warehouse_from как основной склад (откуда отправляется товар)
-                warehouse_name = order.warehouse_from or "Неизвестный склад"
-                
-                # Размер товара
-                size = order.size or "ONE SIZE"
-                
-                key = (nm_id, warehouse_name, size)
-                
-                if key not in aggregated:
-                    aggregated[key] = {
-                        "orders_count": 0,
-                        "quantity_ordered": 0
-                    }
-                
-                aggregated[key]["orders_count"] += 1
-                # Количество единиц товара в заказе (в WBOrder всегда 1)
-                quantity = order.quantity or 1
-                aggregated[key]["quantity_ordered"] += quantity
-            
-            # Записываем агрегированные данные в БД
-            records_created = 0
-            for (nm_id, warehouse_name, size), stats in aggregated.items():
-                analytics_data = DailySalesAnalyticsCreate(
-                    cabinet_id=cabinet_id,
-                    nm_id=nm_id,
-                    warehouse_name=warehouse_name,
-                    size=size,
-                    date=target_date,
-                    orders_count=stats["orders_count"],
-                    quantity_ordered=stats["quantity_ordered"]
+                    WBOrder.nm_id.isnot(None),
+                    WBOrder.order_date >= datetime.combine(date_from, datetime.min.time()),
+                    WBOrder.order_date < datetime.combine(date_to + timedelta(days=1), datetime.min.time())
                 )
-                
-                self.crud.create_or_update(self.db, analytics_data)
-                records_created += 1
+            ).group_by(order_day, WBOrder.nm_id, warehouse_name, size).all()
+            
+            analytics_rows = []
+            days: Dict[str, Dict[str, int]] = {}
+            for day, nm_id, warehouse, size_name, orders_count, quantity_ordered in rows:
+                # SQLite возвращает date() строкой
+                day = day if isinstance(day, date) else date.fromisoformat(str(day))
+                analytics_rows.append({
+                    "cabinet_id": cabinet_id,
+                    "nm_id": nm_id,
+                    "warehouse_name": warehouse,
+                    "size": size_name,
+                    "date": day,
+                    "orders_count": int(orders_count),
+                    "quantity_ordered": int(quantity_ordered or 0)
+                })
+                day_stats = days.setdefault(str(day), {"records_processed": 0, "unique_positions": 0})
+                day_stats["records_processed"] += int(orders_count)
+                day_stats["unique_positions"] += 1
+            
+            positions = self.crud.bulk_upsert(self.db, analytics_rows)
+            orders_processed = sum(day_stats["records_processed"] for day_stats in days.values())
             
             logger.info(
-                f"Aggregation completed: {records_created} positions, "
-                f"{len(orders)} orders processed"
+                f"Aggregation completed: {positions} positions, "
+                f"{orders_processed} orders processed, {len(days)} days with orders"
             )
             
             return {
                 "status": "success",
-                "date": str(target_date),
-                "records_processed": len(orders),
-                "unique_positions": records_created
+                "date_from": str(date_from),
+                "date_to": str(date_to),
+                "records_processed": orders_processed,
+                "unique_positions": positions,
+                "days": days
             }
             
         except Exception as e:
-            logger.error(f"Error aggregating orders for date {target_date}: {e}")
+            logger.error(f"Error aggregating orders for {date_from} - {date_to}: {e}")
+            self.db.rollback()
             return {
                 "status": "error",
-                "date": str(target_date),
+                "date_from": str(date_from),
+                "date_to": str(date_to),
                 "error": str(e)
             }
     
@@ -134,9 +156,11 @@ class DailySalesAggregator:
         days: int = 7
     ) -> Dict[str, Any]:
         """
-        Агрегирует заказы за последние N дней
+        Агрегирует заказы за последние N дней (backfill)
         Используется для первичной загрузки или пересчета
         
+        Все N дней заполняются одним запросом агрегации и одним upsert.
+        
         Args:
             cabinet_id: ID кабинета
             days: Количество дней для агрегации
@@ -144,42 +168,32 @@ class DailySalesAggregator:
         Returns:
             Статистика обработки
         """
-        try:
-            logger.info(f"Starting aggregation for last {days} days, cabinet {cabinet_id}")
-            
-            results = []
-            total_records = 0
-            total_positions = 0
-            
-            # Агрегируем каждый день отдельно
-            for i in range(days):
-                target_date = date.today() - timedelta(days=i+1)
-                result = await self.aggregate_orders_for_date(cabinet_id, target_date)
-                results.append(result)
-                
-                if result["status"] == "success":
-                    total_records += result["records_processed"]
-                    total_positions += result["unique_positions"]
-            
-            logger.info(
-                f"Completed aggregation for {days} days: "
-                f"{total_records} orders, {total_positions} positions"
-            )
-            
-            return {
-                "status": "success",
-                "days_processed": days,
-                "total_records": total_records,
-                "total_positions": total_positions,
-                "daily_results": results
-            }
-            
-        except Exception as e:
-            logger.error(f"Error aggregating last {days} days: {e}")
-            return {
-                "status": "error",
-                "error": str(e)
-            }
+        logger.info(f"Starting aggregation for last {days} days, cabinet {cabinet_id}")
+        
+        date_to = date.today() - timedelta(days=1)
+        date_from = date.today() - timedelta(days=days)
+        result = await self.aggregate_date_range(cabinet_id, date_from, date_to)
+        if result["status"] != "success":
+            return {"status": "error", "error": result.get("error")}
+        
+        daily_results = []
+        for i in range(days):
+            target_date = str(date.today() - timedelta(days=i+1))
+            day_stats = result["days"].get(target_date, {"records_processed": 0, "unique_positions": 0})
+            daily_results.append({"status": "success", "date": target_date, **day_stats})
+        
+        logger.info(
+            f"Completed aggregation for {days} days: "
+            f"{result['records_processed']} orders, {result['unique_positions']} positions"
+        )
+        
+        return {
+            "status": "success",
+            "days_processed": days,
+            "total_records": result["records_processed"],
+            "total_positions": result["unique_positions"],
+            "daily_results": daily_results
+        }
     
     async def get_rolling_stats(
         self,
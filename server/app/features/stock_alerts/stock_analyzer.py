@@ -23,9 +23,20 @@ class DynamicStockAnalyzer:
         self, 
         cabinet_id: int,
         perspective_days: int = 3
+    ) -> List[Dict[str, Any]]:
+        """Анализирует все позиции остатков для кабинета (см. analyze_stock_positions_sync)"""
+        return self.analyze_stock_positions_sync(cabinet_id, perspective_days=perspective_days)
+
+    def analyze_stock_positions_sync(
+        self,
+        cabinet_id: int,
+        perspective_days: int = 3
     ) -> List[Dict[str, Any]]:
         """
         Анализирует все позиции остатков для кабинета
+
+        Только синхронные запросы к БД - можно выполнять в потоке
+        (DailySalesRunner), не блокируя event loop.
         
         Логика:
         1. Получить все текущие остатки из WBStock
@@ -88,9 +99,7 @@ class DynamicStockAnalyzer:
                     avg_per_day = orders_last_30_days / ANALYSIS_DAYS if ANALYSIS_DAYS > 0 else 0
                     
                     # Рассчитываем прогноз
-                    days_remaining = await self.calculate_days_remaining(
-                        current_stock, avg_per_day
-                    )
+                    days_remaining = self._days_remaining(current_stock, avg_per_day)
                     
                     # Проверяем условие риска: days_remaining <= perspective_days и есть заказы
                     if days_remaining <= perspective_days and orders_last_30_days > 0:
@@ -150,6 +159,10 @@ class DynamicStockAnalyzer:
         Returns:
             Количество дней (float), на которые хватит остатка
         """
+        return self._days_remaining(current_stock, orders_per_day)
+
+    @staticmethod
+    def _days_remaining(current_stock: int, orders_per_day: float) -> float:
         if orders_per_day <= 0:
             return float('inf')
         
@@ -12,6 +12,7 @@ from app.features.wb_api.models import WBCabinet
 from app.features.user.models import User
 from app.features.wb_api.crud_cabinet_users import CabinetUserCRUD
 from .sales_aggregator import DailySalesAggregator
+from .daily_runner import DailySalesRunner
 from .notification_service import StockAlertNotificationService
 from .crud import DailySalesAnalyticsCRUD, StockAlertHistoryCRUD
 
@@ -65,111 +66,20 @@ def aggregate_daily_sales_all_cabinets(self) -> Dict[str, Any]:
     Агрегация продаж за вчерашний день для всех активных кабинетов + проверка алертов
     
     Запускается: Ежедневно в настраиваемое время (STOCK_ALERT_CHECK_TIME)
-    """
-    db = next(get_db())
     
+    Кабинеты обрабатываются параллельно (STOCK_ALERTS_CONCURRENCY),
+    работа с БД - в потоках, см. DailySalesRunner. В результате - отчет по каждому кабинету.
+    """
     try:
         yesterday = date.today() - timedelta(days=1)
         logger.info(f"Starting daily sales aggregation and stock alerts check for all cabinets, date {yesterday}")
         
-        # Получаем все активные кабинеты
-        cabinets = db.query(WBCabinet).filter(WBCabinet.is_active == True).all()
-        
-        aggregation_processed = 0
-        aggregation_failed = 0
-        alerts_processed = 0
-        alerts_failed = 0
-        total_alerts_sent = 0
-        
-        for cabinet in cabinets:
-            try:
-                # 1. Агрегируем данные за вчерашний день
-                aggregator = DailySalesAggregator(db)
-                import asyncio
-                agg_result = asyncio.run(aggregator.aggregate_orders_for_date(cabinet.id, yesterday))
-                
-                if agg_result.get("status") == "success":
-                    aggregation_processed += 1
-                    logger.info(f"Aggregation completed for cabinet {cabinet.id}: {agg_result}")
-                else:
-                    aggregation_failed += 1
-                    logger.error(f"Aggregation failed for cabinet {cabinet.id}: {agg_result}")
-                    continue
-                
-                # 2. Сразу проверяем алерты для этого кабинета
-                try:
-                    # Получаем пользователей кабинета
-                    cabinet_user_crud = CabinetUserCRUD()
-                    user_ids = cabinet_user_crud.get_cabinet_users(db, cabinet.id)
-                    
-                    cabinet_alerts_sent = 0
-                    
-                    for user_id in user_ids:
-                        try:
-                            user = db.query(User).filter(User.id == user_id).first()
-                            if not user:
-                                continue
-                            
-                            bot_webhook_url = getattr(user, 'bot_webhook_url', None)
-                            if not bot_webhook_url:
-                                logger.warning(f"No webhook URL for user {user_id}")
-                                continue
-                            
-                            # Проверяем алерты
-                            notification_service = StockAlertNotificationService(db)
-                            alert_result = asyncio.run(notification_service.check_and_send_alerts(
-                                cabinet_id=cabinet.id,
-                                user_id=user_id,
-                                bot_webhook_url=bot_webhook_url
-                            ))
-                            
-                            cabinet_alerts_sent += alert_result.get("alerts_sent", 0)
-                            logger.info(f"Alerts for user {user_id}: {alert_result}")
-                            
-                        except Exception as e:
-                            logger.error(f"Error checking alerts for user {user_id}: {e}")
-                            alerts_failed += 1
-                            continue
-                    
-                    total_alerts_sent += cabinet_alerts_sent
-                    alerts_processed += 1
-                    logger.info(f"Stock alerts completed for cabinet {cabinet.id}: {cabinet_alerts_sent} alerts sent")
-                    
-                except Exception as e:
-                    logger.error(f"Error checking alerts for cabinet {cabinet.id}: {e}")
-                    alerts_failed += 1
-                
-            except Exception as e:
-                logger.error(f"Error processing cabinet {cabinet.id}: {e}")
-                aggregation_failed += 1
-        
-        logger.info(
-            f"Daily aggregation and alerts completed: "
-            f"{aggregation_processed} cabinets aggregated, {aggregation_failed} failed, "
-            f"{alerts_processed} cabinets checked for alerts, {alerts_failed} failed, "
-            f"{total_alerts_sent} total alerts sent"
-        )
-        
-        return {
-            "status": "success",
-            "date": str(yesterday),
-            "aggregation": {
-                "cabinets_processed": aggregation_processed,
-                "cabinets_failed": aggregation_failed
-            },
-            "alerts": {
-                "cabinets_processed": alerts_processed,
-                "cabinets_failed": alerts_failed,
-                "total_alerts_sent": total_alerts_sent
-            }
-        }
+        import asyncio
+        return asyncio.run(DailySalesRunner().run(yesterday))
         
     except Exception as e:
         logger.error(f"Error in aggregate_daily_sales_all_cabinets: {e}")
         raise self.retry(exc=e, countdown=60)
-    
-    finally:
-        db.close()
 
 
 @celery_app.task(bind=True, max_retries=3)
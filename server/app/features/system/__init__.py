@@ -2,9 +2,12 @@
 Системные функции - здоровье и метрики приложения.
 
 Этот модуль содержит:
-- routes: маршруты для проверки здоровья системы (/health, /status)
+- routes: маршруты для проверки здоровья системы (/health, /health/live, /health/ready, /status)
+- health: проверки зависимостей для readiness
 """
 
-from .routes import system_router
+from app.utils.lazy import lazy_exports
+
+__getattr__ = lazy_exports(__name__, {"system_router": (".routes", "system_router")})
 
 __all__ = ["system_router"]
\ No newline at end of file
@@ -0,0 +1,245 @@
+"""
+Проверки зависимостей для liveness/readiness.
+
+/system/health выполнял только SELECT 1 синхронной сессией внутри async
+маршрута; Redis, брокер Celery, GPT сервис и pgvector не проверялись,
+и балансировщик продолжал слать трафик на деградировавший инстанс.
+
+Теперь:
+    - liveness (/system/health/live) не трогает зависимости - только то,
+      что процесс жив и event loop отвечает;
+    - readiness (/system/health/ready) опрашивает все зависимости
+      параллельно, каждую с таймаутом HEALTH_CHECK_TIMEOUT, и отдает
+      состояние и задержку каждой;
+    - результат кэшируется на HEALTH_CACHE_TTL, одновременные запросы
+      ждут одну общую проверку - частые пробы не множат запросы к БД;
+    - отказ критичной зависимости (БД, Redis, брокер) - 503, отказ
+      некритичной (GPT сервис, pgvector) - 200 со статусом degraded.
+
+asyncio.wait_for не прерывает поток с синхронным запросом, поэтому пробы БД
+идут через отдельный engine с короткими таймаутами (подключение, запрос,
+ожидание соединения из пула) в своем пуле из PROBE_THREADS потоков: зависшая
+БД не копит застрявшие потоки в общем executor asyncio.to_thread.
+"""
+
+import os
+import math
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine, make_url
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "1.0"))
+HEALTH_CACHE_TTL = float(os.getenv("HEALTH_CACHE_TTL", "5"))
+
+# Потоки и соединения для проб БД (БД и pgvector проверяются одновременно)
+PROBE_THREADS = 2
+
+CheckFunc = Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+T = TypeVar("T")
+
+
+class DependencySkipped(Exception):
+    """Зависимость не настроена в этом окружении - не проверяется"""
+
+
+class DependencyCheck:
+    def __init__(self, name: str, probe: CheckFunc, critical: bool = True):
+        self.name = name
+        self.probe = probe
+        self.critical = critical
+
+
+class HealthChecker:
+    """Параллельный опрос зависимостей с таймаутом, кэшем и общей проверкой"""
+
+    def __init__(self, checks, timeout: float = HEALTH_CHECK_TIMEOUT, cache_ttl: float = HEALTH_CACHE_TTL):
+        self.checks = list(checks)
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self._cached: Optional[Dict[str, Any]] = None
+        self._cached_at = 0.0
+        self._inflight: Optional[asyncio.Future] = None
+
+    async def _run(self, check: DependencyCheck) -> Dict[str, Any]:
+        started = time.perf_counter()
+        result: Dict[str, Any] = {"critical": check.critical}
+        try:
+            details = await asyncio.wait_for(check.probe(), timeout=self.timeout)
+            result["status"] = "up"
+            if details:
+                result.update(details)
+        except DependencySkipped as e:
+            result.update(status="skipped", reason=str(e))
+        except asyncio.TimeoutError:
+            result.update(status="timeout", error=f"No response in {self.timeout}s")
+        except Exception as e:
+            result.update(status="down", error=f"{type(e).__name__}: {e}")
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if result["status"] in ("down", "timeout"):
+            logger.warning(f"⚠️ Health check {check.name} {result['status']}: {result.get('error')}")
+        return result
+
+    async def _check_all(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self._run(check) for check in self.checks))
+        dependencies = {check.name: result for check, result in zip(self.checks, results)}
+
+        failed = [name for name, result in dependencies.items() if result["status"] in ("down", "timeout")]
+        if any(dependencies[name]["critical"] for name in failed):
+            status = "unhealthy"
+        elif failed:
+            status = "degraded"
+        else:
+            status = "healthy"
+        return {
+            "status": status,
+            "ready": status != "unhealthy",
+            "checked_at": time.time(),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "dependencies": dependencies,
+        }
+
+    async def check(self, use_cache: bool = True) -> Dict[str, Any]:
+        """Состояние зависимостей (из кэша, если проверка была недавно)"""
+        if use_cache and self._cached is not None and time.monotonic() - self._cached_at < self.cache_ttl:
+            return {**self._cached, "cached": True}
+
+        inflight = self._inflight
+        if inflight is not None and not inflight.done() and inflight.get_loop() is asyncio.get_running_loop():
+            return {**await asyncio.shield(inflight), "cached": True}
+
+        self._inflight = asyncio.ensure_future(self._check_all())
+        try:
+            report = await asyncio.shield(self._inflight)
+        finally:
+            if self._inflight is not None and self._inflight.done():
+                self._inflight = None
+        self._cached, self._cached_at = report, time.monotonic()
+        return {**report, "cached": False}
+
+    def reset(self) -> None:
+        self._cached = None
+        self._cached_at = 0.0
+
+
+# --- Проверки зависимостей приложения ---
+
+_probe_lock = threading.Lock()
+_probe_engine: Optional[Engine] = None
+_probe_executor: Optional[ThreadPoolExecutor] = None
+
+
+def probe_engine() -> Engine:
+    """Engine проб БД: свой маленький пул и таймауты не длиннее HEALTH_CHECK_TIMEOUT"""
+    global _probe_engine
+    with _probe_lock:
+        if _probe_engine is None:
+            from app.core.database import DATABASE_URL
+
+            url = make_url(DATABASE_URL)
+            options: Dict[str, Any] = {}
+            if url.get_backend_name() != "sqlite":
+                options = {
+                    "pool_size": PROBE_THREADS,
+                    "max_overflow": 0,
+                    "pool_timeout": HEALTH_CHECK_TIMEOUT,
+                    "pool_pre_ping": True,
+                }
+                if url.get_backend_name() == "postgresql":
+                    options["connect_args"] = {
+                        "connect_timeout": max(1, math.ceil(HEALTH_CHECK_TIMEOUT)),
+                        "options": f"-c statement_timeout={int(HEALTH_CHECK_TIMEOUT * 1000)}",
+                    }
+            _probe_engine = create_engine(url, **options)
+        return _probe_engine
+
+
+async def run_probe(func: Callable[[], T]) -> T:
+    """Синхронная проба в пуле потоков проб, а не в общем executor"""
+    global _probe_executor
+    with _probe_lock:
+        if _probe_executor is None:
+            _probe_executor = ThreadPoolExecutor(max_workers=PROBE_THREADS, thread_name_prefix="health-probe")
+    return await asyncio.get_running_loop().run_in_executor(_probe_executor, func)
+
+
+async def check_database() -> Dict[str, Any]:
+    engine = probe_engine()
+
+    def ping():
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+    # Синхронный драйвер - в потоке, чтобы не блокировать event loop
+    await run_probe(ping)
+    return {"dialect": engine.dialect.name}
+
+
+async def check_pgvector() -> Dict[str, Any]:
+    engine = probe_engine()
+
+    if engine.dialect.name != "postgresql":
+        raise DependencySkipped(f"{engine.dialect.name} database has no pgvector")
+
+    def extension_version():
+        with engine.connect() as connection:
+            return connection.execute(
+                text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+            ).scalar()
+
+    version = await run_probe(extension_version)
+    if version is None:
+        raise RuntimeError("Extension vector is not installed")
+    return {"version": version}
+
+
+async def _ping_redis(url: str) -> None:
+    import redis.asyncio as redis_asyncio
+
+    client = redis_asyncio.from_url(url, socket_connect_timeout=HEALTH_CHECK_TIMEOUT, socket_timeout=HEALTH_CHECK_TIMEOUT)
+    try:
+        await client.ping()
+    finally:
+        await client.aclose()
+
+
+async def check_redis() -> None:
+    await _ping_redis(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+
+
+async def check_celery_broker() -> Dict[str, Any]:
+    from app.core.celery_app import celery_app
+
+    broker_url = celery_app.conf.broker_url
+    if not broker_url.startswith(("redis://", "rediss://")):
+        raise DependencySkipped(f"Unsupported broker transport: {broker_url.split(':', 1)[0]}")
+    await _ping_redis(broker_url)
+    return {"transport": "redis"}
+
+
+async def check_gpt_service() -> Dict[str, Any]:
+    gpt_service_url = os.getenv("GPT_INTEGRATION_URL")
+    if not gpt_service_url:
+        raise DependencySkipped("GPT_INTEGRATION_URL is not set")
+    async with httpx.AsyncClient(timeout=HEALTH_CHECK_TIMEOUT) as client:
+        response = await client.get(f"{gpt_service_url.rstrip('/')}/health")
+    response.raise_for_status()
+    return {"status_code": response.status_code}
+
+
+health_checker = HealthChecker([
+    DependencyCheck("database", check_database),
+    DependencyCheck("redis", check_redis),
+    DependencyCheck("celery_broker", check_celery_broker),
+    DependencyCheck("gpt_service", check_gpt_service, critical=False),
+    DependencyCheck("pgvector", check_pgvector, critical=False),
+])
@@ -2,36 +2,48 @@
 Системные маршруты для проверки здоровья и статуса приложения.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import time
+
+from fastapi import APIRouter
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from ...core.database import get_db
+from . import health
 
 system_router = APIRouter(prefix="/system", tags=["system"])
 
+STARTED_AT = time.time()
+
+
+@system_router.get("/health/live")
+async def liveness_check():
+    """
+    Liveness: процесс жив и event loop отвечает. Зависимости не проверяются -
+    их отказ не лечится перезапуском контейнера.
+    """
+    return JSONResponse(
+        status_code=200,
+        content={
+            "status": "alive",
+            "uptime_seconds": round(time.time() - STARTED_AT, 1)
+        }
+    )
+
+
+@system_router.get("/health/ready")
+async def readiness_check():
+    """
+    Readiness: состояние и задержка каждой зависимости; 503, если отказала
+    критичная зависимость и трафик на инстанс слать нельзя.
+    """
+    report = await health.health_checker.check()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
 
 @system_router.get("/health")
-async def health_check(db: Session = Depends(get_db)):
+async def health_check():
     """
-    Проверка здоровья приложения и подключения к БД.
+    Проверка здоровья приложения и зависимостей (совпадает с readiness).
     """
-    try:
-        # Проверяем подключение к БД
-        db.execute(text("SELECT 1"))
-        return JSONResponse(
-            status_code=200,
-            content={
-                "status": "healthy",
-                "message": "Application is running",
-                "database": "connected"
-            }
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=f"Database connection failed: {str(e)}"
-        )
+    return await readiness_check()
 
 
 @system_router.get("/")
@@ -8,9 +8,11 @@
 - routes: маршруты для работы с пользователями (/users, /users/{id})
 """
 
+from app.utils.lazy import lazy_exports
 from .models import User
 from .crud import UserCRUD, get_user_crud
-from .routes import user_router
+
+__getattr__ = lazy_exports(__name__, {"user_router": (".routes", "user_router")})
 
 __all__ = [
     "User",
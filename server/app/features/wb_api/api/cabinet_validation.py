@@ -15,6 +15,7 @@ router = APIRouter()
 @router.post("/validate-all")
 async def validate_all_cabinets(
     max_retries: int = 3,
+    use_cache: bool = True,
     db: Session = Depends(get_db)
 ):
     """
@@ -22,13 +23,14 @@ async def validate_all_cabinets(
     
     Args:
         max_retries: Максимальное количество попыток валидации для каждого кабинета
+        use_cache: Использовать кэш валидации (False - проверить все ключи в WB)
         
     Returns:
         Результат валидации всех кабинетов
     """
     try:
         cabinet_manager = CabinetManager(db)
-        result = await cabinet_manager.validate_all_cabinets(max_retries)
+        result = await cabinet_manager.validate_all_cabinets(max_retries, use_cache=use_cache)
         
         return {
             "success": True,
@@ -69,7 +71,8 @@ async def validate_cabinet(
             )
         
         cabinet_manager = CabinetManager(db)
-        result = await cabinet_manager.validate_and_cleanup_cabinet(cabinet, max_retries)
+        # Ручная проверка всегда идет в WB, минуя кэш
+        result = await cabinet_manager.validate_and_cleanup_cabinet(cabinet, max_retries, use_cache=False)
         
         return {
             "success": True,
@@ -4,15 +4,15 @@ Cabinet Manager - управление кабинетами WB с автомат
 
 import logging
 import os
+import time
 import asyncio
 import aiohttp
 from typing import Dict, Any, Optional, List
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 
-from .models import WBCabinet, WBOrder, WBProduct, WBStock, WBReview
-from .models_sales import WBSales
-from .client import WBAPIClient
+from .models import WBCabinet
+from .key_validation import KeyValidator
 
 logger = logging.getLogger(__name__)
 
@@ -20,51 +20,75 @@ logger = logging.getLogger(__name__)
 class CabinetManager:
     """Менеджер кабинетов с автоматическим удалением при невалидном API"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, validator: Optional[KeyValidator] = None):
         self.db = db
+        self.validator = validator or KeyValidator()
     
-    async def validate_and_cleanup_cabinet(self, cabinet: WBCabinet, max_retries: int = 3) -> Dict[str, Any]:
+    async def validate_and_cleanup_cabinet(
+        self,
+        cabinet: WBCabinet,
+        max_retries: int = 3,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
         """
         Валидация кабинета с автоматическим удалением при невалидном API
         
         Args:
             cabinet: Кабинет для валидации
             max_retries: Максимальное количество попыток валидации
+            use_cache: Использовать результат из кэша валидации (если есть)
             
         Returns:
             Dict с результатом валидации и действий
         """
         try:
-            logger.info(f"Starting cabinet validation for cabinet {cabinet.id}")
-            
-            # Создаем клиент для валидации
-            client = WBAPIClient(cabinet)
-            
-            # Валидируем API ключ (retry логика уже есть в _make_request)
             logger.info(f"Validating API key for cabinet {cabinet.id}")
-            
-            try:
-                validation_result = await client.validate_api_key()
-            except Exception as e:
-                # Timeout и другие сетевые ошибки - НЕ удаляем кабинет!
-                logger.warning(f"API validation error for cabinet {cabinet.id}: {e}")
-                return {
-                    "success": True,  # НЕ False!
-                    "valid": True,    # НЕ False!
-                    "message": f"Validation error (timeout/network): {str(e)}",
-                    "attempts": 1,
-                    "warning": True
-                }
-            
-            if validation_result.get("valid", False):
-                logger.info(f"API key validation successful for cabinet {cabinet.id}")
-                return {
-                    "success": True,
-                    "valid": True,
-                    "message": "API key is valid",
-                    "attempts": 1
-                }
-            
+            validation_result = await self.validator.validate(cabinet.api_key, use_cache=use_cache)
+            return await self._apply_validation_result(cabinet, validation_result)
+        except Exception as e:
+            logger.error(
+                f"Unexpected error during cabinet validation for cabinet {cabinet.id if hasattr(cabinet, 'id') else 'unknown'}: {e}",
+                exc_info=True
+            )
+            return {
+                "success": False,
+                "valid": False,
+                "message": f"Unexpected validation error: {str(e)}",
+                "attempts": 0,
+                "cabinet_removed": False
+            }
+    
+    async def _apply_validation_result(self, cabinet: WBCabinet, validation_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Действие по результату валидации: невалидный (401) кабинет удаляется"""
+        if validation_result.get("valid") is None:
+            # Timeout, 429, 5xx и другие сетевые ошибки - НЕ удаляем кабинет!
+            logger.warning(f"API validation error for cabinet {cabinet.id}: {validation_result.get('message')}")
+            return {
+                "success": True,  # НЕ False!
+                "valid": True,    # НЕ False!
+                "message": f"Validation error (timeout/network): {validation_result.get('message')}",
+                "attempts": 1,
+                "warning": True
+            }
+        
+        if validation_result["valid"]:
+            logger.info(
+                f"API key validation successful for cabinet {cabinet.id}"
+                f"{' (cached)' if validation_result.get('cached') else ''}"
+            )
+            return {
+                "success": True,
+                "valid": True,
+                "message": "API key is valid",
+                "attempts": 0 if validation_result.get("cached") else 1,
+                "cached": validation_result.get("cached", False)
+            }
+        
+        return await self._remove_invalid_cabinet(cabinet, validation_result)
+    
+    async def _remove_invalid_cabinet(self, cabinet: WBCabinet, validation_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Удаление кабинета с невалидным API ключом и уведомление пользователей"""
+        try:
             # Если API невалиден (статус 401), удаляем кабинет
             logger.error(f"API validation failed for cabinet {cabinet.id}. Removing cabinet.")
             
@@ -99,11 +123,8 @@ class CabinetManager:
                 f"🗑️ CABINET REMOVED - ID: {cabinet_info['id']}, "
                 f"Name: {cabinet_info['name']}, "
                 f"Users affected: {len(users_data)}, "
-                f"Deleted data: orders={deleted_counts.get('orders', 0)}, "
-                f"products={deleted_counts.get('products', 0)}, "
-                f"stocks={deleted_counts.get('stocks', 0)}, "
-                f"reviews={deleted_counts.get('reviews', 0)}, "
-                f"sales={deleted_counts.get('sales', 0)}, "
+                f"Deleted data: {deleted_counts}, "
+                f"Teardown: {cleanup_result.get('teardown', {}).get('status', 'N/A')}, "
                 f"Reason: API key invalid (status {validation_result.get('status_code', 'N/A')}), "
                 f"Error: {validation_result.get('message', 'N/A')}"
             )
@@ -190,65 +211,49 @@ class CabinetManager:
             return None
     
     async def _cleanup_cabinet_data(self, cabinet: WBCabinet) -> Dict[str, Any]:
-        """Удаление всех данных кабинета"""
+        """
+        Удаление кабинета и всех его данных
+
+        Здесь кабинет только выключается из синхронизации и отвязывается от
+        пользователей (одна короткая транзакция); сами данные удаляются
+        порциями в фоне задачей teardown_cabinet_task (см. cabinet_teardown).
+        """
         try:
-            logger.info(f"Cleaning up data for cabinet {cabinet.id}")
-            
-            # Удаляем все связанные данные
+            logger.info(f"Scheduling teardown for cabinet {cabinet.id}")
+            cabinet_id = cabinet.id
+            cabinet_name = cabinet.name
+
+            # Удаляем связи пользователей с кабинетом и выключаем синхронизацию
+            from .models_cabinet_users import CabinetUser
             deleted_counts = {
-                "orders": 0,
-                "products": 0,
-                "stocks": 0,
-                "reviews": 0,
-                "sales": 0,
-                "cabinet_users": 0
+                "cabinet_users": self.db.query(CabinetUser)
+                .filter(CabinetUser.cabinet_id == cabinet_id)
+                .delete(synchronize_session=False)
             }
-            
-            # Удаляем связи пользователей с кабинетом
-            from .models_cabinet_users import CabinetUser
-            cabinet_users_query = self.db.query(CabinetUser).filter(CabinetUser.cabinet_id == cabinet.id)
-            deleted_counts["cabinet_users"] = cabinet_users_query.count()
-            cabinet_users_query.delete(synchronize_session=False)
-            
-            # Удаляем заказы
-            orders_query = self.db.query(WBOrder).filter(WBOrder.cabinet_id == cabinet.id)
-            deleted_counts["orders"] = orders_query.count()
-            orders_query.delete(synchronize_session=False)
-            
-            # Удаляем товары
-            products_query = self.db.query(WBProduct).filter(WBProduct.cabinet_id == cabinet.id)
-            deleted_counts["products"] = products_query.count()
-            products_query.delete(synchronize_session=False)
-            
-            # Удаляем остатки
-            stocks_query = self.db.query(WBStock).filter(WBStock.cabinet_id == cabinet.id)
-            deleted_counts["stocks"] = stocks_query.count()
-            stocks_query.delete(synchronize_session=False)
-            
-            # Удаляем отзывы
-            reviews_query = self.db.query(WBReview).filter(WBReview.cabinet_id == cabinet.id)
-            deleted_counts["reviews"] = reviews_query.count()
-            reviews_query.delete(synchronize_session=False)
-            
-            # Удаляем продажи
-            sales_query = self.db.query(WBSales).filter(WBSales.cabinet_id == cabinet.id)
-            deleted_counts["sales"] = sales_query.count()
-            sales_query.delete(synchronize_session=False)
-            
-            # Удаляем сам кабинет
-            cabinet_name = cabinet.name
-            self.db.delete(cabinet)
+            cabinet.is_active = False
             self.db.commit()
-            
-            logger.info(f"Cabinet {cabinet.id} and all related data removed successfully. "
-                       f"Deleted: {deleted_counts}")
-            
+
+            try:
+                from .tasks import teardown_cabinet_task
+                task = teardown_cabinet_task.delay(cabinet_id)
+                teardown = {"status": "scheduled", "task_id": task.id}
+            except Exception as enqueue_error:
+                # Брокер недоступен - удаляем здесь же, не блокируя event loop
+                logger.warning(f"⚠️ Failed to enqueue teardown for cabinet {cabinet_id}: {enqueue_error}")
+                from .cabinet_teardown import CabinetTeardown
+                progress = await asyncio.to_thread(CabinetTeardown().run, cabinet_id)
+                deleted_counts.update(progress["deleted"])
+                teardown = {"status": progress["status"]}
+
+            logger.info(f"Cabinet {cabinet_id} deactivated, teardown {teardown['status']}")
+
             return {
                 "success": True,
                 "cabinet_name": cabinet_name,
-                "deleted_counts": deleted_counts
+                "deleted_counts": deleted_counts,
+                "teardown": teardown
             }
-            
+
         except Exception as e:
             logger.error(f"Error cleaning up cabinet {cabinet.id}: {e}", exc_info=True)
             self.db.rollback()
@@ -416,13 +421,19 @@ class CabinetManager:
         else:
             return f"API ключ недействителен: {message}"
     
-    async def validate_all_cabinets(self, max_retries: int = 3) -> Dict[str, Any]:
-        """Валидация всех кабинетов с автоматическим удалением невалидных"""
+    async def validate_all_cabinets(self, max_retries: int = 3, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Валидация всех кабинетов с автоматическим удалением невалидных
+        
+        Ключи проверяются параллельно (KeyValidator: общий кэш, лимит частоты
+        на хост WB API), удаление невалидных - последовательно, в сессии БД
+        менеджера.
+        """
         try:
             logger.info("Starting validation of all cabinets")
             
-            # Получаем все кабинеты
-            cabinets = self.db.query(WBCabinet).all()
+            # Кабинеты в процессе удаления (is_active=False) не проверяем
+            cabinets = self.db.query(WBCabinet).filter(WBCabinet.is_active == True).all()
             
             if not cabinets:
                 logger.info("No cabinets found for validation")
@@ -442,9 +453,15 @@ class CabinetManager:
                 "details": []
             }
             
-            for cabinet in cabinets:
+            started = time.monotonic()
+            calls_before = self.validator.outbound_calls
+            validation_results = await self.validator.validate_many(
+                [cabinet.api_key for cabinet in cabinets], use_cache=use_cache
+            )
+            
+            for cabinet, validation_result in zip(cabinets, validation_results):
                 try:
-                    result = await self.validate_and_cleanup_cabinet(cabinet, max_retries)
+                    result = await self._apply_validation_result(cabinet, validation_result)
                     
                     if result.get("valid", False):
                         results["valid_cabinets"] += 1
@@ -472,7 +489,15 @@ class CabinetManager:
                         "error": str(e)
                     })
             
-            logger.info(f"Cabinet validation completed: {results}")
+            results["cached_results"] = sum(1 for r in validation_results if r.get("cached"))
+            results["outbound_calls"] = self.validator.outbound_calls - calls_before
+            results["duration_seconds"] = round(time.monotonic() - started, 3)
+            logger.info(
+                f"Cabinet validation completed: {results['valid_cabinets']} valid, "
+                f"{results['removed_cabinets']} removed, {results['errors']} errors, "
+                f"{results['cached_results']} from cache, {results['outbound_calls']} WB calls "
+                f"in {results['duration_seconds']}s"
+            )
             return results
             
         except Exception as e:
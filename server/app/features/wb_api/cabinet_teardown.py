@@ -0,0 +1,281 @@
+"""
+Фоновое удаление кабинета порциями.
+
+Раньше CabinetManager._cleanup_cabinet_data удалял заказы, товары, остатки,
+отзывы и продажи одной транзакцией (count() + bulk delete() на каждую
+таблицу): на большом кабинете транзакция держала блокировки минутами и
+тормозила синхронизацию остальных кабинетов, а аналитика, экспортные токены,
+конкуренты, сводки и RAG-индекс оставались в базе.
+
+Теперь:
+    - кабинет сразу деактивируется (синхронизация его больше не берет);
+    - таблицы с данными кабинета находятся по метаданным: колонка cabinet_id
+      или внешний ключ на такую таблицу (competitor_products -> competitor_links);
+    - строки удаляются порциями по CABINET_TEARDOWN_CHUNK_SIZE в порядке
+      первичного ключа, каждая порция - отдельная короткая транзакция,
+      дочерние таблицы раньше родительских;
+    - прогресс пишется в Redis (cabinet_teardown:<id>);
+    - RAG-индекс удаляется через AI-сервис; если AI-сервис недоступен,
+      запуск завершается ошибкой и строка кабинета остается до повтора;
+    - строка кабинета удаляется последней.
+
+Удаление идемпотентно: повторный запуск после сбоя продолжает с оставшихся
+строк, уже удаленные порции не трогаются.
+"""
+
+import os
+import json
+import time
+import logging
+import importlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+from sqlalchemy import Table, delete, select, update
+from sqlalchemy.orm import Session
+
+from ...core.database import Base, SessionLocal
+from .models import WBCabinet
+
+logger = logging.getLogger(__name__)
+
+CABINET_TEARDOWN_CHUNK_SIZE = int(os.getenv("CABINET_TEARDOWN_CHUNK_SIZE", "1000"))
+# Пауза между порциями - окно для транзакций синхронизации других кабинетов
+CABINET_TEARDOWN_PAUSE_SECONDS = float(os.getenv("CABINET_TEARDOWN_PAUSE_SECONDS", "0.05"))
+CABINET_TEARDOWN_PROGRESS_TTL = int(os.getenv("CABINET_TEARDOWN_PROGRESS_TTL", "604800"))
+
+PROGRESS_KEY = "cabinet_teardown:{cabinet_id}"
+
+# Модули моделей, которые должны быть зарегистрированы в Base.metadata до поиска таблиц
+MODEL_MODULES = (
+    "app.features.user.models",
+    "app.features.wb_api.models",
+    "app.features.wb_api.models_sales",
+    "app.features.wb_api.models_cabinet_users",
+    "app.features.competitors.models",
+    "app.features.semantic_core.models",
+    "app.features.export.models",
+    "app.features.stock_alerts.models",
+    "app.features.digest.models",
+    "app.features.notifications.models",
+)
+
+
+@dataclass
+class TeardownStep:
+    """Таблица с данными кабинета и условие выборки ее строк"""
+    table: Table
+    condition: Callable[[int], Any]
+
+    @property
+    def name(self) -> str:
+        return self.table.name
+
+
+def _scope(table: Table, scopes: Dict[str, Callable[[int], Any]]) -> Optional[Callable[[int], Any]]:
+    """Условие принадлежности строк table кабинету, если оно выводится из схемы"""
+    cabinet_column = table.c.get("cabinet_id")
+    if cabinet_column is not None:
+        return lambda cabinet_id: cabinet_column == cabinet_id
+
+    for fk in table.foreign_keys:
+        parent = fk.column.table
+        # SET NULL - строка переживает родителя, ее не удаляем
+        if parent.name not in scopes or (fk.ondelete or "").upper() == "SET NULL":
+            continue
+        parent_condition = scopes[parent.name]
+        parent_key = fk.column
+        return lambda cabinet_id, column=fk.parent: column.in_(
+            select(parent_key).where(parent_condition(cabinet_id))
+        )
+    return None
+
+
+def discover_teardown_steps(metadata=Base.metadata) -> List[TeardownStep]:
+    """
+    Все таблицы с данными кабинета, дочерние раньше родительских
+
+    Строка wb_cabinets в список не входит - она удаляется последней отдельно.
+    """
+    for module in MODEL_MODULES:
+        importlib.import_module(module)
+
+    scopes: Dict[str, Callable[[int], Any]] = {}
+    ordered: List[Table] = []
+    # sorted_tables - родители раньше детей, так условие родителя уже известно
+    for table in metadata.sorted_tables:
+        if table.name == WBCabinet.__tablename__ or len(table.primary_key.columns) != 1:
+            continue
+        condition = _scope(table, scopes)
+        if condition is not None:
+            scopes[table.name] = condition
+            ordered.append(table)
+
+    return [TeardownStep(table=table, condition=scopes[table.name]) for table in reversed(ordered)]
+
+
+def purge_rag_index(cabinet_id: int) -> str:
+    """
+    Удалить RAG-индекс кабинета в AI-сервисе
+
+    Returns:
+        "purged", "skipped" (AI-сервис не настроен) или "failed"
+    """
+    gpt_service_url = os.getenv("GPT_INTEGRATION_URL")
+    api_key = os.getenv("API_SECRET_KEY")
+    if not gpt_service_url or not api_key:
+        return "skipped"
+    try:
+        response = requests.delete(
+            f"{gpt_service_url.rstrip('/')}/v1/rag/index/{cabinet_id}",
+            headers={"X-API-KEY": api_key},
+            timeout=120,
+        )
+        response.raise_for_status()
+        return "purged"
+    except requests.RequestException as e:
+        logger.error(f"❌ Failed to purge RAG index for cabinet {cabinet_id}: {e}")
+        return "failed"
+
+
+class CabinetTeardown:
+    """Порционное удаление кабинета с прогрессом в Redis"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        redis_client=None,
+        chunk_size: int = CABINET_TEARDOWN_CHUNK_SIZE,
+        pause_seconds: float = CABINET_TEARDOWN_PAUSE_SECONDS,
+        rag_purger: Callable[[int], str] = purge_rag_index,
+    ):
+        self.session_factory = session_factory
+        self._redis = redis_client
+        self.chunk_size = chunk_size
+        self.pause_seconds = pause_seconds
+        self.rag_purger = rag_purger
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from app.core.redis import get_redis_client
+            self._redis = get_redis_client()
+        return self._redis
+
+    def get_progress(self, cabinet_id: int) -> Optional[Dict[str, Any]]:
+        """Прогресс удаления кабинета или None, если удаление не запускалось"""
+        try:
+            raw = self.redis.get(PROGRESS_KEY.format(cabinet_id=cabinet_id))
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to read teardown progress for cabinet {cabinet_id}: {e}")
+            return None
+        return json.loads(raw) if raw else None
+
+    def _save_progress(self, progress: Dict[str, Any]) -> None:
+        progress["updated_at"] = datetime.now(timezone.utc).isoformat()
+        try:
+            self.redis.set(
+                PROGRESS_KEY.format(cabinet_id=progress["cabinet_id"]),
+                json.dumps(progress),
+                ex=CABINET_TEARDOWN_PROGRESS_TTL,
+            )
+        except Exception as e:
+            # Прогресс - только для наблюдения, удаление не прерываем
+            logger.warning(f"⚠️ Failed to save teardown progress for cabinet {progress['cabinet_id']}: {e}")
+
+    def deactivate(self, cabinet_id: int) -> bool:
+        """Выключить кабинет из синхронизации; False - кабинета нет"""
+        db = self.session_factory()
+        try:
+            updated = db.execute(
+                update(WBCabinet.__table__)
+                .where(WBCabinet.__table__.c.id == cabinet_id)
+                .values(is_active=False)
+            ).rowcount
+            db.commit()
+            return bool(updated)
+        finally:
+            db.close()
+
+    def delete_chunk(self, db: Session, step: TeardownStep, cabinet_id: int) -> int:
+        """Одна порция: до chunk_size строк с наименьшими первичными ключами"""
+        pk = next(iter(step.table.primary_key.columns))
+        ids = db.execute(
+            select(pk).where(step.condition(cabinet_id)).order_by(pk).limit(self.chunk_size)
+        ).scalars().all()
+        if not ids:
+            return 0
+        db.execute(delete(step.table).where(pk.in_(ids)))
+        db.commit()
+        return len(ids)
+
+    def run(self, cabinet_id: int) -> Dict[str, Any]:
+        """
+        Удалить кабинет и все его данные
+
+        Returns:
+            Итоговый прогресс: status, deleted (по таблицам), chunks, rag
+        """
+        progress = self.get_progress(cabinet_id) or {}
+        deleted: Dict[str, int] = progress.get("deleted", {})
+        progress.update({
+            "cabinet_id": cabinet_id,
+            "status": "running",
+            "current_table": None,
+            "deleted": deleted,
+            "chunks": progress.get("chunks", 0),
+            "started_at": progress.get("started_at") or datetime.now(timezone.utc).isoformat(),
+            "error": None,
+        })
+        self._save_progress(progress)
+        logger.info(f"🧹 Starting teardown of cabinet {cabinet_id} (chunk size {self.chunk_size})")
+
+        try:
+            self.deactivate(cabinet_id)
+
+            db = self.session_factory()
+            try:
+                for step in discover_teardown_steps():
+                    progress["current_table"] = step.name
+                    while True:
+                        count = self.delete_chunk(db, step, cabinet_id)
+                        if not count:
+                            break
+                        deleted[step.name] = deleted.get(step.name, 0) + count
+                        progress["chunks"] += 1
+                        self._save_progress(progress)
+                        if count < self.chunk_size:
+                            break
+                        if self.pause_seconds:
+                            time.sleep(self.pause_seconds)
+
+                progress["current_table"] = "rag_index"
+                progress["rag"] = self.rag_purger(cabinet_id)
+                if progress["rag"] == "failed":
+                    # Строку кабинета не удаляем: повтор задачи дочистит индекс
+                    raise RuntimeError(f"RAG index purge failed for cabinet {cabinet_id}")
+
+                progress["current_table"] = WBCabinet.__tablename__
+                db.execute(delete(WBCabinet.__table__).where(WBCabinet.__table__.c.id == cabinet_id))
+                db.commit()
+            finally:
+                db.close()
+        except Exception as e:
+            logger.error(f"❌ Teardown of cabinet {cabinet_id} failed at {progress['current_table']}: {e}", exc_info=True)
+            progress.update({"status": "failed", "error": str(e)})
+            self._save_progress(progress)
+            raise
+
+        progress.update({
+            "status": "completed",
+            "current_table": None,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+        })
+        self._save_progress(progress)
+        logger.info(
+            f"✅ Cabinet {cabinet_id} removed: {sum(deleted.values())} rows in "
+            f"{progress['chunks']} chunks, RAG index {progress.get('rag')}"
+        )
+        return progress
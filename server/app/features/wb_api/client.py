@@ -4,6 +4,7 @@ import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timezone
 from .models import WBCabinet
+from .key_validation import get_key_validation_cache
 
 logger = logging.getLogger(__name__)
 
@@ -149,11 +150,14 @@ class WBAPIClient:
                     # Обработка успешного ответа
                     if response.status_code == 200:
                         self.request_counters[api_type] += 1
+                        # Успешный запрос подтверждает ключ - перед следующей синхронизацией не перепроверяем
+                        get_key_validation_cache().confirm_valid(self.api_key)
                         return response.json()
                     
                     # Обработка ошибок
                     elif response.status_code == 401:
                         logger.error(f"Unauthorized: Invalid API key for cabinet {self.cabinet.id}")
+                        get_key_validation_cache().invalidate(self.api_key)
                         raise Exception("Invalid API key")
                     
                     elif response.status_code == 429:
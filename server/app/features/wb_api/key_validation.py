@@ -0,0 +1,261 @@
+"""
+Валидация API ключей WB с общим кэшем результатов.
+
+Раньше validate_all_cabinets проверял кабинеты по одному (каждая проверка -
+запрос с паузой rate limiter'а и повторами), а синхронизация перед каждым
+запуском заново проверяла ключ лишним запросом к WB.
+
+Теперь:
+    - результат проверки хранится в Redis по отпечатку ключа (sha256, сам
+      ключ в Redis не попадает): wb:key_validation:<fingerprint>;
+      валидный - KEY_VALIDATION_TTL, невалидный (401) - KEY_VALIDATION_INVALID_TTL,
+      сетевые ошибки, 429 и 5xx не кэшируются;
+    - любой успешный запрос клиента синхронизации подтверждает ключ
+      (WBAPIClient._make_request -> confirm_valid), поэтому регулярно
+      синхронизируемые кабинеты перепроверять не нужно;
+    - обход всех кабинетов идет параллельно (KEY_VALIDATION_CONCURRENCY),
+      с ограничением частоты запросов на каждый хост WB API и паузой хоста
+      по Retry-After при 429.
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timezone
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+KEY_VALIDATION_TTL = int(os.getenv("KEY_VALIDATION_TTL", "21600"))
+KEY_VALIDATION_INVALID_TTL = int(os.getenv("KEY_VALIDATION_INVALID_TTL", "600"))
+KEY_VALIDATION_CONCURRENCY = int(os.getenv("KEY_VALIDATION_CONCURRENCY", "10"))
+# Запросов в секунду на один хост WB API
+KEY_VALIDATION_HOST_RPS = float(os.getenv("KEY_VALIDATION_HOST_RPS", "10"))
+KEY_VALIDATION_ATTEMPTS = 3
+KEY_VALIDATION_RETRY_DELAY = float(os.getenv("KEY_VALIDATION_RETRY_DELAY", "1"))
+# Подтверждение ключа из синхронизации пишется в Redis не чаще раза в N секунд
+KEY_CONFIRM_INTERVAL = int(os.getenv("KEY_CONFIRM_INTERVAL", "300"))
+
+VALIDATION_URL = "https://marketplace-api.wildberries.ru/api/v3/warehouses"
+CACHE_KEY = "wb:key_validation:{fingerprint}"
+
+
+def key_fingerprint(api_key: str) -> str:
+    """Отпечаток API ключа для ключей кэша и логов"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:32]
+
+
+class KeyValidationCache:
+    """Результаты проверки ключей в Redis"""
+
+    def __init__(self, redis_client=None):
+        self._redis = redis_client
+        self._confirmed_at: Dict[str, float] = {}
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from app.core.redis import get_redis_client
+            self._redis = get_redis_client()
+        return self._redis
+
+    def get(self, api_key: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = self.redis.get(CACHE_KEY.format(fingerprint=key_fingerprint(api_key)))
+        except Exception as e:
+            logger.warning(f"⚠️ Key validation cache unavailable: {e}")
+            return None
+        return json.loads(raw) if raw else None
+
+    def set(self, api_key: str, result: Dict[str, Any], source: str = "validation") -> None:
+        """Сохранить однозначный результат (валиден / 401)"""
+        ttl = KEY_VALIDATION_TTL if result["valid"] else KEY_VALIDATION_INVALID_TTL
+        entry = {
+            "valid": result["valid"],
+            "status_code": result.get("status_code"),
+            "message": result.get("message"),
+            "source": source,
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+        }
+        try:
+            self.redis.set(CACHE_KEY.format(fingerprint=key_fingerprint(api_key)), json.dumps(entry), ex=ttl)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to cache key validation: {e}")
+
+    def confirm_valid(self, api_key: str) -> None:
+        """Ключ подтвержден успешным запросом к WB (продлевает TTL)"""
+        fingerprint = key_fingerprint(api_key)
+        now = time.monotonic()
+        if now - self._confirmed_at.get(fingerprint, -KEY_CONFIRM_INTERVAL) < KEY_CONFIRM_INTERVAL:
+            return
+        self._confirmed_at[fingerprint] = now
+        self.set(api_key, {"valid": True, "status_code": 200, "message": "API key is valid"}, source="sync")
+
+    def invalidate(self, api_key: str) -> None:
+        """Сбросить результат - следующая проверка пойдет в WB"""
+        self._confirmed_at.pop(key_fingerprint(api_key), None)
+        try:
+            self.redis.delete(CACHE_KEY.format(fingerprint=key_fingerprint(api_key)))
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to invalidate key validation: {e}")
+
+
+_shared_cache: Optional[KeyValidationCache] = None
+
+
+def get_key_validation_cache() -> KeyValidationCache:
+    """Кэш процесса (одно подключение к Redis на процесс)"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = KeyValidationCache()
+    return _shared_cache
+
+
+class HostRateLimiter:
+    """Равномерная частота запросов на хост; при 429 хост ставится на паузу"""
+
+    def __init__(self, requests_per_second: float = KEY_VALIDATION_HOST_RPS):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, host: str) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def pause(self, host: str, seconds: float) -> None:
+        """Следующие запросы к хосту - не раньше чем через seconds"""
+        resume_at = time.monotonic() + seconds
+        self._next_slot[host] = max(self._next_slot.get(host, 0.0), resume_at)
+
+
+class KeyValidator:
+    """Проверка ключей с кэшем, ограничением параллельности и частоты по хостам"""
+
+    def __init__(
+        self,
+        cache: Optional[KeyValidationCache] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        limiter: Optional[HostRateLimiter] = None,
+        concurrency: int = KEY_VALIDATION_CONCURRENCY,
+        validation_url: str = VALIDATION_URL,
+    ):
+        self.cache = cache or get_key_validation_cache()
+        self._http = http_client
+        self.limiter = limiter or HostRateLimiter()
+        self.concurrency = concurrency
+        self.validation_url = validation_url
+        self.outbound_calls = 0
+
+    @asynccontextmanager
+    async def _client(self, client: Optional[httpx.AsyncClient] = None) -> AsyncIterator[httpx.AsyncClient]:
+        """
+        HTTP клиент на время вызова: клиент вызывающего, переданный в конструктор
+        или собственный клиент этого вызова.
+
+        Клиент вызова в self не сохраняется: параллельные validate() не должны
+        получить чужой клиент, закрытый при завершении другого вызова.
+        """
+        if client is not None:
+            yield client
+            return
+        if self._http is not None:
+            yield self._http
+            return
+        async with httpx.AsyncClient(timeout=30.0) as own_client:
+            yield own_client
+
+    @staticmethod
+    async def _backoff(attempt: int) -> None:
+        if attempt < KEY_VALIDATION_ATTEMPTS - 1:
+            await asyncio.sleep(KEY_VALIDATION_RETRY_DELAY * 2 ** attempt)
+
+    async def _probe(self, api_key: str, client: httpx.AsyncClient) -> Dict[str, Any]:
+        """
+        Один запрос к WB (с повторами только для 429/5xx/таймаутов)
+
+        Returns:
+            valid: True / False (401) / None (проверить не удалось)
+        """
+        host = urlsplit(self.validation_url).netloc
+        headers = {"Authorization": f"Bearer {api_key}"}
+        result: Dict[str, Any] = {"valid": None, "status_code": 0, "message": "Validation not attempted"}
+
+        for attempt in range(KEY_VALIDATION_ATTEMPTS):
+            await self.limiter.acquire(host)
+            self.outbound_calls += 1
+            try:
+                response = await client.get(self.validation_url, headers=headers)
+            except httpx.HTTPError as e:
+                result = {"valid": None, "status_code": 0, "message": f"Validation error: {e}"}
+                await self._backoff(attempt)
+                continue
+
+            if response.status_code == 200:
+                return {"valid": True, "status_code": 200, "message": "API key is valid"}
+            if response.status_code == 401:
+                error_data = response.json() if response.content else {}
+                return {
+                    "valid": False,
+                    "status_code": 401,
+                    "message": error_data.get("detail", "API access token not valid"),
+                    "error_code": error_data.get("code", ""),
+                    "title": error_data.get("title", "unauthorized"),
+                }
+            if response.status_code == 429:
+                retry_after = float(response.headers.get("Retry-After", 10))
+                logger.warning(f"⏳ {host} rate limited validation, pausing host for {retry_after}s")
+                self.limiter.pause(host, retry_after)
+                result = {"valid": None, "status_code": 429, "message": "Rate limit exceeded"}
+                continue
+            if response.status_code >= 500:
+                result = {"valid": None, "status_code": response.status_code, "message": f"Server error: {response.status_code}"}
+                await self._backoff(attempt)
+                continue
+            # Прочие ответы о валидности ключа ничего не говорят
+            return {"valid": None, "status_code": response.status_code, "message": f"API returned status {response.status_code}"}
+
+        return result
+
+    async def validate(
+        self,
+        api_key: str,
+        use_cache: bool = True,
+        client: Optional[httpx.AsyncClient] = None,
+    ) -> Dict[str, Any]:
+        """Результат проверки ключа (из кэша или из WB)"""
+        if use_cache:
+            cached = self.cache.get(api_key)
+            if cached is not None:
+                return {**cached, "cached": True}
+
+        async with self._client(client) as http:
+            result = await self._probe(api_key, http)
+        if result["valid"] is not None:
+            self.cache.set(api_key, result)
+        else:
+            logger.warning(f"⚠️ Key {key_fingerprint(api_key)[:8]} not validated: {result['message']}")
+        return {**result, "cached": False}
+
+    async def validate_many(self, api_keys: Sequence[str], use_cache: bool = True) -> List[Dict[str, Any]]:
+        """Параллельная проверка ключей (результаты в порядке api_keys)"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        # Один клиент на весь обход (одно соединение на хост), передается явно
+        async with self._client() as client:
+            async def validate_one(api_key: str) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self.validate(api_key, use_cache=use_cache, client=client)
+
+            return await asyncio.gather(*(validate_one(api_key) for api_key in api_keys))
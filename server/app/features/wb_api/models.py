@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Float, ForeignKey, UniqueConstraint, Index, func
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Float, ForeignKey, UniqueConstraint, Index, func, text
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 
@@ -124,6 +124,11 @@ class WBOrder(Base):
         Index('idx_nm_id', 'nm_id'),
         Index('idx_order_date', 'order_date'),
         Index('idx_order_status', 'status'),
+        # Горячие запросы (migrations/004_hot_query_indexes.sql, 005_listing_keyset_indexes.sql)
+        Index('idx_wb_orders_cabinet_date_id', 'cabinet_id', 'order_date', 'id'),
+        Index('idx_wb_orders_cabinet_date_active', 'cabinet_id', 'order_date',
+              postgresql_where=text("status <> 'canceled'")),
+        Index('idx_wb_orders_position_date', 'cabinet_id', 'nm_id', 'warehouse_from', 'size', 'order_date'),
     )
 
     def __repr__(self):
@@ -171,6 +176,9 @@ class WBStock(Base):
         Index('idx_quantity', 'quantity'),
         Index('idx_warehouse_name', 'warehouse_name'),
         Index('idx_last_updated', 'last_updated'),
+        # Горячие запросы (migrations/004_hot_query_indexes.sql, 005_listing_keyset_indexes.sql)
+        Index('idx_wb_stocks_cabinet_quantity', 'cabinet_id', 'quantity'),
+        Index('idx_wb_stocks_cabinet_updated_id', 'cabinet_id', 'last_updated', 'id'),
     )
 
     def __repr__(self):
@@ -201,6 +209,12 @@ class WBReview(Base):
     was_viewed = Column(Boolean, nullable=True)                # wasViewed
     supplier_feedback_valuation = Column(Integer, nullable=True)  # supplierFeedbackValuation
     supplier_product_valuation = Column(Integer, nullable=True)    # supplierProductValuation
+
+    # Локальная классификация при синхронизации (review_classifier.py, migrations/006_review_sentiment.sql)
+    sentiment = Column(String(16), nullable=True)              # positive / neutral / negative
+    sentiment_score = Column(Float, nullable=True)             # [-1, 1]
+    topics = Column(String(255), nullable=True)                # ",size,quality,"
+    classifier_version = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -212,6 +226,9 @@ class WBReview(Base):
         UniqueConstraint('cabinet_id', 'review_id', name='uq_cabinet_review_id'),
         Index('idx_nm_id_rating', 'nm_id', 'rating'),
         Index('idx_is_answered', 'is_answered'),
+        # Горячие запросы (migrations/004_hot_query_indexes.sql, 005_listing_keyset_indexes.sql)
+        Index('idx_wb_reviews_cabinet_created_id', 'cabinet_id', 'created_date', 'id'),
+        Index('idx_wb_reviews_cabinet_sentiment_created', 'cabinet_id', 'sentiment', 'created_date'),
     )
 
     def __repr__(self):
@@ -1,7 +1,7 @@
 """
 Модель для продаж и возвратов Wildberries
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, func, Index, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, func, Index, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 from ...core.database import Base
 
@@ -53,6 +53,12 @@ class WBSales(Base):
         Index('idx_sales_type', 'type'),
         Index('idx_sales_is_cancel', 'is_cancel'),
         Index('idx_sales_g_number', 'g_number'),  # Индекс для сопоставления с заказами
+        # Горячие запросы (migrations/004_hot_query_indexes.sql)
+        Index('idx_wb_sales_cabinet_date_active', 'cabinet_id', 'sale_date',
+              postgresql_where=text("is_cancel = false OR is_cancel IS NULL")),
+        Index('idx_wb_sales_cabinet_nm_type_active', 'cabinet_id', 'nm_id', 'type', 'sale_date',
+              postgresql_where=text("is_cancel = false OR is_cancel IS NULL")),
+        Index('idx_wb_sales_cabinet_g_number', 'cabinet_id', 'g_number'),
     )
 
     def __repr__(self):
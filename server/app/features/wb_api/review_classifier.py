@@ -0,0 +1,226 @@
+"""
+Локальная классификация отзывов: тональность и темы.
+
+Сводка отзывов в боте и уведомления о негативных отзывах опирались только
+на оценку (rating <= порог), а все, что сложнее, уходило в GPT. Пятизвездный
+отзыв "пришел брак, шов разошелся" оставался незамеченным.
+
+Классификатор - словарь основ (без внешних зависимостей, только CPU):
+    - текст, достоинства (pros), недостатки (cons) и теги WB (bables)
+      разбиваются на слова, каждое слово ищется в словаре по самой длинной
+      совпадающей основе ("бракованный" -> "бракован", "неудобно" -> "неудобн",
+      а не "удобн"); результат поиска кэшируется на слово;
+    - "не" / "нет" / "без" в пределах двух слов меняют знак веса,
+      "нет" после негативного слова ("брака нет") - тоже;
+    - непустые pros / cons ("нет", "-", "все устраивает" - пустые) и оценка
+      сдвигают итог; score в [-1, 1], метка - positive / neutral / negative;
+    - темы (размер, качество, доставка...) - теги основ словаря.
+
+Отзыв классифицируется один раз при синхронизации (новый или изменившийся,
+либо классифицированный прежней версией словаря - CLASSIFIER_VERSION), и
+результат хранится в колонках wb_reviews - сводки и дайджесты фильтруют и
+агрегируют его в SQL. Темы хранятся строкой ",size,quality," - фильтр по
+теме: topic_filter(WBReview.topics, "size").
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Увеличивается при изменении словаря или весов: отзывы переклассифицируются
+CLASSIFIER_VERSION = 2
+
+POSITIVE = "positive"
+NEUTRAL = "neutral"
+NEGATIVE = "negative"
+SENTIMENTS = (POSITIVE, NEUTRAL, NEGATIVE)
+
+TOPICS: Dict[str, str] = {
+    "size": "Размер",
+    "quality": "Качество",
+    "material": "Материал",
+    "appearance": "Внешний вид",
+    "description": "Соответствие описанию",
+    "delivery": "Доставка",
+    "packaging": "Упаковка",
+    "price": "Цена",
+    "smell": "Запах",
+}
+
+# Граница метки по score
+SENTIMENT_THRESHOLD = 0.2
+# Вклад оценки: (rating - 3) * RATING_WEIGHT
+RATING_WEIGHT = 1.0
+PROS_WEIGHT = 0.5
+CONS_WEIGHT = -1.0
+# Сколько следующих слов затрагивает отрицание
+NEGATION_WINDOW = 2
+
+# Основа -> (вес тональности, темы). Ищется самая длинная основа - префикс слова
+LEXICON: Dict[str, Tuple[float, Tuple[str, ...]]] = {
+    # Положительные
+    "отличн": (2.0, ()), "прекрасн": (2.0, ()), "замечательн": (2.0, ()), "великолеп": (2.0, ()),
+    "идеальн": (2.0, ("size",)), "шикарн": (2.0, ()), "восторг": (2.0, ()), "супер": (2.0, ()),
+    "хорош": (1.5, ()), "класс": (1.5, ()), "рекоменд": (1.5, ()), "довол": (1.5, ()),
+    "нрав": (1.5, ()), "понрав": (1.5, ()), "красив": (1.5, ("appearance",)), "качествен": (1.5, ("quality",)),
+    "удобн": (1.0, ()), "приятн": (1.0, ()), "стильн": (1.0, ("appearance",)), "достойн": (1.0, ()),
+    "спасиб": (1.0, ()), "благодар": (1.0, ()), "впору": (1.0, ("size",)), "соответству": (1.0, ("description",)),
+    "норм": (0.5, ()), "нормальн": (0.5, ()), "мягк": (0.5, ("material",)), "тепл": (0.5, ()),
+    "быстр": (0.5, ()), "аккуратн": (1.0, ()), "плотн": (0.5, ("material",)),
+    # Отрицательные
+    "плох": (-2.0, ()), "ужас": (-2.5, ()), "отвратит": (-2.5, ()), "кошмар": (-2.5, ()), "отстой": (-2.0, ()),
+    "разочар": (-2.0, ()), "обман": (-2.0, ("description",)), "подделк": (-2.0, ("quality",)),
+    "брак": (-2.0, ("quality",)), "бракован": (-2.0, ("quality",)), "порван": (-2.0, ("quality",)),
+    "порвал": (-2.0, ("quality",)), "слома": (-2.0, ("quality",)), "дыр": (-1.5, ("quality",)),
+    "пятн": (-1.5, ("quality",)), "грязн": (-1.5, ("quality",)),
+    "крив": (-1.5, ("quality",)), "катыш": (-1.5, ("material",)), "линя": (-1.5, ("material",)),
+    "полинял": (-1.5, ("material",)), "колюч": (-1.0, ("material",)), "тонк": (-0.5, ("material",)),
+    "дешевк": (-1.5, ("quality",)), "неудобн": (-1.5, ()), "некачествен": (-2.0, ("quality",)),
+    "вернул": (-1.5, ()), "возврат": (-1.5, ()), "жаль": (-1.0, ()), "мусор": (-1.5, ()),
+    "маломер": (-1.5, ("size",)), "большемер": (-1.5, ("size",)), "мал": (-0.5, ("size",)),
+    "маленьк": (-0.5, ("size",)), "велик": (-0.5, ("size",)), "тесн": (-1.0, ("size",)),
+    "воня": (-2.0, ("smell",)), "вонь": (-2.0, ("smell",)), "воняет": (-2.0, ("smell",)),
+    "расход": (-1.0, ("quality",)), "разошел": (-1.5, ("quality",)), "помят": (-1.0, ("packaging",)),
+    "долг": (-0.5, ()), "дорог": (-0.5, ("price",)),
+    # Только темы
+    "размер": (0.0, ("size",)), "длин": (0.0, ("size",)), "коротк": (0.0, ("size",)), "узк": (0.0, ("size",)),
+    "широк": (0.0, ("size",)), "рост": (0.0, ("size",)), "сидит": (0.0, ("size",)),
+    "качеств": (0.0, ("quality",)), "шов": (0.0, ("quality",)), "швы": (0.0, ("quality",)), "нитк": (0.0, ("quality",)),
+    "материал": (0.0, ("material",)), "ткан": (0.0, ("material",)), "хлоп": (0.0, ("material",)),
+    "синтет": (0.0, ("material",)), "состав": (0.0, ("material",)), "кож": (0.0, ("material",)),
+    "цвет": (0.0, ("appearance",)), "оттен": (0.0, ("appearance",)), "дизайн": (0.0, ("appearance",)),
+    "выгляд": (0.0, ("appearance",)), "фасон": (0.0, ("appearance",)),
+    "описани": (0.0, ("description",)), "фото": (0.0, ("description",)), "картинк": (0.0, ("description",)),
+    "заявлен": (0.0, ("description",)),
+    "доставк": (0.0, ("delivery",)), "доставил": (0.0, ("delivery",)), "курьер": (0.0, ("delivery",)),
+    # "пришел" / "пришла" в отзывах чаще значит "получил" ("пришел брак"), а не доставку
+    "пвз": (0.0, ("delivery",)), "привез": (0.0, ("delivery",)), "срок": (0.0, ("delivery",)),
+    "упаков": (0.0, ("packaging",)), "коробк": (0.0, ("packaging",)), "пакет": (0.0, ("packaging",)),
+    "цен": (0.0, ("price",)), "стоим": (0.0, ("price",)), "дешев": (0.0, ("price",)), "деньг": (0.0, ("price",)),
+    "скидк": (0.0, ("price",)),
+    "запах": (-0.5, ("smell",)), "пахн": (0.0, ("smell",)),
+    # Перекрывает короткую основу: "малыш" - не "мал"
+    "малыш": (0.0, ()),
+}
+
+NEGATIONS = frozenset({"не", "нет", "без", "ни"})
+MIN_STEM = min(len(stem) for stem in LEXICON)
+MAX_STEM = max(len(stem) for stem in LEXICON)
+
+_WORD_RE = re.compile(r"[а-яёa-z]+")
+# pros / cons без содержания: "нет", "-", "все устраивает", "не обнаружено"
+_EMPTY_SECTION_RE = re.compile(
+    r"^\s*(?:-+|нет|нету|не\s+нашл[аи]?|не\s+обнаружен[оы]?|все\s+устраивает|всё\s+устраивает|"
+    r"минусов\s+нет|недостатков\s+нет|нет\s+минусов|нет\s+недостатков|\.+)?\s*[.!)]*\s*$",
+    re.IGNORECASE,
+)
+
+_NO_MATCH: Tuple[float, Tuple[str, ...]] = (0.0, ())
+
+
+class ReviewClassification(NamedTuple):
+    sentiment: str
+    score: float
+    topics: Tuple[str, ...]
+
+
+@lru_cache(maxsize=65536)
+def _lookup(word: str) -> Tuple[float, Tuple[str, ...]]:
+    """Самая длинная основа словаря, являющаяся префиксом слова"""
+    for length in range(min(len(word), MAX_STEM), MIN_STEM - 1, -1):
+        entry = LEXICON.get(word[:length])
+        if entry is not None:
+            return entry
+    return _NO_MATCH
+
+
+def _has_content(section: Optional[str]) -> bool:
+    return bool(section) and not _EMPTY_SECTION_RE.match(section)
+
+
+def _analyze(text: str, topics: set) -> float:
+    """Сумма весов слов с учетом отрицаний; темы добавляются в topics"""
+    total = 0.0
+    negated = 0
+    previous = 0.0  # вес предыдущего слова
+    for word in _WORD_RE.findall(text.lower().replace("ё", "е")):
+        if word in NEGATIONS:
+            if word == "нет" and previous < 0:
+                # "брака нет" - отрицание после слова
+                total -= previous * 1.5
+                previous = 0.0
+                continue
+            negated = NEGATION_WINDOW
+            previous = 0.0
+            continue
+        weight, word_topics = _lookup(word)
+        if word_topics:
+            topics.update(word_topics)
+        if weight:
+            if negated:
+                # "не рекомендую" - негатив, "без брака" - слабый позитив
+                weight = -weight if weight > 0 else -weight * 0.5
+                negated = 0
+            total += weight
+        elif negated:
+            negated -= 1
+        previous = weight
+    return total
+
+
+def classify(text: Optional[str] = None, pros: Optional[str] = None, cons: Optional[str] = None,
+             rating: Optional[int] = None, bables: Optional[str] = None) -> ReviewClassification:
+    """Тональность (метка и score в [-1, 1]) и темы отзыва"""
+    topics: set = set()
+    total = 0.0
+    if text:
+        total += _analyze(text, topics)
+    if _has_content(pros):
+        total += PROS_WEIGHT + _analyze(pros, topics)
+    if _has_content(cons):
+        # Недостатки перечисляют проблемы и без оценочных слов ("маломерит")
+        total += CONS_WEIGHT + min(_analyze(cons, topics), 0.0)
+    if bables:
+        # Теги WB ("Качество", "Размер") дают только темы
+        _analyze(bables, topics)
+    if rating:
+        total += (rating - 3) * RATING_WEIGHT
+
+    score = round(total / (abs(total) + 2.0), 3)
+    if score > SENTIMENT_THRESHOLD:
+        sentiment = POSITIVE
+    elif score < -SENTIMENT_THRESHOLD:
+        sentiment = NEGATIVE
+    else:
+        sentiment = NEUTRAL
+    return ReviewClassification(sentiment, score, tuple(tag for tag in TOPICS if tag in topics))
+
+
+def encode_topics(topics: Iterable[str]) -> Optional[str]:
+    """Темы для колонки topics: ",size,quality," (None - тем нет)"""
+    topics = list(topics)
+    return f",{','.join(topics)}," if topics else None
+
+
+def decode_topics(value: Optional[str]) -> List[str]:
+    return [tag for tag in (value or "").split(",") if tag]
+
+
+def topic_filter(column, topic: str):
+    """Условие SQL "у отзыва есть тема topic" для колонки topics"""
+    return column.like(f"%,{topic},%")
+
+
+def review_signature(review) -> tuple:
+    """Поля, от которых зависит классификация отзыва"""
+    return review.text, review.pros, review.cons, review.rating, review.bables
+
+
+def apply_classification(review) -> ReviewClassification:
+    """Классифицирует WBReview и записывает результат в его колонки"""
+    result = classify(review.text, review.pros, review.cons, review.rating, review.bables)
+    review.sentiment = result.sentiment
+    review.sentiment_score = result.score
+    review.topics = encode_topics(result.topics)
+    review.classifier_version = CLASSIFIER_VERSION
+    return result
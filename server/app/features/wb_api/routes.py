@@ -1,18 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+import asyncio
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timezone, timedelta
 
 from ...core.database import get_db
+from ...utils.pagination import CursorKey, InvalidCursorError, decode_cursor, encode_cursor, paginate
 from .models import WBCabinet, WBOrder, WBProduct, WBStock, WBReview, WBAnalyticsCache, WBWarehouse, WBSyncLog
 from .client import WBAPIClient
 from .sync_service import WBSyncService
 from .cache_manager import WBCacheManager
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/wb", tags=["Wildberries API"])
 
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _listing_cursor(kind: str, cursor: Optional[str], offset: int) -> Optional[CursorKey]:
+    """Ключ из курсора листинга (400 для чужого/поврежденного курсора или вместе с offset)"""
+    if cursor is None:
+        return None
+    if offset:
+        raise HTTPException(status_code=400, detail="Use either cursor or offset")
+    try:
+        return decode_cursor(kind, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _set_next_cursor(response: Response, kind: str, next_key: Optional[CursorKey]) -> None:
+    if next_key is not None:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(kind, next_key)
+
+
 @router.post("/cabinets/", response_model=Dict[str, Any])
 async def create_wb_cabinet(
     user_id: int,
@@ -188,19 +214,35 @@ async def delete_wb_cabinet(
     cabinet_id: int,
     db: Session = Depends(get_db)
 ):
-    """Удаление WB кабинета"""
+    """Удаление WB кабинета: кабинет выключается сразу, данные удаляются порциями в фоне"""
     try:
+        from .tasks import teardown_cabinet_task
+
         cabinet = db.query(WBCabinet).filter(WBCabinet.id == cabinet_id).first()
         
         if not cabinet:
             raise HTTPException(status_code=404, detail="Cabinet not found")
         
-        db.delete(cabinet)
+        cabinet.is_active = False
         db.commit()
+        try:
+            task = teardown_cabinet_task.delay(cabinet_id)
+        except Exception as enqueue_error:
+            # Брокер недоступен - удаляем здесь же, иначе кабинет останется выключенным навсегда
+            logger.warning(f"⚠️ Failed to enqueue teardown for cabinet {cabinet_id}: {enqueue_error}")
+            from .cabinet_teardown import CabinetTeardown
+            progress = await asyncio.to_thread(CabinetTeardown().run, cabinet_id)
+            return {
+                "status": "success",
+                "message": f"Cabinet {cabinet_id} deleted",
+                "task_id": None,
+                "teardown": progress["status"]
+            }
         
         return {
             "status": "success",
-            "message": f"Cabinet {cabinet_id} deleted successfully"
+            "message": f"Cabinet {cabinet_id} deletion scheduled",
+            "task_id": task.id
         }
         
     except HTTPException:
@@ -210,6 +252,17 @@ async def delete_wb_cabinet(
         raise HTTPException(status_code=500, detail=f"Error deleting cabinet: {str(e)}")
 
 
+@router.get("/cabinets/{cabinet_id}/teardown", response_model=Dict[str, Any])
+async def get_wb_cabinet_teardown(cabinet_id: int):
+    """Прогресс удаления WB кабинета"""
+    from .cabinet_teardown import CabinetTeardown
+
+    progress = CabinetTeardown().get_progress(cabinet_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Cabinet teardown not found")
+    return progress
+
+
 @router.get("/cabinets/{cabinet_id}/products", response_model=List[Dict[str, Any]])
 async def get_wb_products(
     cabinet_id: int,
@@ -256,14 +309,17 @@ async def get_wb_products(
 @router.get("/cabinets/{cabinet_id}/orders", response_model=List[Dict[str, Any]])
 async def get_wb_orders(
     cabinet_id: int,
+    response: Response,
     date_from: str = Query(..., description="Date from (YYYY-MM-DD)"),
     date_to: Optional[str] = Query(None, description="Date to (YYYY-MM-DD)"),
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor of the next page (X-Next-Cursor header)"),
     db: Session = Depends(get_db)
 ):
-    """Получение заказов WB кабинета"""
+    """Получение заказов WB кабинета (новые первыми; следующая страница - по курсору из X-Next-Cursor)"""
     try:
+        after = _listing_cursor("orders", cursor, offset)
         cabinet = db.query(WBCabinet).filter(WBCabinet.id == cabinet_id).first()
         if not cabinet:
             raise HTTPException(status_code=404, detail="Cabinet not found")
@@ -275,7 +331,8 @@ async def get_wb_orders(
         if date_to:
             query = query.filter(WBOrder.order_date <= date_to)
         
-        orders = query.offset(offset).limit(limit).all()
+        orders, next_key = paginate(query, WBOrder.order_date, WBOrder.id, limit, offset, after)
+        _set_next_cursor(response, "orders", next_key)
         
         return [
             {
@@ -306,14 +363,17 @@ async def get_wb_orders(
 @router.get("/cabinets/{cabinet_id}/stocks", response_model=List[Dict[str, Any]])
 async def get_wb_stocks(
     cabinet_id: int,
+    response: Response,
     date_from: str = Query(..., description="Date from (YYYY-MM-DD)"),
     date_to: Optional[str] = Query(None, description="Date to (YYYY-MM-DD)"),
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor of the next page (X-Next-Cursor header)"),
     db: Session = Depends(get_db)
 ):
-    """Получение остатков WB кабинета"""
+    """Получение остатков WB кабинета (свежие первыми; следующая страница - по курсору из X-Next-Cursor)"""
     try:
+        after = _listing_cursor("stocks", cursor, offset)
         cabinet = db.query(WBCabinet).filter(WBCabinet.id == cabinet_id).first()
         if not cabinet:
             raise HTTPException(status_code=404, detail="Cabinet not found")
@@ -325,7 +385,8 @@ async def get_wb_stocks(
         if date_to:
             query = query.filter(WBStock.last_updated <= date_to)
         
-        stocks = query.offset(offset).limit(limit).all()
+        stocks, next_key = paginate(query, WBStock.last_updated, WBStock.id, limit, offset, after)
+        _set_next_cursor(response, "stocks", next_key)
         
         return [
             {
@@ -356,13 +417,16 @@ async def get_wb_stocks(
 @router.get("/cabinets/{cabinet_id}/reviews", response_model=List[Dict[str, Any]])
 async def get_wb_reviews(
     cabinet_id: int,
+    response: Response,
     is_answered: Optional[bool] = Query(None, description="Filter by answered status"),
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor of the next page (X-Next-Cursor header)"),
     db: Session = Depends(get_db)
 ):
-    """Получение отзывов WB кабинета"""
+    """Получение отзывов WB кабинета (новые первыми; следующая страница - по курсору из X-Next-Cursor)"""
     try:
+        after = _listing_cursor("reviews", cursor, offset)
         cabinet = db.query(WBCabinet).filter(WBCabinet.id == cabinet_id).first()
         if not cabinet:
             raise HTTPException(status_code=404, detail="Cabinet not found")
@@ -372,7 +436,8 @@ async def get_wb_reviews(
         if is_answered is not None:
             query = query.filter(WBReview.is_answered == is_answered)
         
-        reviews = query.offset(offset).limit(limit).all()
+        reviews, next_key = paginate(query, WBReview.created_date, WBReview.id, limit, offset, after)
+        _set_next_cursor(response, "reviews", next_key)
         
         return [
             {
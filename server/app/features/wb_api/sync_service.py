@@ -10,7 +10,9 @@ from .models_cabinet_users import CabinetUser
 from .client import WBAPIClient
 from .cache_manager import WBCacheManager
 from .cabinet_manager import CabinetManager
+from .review_classifier import CLASSIFIER_VERSION, apply_classification, classify, encode_topics, review_signature
 from app.features.user.models import User
+from app.core import metrics
 from app.utils.timezone import TimezoneUtils, MSK_TZ
 
 logger = logging.getLogger(__name__)
@@ -35,7 +37,11 @@ class WBSyncService:
             
             async with notification_service._get_sync_lock(cabinet.id):
                 logger.info(f"🔒 Получена блокировка синхронизации для кабинета {cabinet.id}")
-                return await self._perform_sync_with_lock(cabinet)
+                try:
+                    return await self._perform_sync_with_lock(cabinet)
+                finally:
+                    # Синхронизация идет в воркере Celery - метрики этапов уходят сборщику API
+                    await metrics.registry.publish_async(force=True)
                 
         except Exception as e:
             logger.error(f"Ошибка синхронизации кабинета {cabinet.id}: {e}")
@@ -125,8 +131,10 @@ class WBSyncService:
             
             for task_name, task in sync_tasks:
                 try:
-                    result = await task
+                    with metrics.SYNC_STAGE_DURATION.time(task_name):
+                        result = await task
                     results[task_name] = result
+                    metrics.SYNC_STAGE_RESULTS.inc(task_name, str(result.get("status", "unknown")))
 
                     # Собираем changed_ids для RAG индексации
                     if task_name in changed_ids and result.get("changed_ids"):
@@ -137,6 +145,7 @@ class WBSyncService:
                 except Exception as e:
                     logger.error(f"Sync {task_name} failed: {e}")
                     results[task_name] = {"status": "error", "error": str(e)}
+                    metrics.SYNC_STAGE_RESULTS.inc(task_name, "error")
             
             # Обновляем цены товаров из остатков
             try:
@@ -156,11 +165,8 @@ class WBSyncService:
                 logger.error(f"Failed to update product ratings: {e}")
                 results["product_ratings"] = {"status": "error", "error": str(e)}
             
-            # ИСПРАВЛЕНИЕ: Сначала обрабатываем события, потом обновляем время
-            # Отправляем уведомления о новых событиях ДО обновления last_sync_at
-            await self._send_sync_completion_notification(cabinet.id, previous_sync_at)
-            
-            # Обновляем время последней синхронизации ПОСЛЕ обработки событий
+            # Обновляем время последней синхронизации. Окно уведомлений задается
+            # previous_sync_at, поэтому события можно обработать после коммита
             cabinet.last_sync_at = TimezoneUtils.now_msk()
             
             # Обновляем лог синхронизации
@@ -170,6 +176,20 @@ class WBSyncService:
             self.db.commit()
             logger.info(f"✅ Синхронизация кабинета {cabinet.id} завершена: {results}")
             
+            # Уведомления обрабатывает consumer потока событий синхронизации,
+            # блокировка кабинета не ждет отправки webhook-ов
+            sync_event_id = self._publish_sync_event(cabinet.id, previous_sync_at, is_first_sync, changed_ids)
+            if sync_event_id:
+                from app.features.notifications.tasks import consume_sync_events
+                try:
+                    consume_sync_events.delay()
+                except Exception as e:
+                    # Событие в потоке, его заберет периодический consumer
+                    logger.warning(f"⚠️ Failed to trigger sync events consumer: {e}")
+            else:
+                await self._send_sync_completion_notification(cabinet.id, previous_sync_at)
+                self.db.commit()
+            
             # Инвалидируем кэш после успешной синхронизации
             await self._invalidate_user_cache(cabinet.id)
             
@@ -189,6 +209,7 @@ class WBSyncService:
                 "results": results,
                 "sync_time": cabinet.last_sync_at.isoformat(),
                 "is_first_sync": is_first_sync,
+                "sync_event_id": sync_event_id,
                 "changed_ids": changed_ids  # ID изменений для event-driven RAG индексации
             }
             
@@ -240,109 +261,50 @@ class WBSyncService:
             logger.error(f"Error invalidating cache for cabinet {cabinet_id}: {e}")
     
     async def _send_sync_completion_notification(self, cabinet_id: int, previous_sync_at: datetime = None):
-        """Отправка уведомления о завершении синхронизации
+        """Синхронная отправка уведомлений о завершении синхронизации
+        
+        Используется, если событие синхронизации не удалось опубликовать в поток
+        (Redis недоступен). Коммит делает вызывающий код.
         
         Args:
             cabinet_id: ID кабинета
             previous_sync_at: Время предыдущей синхронизации (ДО текущей)
         """
         try:
-            logger.info(f"🔧 [_send_sync_completion_notification] cabinet_id={cabinet_id}, previous_sync_at={previous_sync_at}")
-            logger.info(f"🔧 [_send_sync_completion_notification] previous_sync_at type: {type(previous_sync_at)}")
-            logger.info(f"🔧 [_send_sync_completion_notification] previous_sync_at tzinfo: {previous_sync_at.tzinfo if previous_sync_at else 'None'}")
-            # Получаем всех пользователей кабинета
-            from app.features.wb_api.crud_cabinet_users import CabinetUserCRUD
-            cabinet_user_crud = CabinetUserCRUD()
-            user_ids = cabinet_user_crud.get_cabinet_users(self.db, cabinet_id)
-            
-            # Импортируем NotificationService для отправки webhook уведомлений
             from app.features.notifications.notification_service import NotificationService
             notification_service = NotificationService(self.db)
-            
-            # Создаем уведомление о завершении синхронизации для каждого пользователя
-            for user_id in user_ids:
-                # Проверяем, это ли первая синхронизация для конкретного пользователя
-                cabinet_user = self.db.query(CabinetUser).filter(
-                    CabinetUser.cabinet_id == cabinet_id,
-                    CabinetUser.user_id == user_id
-                ).first()
-                
-                is_first_sync = not cabinet_user.first_sync_completed if cabinet_user else True
-                
-                notification_data = {
-                    "type": "sync_completed",
-                    "cabinet_id": cabinet_id,
-                    "message": "Синхронизация завершена! Данные готовы к использованию.",
-                    "timestamp": TimezoneUtils.now_msk().isoformat(),
-                    "is_first_sync": is_first_sync
-                }
-                
-                # Отправляем webhook уведомление через NotificationService
-                try:
-                    webhook_result = await notification_service.send_sync_completion_notification(
-                        user_id=user_id,
-                        cabinet_id=cabinet_id,
-                        is_first_sync=is_first_sync
-                    )
-                    logger.info(f"📢 Webhook notification sent for user {user_id}: {webhook_result}")
-                except Exception as e:
-                    logger.error(f"❌ Failed to send webhook notification for user {user_id}: {e}")
-                
-                # Сохраняем уведомление в историю
-                from app.features.notifications.models import NotificationHistory
-                import json
-                import uuid
-                
-                notification = NotificationHistory(
-                    id=f"sync_completed_{uuid.uuid4().hex[:8]}",
-                    user_id=user_id,
-                    notification_type="sync_completed",
-                    priority="HIGH",
-                    title="Синхронизация завершена",
-                    content=json.dumps(notification_data),
-                    sent_at=TimezoneUtils.to_utc(TimezoneUtils.now_msk()),
-                    status="delivered"
-                )
-                
-                self.db.add(notification)
-                logger.info(f"📢 Sync completion notification created for user {user_id}")
-                
-                # Если это первая синхронизация для пользователя, устанавливаем флаг
-                if is_first_sync and cabinet_user:
-                    cabinet_user.first_sync_completed = True
-                    # НЕ КОММИТИМ ЗДЕСЬ - будет общий коммит в конце
-                    logger.info(f"🏁 First sync completed for user {user_id} in cabinet {cabinet_id}")
-                
-                # Обрабатываем уведомления о новых событиях (ПРОСТАЯ ЛОГИКА)
-                if previous_sync_at:
-                    try:
-                        logger.info(f"🔍 [Simple] Processing sync events for user {user_id} with previous_sync_at={previous_sync_at}")
-                        logger.info(f"🔍 [Simple] previous_sync_at type: {type(previous_sync_at)}")
-                        logger.info(f"🔍 [Simple] previous_sync_at tzinfo: {previous_sync_at.tzinfo if previous_sync_at else 'None'}")
-                        
-                        # Используем простую логику (как в старой версии)
-                        events_result = await notification_service.process_sync_events_simple(
-                            user_id=user_id,
-                            cabinet_id=cabinet_id,
-                            last_sync_at=previous_sync_at
-                        )
-                        
-                        # Создаем краткий отчет о результатах
-                        events_summary = {
-                            "status": events_result.get("status", "unknown"),
-                            "notifications_sent": events_result.get("notifications_sent", 0),
-                            "events_processed": len(events_result.get("events", [])) if isinstance(events_result.get("events"), list) else 0
-                        }
-                        logger.info(f"📢 [Simple] Processed sync events for user {user_id}: {events_summary}")
-                        
-                    except Exception as e:
-                        logger.error(f"❌ [Simple] Failed to process sync events for user {user_id}: {e}")
-            
-            # УБИРАЕМ ДВОЙНОЙ КОММИТ - коммит будет в основной функции
-            
+            await notification_service.process_sync_completed(cabinet_id, previous_sync_at)
         except Exception as e:
             logger.error(f"Error sending sync completion notification for cabinet {cabinet_id}: {e}")
-
+    
+    def _publish_sync_event(
+        self,
+        cabinet_id: int,
+        previous_sync_at: Optional[datetime],
+        is_first_sync: bool,
+        changed_ids: Dict[str, List]
+    ) -> Optional[str]:
+        """Публикация события синхронизации для consumer-а уведомлений
+        
+        Returns:
+            ID события или None, если Redis недоступен
+        """
+        try:
+            from app.core.redis import get_redis_client
+            from app.features.notifications.sync_event_stream import publish_sync_event
+            
+            return publish_sync_event(
+                get_redis_client(),
+                cabinet_id=cabinet_id,
+                previous_sync_at=previous_sync_at,
+                synced_at=TimezoneUtils.now_msk(),
+                is_first_sync=is_first_sync,
+                change_counts={name: len(ids) for name, ids in changed_ids.items()}
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to publish sync event for cabinet {cabinet_id}: {e}")
+            return None
+    
     async def sync_products(
         self, 
         cabinet: WBCabinet, 
@@ -1007,6 +969,7 @@ class WBSyncService:
         try:
             created = 0
             updated = 0
+            classified = 0
             changed_ids = []  # Список ID для RAG индексации
             
             for review_data in reviews_data:
@@ -1026,6 +989,7 @@ class WBSyncService:
                 
                 if existing:
                     # Обновляем существующий отзыв
+                    signature = review_signature(existing)
                     existing.nm_id = nm_id
                     existing.text = review_data.get("text")
                     existing.rating = review_data.get("productValuation")
@@ -1044,6 +1008,12 @@ class WBSyncService:
                     existing.supplier_feedback_valuation = review_data.get("supplierFeedbackValuation")
                     existing.supplier_product_valuation = review_data.get("supplierProductValuation")
 
+                    # Классифицируем только изменившиеся отзывы (или по прежней версии словаря)
+                    if (review_signature(existing) != signature
+                            or existing.classifier_version != CLASSIFIER_VERSION):
+                        apply_classification(existing)
+                        classified += 1
+
                     existing.updated_at = TimezoneUtils.now_msk()
                     updated += 1
                     changed_ids.append(existing.id)  # Добавляем id для RAG индексации
@@ -1070,6 +1040,8 @@ class WBSyncService:
                         supplier_feedback_valuation=review_data.get("supplierFeedbackValuation"),
                         supplier_product_valuation=review_data.get("supplierProductValuation")
                     )
+                    apply_classification(review)
+                    classified += 1
                     self.db.add(review)
                     self.db.flush()  # Получаем id для нового отзыва
                     created += 1
@@ -1084,7 +1056,10 @@ class WBSyncService:
             self._batch_stats['created'] += created
             self._batch_stats['updated'] += updated
 
-            logger.info(f"Processed batch: {created} created, {updated} updated, {len(changed_ids)} changed")
+            logger.info(
+                f"Processed batch: {created} created, {updated} updated, {len(changed_ids)} changed, "
+                f"{classified} classified"
+            )
 
             return changed_ids  # Возвращаем ID для RAG индексации
 
@@ -1138,6 +1113,16 @@ class WBSyncService:
                     "supplier_product_valuation": review_data.get("supplierProductValuation"),
                     "updated_at": TimezoneUtils.now_msk()
                 }
+                classification = classify(
+                    review_dict["text"], review_dict["pros"], review_dict["cons"],
+                    review_dict["rating"], review_dict["bables"],
+                )
+                review_dict.update(
+                    sentiment=classification.sentiment,
+                    sentiment_score=classification.score,
+                    topics=encode_topics(classification.topics),
+                    classifier_version=CLASSIFIER_VERSION,
+                )
                 
                 # Используем PostgreSQL UPSERT
                 stmt = insert(WBReview).values(**review_dict)
@@ -1159,6 +1144,10 @@ class WBSyncService:
                         'was_viewed': stmt.excluded.was_viewed,
                         'supplier_feedback_valuation': stmt.excluded.supplier_feedback_valuation,
                         'supplier_product_valuation': stmt.excluded.supplier_product_valuation,
+                        'sentiment': stmt.excluded.sentiment,
+                        'sentiment_score': stmt.excluded.sentiment_score,
+                        'topics': stmt.excluded.topics,
+                        'classifier_version': stmt.excluded.classifier_version,
                         'updated_at': stmt.excluded.updated_at
                     }
                 )
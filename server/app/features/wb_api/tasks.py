@@ -0,0 +1,24 @@
+"""
+Фоновые задачи кабинетов WB
+"""
+import logging
+from typing import Dict, Any
+
+from app.core.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(bind=True, max_retries=5)
+def teardown_cabinet_task(self, cabinet_id: int) -> Dict[str, Any]:
+    """
+    Порционное удаление кабинета и всех его данных.
+    Повтор после сбоя продолжает с оставшихся строк.
+    """
+    from .cabinet_teardown import CabinetTeardown
+
+    try:
+        return CabinetTeardown().run(cabinet_id)
+    except Exception as e:
+        logger.error(f"Error tearing down cabinet {cabinet_id}: {e}", exc_info=True)
+        raise self.retry(countdown=60 * (self.request.retries + 1), exc=e)
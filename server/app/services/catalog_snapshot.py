@@ -0,0 +1,227 @@
+"""
+Версионированный снапшот каталога из Google Sheets.
+
+Раньше каждый промах TTL-кэша читал весь лист через get_all_records, а кэш
+жил в словарях модуля - у каждого процесса (uvicorn/celery) свой, с разным
+содержимым и своими запросами к Sheets.
+
+Теперь каталог целиком (категории + товары) собирается в снапшот с индексами
+по категории и ID товара и хранится в Redis:
+
+    catalog:snapshot:current        -> {"version": ..., "revision": ...}
+    catalog:snapshot:<version>      -> JSON снапшота
+
+Фоновая задача (app.features.catalog.tasks) сравнивает ревизию таблицы
+(modifiedTime из Drive API - один легкий запрос) с ревизией снапшота и
+пересобирает снапшот, только если таблица изменилась. Процессы держат
+разобранный снапшот в памяти и сверяют версию в Redis не чаще раза в
+CATALOG_VERSION_CHECK_SECONDS - все поиски O(1) по словарям и одинаковы во
+всех процессах.
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_CHECK_SECONDS = float(os.getenv("CATALOG_VERSION_CHECK_SECONDS", "5"))
+CATALOG_REFRESH_INTERVAL = int(os.getenv("CATALOG_REFRESH_INTERVAL", "60"))
+# Старая версия живет еще какое-то время: процесс мог прочитать указатель до переключения
+CATALOG_OLD_VERSION_TTL = int(os.getenv("CATALOG_OLD_VERSION_TTL", "3600"))
+CATALOG_REFRESH_LOCK_TTL = 120
+# Холодный старт: сколько ждать снапшот, который собирает другой процесс
+CATALOG_COLD_START_WAIT = float(os.getenv("CATALOG_COLD_START_WAIT", "10"))
+CATALOG_COLD_START_POLL = 0.2
+
+CURRENT_KEY = "catalog:snapshot:current"
+SNAPSHOT_KEY = "catalog:snapshot:{version}"
+LOCK_KEY = "catalog:snapshot:refresh_lock"
+
+
+class CatalogSource(Protocol):
+    """Источник каталога (Google Sheets или фейк в тестах)"""
+
+    def get_revision(self) -> Optional[str]:
+        """Ревизия данных; None - ревизия неизвестна (источник недоступен)"""
+        ...
+
+    def fetch_catalog(self) -> Tuple[List[Dict], List[Dict]]:
+        """(категории, товары) в нормализованном виде"""
+        ...
+
+
+@dataclass
+class CatalogSnapshot:
+    """Каталог с индексами по категории и ID товара"""
+    version: str
+    revision: Optional[str]
+    built_at: str
+    categories: List[Dict[str, Any]]
+    products: Dict[str, Dict[str, Any]]
+    by_category: Dict[str, List[str]] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, categories: List[Dict], products: List[Dict], revision: Optional[str]) -> "CatalogSnapshot":
+        by_id: Dict[str, Dict] = {}
+        by_category: Dict[str, List[str]] = {}
+        for product in products:
+            product_id = product["product_id"]
+            by_id[product_id] = product
+            # В выдачу по категории попадают только активные товары
+            if product.get("is_active"):
+                by_category.setdefault(product["category"], []).append(product_id)
+        return cls(
+            version=uuid.uuid4().hex,
+            revision=revision,
+            built_at=datetime.now(timezone.utc).isoformat(),
+            categories=sorted(categories, key=lambda c: c["display_order"]),
+            products=by_id,
+            by_category=by_category,
+        )
+
+    def get_categories(self) -> List[Dict]:
+        return self.categories
+
+    def get_products_by_category(self, category_id: str) -> List[Dict]:
+        return [self.products[product_id] for product_id in self.by_category.get(category_id, [])]
+
+    def get_product(self, product_id: str) -> Optional[Dict]:
+        return self.products.get(product_id)
+
+    def to_json(self) -> str:
+        return json.dumps(self.__dict__, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "CatalogSnapshot":
+        return cls(**json.loads(raw))
+
+
+class CatalogSnapshotStore:
+    """Хранение снапшотов в Redis"""
+
+    def __init__(self, redis_client=None):
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from app.core.redis import get_redis_client
+            self._redis = get_redis_client()
+        return self._redis
+
+    def current(self) -> Optional[Dict[str, Any]]:
+        raw = self.redis.get(CURRENT_KEY)
+        return json.loads(raw) if raw else None
+
+    def load(self, version: str) -> Optional[CatalogSnapshot]:
+        raw = self.redis.get(SNAPSHOT_KEY.format(version=version))
+        return CatalogSnapshot.from_json(raw) if raw else None
+
+    def save(self, snapshot: CatalogSnapshot) -> None:
+        """Записывает снапшот и переключает на него указатель"""
+        previous = self.current()
+        self.redis.set(SNAPSHOT_KEY.format(version=snapshot.version), snapshot.to_json())
+        self.redis.set(CURRENT_KEY, json.dumps({"version": snapshot.version, "revision": snapshot.revision}))
+        if previous and previous["version"] != snapshot.version:
+            self.redis.expire(SNAPSHOT_KEY.format(version=previous["version"]), CATALOG_OLD_VERSION_TTL)
+
+    def acquire_refresh_lock(self) -> bool:
+        return bool(self.redis.set(LOCK_KEY, "1", ex=CATALOG_REFRESH_LOCK_TTL, nx=True))
+
+    def release_refresh_lock(self) -> None:
+        self.redis.delete(LOCK_KEY)
+
+
+class CatalogSnapshotManager:
+    """Снапшот каталога процесса, синхронизированный с Redis"""
+
+    def __init__(self, source: CatalogSource, store: Optional[CatalogSnapshotStore] = None):
+        self.source = source
+        self.store = store or CatalogSnapshotStore()
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[CatalogSnapshot]:
+        """
+        Текущий снапшот
+
+        Версия в Redis проверяется не чаще раза в CATALOG_VERSION_CHECK_SECONDS;
+        если снапшота еще нет (первый запуск) - собирается синхронно, а если его
+        уже собирает другой процесс - ждем его не дольше CATALOG_COLD_START_WAIT.
+        Пока снапшот не загружен, время проверки не запоминается: следующий
+        вызов снова идет в Redis, а не отдает пустой каталог.
+        """
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._checked_at < CATALOG_VERSION_CHECK_SECONDS:
+            return self._snapshot
+
+        with self._lock:
+            if self._snapshot is not None and now - self._checked_at < CATALOG_VERSION_CHECK_SECONDS:
+                return self._snapshot
+            try:
+                current = self.store.current()
+                if current is None and not self.refresh():
+                    current = self._wait_for_current()
+                if current is not None and (self._snapshot is None or self._snapshot.version != current["version"]):
+                    snapshot = self.store.load(current["version"])
+                    if snapshot is not None:
+                        self._snapshot = snapshot
+                        logger.info(f"📚 Loaded catalog snapshot {snapshot.version} (revision {snapshot.revision})")
+            except Exception as e:
+                # Redis недоступен - работаем на последнем снапшоте процесса
+                logger.error(f"❌ Failed to check catalog snapshot version: {e}")
+            if self._snapshot is not None:
+                self._checked_at = time.monotonic()
+        return self._snapshot
+
+    def _wait_for_current(self) -> Optional[Dict[str, Any]]:
+        """Указатель на снапшот, который собирает процесс, взявший блокировку"""
+        deadline = time.monotonic() + CATALOG_COLD_START_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(CATALOG_COLD_START_POLL)
+            current = self.store.current()
+            if current is not None:
+                return current
+        logger.warning(f"⚠️ Catalog snapshot not built by another process within {CATALOG_COLD_START_WAIT:.0f}s")
+        return None
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Пересобрать снапшот, если ревизия таблицы изменилась
+
+        Args:
+            force: Пересобрать без сравнения ревизий
+
+        Returns:
+            True, если собран новый снапшот
+        """
+        if not self.store.acquire_refresh_lock():
+            logger.info("Catalog snapshot refresh already in progress")
+            return False
+        try:
+            revision = self.source.get_revision()
+            current = self.store.current()
+            if not force and current and revision is not None and current.get("revision") == revision:
+                logger.debug(f"Catalog revision unchanged ({revision}), snapshot kept")
+                return False
+
+            categories, products = self.source.fetch_catalog()
+            snapshot = CatalogSnapshot.build(categories, products, revision)
+            self.store.save(snapshot)
+            self._snapshot = snapshot
+            self._checked_at = time.monotonic()
+            logger.info(
+                f"📚 Catalog snapshot {snapshot.version} built: {len(categories)} categories, "
+                f"{len(products)} products (revision {revision})"
+            )
+            return True
+        finally:
+            self.store.release_refresh_lock()
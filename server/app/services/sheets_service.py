@@ -1,13 +1,12 @@
 """
 Сервис для работы с Google Sheets
 """
-import gspread
-from google.oauth2.service_account import Credentials
-from cachetools import TTLCache
 import os
 import logging
 import re
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
+
+from app.services.catalog_snapshot import CatalogSnapshot, CatalogSnapshotManager, CatalogSnapshotStore
 
 logger = logging.getLogger(__name__)
 
@@ -46,14 +45,13 @@ def convert_google_drive_url(url: str) -> str:
     logger.debug(f"URL passed through without conversion: {url}")
     return url
 
-# Кеш для данных из Google Sheets
-categories_cache = TTLCache(maxsize=1, ttl=600)  # 10 минут
-products_cache = TTLCache(maxsize=100, ttl=300)  # 5 минут
-size_tables_cache = TTLCache(maxsize=50, ttl=1800)  # 30 минут
-
-
 class GoogleSheetsService:
-    """Сервис для работы с Google Sheets"""
+    """
+    Сервис для работы с Google Sheets
+
+    Каталог читается из версионированного снапшота (см. catalog_snapshot.py),
+    сам лист перечитывается только при изменении ревизии таблицы.
+    """
     
     # Маппинг русских названий столбцов на английские ключи
     CATEGORIES_MAPPING = {
@@ -120,10 +118,12 @@ class GoogleSheetsService:
         'Высота посадки сзади макс': 'back_rise_height_max'
     }
 
-    def __init__(self):
+    def __init__(self, spreadsheet=None, store: Optional[CatalogSnapshotStore] = None):
         self.client = None
-        self.spreadsheet = None
-        self._initialize()
+        self.spreadsheet = spreadsheet
+        if spreadsheet is None:
+            self._initialize()
+        self.snapshots = CatalogSnapshotManager(source=self, store=store)
 
     def _initialize(self):
         """Инициализация подключения к Google Sheets"""
@@ -150,6 +150,10 @@ class GoogleSheetsService:
                 'https://www.googleapis.com/auth/drive.readonly'
             ]
 
+            # gspread и google-auth нужны только каталогу - импортируются при первом обращении
+            import gspread
+            from google.oauth2.service_account import Credentials
+
             credentials = Credentials.from_service_account_file(creds_path, scopes=scopes)
             self.client = gspread.authorize(credentials)
             
@@ -190,185 +194,114 @@ class GoogleSheetsService:
         
         return result
 
-    def get_categories(self) -> List[Dict]:
-        """Получить список категорий"""
-        if 'categories' in categories_cache:
-            return categories_cache['categories']
-
+    def _build_category(self, row: Dict) -> Dict:
+        mapped_row = self._map_row(row, self.CATEGORIES_MAPPING)
+        return {
+            'category_id': str(mapped_row['category_id']),
+            'category_name': mapped_row['category_name'],
+            'display_order': int(mapped_row['display_order']) if mapped_row['display_order'] else 0,
+            'emoji': mapped_row['emoji']
+        }
+
+    def _build_product(self, row: Dict) -> Dict:
+        mapped_row = self._map_row(row, self.PRODUCTS_MAPPING)
+        is_active = str(mapped_row.get('is_active', 'ДА')).upper() in ['ДА', 'TRUE', 'YES', '1']
+        product_id = str(mapped_row.get('product_id', '')).strip()
+        ozon_id = mapped_row.get('ozon_url')
+        shop_url = mapped_row.get('shop_url')
+        return {
+            'product_id': product_id,
+            'category': str(mapped_row.get('category', '')).strip(),
+            'name': mapped_row['name'],
+            'description': mapped_row['description'],
+            'wb_link': f"https://www.wildberries.ru/catalog/{product_id}/detail.aspx",
+            'ozon_url': f"https://www.ozon.ru/product/pidzhak-slavalook-brand-{ozon_id}" if ozon_id else None,
+            'shop_url': shop_url.strip() if shop_url and isinstance(shop_url, str) else None,
+            'available_sizes': mapped_row['available_sizes'],
+            'collage_url': convert_google_drive_url(mapped_row['collage_url']),
+            'photo_1_url': convert_google_drive_url(mapped_row['photo_1_url']),
+            'photo_2_url': convert_google_drive_url(mapped_row['photo_2_url']),
+            'photo_3_url': convert_google_drive_url(mapped_row['photo_3_url']),
+            'photo_4_url': convert_google_drive_url(mapped_row['photo_4_url']),
+            'photo_5_url': convert_google_drive_url(mapped_row['photo_5_url']),
+            'photo_6_url': convert_google_drive_url(mapped_row['photo_6_url']),
+            'is_active': is_active
+        }
+
+    def get_revision(self) -> Optional[str]:
+        """Ревизия таблицы: modifiedTime из Drive API (без чтения листов)"""
         if not self.spreadsheet:
-            logger.error("Google Sheets not initialized. Cannot fetch categories.")
-            return []
-
+            return None
         try:
-            worksheet = self.spreadsheet.worksheet("Категории")
-            records = worksheet.get_all_records()
-
-            categories = []
-            for row in records:
-                mapped_row = self._map_row(row, self.CATEGORIES_MAPPING)
-                
-                categories.append({
-                    'category_id': str(mapped_row['category_id']),
-                    'category_name': mapped_row['category_name'],
-                    'display_order': int(mapped_row['display_order']) if mapped_row['display_order'] else 0,
-                    'emoji': mapped_row['emoji']
-                })
-
-            categories = sorted(categories, key=lambda x: x['display_order'])
-            categories_cache['categories'] = categories
-            return categories
-
+            return self.spreadsheet.get_lastUpdateTime()
         except Exception as e:
-            logger.error(f"Error fetching categories from Google Sheets: {e}", exc_info=True)
-            # Возвращаем кешированные данные, если они есть
-            if 'categories' in categories_cache:
-                logger.warning("Using cached categories due to Google Sheets error")
-                return categories_cache['categories']
-            logger.error("No cached data available, returning empty list")
-            return []
+            logger.warning(f"Failed to get spreadsheet revision: {e}")
+            return None
 
-    def get_products_by_category(self, category_id: str) -> List[Dict]:
-        """Получить товары по категории"""
-        logger.info(f"Requesting products for category_id: {category_id}")
-        cache_key = f"products_{category_id}"
-        if cache_key in products_cache:
-            logger.info(f"Cache HIT for category: {category_id}")
-            return products_cache[cache_key]
-
-        logger.info(f"Cache MISS for category: {category_id}. Fetching from Google Sheets.")
+    def fetch_catalog(self) -> Tuple[List[Dict], List[Dict]]:
+        """Прочитать листы 'Категории' и 'Товары' целиком"""
         if not self.spreadsheet:
-            logger.error("Google Sheets not initialized. Cannot fetch products.")
-            return []
+            raise RuntimeError("Google Sheets not initialized. Cannot fetch catalog.")
+
+        categories = [self._build_category(row) for row in self.spreadsheet.worksheet("Категории").get_all_records()]
+        products = []
+        for row in self.spreadsheet.worksheet("Товары").get_all_records():
+            product = self._build_product(row)
+            if product['product_id']:
+                products.append(product)
+        logger.info(f"Fetched {len(categories)} categories and {len(products)} products from Google Sheets.")
+        return categories, products
+
+    def _snapshot(self) -> Optional[CatalogSnapshot]:
+        snapshot = self.snapshots.get()
+        if snapshot is None:
+            logger.error("Catalog snapshot is not available")
+        return snapshot
 
-        try:
-            worksheet = self.spreadsheet.worksheet("Товары")
-            records = worksheet.get_all_records()
-
-            products = []
-            for row in records:
-                mapped_row = self._map_row(row, self.PRODUCTS_MAPPING)
-                
-                is_active = str(mapped_row.get('is_active', 'ДА')).upper() in ['ДА', 'TRUE', 'YES', '1']
-                
-                if str(mapped_row.get('category', '')).strip() == category_id and is_active:
-                    product_id = str(mapped_row['product_id']).strip()
-                    ozon_id = mapped_row.get('ozon_url')
-                    shop_url = mapped_row.get('shop_url')
-                    products.append({
-                        'product_id': product_id,
-                        'category': str(mapped_row['category']),
-                        'name': mapped_row['name'],
-                        'description': mapped_row['description'],
-                        'wb_link': f"https://www.wildberries.ru/catalog/{product_id}/detail.aspx",
-                        'ozon_url': f"https://www.ozon.ru/product/pidzhak-slavalook-brand-{ozon_id}" if ozon_id else None,
-                        'shop_url': shop_url.strip() if shop_url and isinstance(shop_url, str) else None,
-                        'available_sizes': mapped_row['available_sizes'],
-                        'collage_url': convert_google_drive_url(mapped_row['collage_url']),
-                        'photo_1_url': convert_google_drive_url(mapped_row['photo_1_url']),
-                        'photo_2_url': convert_google_drive_url(mapped_row['photo_2_url']),
-                        'photo_3_url': convert_google_drive_url(mapped_row['photo_3_url']),
-                        'photo_4_url': convert_google_drive_url(mapped_row['photo_4_url']),
-                        'photo_5_url': convert_google_drive_url(mapped_row['photo_5_url']),
-                        'photo_6_url': convert_google_drive_url(mapped_row['photo_6_url']),
-                        'is_active': is_active
-                    })
-            
-            logger.info(f"Found and filtered {len(products)} products for category {category_id}.")
-
-            products_cache[cache_key] = products
-            
-            # Дополнительно кешируем каждый товар по отдельности для консистентности
-            logger.info(f"Populating single-product cache for {len(products)} items from category {category_id}.")
-            for product in products:
-                single_product_cache_key = f"product_{product['product_id']}"
-                logger.debug(f"Caching single product with key: {single_product_cache_key}")
-                if single_product_cache_key not in products_cache:
-                    products_cache[single_product_cache_key] = product
-            
-            return products
+    def get_categories(self) -> List[Dict]:
+        """Получить список категорий"""
+        snapshot = self._snapshot()
+        return snapshot.get_categories() if snapshot else []
 
-        except Exception as e:
-            logger.error(f"Error fetching products from Google Sheets: {e}", exc_info=True)
-            # Возвращаем кешированные данные, если они есть
-            if cache_key in products_cache:
-                logger.warning(f"Using cached products for category {category_id} due to Google Sheets error")
-                return products_cache[cache_key]
-            logger.error(f"No cached data available for category {category_id}, returning empty list")
-            return []
+    def get_products_by_category(self, category_id: str) -> List[Dict]:
+        """Получить активные товары категории"""
+        snapshot = self._snapshot()
+        return snapshot.get_products_by_category(category_id) if snapshot else []
 
     def get_product_by_id(self, product_id: str) -> Optional[Dict]:
         """Получить товар по ID"""
-        logger.info(f"Requesting product by ID: {product_id}")
-        cache_key = f"product_{product_id}"
-        
-        if cache_key in products_cache:
-            logger.info(f"Cache HIT for product_id: {product_id}")
-            return products_cache[cache_key]
-        
-        logger.info(f"Cache MISS for product_id: {product_id}. Fetching from Google Sheets.")
+        snapshot = self._snapshot()
+        return snapshot.get_product(product_id) if snapshot else None
 
-        if not self.spreadsheet:
-            logger.error("Google Sheets not initialized. Cannot fetch product.")
-            return None
+    def refresh_snapshot(self, force: bool = False) -> bool:
+        """Пересобрать снапшот каталога, если таблица изменилась (или принудительно)"""
+        return self.snapshots.refresh(force=force)
 
+    def clear_cache(self):
+        """Принудительно перечитать каталог из Google Sheets"""
         try:
-            worksheet = self.spreadsheet.worksheet("Товары")
-            records = worksheet.get_all_records()
-            logger.info(f"Fetched {len(records)} total rows from 'Товары' sheet.")
-
-            for row in records:
-                mapped_row = self._map_row(row, self.PRODUCTS_MAPPING)
-                sheet_product_id = str(mapped_row.get('product_id', '')).strip()
-                
-                logger.debug(f"Checking sheet row with ID: '{sheet_product_id}' against requested ID: '{product_id}'")
-
-                if sheet_product_id == product_id:
-                    logger.info(f"Found match for product_id: {product_id} in sheet.")
-                    is_active = str(mapped_row.get('is_active', 'ДА')).upper() in ['ДА', 'TRUE', 'YES', '1']
-                    prod_id = sheet_product_id
-                    ozon_id = mapped_row.get('ozon_url')
-                    shop_url = mapped_row.get('shop_url')
-
-                    product = {
-                        'product_id': prod_id,
-                        'category': str(mapped_row.get('category', '')).strip(),
-                        'name': mapped_row['name'],
-                        'description': mapped_row['description'],
-                        'wb_link': f"https://www.wildberries.ru/catalog/{prod_id}/detail.aspx",
-                        'ozon_url': f"https://www.ozon.ru/product/pidzhak-slavalook-brand-{ozon_id}" if ozon_id else None,
-                        'shop_url': shop_url.strip() if shop_url and isinstance(shop_url, str) else None,
-                        'available_sizes': mapped_row['available_sizes'],
-                        'collage_url': convert_google_drive_url(mapped_row['collage_url']),
-                        'photo_1_url': convert_google_drive_url(mapped_row['photo_1_url']),
-                        'photo_2_url': convert_google_drive_url(mapped_row['photo_2_url']),
-                        'photo_3_url': convert_google_drive_url(mapped_row['photo_3_url']),
-                        'photo_4_url': convert_google_drive_url(mapped_row['photo_4_url']),
-                        'photo_5_url': convert_google_drive_url(mapped_row['photo_5_url']),
-                        'photo_6_url': convert_google_drive_url(mapped_row['photo_6_url']),
-                        'is_active': is_active
-                    }
-                    products_cache[cache_key] = product
-                    return product
-            
-            logger.warning(f"Product with ID: {product_id} not found after scanning all sheet rows.")
-            return None
-
+            self.refresh_snapshot(force=True)
+            logger.info("Google Sheets catalog snapshot rebuilt")
         except Exception as e:
-            logger.error(f"Error fetching product from Google Sheets: {e}", exc_info=True)
-            # Возвращаем кешированные данные, если они есть
-            if cache_key in products_cache:
-                logger.warning(f"Using cached product {product_id} due to Google Sheets error")
-                return products_cache[cache_key]
-            logger.error(f"No cached data available for product {product_id}")
-            return None
+            logger.error(f"Failed to rebuild catalog snapshot: {e}", exc_info=True)
 
-    def clear_cache(self):
-        """Очистить кеш"""
-        categories_cache.clear()
-        products_cache.clear()
-        size_tables_cache.clear()
-        logger.info("Google Sheets cache cleared")
+
+_sheets_service: Optional[GoogleSheetsService] = None
+
+
+def get_sheets_service() -> GoogleSheetsService:
+    """
+    Singleton сервиса каталога. Создается при первом обращении: подключение
+    к Google Sheets не должно выполняться при импорте модуля.
+    """
+    global _sheets_service
+    if _sheets_service is None:
+        _sheets_service = GoogleSheetsService()
+    return _sheets_service
 
 
-# Singleton instance
-sheets_service = GoogleSheetsService()
\ No newline at end of file
+def __getattr__(name: str):
+    # Совместимость со старым `from app.services.sheets_service import sheets_service`
+    if name == "sheets_service":
+        return get_sheets_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
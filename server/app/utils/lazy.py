@@ -0,0 +1,26 @@
+"""
+Ленивые реэкспорты пакетов.
+
+__init__ пакетов фич реэкспортировали роутеры и сервисы, поэтому импорт
+любой модели (например, из задачи Celery) подтягивал весь HTTP слой фичи
+и соседних фич. Пакет объявляет реэкспорты, а модуль импортируется при
+первом обращении к имени (PEP 562):
+
+    __getattr__ = lazy_exports(__name__, {"router": (".routes", "router")})
+"""
+
+import importlib
+from typing import Callable, Dict, Tuple
+
+
+def lazy_exports(package: str, exports: Dict[str, Tuple[str, str]]) -> Callable[[str], object]:
+    """__getattr__ пакета: имя -> (относительный модуль, атрибут)"""
+
+    def __getattr__(name: str):
+        try:
+            module_name, attribute = exports[name]
+        except KeyError:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}") from None
+        return getattr(importlib.import_module(module_name, package), attribute)
+
+    return __getattr__
@@ -0,0 +1,104 @@
+"""
+Курсорная (keyset) пагинация листингов.
+
+offset/limit без ORDER BY отдавал строки в произвольном порядке, а глубокие
+страницы читали и отбрасывали все предыдущие строки; во время синхронизации
+вставки сдвигали страницы - строки пропускались или повторялись.
+
+Листинг упорядочен по (timestamp DESC, id DESC): новые первыми, строки без
+даты - в конце по id. Курсор - непрозрачная строка с ключом последней строки
+страницы; следующая страница начинается строго после этого ключа, поэтому
+новые строки не сдвигают уже выданные. Запрос страницы по курсору читает
+только limit + 1 строк по индексу (cabinet_id, timestamp, id) - время не
+зависит от номера страницы.
+
+Строки с датой и без даты выбираются отдельными запросами: так порядок
+одинаков в PostgreSQL и SQLite и не требует NULLS LAST в индексах.
+"""
+
+import json
+import base64
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+
+CursorKey = Tuple[Optional[datetime], int]
+
+
+class InvalidCursorError(ValueError):
+    """Курсор поврежден или выдан другим листингом"""
+
+
+def encode_cursor(kind: str, key: Tuple[Any, Any]) -> str:
+    """Курсор из ключа последней строки страницы"""
+    timestamp, row_id = key
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.isoformat()
+    payload = json.dumps({"k": kind, "t": timestamp, "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(kind: str, cursor: str, timestamp_type: type = datetime) -> Tuple[Any, Any]:
+    """Ключ строки из курсора листинга kind"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if payload["k"] != kind:
+            raise InvalidCursorError(f"Cursor belongs to another listing: {payload['k']}")
+        timestamp = payload["t"]
+        if timestamp is not None and timestamp_type is datetime:
+            timestamp = datetime.fromisoformat(timestamp)
+        return timestamp, payload["id"]
+    except InvalidCursorError:
+        raise
+    except Exception as e:
+        raise InvalidCursorError(f"Invalid cursor: {e}") from e
+
+
+def stable_order(query, timestamp_column, id_column):
+    """Порядок листинга для offset-пагинации: тот же, что у курсоров"""
+    return query.order_by(timestamp_column.is_(None), timestamp_column.desc(), id_column.desc())
+
+
+def row_key(row, timestamp_column, id_column) -> CursorKey:
+    return getattr(row, timestamp_column.key), getattr(row, id_column.key)
+
+
+def keyset_page(query, timestamp_column, id_column, limit: int,
+                after: Optional[CursorKey] = None) -> Tuple[List[Any], Optional[CursorKey]]:
+    """
+    Страница строк после ключа after
+
+    Returns:
+        (строки, ключ для следующей страницы или None, если страница последняя)
+    """
+    rows: List[Any] = []
+    if after is None or after[0] is not None:
+        dated = query.filter(timestamp_column.isnot(None))
+        if after is not None:
+            dated = dated.filter(tuple_(timestamp_column, id_column) < tuple(after))
+        rows = dated.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1).all()
+
+    if len(rows) <= limit:
+        undated = query.filter(timestamp_column.is_(None))
+        if after is not None and after[0] is None:
+            undated = undated.filter(id_column < after[1])
+        rows += undated.order_by(id_column.desc()).limit(limit + 1 - len(rows)).all()
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, row_key(rows[-1], timestamp_column, id_column)
+
+
+def paginate(query, timestamp_column, id_column, limit: int, offset: int = 0,
+             after: Optional[CursorKey] = None) -> Tuple[List[Any], Optional[CursorKey]]:
+    """Страница по курсору или (для старых клиентов) по offset - в одном порядке"""
+    if after is not None or not offset:
+        return keyset_page(query, timestamp_column, id_column, limit, after)
+    rows = stable_order(query, timestamp_column, id_column).offset(offset).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, row_key(rows[-1], timestamp_column, id_column)
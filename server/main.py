@@ -13,7 +13,7 @@ else:
 
 from app.core.config import settings
 from app.core.middleware import setup_middleware, setup_exception_handlers
-from app.core.database import init_db
+from app.core.bootstrap import lifespan
 from app.features.system.routes import system_router
 from app.features.user.routes import user_router
 from app.features.stats.routes import stats_router
@@ -32,25 +32,9 @@ from app.features.user_photos.routes import router as user_photos_router
 from app.features.measurements.routes import router as measurements_router
 from app.features.favorites.routes import router as favorites_router
 
-# Импортируем модели для создания таблиц
-from app.features.user.models import User
-from app.features.wb_api.models import WBCabinet, WBProduct, WBOrder, WBStock, WBReview, WBAnalyticsCache, WBWarehouse, WBSyncLog
-from app.features.wb_api.models_sales import WBSales
-from app.features.notifications.models import NotificationSettings, NotificationHistory, OrderStatusHistory
-from app.features.stock_alerts.models import DailySalesAnalytics, StockAlertHistory
-from app.features.export.models import ExportToken, ExportLog
-from app.features.digest.models import ChannelReport, DigestHistory
-from app.features.competitors.models import CompetitorLink, CompetitorProduct, CompetitorSemanticCore
-from app.features.semantic_core.models import CabinetSemanticCore
-from app.features.user_photos.models import UserPhoto
-from app.features.measurements.models import UserMeasurements
-from app.features.favorites.models import Favorite
-
-# Создаем FastAPI приложение с настройками из config
-app = FastAPI(**settings.get_app_config())
-
-# Инициализируем базу данных ПОСЛЕ импорта всех моделей
-init_db()
+# Создаем FastAPI приложение с настройками из config.
+# Схема БД создается при старте (app/core/bootstrap.py), а не при импорте
+app = FastAPI(**settings.get_app_config(), lifespan=lifespan)
 
 # Настраиваем middleware
 setup_middleware(app)
@@ -0,0 +1,18 @@
+-- Migration: Add next_digest_at to channel_reports table
+-- Date: 2026-10-18
+-- Description: Следующее время отправки сводки (UTC) для планировщика digest.
+-- Значения для существующих каналов заполняет сам планировщик
+-- (app/features/digest/schedule.py::backfill_next_digest_at) на первом тике.
+
+ALTER TABLE channel_reports
+ADD COLUMN IF NOT EXISTS next_digest_at TIMESTAMP WITHOUT TIME ZONE;
+
+CREATE INDEX IF NOT EXISTS idx_active_next_digest
+ON channel_reports(is_active, next_digest_at);
+
+COMMENT ON COLUMN channel_reports.next_digest_at IS 'Следующая отправка сводки (UTC), пересчитывается с учетом timezone и перехода на летнее время';
+
+-- Проверка результата
+SELECT column_name, data_type
+FROM information_schema.columns
+WHERE table_name = 'channel_reports' AND column_name = 'next_digest_at';
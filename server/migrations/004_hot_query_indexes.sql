@@ -0,0 +1,80 @@
+-- Migration: Hot query indexes
+-- Date: 2026-10-18
+-- Description: Индексы под запросы BotAPIService, ExportService, DigestService
+-- и DynamicStockAnalyzer (заменяют ручной server/add_indexes.sql).
+-- Те же индексы объявлены в моделях (wb_api/models.py, models_sales.py), поэтому
+-- init_db() создает их в новой БД; планы запросов проверяет
+-- tests/performance/test_query_plans.py.
+--
+-- Индексы строятся CONCURRENTLY - без блокировки записи синхронизацией.
+-- CONCURRENTLY не работает внутри транзакции: применять обычным psql -f,
+-- без -1 / --single-transaction. Если построение прервалось, индекс остается
+-- невалидным (см. проверку в конце) - удалить его DROP INDEX CONCURRENTLY и
+-- применить миграцию повторно.
+
+-- Заказы кабинета за период / последние заказы (дашборд, тренды, список заказов,
+-- экспорт, сводка)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wb_orders_cabinet_date
+ON wb_orders (cabinet_id, order_date);
+
+-- То же без отмененных (status != 'canceled': дашборд, тренды, топ товаров)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wb_orders_cabinet_date_active
+ON wb_orders (cabinet_id, order_date) WHERE status <> 'canceled';
+
+-- Заказы позиции (товар + склад + размер) за период - анализ остатков;
+-- префикс (cabinet_id, nm_id) - статистика товаров в экспорте
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wb_orders_position_date
+ON wb_orders (cabinet_id, nm_id, warehouse_from, size, order_date);
+
+-- Выкупы и возвраты кабинета за период (сводка, тренды)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wb_sales_cabinet_date_active
+ON wb_sales (cabinet_id, sale_date) WHERE is_cancel = false OR is_cancel IS NULL;
+
+-- Выкупы и возвраты по товарам (статистика товаров в экспорте)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wb_sales_cabinet_nm_type_active
+ON wb_sales (cabinet_id, nm_id, type, sale_date) WHERE is_cancel = false OR is_cancel IS NULL;
+
+-- Сопоставление продаж с заказами в экспорте
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wb_sales_cabinet_g_number
+ON wb_sales (cabinet_id, g_number);
+
+-- Остатки кабинета по количеству (> 0, < 10, = 0)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wb_stocks_cabinet_quantity
+ON wb_stocks (cabinet_id, quantity);
+
+-- Отзывы кабинета за период / последние отзывы
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wb_reviews_cabinet_created
+ON wb_reviews (cabinet_id, created_date);
+
+-- Индексы из add_indexes.sql, которые заменены индексами выше или не
+-- используются ни одним запросом (trigram: поиск остатков фильтрует по OR
+-- двух таблиц после JOIN и индекс не применяет), но замедляют запись
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_stock_cabinet_warehouse_size;
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_stock_name_trgm;
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_stock_article_trgm;
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_stock_nm_id_cabinet;
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_stock_quantity;
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_product_nm_id_cabinet;
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_product_name_trgm;
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_product_vendor_code_trgm;
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_order_cabinet_date_status;
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_order_nm_id_cabinet_date;
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_order_active;
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_order_canceled_updated;
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_sales_cabinet_date_type;
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_sales_nm_id_cabinet_date;
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_sales_buyouts;
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_sales_returns;
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_review_cabinet_date;
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_review_cabinet_rating;
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_review_nm_id_cabinet;
+
+ANALYZE wb_orders;
+ANALYZE wb_sales;
+ANALYZE wb_stocks;
+ANALYZE wb_reviews;
+
+-- Проверка результата: все индексы валидны (невалидных строк быть не должно)
+SELECT indexrelid::regclass AS invalid_index
+FROM pg_index
+WHERE NOT indisvalid;
@@ -0,0 +1,26 @@
+-- Migration: Listing keyset indexes
+-- Date: 2026-10-18
+-- Description: Индексы курсорной пагинации листингов заказов, остатков и
+-- отзывов (app/utils/pagination.py): страница по курсору (timestamp, id)
+-- читает limit + 1 строк по индексу (cabinet_id, timestamp, id).
+-- Индексы заказов и отзывов заменяют (cabinet_id, timestamp) из миграции 004 -
+-- они покрывают те же запросы.
+--
+-- Как и 004: CONCURRENTLY, применять psql -f без -1 / --single-transaction.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wb_orders_cabinet_date_id
+ON wb_orders (cabinet_id, order_date, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wb_stocks_cabinet_updated_id
+ON wb_stocks (cabinet_id, last_updated, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wb_reviews_cabinet_created_id
+ON wb_reviews (cabinet_id, created_date, id);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_orders_cabinet_date;
+DROP INDEX CONCURRENTLY IF EXISTS idx_wb_reviews_cabinet_created;
+
+-- Проверка результата: все индексы валидны (невалидных строк быть не должно)
+SELECT indexrelid::regclass AS invalid_index
+FROM pg_index
+WHERE NOT indisvalid;
@@ -0,0 +1,28 @@
+-- Migration: Review sentiment and topics
+-- Date: 2026-10-18
+-- Description: Тональность и темы отзывов, которые вычисляет локальный
+-- классификатор при синхронизации (app/features/wb_api/review_classifier.py).
+-- Существующие отзывы классифицируются на ближайшей синхронизации кабинета:
+-- classifier_version IS NULL считается устаревшей версией.
+--
+-- Как и 004: CONCURRENTLY, применять psql -f без -1 / --single-transaction.
+
+ALTER TABLE wb_reviews ADD COLUMN IF NOT EXISTS sentiment VARCHAR(16);
+ALTER TABLE wb_reviews ADD COLUMN IF NOT EXISTS sentiment_score DOUBLE PRECISION;
+ALTER TABLE wb_reviews ADD COLUMN IF NOT EXISTS topics VARCHAR(255);
+ALTER TABLE wb_reviews ADD COLUMN IF NOT EXISTS classifier_version INTEGER;
+
+COMMENT ON COLUMN wb_reviews.sentiment IS 'positive / neutral / negative - локальный классификатор';
+COMMENT ON COLUMN wb_reviews.sentiment_score IS 'Тональность в [-1, 1]';
+COMMENT ON COLUMN wb_reviews.topics IS 'Темы отзыва через запятую с запятыми по краям: ,size,quality,';
+COMMENT ON COLUMN wb_reviews.classifier_version IS 'Версия словаря классификатора (CLASSIFIER_VERSION)';
+
+-- Негативные отзывы кабинета за период, распределение тональности
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wb_reviews_cabinet_sentiment_created
+ON wb_reviews (cabinet_id, sentiment, created_date);
+
+-- Проверка результата
+SELECT column_name, data_type
+FROM information_schema.columns
+WHERE table_name = 'wb_reviews'
+  AND column_name IN ('sentiment', 'sentiment_score', 'topics', 'classifier_version');
@@ -8,7 +8,7 @@ from unittest.mock import Mock, patch, AsyncMock
 from datetime import datetime, timezone
 
 from app.features.notifications.notification_service import NotificationService
-from app.features.notifications.queue_manager import QueueManager
+from app.features.notifications.stream_queue import StreamQueueManager
 from app.features.notifications.retry_logic import RetryLogic, RetryConfig
 from app.features.notifications.redis_integration import RedisIntegration, CacheConfig
 from app.features.notifications.event_detector import EventDetector
@@ -51,8 +51,8 @@ class TestFullNotificationFlow:
 
     @pytest.fixture
     def queue_manager(self, mock_redis):
-        """QueueManager for integration testing"""
-        return QueueManager(mock_redis)
+        """StreamQueueManager for integration testing"""
+        return StreamQueueManager(mock_redis, consumer_name="integration-test")
 
     @pytest.fixture
     def retry_logic(self):
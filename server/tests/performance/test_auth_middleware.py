@@ -0,0 +1,147 @@
+"""
+Запросов в секунду: прежняя @app.middleware("http") против APIKeyMiddleware.
+
+Одно и то же приложение с простым маршрутом, логирование включено на
+уровне INFO (в буфер в памяти, с форматтером приложения), метрики
+записываются в обоих вариантах. Прежняя middleware воспроизведена здесь
+в том виде, в котором была до перехода на ASGI: BaseHTTPMiddleware,
+ключ из окружения на каждый запрос, две INFO записи на запрос.
+
+По умолчанию 2000 запросов на вариант; 20000:
+    RUN_BENCHMARKS=1 pytest tests/performance/test_auth_middleware.py -s
+"""
+
+import io
+import os
+import time
+import asyncio
+import logging
+from contextlib import contextmanager
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
+
+from app.core import metrics
+from app.core.middleware import AccessLog, APIKeyMiddleware
+
+pytestmark = pytest.mark.slow
+
+REQUESTS = 20_000 if os.getenv("RUN_BENCHMARKS") == "1" else 2_000
+CONCURRENCY = 20
+REPEATS = 3
+API_KEY = "benchmark-key"
+
+legacy_logger = logging.getLogger("benchmark.legacy_middleware")
+
+
+def base_app():
+    app = FastAPI()
+
+    @app.get("/api/v1/bot/orders/{order_id}")
+    async def order(order_id: int, telegram_id: int):
+        return {"order_id": order_id, "telegram_id": telegram_id}
+
+    return app
+
+
+def legacy_app():
+    app = base_app()
+
+    @app.middleware("http")
+    async def main_middleware(request: Request, call_next):
+        start_time = time.time()
+        client_host = request.client.host if request.client else "unknown"
+        legacy_logger.info(f"Входящий запрос: {request.method} {request.url.path} от {client_host}")
+
+        public_paths = ['/system/health', '/docs', '/openapi.json', '/redoc']
+        if request.url.path not in public_paths and not request.url.path.startswith('/docs'):
+            secret_header = request.headers.get("X-API-SECRET-KEY")
+            expected_key = os.getenv('BENCHMARK_API_SECRET_KEY', API_KEY)
+            if not secret_header:
+                return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "Missing API Secret Key"})
+            if secret_header != expected_key:
+                return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "Invalid API Secret Key"})
+            legacy_logger.debug(f"✅ Аутентификация успешна для {request.url.path}")
+
+        response = await call_next(request)
+
+        process_time = time.time() - start_time
+        route = request.scope.get("route")
+        metrics.record_request(
+            request.method, getattr(route, "path", "unmatched"), response.status_code, process_time,
+            request.query_params.get("telegram_id"),
+        )
+        legacy_logger.info(
+            f"✅ Запрос {request.method} {request.url.path} выполнен успешно | "
+            f"Статус: {response.status_code} | Время: {process_time:.4f}s"
+        )
+        return response
+
+    return app
+
+
+def asgi_app():
+    app = base_app()
+    app.add_middleware(APIKeyMiddleware, api_keys=[API_KEY, "previous-key"], access_log=AccessLog())
+    return app
+
+
+@contextmanager
+def logs_in_memory():
+    """INFO логи с форматтером приложения, но в буфер, а не в stderr"""
+    buffer = io.StringIO()
+    handler = logging.StreamHandler(buffer)
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    loggers = [legacy_logger, logging.getLogger("app.access")]
+    saved = [(log.level, log.propagate) for log in loggers]
+    for log in loggers:
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        log.propagate = False
+    try:
+        yield buffer
+    finally:
+        for log, (level, propagate) in zip(loggers, saved):
+            log.removeHandler(handler)
+            log.setLevel(level)
+            log.propagate = propagate
+
+
+async def requests_per_second(app):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", headers={"X-API-SECRET-KEY": API_KEY}) as client:
+        assert (await client.get("/api/v1/bot/orders/1", params={"telegram_id": 1})).status_code == 200
+
+        async def worker(offset):
+            for i in range(offset, REQUESTS, CONCURRENCY):
+                response = await client.get(f"/api/v1/bot/orders/{i}", params={"telegram_id": i % 100})
+                assert response.status_code == 200
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(CONCURRENCY)))
+        return REQUESTS / (time.perf_counter() - started)
+
+
+def test_asgi_middleware_serves_more_requests_per_second():
+    results = {"legacy": [], "asgi": []}
+    log_lines = {}
+    with patch.object(metrics.registry, "_write_snapshot"):
+        for name, make_app in (("legacy", legacy_app), ("asgi", asgi_app)):
+            with logs_in_memory() as logs:
+                for _ in range(REPEATS):
+                    results[name].append(asyncio.run(requests_per_second(make_app())))
+            log_lines[name] = logs.getvalue().count("\n")
+    metrics.registry.reset()
+
+    legacy, asgi = max(results["legacy"]), max(results["asgi"])
+    print(f"\nЗапросов в секунду ({REQUESTS} запросов, {CONCURRENCY} параллельно, лучший из {REPEATS}):")
+    print(f"  @app.middleware('http'): {legacy:.0f}, строк лога: {log_lines['legacy']}")
+    print(f"  APIKeyMiddleware:        {asgi:.0f} (x{asgi / legacy:.2f}), строк лога: {log_lines['asgi']}")
+
+    # Прежняя: 2 строки на запрос; новая: ~1% выборка с ограничением частоты
+    assert log_lines["legacy"] >= 2 * REQUESTS * REPEATS
+    assert log_lines["asgi"] < REQUESTS * REPEATS * 0.05
+    assert asgi > legacy * 1.2
@@ -0,0 +1,168 @@
+"""
+Удаление большого кабинета не блокирует синхронизацию других кабинетов.
+
+Пока в фоне удаляется кабинет с десятками тысяч заказов, остатков и товаров,
+"синхронизация" соседнего кабинета пишет пачки заказов в ту же файловую БД.
+Порционное удаление коммитит каждую порцию - записи соседа проходят между
+порциями, а не ждут конца удаления. Для сравнения печатается ожидание записи
+при удалении одной транзакцией (как было в CabinetManager._cleanup_cabinet_data).
+
+По умолчанию 20k строк на таблицу; 200k:
+    RUN_BENCHMARKS=1 pytest tests/performance/test_cabinet_teardown.py -s
+"""
+
+import os
+import time
+import threading
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, delete, func, select
+from sqlalchemy.orm import sessionmaker
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.core.database import Base
+from app.features.wb_api.cabinet_teardown import CabinetTeardown, discover_teardown_steps
+from app.features.wb_api.models import WBCabinet, WBOrder, WBProduct, WBStock
+
+pytestmark = pytest.mark.slow
+
+ROWS = int(os.getenv(
+    "TEARDOWN_SIM_ROWS", "200000" if os.getenv("RUN_BENCHMARKS") == "1" else "20000"
+))
+BIG_CABINET, SYNCED_CABINET = 1, 2
+SYNC_BATCH = 50
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    discover_teardown_steps()
+    engine = create_engine(f"sqlite:///{tmp_path / 'teardown.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def seed_big_cabinet(session_factory, with_neighbour=True):
+    db = session_factory()
+    db.add(WBCabinet(id=BIG_CABINET, api_key="big", is_active=True))
+    if with_neighbour:
+        db.add(WBCabinet(id=SYNCED_CABINET, api_key="synced", is_active=True))
+    db.commit()
+    now = datetime(2025, 1, 1)
+    db.bulk_insert_mappings(WBProduct, [
+        {"cabinet_id": BIG_CABINET, "nm_id": i, "name": f"Товар {i}"} for i in range(ROWS)
+    ])
+    db.bulk_insert_mappings(WBStock, [
+        {"cabinet_id": BIG_CABINET, "nm_id": i, "warehouse_name": "Коледино", "size": "M", "quantity": 1}
+        for i in range(ROWS)
+    ])
+    db.bulk_insert_mappings(WBOrder, [
+        {"cabinet_id": BIG_CABINET, "order_id": f"big-{i}", "nm_id": i, "order_date": now}
+        for i in range(ROWS)
+    ])
+    db.commit()
+    db.close()
+
+
+def sync_other_cabinet(session_factory, done: threading.Event, label: str):
+    """Синхронизация соседнего кабинета: пачки заказов с коммитом, время ожидания каждой"""
+    db = session_factory()
+    commits = []
+    batch = 0
+    try:
+        while not done.is_set():
+            started = time.perf_counter()
+            db.bulk_insert_mappings(WBOrder, [
+                {
+                    "cabinet_id": SYNCED_CABINET,
+                    "order_id": f"{label}-{batch}-{i}",
+                    "nm_id": i,
+                    "order_date": datetime(2025, 1, 2),
+                }
+                for i in range(SYNC_BATCH)
+            ])
+            db.commit()
+            commits.append((started, time.perf_counter()))
+            batch += 1
+            time.sleep(0.005)
+    finally:
+        db.close()
+    return commits
+
+
+def run_with_concurrent_sync(session_factory, teardown, label):
+    """Удаление в фоне, синхронизация соседа в текущем потоке"""
+    done = threading.Event()
+    window = {}
+
+    def worker():
+        window["start"] = time.perf_counter()
+        try:
+            teardown()
+        finally:
+            window["end"] = time.perf_counter()
+            done.set()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    commits = sync_other_cabinet(session_factory, done, label)
+    thread.join()
+    # Пачки, которые писались (или ждали блокировку) во время удаления
+    during = [end - start for start, end in commits if start <= window["end"] and end >= window["start"]]
+    return window["end"] - window["start"], during
+
+
+def legacy_cleanup(session_factory):
+    """Как было: все таблицы и кабинет одной транзакцией"""
+    db = session_factory()
+    try:
+        for model in (WBOrder, WBProduct, WBStock):
+            db.query(model).filter(model.cabinet_id == BIG_CABINET).count()
+            db.query(model).filter(model.cabinet_id == BIG_CABINET).delete(synchronize_session=False)
+        db.execute(delete(WBCabinet).where(WBCabinet.id == BIG_CABINET))
+        db.commit()
+    finally:
+        db.close()
+
+
+def count_orders(session_factory, cabinet_id):
+    db = session_factory()
+    try:
+        return db.execute(select(func.count()).select_from(WBOrder).where(WBOrder.cabinet_id == cabinet_id)).scalar()
+    finally:
+        db.close()
+
+
+def test_teardown_does_not_block_other_cabinet_sync(session_factory):
+    seed_big_cabinet(session_factory)
+    teardown = CabinetTeardown(
+        session_factory,
+        fakeredis.FakeRedis(decode_responses=True),
+        chunk_size=1000,
+        pause_seconds=0.005,
+        rag_purger=lambda _: "skipped",
+    )
+
+    duration, waits = run_with_concurrent_sync(session_factory, lambda: teardown.run(BIG_CABINET), "chunked")
+
+    progress = teardown.get_progress(BIG_CABINET)
+    assert progress["status"] == "completed"
+    assert progress["deleted"]["wb_orders"] == ROWS
+    assert count_orders(session_factory, BIG_CABINET) == 0
+    # Сосед синхронизировался во время удаления, и ни одна пачка не ждала удаление целиком
+    assert len(waits) >= 5
+    assert max(waits) < max(0.5, duration / 4)
+    synced_orders = count_orders(session_factory, SYNCED_CABINET)
+
+    # Тот же кабинет заново - для сравнения с удалением одной транзакцией
+    seed_big_cabinet(session_factory, with_neighbour=False)
+    legacy_duration, legacy_waits = run_with_concurrent_sync(session_factory, lambda: legacy_cleanup(session_factory), "legacy")
+
+    print(
+        f"\n{ROWS} строк на таблицу: порционно {duration:.2f} с, {progress['chunks']} порций, "
+        f"{len(waits)} пачек соседа, ожидание max {max(waits) * 1000:.0f} мс; "
+        f"одной транзакцией {legacy_duration:.2f} с, ожидание max "
+        f"{max(legacy_waits or [0]) * 1000:.0f} мс; заказов соседа {synced_orders}"
+    )
@@ -0,0 +1,101 @@
+"""
+Бенчмарк графика daily-trends: холодный путь (рендер в пуле процессов) против
+теплого (chart_id из кэша) и загрузка event loop во время рендера.
+
+Запуск:
+    RUN_BENCHMARKS=1 pytest tests/performance/test_chart_rendering.py -s
+"""
+
+import os
+import time
+import asyncio
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("matplotlib")
+
+from app.features.bot_api.chart_renderer import ChartRenderer, render_trends_chart
+
+pytestmark = [
+    pytest.mark.slow,
+    pytest.mark.skipif(os.getenv("RUN_BENCHMARKS") != "1", reason="бенчмарк: RUN_BENCHMARKS=1"),
+]
+
+RUNS = int(os.getenv("CHART_BENCH_RUNS", "20"))
+DAY_KEYS = [f"2025-01-{day:02d}" for day in range(1, 15)]
+
+
+def series_for(run: int):
+    return {
+        "orders": [run + day for day in range(14)],
+        "buyouts": [day for day in range(14)],
+        "returns": [day % 3 for day in range(14)],
+    }
+
+
+async def max_loop_stall(coro):
+    """Выполняет coro и возвращает время выполнения и максимальную задержку тиков event loop (мс)"""
+    stalls = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            stalls.append((time.perf_counter() - started - 0.005) * 1000)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    try:
+        await coro
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        done.set()
+        await task
+    return elapsed, max(stalls, default=0.0)
+
+
+def percentile(values, q):
+    return sorted(values)[min(len(values) - 1, int(len(values) * q))]
+
+
+@pytest.mark.asyncio
+async def test_cold_and_warm_chart_latency():
+    executor = ProcessPoolExecutor(max_workers=2)
+    renderer = ChartRenderer(redis_client=fakeredis.FakeRedis(decode_responses=True), executor=executor)
+    # Прогрев процессов пула (импорт matplotlib)
+    await renderer.get_or_render(0, DAY_KEYS, series_for(-1))
+
+    async def render_in_loop():
+        return render_trends_chart(DAY_KEYS, series_for(-2))
+
+    _, inline_stall = await max_loop_stall(render_in_loop())
+
+    cold, warm = [], []
+    cold_stall = 0.0
+    try:
+        for run in range(RUNS):
+            elapsed, stall = await max_loop_stall(renderer.get_or_render(1, DAY_KEYS, series_for(run)))
+            cold.append(elapsed)
+            cold_stall = max(cold_stall, stall)
+
+            started = time.perf_counter()
+            await renderer.get_or_render(1, DAY_KEYS, series_for(run))
+            warm.append((time.perf_counter() - started) * 1000)
+    finally:
+        executor.shutdown()
+
+    print(
+        f"\n{RUNS} графиков, {len(DAY_KEYS)} дней\n"
+        f"  холодный (пул процессов): p50 {statistics.median(cold):7.1f} мс, p95 {percentile(cold, 0.95):7.1f} мс, "
+        f"блокировка loop {cold_stall:6.1f} мс\n"
+        f"  теплый (кэш):             p50 {statistics.median(warm):7.2f} мс, p95 {percentile(warm, 0.95):7.2f} мс\n"
+        f"  рендер в event loop (как было): блокировка loop {inline_stall:6.1f} мс"
+    )
+
+    assert statistics.median(warm) < statistics.median(cold)
+    assert cold_stall < inline_stall
@@ -0,0 +1,127 @@
+"""
+Бенчмарк агрегации daily_sales_analytics: построчная агрегация (как было) против
+GROUP BY + bulk upsert за 30 дней.
+
+Запуск (по умолчанию пропускается - построчный вариант работает десятки секунд):
+    RUN_BENCHMARKS=1 DAILY_SALES_BENCH_ORDERS=100000 pytest tests/performance/test_daily_sales_aggregation.py -s
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import and_, event
+
+from app.features.stock_alerts.crud import DailySalesAnalyticsCRUD
+from app.features.stock_alerts.models import DailySalesAnalytics
+from app.features.stock_alerts.sales_aggregator import DailySalesAggregator
+from app.features.stock_alerts.schemas import DailySalesAnalyticsCreate
+from app.features.wb_api.models import WBCabinet, WBOrder
+
+pytestmark = [
+    pytest.mark.slow,
+    pytest.mark.skipif(os.getenv("RUN_BENCHMARKS") != "1", reason="бенчмарк: RUN_BENCHMARKS=1"),
+]
+
+DAYS = 30
+ORDERS = int(os.getenv("DAILY_SALES_BENCH_ORDERS", "100000"))
+PRODUCTS = 200
+WAREHOUSES = ["Коледино", "Казань", "Электросталь", None]
+SIZES = ["S", "M", "L", None]
+
+
+def seed_orders(db_session) -> int:
+    cabinet = WBCabinet(api_key="bench", name="Bench")
+    db_session.add(cabinet)
+    db_session.commit()
+
+    rows = []
+    for index in range(ORDERS):
+        order_day = date.today() - timedelta(days=1 + index % DAYS)
+        rows.append({
+            "cabinet_id": cabinet.id,
+            "order_id": f"bench-{index}",
+            "nm_id": 1000 + index % PRODUCTS,
+            "warehouse_from": WAREHOUSES[index % len(WAREHOUSES)],
+            "size": SIZES[(index // 7) % len(SIZES)],
+            "order_date": datetime.combine(order_day, datetime.min.time()) + timedelta(minutes=index % 1440),
+        })
+    db_session.execute(WBOrder.__table__.insert(), rows)
+    db_session.commit()
+    return cabinet.id
+
+
+def legacy_aggregate_day(db_session, cabinet_id, target_date):
+    """Агрегация до перехода на GROUP BY: ORM строки заказов и upsert по одному ключу"""
+    orders = db_session.query(WBOrder).filter(
+        and_(
+            WBOrder.cabinet_id == cabinet_id,
+            WBOrder.order_date >= datetime.combine(target_date, datetime.min.time()),
+            WBOrder.order_date < datetime.combine(target_date + timedelta(days=1), datetime.min.time())
+        )
+    ).all()
+    aggregated = {}
+    for order in orders:
+        key = (order.nm_id, order.warehouse_from or "Неизвестный склад", order.size or "ONE SIZE")
+        stats = aggregated.setdefault(key, {"orders_count": 0, "quantity_ordered": 0})
+        stats["orders_count"] += 1
+        stats["quantity_ordered"] += order.quantity or 1
+    for (nm_id, warehouse_name, size), stats in aggregated.items():
+        DailySalesAnalyticsCRUD.create_or_update(db_session, DailySalesAnalyticsCreate(
+            cabinet_id=cabinet_id, nm_id=nm_id, warehouse_name=warehouse_name, size=size,
+            date=target_date, **stats
+        ))
+
+
+@contextmanager
+def measure(db_session):
+    """Время выполнения блока и количество SQL запросов"""
+    stats = {"statements": 0}
+    engine = db_session.get_bind()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats["statements"] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    started = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        stats["seconds"] = time.perf_counter() - started
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def snapshot(db_session, cabinet_id):
+    return {
+        (row.nm_id, row.warehouse_name, row.size, row.date): (row.orders_count, row.quantity_ordered)
+        for row in db_session.query(DailySalesAnalytics).filter(DailySalesAnalytics.cabinet_id == cabinet_id)
+    }
+
+
+@pytest.mark.asyncio
+async def test_backfill_30_days_benchmark(db_session):
+    cabinet_id = seed_orders(db_session)
+    aggregator = DailySalesAggregator(db_session)
+
+    with measure(db_session) as legacy:
+        for day in range(1, DAYS + 1):
+            legacy_aggregate_day(db_session, cabinet_id, date.today() - timedelta(days=day))
+    legacy_rows = snapshot(db_session, cabinet_id)
+    db_session.query(DailySalesAnalytics).delete()
+    db_session.commit()
+
+    with measure(db_session) as bulk:
+        result = await aggregator.aggregate_last_n_days(cabinet_id, days=DAYS)
+
+    print(
+        f"\n{ORDERS} заказов, {DAYS} дней, {len(legacy_rows)} позиций\n"
+        f"  построчно:         {legacy['seconds']:8.2f} с, {legacy['statements']} запросов\n"
+        f"  GROUP BY + upsert: {bulk['seconds']:8.2f} с, {bulk['statements']} запросов"
+    )
+
+    assert result["total_records"] == ORDERS
+    assert snapshot(db_session, cabinet_id) == legacy_rows
+    assert bulk["statements"] < legacy["statements"]
+    assert bulk["seconds"] < legacy["seconds"]
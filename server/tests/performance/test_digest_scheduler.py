@@ -0,0 +1,157 @@
+"""
+Симуляция планировщика сводок: каналы в разных timezone проходят через переходы
+на летнее/зимнее время. Проверяется, что каждая сводка уходит ровно один раз за
+локальные сутки в report_time, и сравнивается стоимость тика с полным обходом
+каналов (как было).
+
+По умолчанию 1000 каналов; 100k:
+    RUN_BENCHMARKS=1 pytest tests/performance/test_digest_scheduler.py -s
+"""
+
+import os
+import time
+import random
+import statistics
+from collections import defaultdict
+from datetime import datetime, time as dt_time, timedelta
+
+import pytest
+import pytz
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from app.features.digest.models import ChannelReport
+from app.features.digest.schedule import claim_due_channels, next_digest_at
+
+pytestmark = pytest.mark.slow
+
+CHANNELS = int(os.getenv(
+    "DIGEST_SIM_CHANNELS", "100000" if os.getenv("RUN_BENCHMARKS") == "1" else "1000"
+))
+TIMEZONES = [
+    "Europe/Moscow", "Europe/Berlin", "Europe/London", "America/New_York",
+    "America/Santiago", "Australia/Sydney", "Pacific/Auckland", "Asia/Kolkata",
+    "Asia/Tehran", "Asia/Vladivostok",
+]
+# Время в окне перехода (несуществующее/повторяющееся) плюс случайное
+DST_EDGE_TIMES = [dt_time(2, 0), dt_time(2, 30), dt_time(1, 30), dt_time(3, 0), dt_time(0, 0), dt_time(23, 59)]
+# 3 дня вокруг переходов: весна в Европе, осень в южном полушарии, осень в Европе и США
+WINDOWS = {
+    "eu-spring": datetime(2025, 3, 29),
+    "south-autumn": datetime(2025, 4, 5),
+    "eu-autumn": datetime(2025, 10, 25),
+    "us-autumn": datetime(2025, 11, 1),
+}
+WINDOW_DAYS = 3
+
+
+@pytest.fixture
+def db():
+    """Отдельная БД в памяти: тысячи тиков с commit без fsync файла"""
+    engine = create_engine("sqlite://")
+    ChannelReport.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def seed_channels(db, start):
+    rnd = random.Random(42)
+    rows = []
+    for i in range(CHANNELS):
+        timezone = TIMEZONES[i % len(TIMEZONES)]
+        if i % 5 == 0:
+            report_time = DST_EDGE_TIMES[rnd.randrange(len(DST_EDGE_TIMES))]
+        else:
+            report_time = dt_time(rnd.randrange(24), rnd.randrange(60))
+        rows.append({
+            "user_id": 1,
+            "cabinet_id": 1,
+            "chat_id": i + 1,
+            "report_time": report_time,
+            "timezone": timezone,
+            "is_active": True,
+            "next_digest_at": next_digest_at(report_time, timezone, start),
+        })
+    db.bulk_insert_mappings(ChannelReport, rows)
+    db.commit()
+
+
+def simulate(db, start, end):
+    """Тики планировщика по минутам, в которых есть что отправлять"""
+    sends = defaultdict(list)
+    tick_ms = []
+    while True:
+        now = db.query(func.min(ChannelReport.next_digest_at)).filter(ChannelReport.is_active == True).scalar()
+        if now is None or now >= end:
+            break
+        started = time.perf_counter()
+        for channel_id in claim_due_channels(db, now):
+            sends[channel_id].append(now)
+        tick_ms.append((time.perf_counter() - started) * 1000)
+    return sends, tick_ms
+
+
+def legacy_tick_ms(db, now):
+    """Тик как было: все активные каналы и перевод времени для каждого"""
+    started = time.perf_counter()
+    current_utc = pytz.UTC.localize(now)
+    matched = 0
+    for channel in db.query(ChannelReport).filter(ChannelReport.is_active == True).all():
+        local = current_utc.astimezone(pytz.timezone(channel.timezone))
+        if local.time().replace(second=0, microsecond=0) == channel.report_time:
+            matched += 1
+    return (time.perf_counter() - started) * 1000
+
+
+def is_nonexistent(tz, local_day, report_time):
+    try:
+        tz.localize(datetime.combine(local_day, report_time), is_dst=None)
+        return False
+    except pytz.NonExistentTimeError:
+        return True
+    except pytz.AmbiguousTimeError:
+        return False
+
+
+@pytest.mark.parametrize("window", list(WINDOWS))
+def test_each_digest_sent_once_per_local_day(db, window):
+    start = WINDOWS[window]
+    end = start + timedelta(days=WINDOW_DAYS)
+    seed_channels(db, start)
+
+    sends, tick_ms = simulate(db, start, end)
+
+    channels = {c.id: c for c in db.query(ChannelReport.id, ChannelReport.report_time, ChannelReport.timezone)}
+    assert len(sends) == CHANNELS
+    shifted = 0
+    for channel_id, moments in sends.items():
+        channel = channels[channel_id]
+        tz = pytz.timezone(channel.timezone)
+        local_moments = [pytz.UTC.localize(moment).astimezone(tz) for moment in moments]
+        local_days = [moment.date() for moment in local_moments]
+
+        # Ровно одна отправка за локальные сутки, без пропусков в начале, середине и конце окна
+        assert all((b - a).days == 1 for a, b in zip(local_days, local_days[1:])), (channel, local_moments)
+        assert moments[0] - start < timedelta(hours=25) and end - moments[-1] < timedelta(hours=25)
+
+        # Отправка в report_time, несуществующее время - через час после него
+        for moment, local_day in zip(local_moments, local_days):
+            local_time = moment.time().replace(tzinfo=None)
+            if is_nonexistent(tz, local_day, channel.report_time):
+                expected = (datetime.combine(local_day, channel.report_time) + timedelta(hours=1)).time()
+                shifted += 1
+            else:
+                expected = channel.report_time
+            assert local_time == expected, (channel, moment)
+
+    if window == "eu-spring":
+        assert shifted > 0
+    total_sends = sum(len(moments) for moments in sends.values())
+    legacy_ms = legacy_tick_ms(db, start + timedelta(hours=12))
+    print(
+        f"\n{window}: {CHANNELS} каналов, {len(tick_ms)} тиков, {total_sends} отправок, "
+        f"тик p50 {statistics.median(tick_ms):.2f} мс / max {max(tick_ms):.1f} мс, "
+        f"полный обход {legacy_ms:.0f} мс"
+    )
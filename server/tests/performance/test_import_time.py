@@ -0,0 +1,153 @@
+"""
+Бюджет времени импорта API (main) и воркера Celery (celery_app + include).
+
+Холодный старт при автоскейлинге и форк воркеров платят за импорт каждый
+раз. Время считается по `python -X importtime` в отдельном процессе: сумма
+cumulative модулей верхнего уровня, лучший из IMPORT_TIME_RUNS запусков.
+Тяжелые опциональные зависимости (matplotlib, gspread, клиент Google API)
+загружаются только внутри своих фич и при импорте не появляются вовсе.
+
+Абсолютное время зависит от машины, поэтому бюджет задан относительно
+калибровочного импорта (fastapi + sqlalchemy.orm + celery), измеренного в
+том же прогоне вперемешку с проверяемым. Сейчас API ~2.3-2.9x калибровки,
+воркер ~2x (до ленивой загрузки ~2.7-3.1x). Множители -
+IMPORT_TIME_BUDGET_FACTOR / WORKER_IMPORT_TIME_BUDGET_FACTOR.
+
+По умолчанию выполняются только быстрые проверки по одному импорту (нет
+тяжелых модулей, воркер без FastAPI, импорт не трогает БД); замеры бюджета:
+    RUN_BENCHMARKS=1 pytest tests/performance/test_import_time.py -s
+"""
+
+import os
+import sys
+import sqlite3
+import subprocess
+from pathlib import Path
+
+import pytest
+
+pytestmark = pytest.mark.slow
+benchmark = pytest.mark.skipif(os.getenv("RUN_BENCHMARKS") != "1", reason="бенчмарк: RUN_BENCHMARKS=1")
+
+SERVER_DIR = Path(__file__).resolve().parents[2]
+API_BUDGET_FACTOR = float(os.getenv("IMPORT_TIME_BUDGET_FACTOR", "3.5"))
+WORKER_BUDGET_FACTOR = float(os.getenv("WORKER_IMPORT_TIME_BUDGET_FACTOR", "2.75"))
+RUNS = int(os.getenv("IMPORT_TIME_RUNS", "5"))
+
+HEAVY_OPTIONAL = {"matplotlib", "gspread", "googleapiclient.discovery", "google.oauth2.service_account"}
+
+API_IMPORT = "import main"
+CALIBRATION_IMPORT = "import fastapi\nimport sqlalchemy.orm\nimport celery\n"
+WORKER_IMPORT = (
+    "import importlib\n"
+    "from app.core.celery_app import celery_app\n"
+    "for module in celery_app.conf.include: importlib.import_module(module)\n"
+)
+
+
+def run_python(code, database_url, *args):
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "SYNC_INTERVAL": os.getenv("SYNC_INTERVAL", "3600"),
+        "STOCK_ALERT_CHECK_TIME": os.getenv("STOCK_ALERT_CHECK_TIME", "09:00"),
+    }
+    result = subprocess.run(
+        [sys.executable, *args, "-c", code], cwd=SERVER_DIR, env=env,
+        capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    return result
+
+
+def import_profile(code, database_url):
+    """
+    Разбор -X importtime: {модуль: (self мкс, cumulative мкс, глубина)}
+
+    Строки вида "import time:       693 |     687069 |   fastapi",
+    глубина - число пробелов перед именем / 2.
+    """
+    result = run_python(code, database_url, "-X", "importtime")
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # заголовок
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        profile[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return profile
+
+
+def total_ms(profile):
+    return sum(cumulative for _, cumulative, depth in profile.values() if depth == 0) / 1000
+
+
+def best_of(code, database_url):
+    """
+    Лучший профиль code и лучшее время калибровочного импорта
+
+    Запуски чередуются, чтобы фоновая нагрузка машины сказывалась на обоих.
+    """
+    profiles, calibration = [], []
+    for _ in range(RUNS):
+        calibration.append(total_ms(import_profile(CALIBRATION_IMPORT, database_url)))
+        profiles.append(import_profile(code, database_url))
+    return min(profiles, key=total_ms), min(calibration)
+
+
+def report(title, profile, calibration_ms, factor):
+    print(f"\n{title}: {total_ms(profile):.0f} мс, {total_ms(profile) / calibration_ms:.2f}x калибровки "
+          f"{calibration_ms:.0f} мс (бюджет {factor:.2f}x = {calibration_ms * factor:.0f} мс)")
+    top = sorted(
+        ((cumulative, name) for name, (_, cumulative, depth) in profile.items()
+         if depth <= 1 and name.startswith(("app.", "main"))),
+        reverse=True,
+    )[:8]
+    for cumulative, name in top:
+        print(f"  {cumulative / 1000:7.1f} мс  {name}")
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'bootstrap.db'}"
+
+
+def test_api_import_without_heavy_dependencies(database_url, tmp_path):
+    profile = import_profile(API_IMPORT, database_url)
+
+    assert HEAVY_OPTIONAL.isdisjoint(profile), sorted(HEAVY_OPTIONAL & set(profile))
+    # Импорт не создает схему и не подключается к БД
+    assert not (tmp_path / "bootstrap.db").exists()
+
+
+def test_worker_import_without_web_stack(database_url):
+    profile = import_profile(WORKER_IMPORT, database_url)
+
+    forbidden = HEAVY_OPTIONAL | {"fastapi", "main"}
+    assert forbidden.isdisjoint(profile), sorted(forbidden & set(profile))
+
+
+@benchmark
+def test_api_import_within_budget(database_url):
+    profile, calibration_ms = best_of(API_IMPORT, database_url)
+    report("Импорт API (main)", profile, calibration_ms, API_BUDGET_FACTOR)
+
+    assert total_ms(profile) <= calibration_ms * API_BUDGET_FACTOR
+
+
+@benchmark
+def test_worker_import_within_budget(database_url):
+    profile, calibration_ms = best_of(WORKER_IMPORT, database_url)
+    report("Импорт воркера Celery", profile, calibration_ms, WORKER_BUDGET_FACTOR)
+
+    assert total_ms(profile) <= calibration_ms * WORKER_BUDGET_FACTOR
+
+
+def test_schema_created_by_bootstrap_command(database_url, tmp_path):
+    run_python("import runpy; runpy.run_module('app.core.bootstrap', run_name='__main__')", database_url)
+
+    with sqlite3.connect(tmp_path / "bootstrap.db") as connection:
+        tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {"users", "wb_cabinets", "wb_orders", "wb_sales", "favorites"} <= tables
@@ -0,0 +1,88 @@
+"""
+Время страницы листинга заказов: страница 1 и страница 1000.
+
+Курсорная страница читает limit + 1 строк по индексу (cabinet_id, order_date, id)
+и не зависит от глубины; offset-страница читает и отбрасывает все предыдущие
+строки. Файловая SQLite, кабинет с 1000 страниц заказов и соседний кабинет.
+
+По умолчанию страницы по 20 заказов (20k заказов); по 100 (100k):
+    RUN_BENCHMARKS=1 pytest tests/performance/test_listing_pagination.py -s
+"""
+
+import os
+import time
+import statistics
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.features.wb_api.models import WBCabinet, WBOrder
+from app.utils.pagination import paginate, row_key, stable_order
+
+pytestmark = pytest.mark.slow
+
+PAGE_SIZE = 100 if os.getenv("RUN_BENCHMARKS") == "1" else 20
+PAGES = 1000
+REPEATS = 15
+
+
+@pytest.fixture(scope="module")
+def db(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('listing') / 'orders.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([WBCabinet(id=1, api_key="key-1"), WBCabinet(id=2, api_key="key-2")])
+    start = datetime(2024, 1, 1)
+    total = PAGE_SIZE * (PAGES + 1)  # страница 1000 - не последняя
+    # Заказы двух кабинетов вперемешку, как пишет синхронизация
+    session.bulk_insert_mappings(WBOrder, [
+        {
+            "cabinet_id": 1 + i % 2, "order_id": f"o-{i}", "nm_id": i % 500,
+            "order_date": start + timedelta(seconds=30 * (i // 2)), "status": "active",
+        }
+        for i in range(total * 2)
+    ])
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def orders(db):
+    return db.query(WBOrder).filter(WBOrder.cabinet_id == 1)
+
+
+def timed(fn):
+    samples = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        rows = fn()
+        samples.append(time.perf_counter() - started)
+        assert len(rows) == PAGE_SIZE
+    return statistics.median(samples)
+
+
+def test_keyset_page_latency_flat_with_depth(db):
+    # Ключ последней строки 999-й страницы - курсор страницы 1000
+    boundary = stable_order(orders(db), WBOrder.order_date, WBOrder.id).offset(PAGE_SIZE * (PAGES - 1) - 1).first()
+    after = row_key(boundary, WBOrder.order_date, WBOrder.id)
+
+    first = timed(lambda: paginate(orders(db), WBOrder.order_date, WBOrder.id, PAGE_SIZE)[0])
+    deep = timed(lambda: paginate(orders(db), WBOrder.order_date, WBOrder.id, PAGE_SIZE, after=after)[0])
+    deep_offset = timed(lambda: paginate(
+        orders(db), WBOrder.order_date, WBOrder.id, PAGE_SIZE, offset=PAGE_SIZE * (PAGES - 1))[0])
+
+    # Курсор и offset на глубине 1000 дают одну и ту же страницу
+    by_cursor = paginate(orders(db), WBOrder.order_date, WBOrder.id, PAGE_SIZE, after=after)[0]
+    by_offset = paginate(orders(db), WBOrder.order_date, WBOrder.id, PAGE_SIZE, offset=PAGE_SIZE * (PAGES - 1))[0]
+    assert [o.id for o in by_cursor] == [o.id for o in by_offset]
+
+    print(
+        f"\n{PAGES} страниц по {PAGE_SIZE}: курсор стр.1 {first * 1000:.2f} мс, стр.{PAGES} {deep * 1000:.2f} мс; "
+        f"offset стр.{PAGES} {deep_offset * 1000:.2f} мс"
+    )
+    assert deep < max(first * 2, first + 0.002)
+    assert deep_offset > deep * 3
@@ -10,7 +10,7 @@ from unittest.mock import Mock, patch, AsyncMock
 from datetime import datetime, timezone
 
 from app.features.notifications.notification_service import NotificationService
-from app.features.notifications.queue_manager import QueueManager
+from app.features.notifications.stream_queue import StreamQueueManager
 from app.features.notifications.retry_logic import RetryLogic, RetryConfig
 
 
@@ -22,6 +22,7 @@ class TestNotificationSystemLoad:
         """Mock Redis client for load testing"""
         redis = Mock()
         redis.lpush = Mock()
+        redis.xadd = Mock(return_value="1-0")
         redis.rpop = Mock()
         redis.llen = Mock()
         redis.lrange = Mock()
@@ -45,8 +46,8 @@ class TestNotificationSystemLoad:
 
     @pytest.fixture
     def queue_manager(self, mock_redis):
-        """QueueManager for load testing"""
-        return QueueManager(mock_redis)
+        """StreamQueueManager for load testing"""
+        return StreamQueueManager(mock_redis, consumer_name="load-test")
 
     def test_notification_service_high_volume_orders(self, notification_service, mock_db, mock_redis):
         """Test notification service with high volume of orders"""
@@ -95,8 +96,10 @@ class TestNotificationSystemLoad:
             print(f"✅ Processed 1000 orders in {processing_time:.2f}s")
             print(f"✅ Throughput: {1000/processing_time:.0f} notifications/second")
 
-    def test_queue_manager_high_volume_throughput(self, queue_manager, mock_redis):
+    def test_queue_manager_high_volume_throughput(self):
         """Test queue manager with high volume throughput"""
+        fakeredis = pytest.importorskip("fakeredis")
+        queue_manager = StreamQueueManager(fakeredis.FakeRedis(decode_responses=True), consumer_name="load-test")
         notifications = []
         for i in range(1000):
             notification = {
@@ -113,14 +116,16 @@ class TestNotificationSystemLoad:
         
         # Add all notifications to queue
         for notification in notifications:
-            queue_manager.add_notification_to_queue(notification)
+            queue_manager.enqueue(notification)
         
         # Get all notifications from queue
         retrieved_notifications = []
-        for _ in range(1000):
-            notification = queue_manager.get_next_notification()
-            if notification:
-                retrieved_notifications.append(notification)
+        while True:
+            batch = queue_manager.read_batch(100)
+            if not batch:
+                break
+            queue_manager.ack(batch)
+            retrieved_notifications.extend(entry.notification for entry in batch)
         
         end_time = time.time()
         processing_time = end_time - start_time
@@ -248,7 +253,7 @@ class TestNotificationSystemLoad:
         
         # Add all notifications to queue
         for notification in notifications:
-            queue_manager.add_notification_to_queue(notification)
+            queue_manager.enqueue(notification)
         
         final_memory = process.memory_info().rss / 1024 / 1024  # MB
         memory_increase = final_memory - initial_memory
@@ -0,0 +1,117 @@
+"""
+Пропускная способность очереди уведомлений: списки (прежний QueueManager,
+rpop по одному уведомлению) против Redis Streams (StreamQueueManager, пачка из
+BATCH уведомлений за один pipeline + подтверждение одним pipeline).
+
+Оба варианта работают поверх fakeredis через прокси, считающий обращения
+к Redis (команда или pipeline.execute - один round trip). На реальном Redis
+время обработки определяется в основном числом round trip'ов.
+
+По умолчанию 2k уведомлений; 20k:
+    RUN_BENCHMARKS=1 pytest tests/performance/test_notification_stream_queue.py -s
+"""
+
+import os
+import json
+import time
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.features.notifications.stream_queue import PRIORITIES, StreamQueueManager
+
+pytestmark = pytest.mark.slow
+
+NOTIFICATIONS = int(os.getenv(
+    "NOTIFICATION_QUEUE_SIM_SIZE", "20000" if os.getenv("RUN_BENCHMARKS") == "1" else "2000"
+))
+BATCH = 50
+
+
+class RoundTripCounter:
+    """Прокси Redis клиента: считает команды и выполнения pipeline"""
+
+    def __init__(self, client):
+        self._client = client
+        self.round_trips = 0
+
+    def pipeline(self, *args, **kwargs):
+        pipe = self._client.pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        def counted_execute(*exec_args, **exec_kwargs):
+            self.round_trips += 1
+            return execute(*exec_args, **exec_kwargs)
+
+        pipe.execute = counted_execute
+        return pipe
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def counted(*args, **kwargs):
+            self.round_trips += 1
+            return attr(*args, **kwargs)
+
+        return counted
+
+
+def notifications():
+    for i in range(NOTIFICATIONS):
+        priority = PRIORITIES[i % len(PRIORITIES)]
+        yield {"id": f"n-{i}", "type": "new_order", "priority": priority, "user_id": i % 100}
+
+
+def drain_lists(redis_client):
+    """Прежняя очередь на списках: lpush в список приоритета, rpop по порядку приоритетов"""
+    queues = [f"notification_queue:{priority.lower()}" for priority in PRIORITIES]
+    for notification in notifications():
+        redis_client.lpush(f"notification_queue:{notification['priority'].lower()}", json.dumps(notification))
+    redis_client.round_trips = 0
+
+    started = time.perf_counter()
+    processed = 0
+    while any(redis_client.rpop(queue) is not None for queue in queues):
+        processed += 1
+    return processed, time.perf_counter() - started
+
+
+def drain_streams(redis_client):
+    queue = StreamQueueManager(redis_client, consumer_name="bench")
+    for notification in notifications():
+        queue.enqueue(notification)
+    redis_client.round_trips = 0
+
+    started = time.perf_counter()
+    processed = 0
+    while True:
+        batch = queue.read_batch(BATCH)
+        if not batch:
+            break
+        processed += queue.ack(batch)
+    return processed, time.perf_counter() - started
+
+
+def test_stream_batches_need_far_fewer_round_trips():
+    lists = RoundTripCounter(fakeredis.FakeRedis(decode_responses=True))
+    streams = RoundTripCounter(fakeredis.FakeRedis(decode_responses=True))
+
+    list_processed, list_seconds = drain_lists(lists)
+    stream_processed, stream_seconds = drain_streams(streams)
+
+    assert list_processed == stream_processed == NOTIFICATIONS
+    # Списки: от 1 до 4 rpop на уведомление; стримы: чтение пачки (плюс
+    # дочитывание, когда приоритет исчерпан) и подтверждение - по pipeline
+    assert lists.round_trips >= NOTIFICATIONS
+    assert streams.round_trips < 3 * NOTIFICATIONS / BATCH
+    assert streams.round_trips * 10 < lists.round_trips
+
+    print(
+        f"\n{NOTIFICATIONS} уведомлений: списки {lists.round_trips} round trip, "
+        f"{NOTIFICATIONS / list_seconds:.0f}/с (fakeredis); "
+        f"стримы пачками по {BATCH}: {streams.round_trips} round trip, "
+        f"{NOTIFICATIONS / stream_seconds:.0f}/с (fakeredis), с подтверждением доставки"
+    )
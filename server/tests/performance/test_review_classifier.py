@@ -0,0 +1,71 @@
+"""
+Пропускная способность локального классификатора отзывов.
+
+100k отзывов собираются из размеченного набора (tests/fixtures/reviews):
+текст отзыва плюс случайный хвост из слов набора, pros / cons и оценка.
+Отдельно - "холодный" вариант, где половина слов уникальна и каждое
+проходит поиск основы мимо кэша. Классификация идет при синхронизации
+отзывов, поэтому важно, чтобы она оставалась малой долей записи в БД.
+
+По умолчанию 100k отзывов; RUN_BENCHMARKS=1 - 500k:
+    RUN_BENCHMARKS=1 pytest tests/performance/test_review_classifier.py -s
+"""
+
+import os
+import json
+import time
+import random
+
+import pytest
+
+from app.features.wb_api.review_classifier import SENTIMENTS, _lookup, classify
+
+pytestmark = pytest.mark.slow
+
+REVIEWS = 500_000 if os.getenv("RUN_BENCHMARKS") == "1" else 100_000
+# Минимум отзывов в секунду (одно ядро)
+MIN_REVIEWS_PER_SECOND = float(os.getenv("REVIEW_CLASSIFIER_MIN_RPS", "10000"))
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "..", "fixtures", "reviews", "labeled_reviews.json")
+
+
+def synthetic_reviews(count, unique_words=False, seed=50):
+    with open(FIXTURE, encoding="utf-8") as f:
+        labeled = json.load(f)
+    rnd = random.Random(seed)
+    vocabulary = [word for review in labeled for word in (review["text"] or "").split()]
+    letters = "абвгдежзиклмнопрстуфхцчшщэюя"
+    reviews = []
+    for i in range(count):
+        base = rnd.choice(labeled)
+        tail = [rnd.choice(vocabulary) for _ in range(rnd.randrange(0, 30))]
+        if unique_words:
+            tail += ["".join(rnd.choice(letters) for _ in range(8)) for _ in range(len(tail))]
+        reviews.append((f"{base['text'] or ''} {' '.join(tail)}", base["pros"], base["cons"], base["rating"]))
+    return reviews
+
+
+def reviews_per_second(reviews):
+    _lookup.cache_clear()
+    counts = dict.fromkeys(SENTIMENTS, 0)
+    started = time.perf_counter()
+    for review in reviews:
+        counts[classify(*review).sentiment] += 1
+    elapsed = time.perf_counter() - started
+    assert sum(counts.values()) == len(reviews)
+    return len(reviews) / elapsed, counts
+
+
+@pytest.mark.parametrize("unique_words", [False, True], ids=["словарь набора", "уникальные слова"])
+def test_classifier_throughput(unique_words):
+    reviews = synthetic_reviews(REVIEWS, unique_words)
+    words = sum(len(text.split()) for text, *_ in reviews) / len(reviews)
+
+    rate, counts = reviews_per_second(reviews)
+    cache = _lookup.cache_info()
+    print(f"\n{REVIEWS} отзывов (~{words:.0f} слов в тексте): {rate:,.0f} отзывов/с, "
+          f"{REVIEWS / rate:.2f} с всего")
+    print(f"  тональность: {counts}, кэш основ: {cache.hits} попаданий, {cache.misses} промахов")
+
+    assert counts["positive"] and counts["negative"]
+    assert rate >= MIN_REVIEWS_PER_SECOND
@@ -0,0 +1,197 @@
+"""
+Накладные расходы записи метрик запроса.
+
+record_request (счетчик, гистограмма латентности, окно requests_per_minute,
+сессия) сравнивается с вариантом на общем словаре под threading.Lock:
+в один поток и в 8 потоков, которые пишут одновременно. Отдельно - доля
+записи метрик во времени обработки запроса минимальным ASGI приложением
+в том же процессе и задержка event loop при публикации снимка в медленный
+Redis.
+
+По умолчанию 50k записей на поток; 500k:
+    RUN_BENCHMARKS=1 pytest tests/performance/test_runtime_metrics.py -s
+"""
+
+import os
+import time
+import asyncio
+import threading
+import statistics
+from bisect import bisect_left
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.core import metrics
+from app.core.metrics import LATENCY_BUCKETS, MetricsRegistry
+
+pytestmark = pytest.mark.slow
+
+RECORDS = 500_000 if os.getenv("RUN_BENCHMARKS") == "1" else 50_000
+THREADS = 8
+ROUTES = [f"/api/v1/bot/route{i}" for i in range(20)]
+
+
+class LockedMetrics:
+    """Базовый вариант: общий словарь и блокировка на каждую запись"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.requests = 0
+
+    def record_request(self, method, route, status, duration, session_id=None):
+        with self.lock:
+            key = (method, route, status)
+            self.counters[key] = self.counters.get(key, 0) + 1
+            values = self.histograms.setdefault((method, route), [0] * (len(LATENCY_BUCKETS) + 2))
+            values[bisect_left(LATENCY_BUCKETS, duration)] += 1
+            values[-1] += duration
+            self.requests += 1
+
+
+def sharded_recorder():
+    registry = MetricsRegistry(process_id="bench:1")
+    requests = registry.counter("http_requests_total", "", ("method", "route", "status"))
+    latency = registry.histogram("http_request_duration_seconds", "", ("method", "route"))
+
+    def record_request(method, route, status, duration, session_id=None):
+        requests.inc(method, route, str(status))
+        latency.observe(duration, method, route)
+        registry.mark_request(session_id)
+
+    return registry, record_request
+
+
+def run(record, threads):
+    def work(offset):
+        for i in range(RECORDS):
+            record("GET", ROUTES[(i + offset) % len(ROUTES)], 200, 0.003, str(i % 100))
+
+    workers = [threading.Thread(target=work, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started
+
+
+def test_sharded_recording_is_cheap_and_exact():
+    registry, record = sharded_recorder()
+    locked = LockedMetrics()
+
+    single = run(record, 1)
+    locked_single = run(locked.record_request, 1)
+    registry, record = sharded_recorder()
+    locked = LockedMetrics()
+    threaded = run(record, THREADS)
+    locked_threaded = run(locked.record_request, THREADS)
+
+    per_record_us = single / RECORDS * 1e6
+    print(f"\nЗапись метрик запроса, {RECORDS} записей на поток")
+    print(f"  1 поток:  шарды {per_record_us:.2f} мкс/запись, блокировка {locked_single / RECORDS * 1e6:.2f} мкс/запись")
+    print(f"  {THREADS} потоков: шарды {threaded:.2f}s, блокировка {locked_threaded:.2f}s")
+
+    collected = registry.collect(include_remote=False)
+    total = sum(value for (name, _), value in collected["counters"].items() if name == "http_requests_total")
+    observed = sum(sum(values[:-1]) for values in collected["histograms"].values())
+    assert total == observed == RECORDS * THREADS
+    assert len(registry._shards) == THREADS
+
+    assert per_record_us < 10
+    # Под GIL свободная блокировка дешевая, выигрыш шардов - в отсутствии
+    # ожидания потока, вытесненного с захваченной блокировкой; здесь
+    # проверяется только, что шарды не деградируют под конкуренцией
+    assert threaded < locked_threaded * 2
+
+
+def test_recording_is_negligible_next_to_request_handling():
+    app = FastAPI()
+
+    @app.get("/api/v1/bot/ping")
+    async def ping(telegram_id: int):
+        return {"ok": True}
+
+    async def measure(count):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get("/api/v1/bot/ping", params={"telegram_id": 1})
+            samples = []
+            for i in range(count):
+                started = time.perf_counter()
+                await client.get("/api/v1/bot/ping", params={"telegram_id": i % 50})
+                samples.append(time.perf_counter() - started)
+            return statistics.median(samples)
+
+    request_seconds = asyncio.run(measure(500))
+
+    registry, record = sharded_recorder()
+    started = time.perf_counter()
+    for i in range(RECORDS):
+        record("GET", "/api/v1/bot/ping", 200, 0.003, str(i % 50))
+    record_seconds = (time.perf_counter() - started) / RECORDS
+
+    share = record_seconds / request_seconds
+    print(f"\nЗапрос в процессе: {request_seconds * 1e6:.0f} мкс, запись метрик: {record_seconds * 1e6:.2f} мкс ({share:.2%})")
+    assert share < 0.02
+
+
+def test_application_registry_records_through_module_api():
+    metrics.registry.reset()
+    started = time.perf_counter()
+    for i in range(RECORDS):
+        metrics.record_request("GET", ROUTES[i % len(ROUTES)], 200, 0.003, str(i % 100))
+    elapsed = time.perf_counter() - started
+    collected = metrics.registry.collect(include_remote=False)
+    metrics.registry.reset()
+
+    print(f"\nmetrics.record_request: {elapsed / RECORDS * 1e6:.2f} мкс/запись")
+    assert collected["requests_per_minute"] == RECORDS
+    assert collected["active_sessions"] == 100
+
+
+class SlowRedis:
+    """Redis с задержкой на каждую команду pipeline"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.writes = 0
+
+    def pipeline(self):
+        return self
+
+    def set(self, *args, **kwargs):
+        pass
+
+    def sadd(self, *args):
+        pass
+
+    def execute(self):
+        time.sleep(self.delay)
+        self.writes += 1
+
+
+def test_publish_does_not_stall_event_loop():
+    delay = 0.2
+    slow_redis = SlowRedis(delay)
+    registry = MetricsRegistry(redis_client=slow_redis, process_id="bench:1")
+
+    async def measure():
+        lags = []
+
+        async def ticker():
+            for _ in range(20):
+                started = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lags.append(time.perf_counter() - started - 0.01)
+
+        await asyncio.gather(ticker(), registry.publish_async(force=True))
+        return max(lags)
+
+    max_lag = asyncio.run(measure())
+    print(f"\nЗапись снимка {delay * 1000:.0f} мс, макс. задержка event loop {max_lag * 1000:.1f} мс")
+    assert slow_redis.writes == 1
+    assert max_lag < delay / 4
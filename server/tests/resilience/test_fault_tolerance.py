@@ -8,7 +8,7 @@ from unittest.mock import Mock, patch, AsyncMock
 from datetime import datetime, timezone
 
 from app.features.notifications.notification_service import NotificationService
-from app.features.notifications.queue_manager import QueueManager
+from app.features.notifications.stream_queue import StreamQueueManager
 from app.features.notifications.retry_logic import RetryLogic, RetryConfig
 from app.features.notifications.redis_integration import RedisIntegration, CacheConfig
 
@@ -37,7 +37,7 @@ class TestNotificationSystemResilience:
                 raise Exception("Redis read failed")
             return None
         
-        redis.lpush = Mock(side_effect=failing_lpush)
+        redis.xadd = Mock(side_effect=failing_lpush)
         redis.rpop = Mock(side_effect=failing_rpop)
         redis.llen = Mock(return_value=0)
         redis.lrange = Mock(return_value=[])
@@ -71,7 +71,7 @@ class TestNotificationSystemResilience:
 
     def test_redis_failure_graceful_degradation(self, mock_redis_failing):
         """Test system behavior when Redis fails"""
-        queue_manager = QueueManager(mock_redis_failing)
+        queue_manager = StreamQueueManager(mock_redis_failing)
         
         notification = {
             "id": "test_notification",
@@ -88,7 +88,7 @@ class TestNotificationSystemResilience:
         
         for i in range(10):
             try:
-                queue_manager.add_notification_to_queue(notification)
+                queue_manager.enqueue(notification)
                 success_count += 1
             except Exception:
                 failure_count += 1
@@ -211,7 +211,7 @@ class TestNotificationSystemResilience:
 
     def test_memory_pressure_handling(self, mock_redis):
         """Test system behavior under memory pressure"""
-        queue_manager = QueueManager(mock_redis)
+        queue_manager = StreamQueueManager(mock_redis)
         
         # Simulate memory pressure by creating large notifications
         large_notifications = []
@@ -231,7 +231,7 @@ class TestNotificationSystemResilience:
         
         for notification in large_notifications:
             try:
-                queue_manager.add_notification_to_queue(notification)
+                queue_manager.enqueue(notification)
             except Exception as e:
                 # Should handle memory pressure gracefully
                 assert "memory" in str(e).lower() or "resource" in str(e).lower()
@@ -247,7 +247,7 @@ class TestNotificationSystemResilience:
 
     def test_concurrent_failure_handling(self, mock_redis_failing):
         """Test handling of concurrent failures"""
-        queue_manager = QueueManager(mock_redis_failing)
+        queue_manager = StreamQueueManager(mock_redis_failing)
         
         async def process_notification(notification_id):
             """Process a single notification"""
@@ -261,7 +261,7 @@ class TestNotificationSystemResilience:
             }
             
             try:
-                queue_manager.add_notification_to_queue(notification)
+                queue_manager.enqueue(notification)
                 return "success"
             except Exception:
                 return "failure"
@@ -354,7 +354,7 @@ class TestNotificationSystemResilience:
 
     def test_cascade_failure_prevention(self, mock_redis):
         """Test prevention of cascade failures"""
-        queue_manager = QueueManager(mock_redis)
+        queue_manager = StreamQueueManager(mock_redis)
         
         # Simulate cascade failure scenario
         def failing_operation():
@@ -362,7 +362,7 @@ class TestNotificationSystemResilience:
         
         # System should prevent cascade failures
         try:
-            queue_manager.add_notification_to_queue({
+            queue_manager.enqueue({
                 "id": "test",
                 "user_id": 1,
                 "type": "new_order",
@@ -378,7 +378,7 @@ class TestNotificationSystemResilience:
 
     def test_system_recovery_after_failure(self, mock_redis):
         """Test system recovery after failure"""
-        queue_manager = QueueManager(mock_redis)
+        queue_manager = StreamQueueManager(mock_redis)
         
         # Simulate system failure and recovery
         notification = {
@@ -392,7 +392,7 @@ class TestNotificationSystemResilience:
         
         # System should recover after failure
         try:
-            queue_manager.add_notification_to_queue(notification)
+            queue_manager.enqueue(notification)
             print("✅ System recovery: successful after failure")
         except Exception as e:
             print(f"❌ System recovery: failed with {e}")
@@ -0,0 +1,170 @@
+"""
+Тесты APIKeyMiddleware: ротация ключей, сравнение за постоянное время,
+публичные пути, выборка и ограничение частоты журнала доступа
+"""
+
+import json
+import hmac
+import logging
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.core import metrics, middleware
+from app.core.middleware import AccessLog, APIKeyMiddleware, LogRateLimiter, load_api_keys
+
+
+def make_app(api_keys=("new-key", "old-key"), sample_rate=1.0, rate_limit=100.0):
+    app = FastAPI()
+
+    @app.get("/system/health/live")
+    async def live():
+        return {"status": "alive"}
+
+    @app.get("/docs/extra")
+    async def docs_page():
+        return {"docs": True}
+
+    @app.get("/orders/{order_id}")
+    async def order(order_id: int, telegram_id: int = 0):
+        return {"order_id": order_id}
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("database exploded")
+
+    app.add_middleware(
+        APIKeyMiddleware,
+        api_keys=api_keys,
+        access_log=AccessLog(sample_rate=sample_rate, rate_limit=rate_limit),
+    )
+    return app
+
+
+def client_for(app):
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+def access_entries(caplog, level=None):
+    return [
+        json.loads(record.getMessage()) for record in caplog.records
+        if record.name == "app.access" and (level is None or record.levelno == level)
+    ]
+
+
+@pytest.fixture(autouse=True)
+def local_metrics():
+    with patch.object(metrics.registry, "_write_snapshot"):
+        metrics.registry.reset()
+        yield
+        metrics.registry.reset()
+
+
+class TestAuthentication:
+    @pytest.mark.asyncio
+    async def test_missing_and_invalid_keys_rejected(self):
+        async with client_for(make_app()) as client:
+            missing = await client.get("/orders/1")
+            invalid = await client.get("/orders/1", headers={"X-API-SECRET-KEY": "new-key-but-longer"})
+
+        assert missing.status_code == invalid.status_code == 403
+        assert missing.json() == {"detail": "Missing API Secret Key"}
+        assert invalid.json() == {"detail": "Invalid API Secret Key"}
+
+    @pytest.mark.asyncio
+    async def test_all_rotating_keys_accepted(self):
+        async with client_for(make_app()) as client:
+            for key in ("new-key", "old-key"):
+                response = await client.get("/orders/1", headers={"X-API-SECRET-KEY": key})
+                assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_every_key_compared_without_early_exit(self):
+        compare = hmac.compare_digest
+        with patch("app.core.middleware.hmac.compare_digest", side_effect=compare) as compare_digest:
+            async with client_for(make_app(api_keys=("k1", "k2", "k3"))) as client:
+                response = await client.get("/orders/1", headers={"X-API-SECRET-KEY": "k1"})
+
+        assert response.status_code == 200
+        assert compare_digest.call_count == 3
+        # Сравниваются sha256 - одинаковой длины при любой длине ключа
+        assert {len(arg) for call in compare_digest.call_args_list for arg in call.args} == {32}
+
+    @pytest.mark.asyncio
+    async def test_public_paths_and_prefixes_skip_key(self):
+        async with client_for(make_app()) as client:
+            assert (await client.get("/system/health/live")).status_code == 200
+            assert (await client.get("/docs/extra")).status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_no_configured_keys_rejects_everything(self):
+        async with client_for(make_app(api_keys=())) as client:
+            response = await client.get("/orders/1", headers={"X-API-SECRET-KEY": ""})
+        assert response.status_code == 403
+
+    def test_keys_loaded_from_environment(self, monkeypatch):
+        monkeypatch.setenv("API_SECRET_KEY", "primary")
+        monkeypatch.setenv("API_SECRET_KEYS", "next, primary ,,previous")
+        assert load_api_keys() == ("primary", "next", "previous")
+
+
+class TestAccessLog:
+    @pytest.mark.asyncio
+    async def test_structured_entry_and_metrics_by_route_template(self, caplog):
+        caplog.set_level(logging.INFO, logger="app.access")
+        async with client_for(make_app()) as client:
+            await client.get("/orders/42", params={"telegram_id": 7}, headers={"X-API-SECRET-KEY": "old-key"})
+
+        [entry] = access_entries(caplog)
+        assert entry["method"] == "GET" and entry["path"] == "/orders/42"
+        assert entry["route"] == "/orders/{order_id}" and entry["status"] == 200
+        assert entry["duration_ms"] >= 0 and entry["sample_rate"] == 1.0
+        collected = metrics.registry.collect(include_remote=False)
+        assert collected["counters"][("http_requests_total", ("GET", "/orders/{order_id}", "200"))] == 1
+        assert collected["active_sessions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_successes_sampled_but_errors_always_logged(self, caplog):
+        caplog.set_level(logging.INFO, logger="app.access")
+        headers = {"X-API-SECRET-KEY": "new-key"}
+        async with client_for(make_app(sample_rate=0.0, rate_limit=1.0)) as client:
+            for _ in range(50):
+                await client.get("/orders/1", headers=headers)
+            for _ in range(5):
+                assert (await client.get("/boom", headers=headers)).status_code == 500
+
+        assert access_entries(caplog, logging.INFO) == []
+        errors = access_entries(caplog, logging.ERROR)
+        assert len(errors) == 5
+        assert errors[0]["status"] == 500 and errors[0]["error"] == "RuntimeError: database exploded"
+
+    @pytest.mark.asyncio
+    async def test_client_errors_rate_limited_with_suppressed_count(self, caplog):
+        caplog.set_level(logging.INFO, logger="app.access")
+        access_log = AccessLog(sample_rate=1.0, rate_limit=1.0)
+        app = make_app()
+        app.user_middleware[0].kwargs["access_log"] = access_log
+        async with client_for(app) as client:
+            for _ in range(20):
+                await client.get("/orders/1")
+            access_log.client_error_limiter.tokens = 1  # прошла секунда
+            await client.get("/orders/1")
+
+        warnings = access_entries(caplog, logging.WARNING)
+        assert len(warnings) == 2
+        assert warnings[1]["suppressed"] == 19
+
+    def test_rate_limiter_refills_over_time(self):
+        with patch("app.core.middleware.time.monotonic", side_effect=[0.0, 0.0, 0.0, 0.0, 0.5, 1.0]):
+            limiter = LogRateLimiter(rate=2.0)
+            assert [limiter.allow() for _ in range(5)] == [True, True, False, True, True]
+        assert limiter.suppressed == 1
+
+
+def test_application_uses_asgi_middleware():
+    from main import app
+
+    assert any(item.cls is middleware.APIKeyMiddleware for item in app.user_middleware)
@@ -0,0 +1,246 @@
+"""
+Тесты порционного удаления кабинета: поиск таблиц по метаданным, полное
+удаление данных кабинета, продолжение после сбоя, прогресс в Redis
+"""
+
+from datetime import date, datetime, time, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.core.database import Base
+from app.features.wb_api.cabinet_teardown import CabinetTeardown, discover_teardown_steps
+from app.features.wb_api.models import WBCabinet
+from app.features.wb_api.routes import delete_wb_cabinet
+
+ROWS_PER_TABLE = 25
+CABINET, OTHER_CABINET = 1, 2
+
+
+@pytest.fixture
+def steps():
+    return discover_teardown_steps()
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'teardown.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def dummy_value(column, i, owner):
+    """Значение обязательной колонки, уникальное в пределах таблицы"""
+    python_type = column.type.python_type
+    if python_type is bool:
+        return True
+    if python_type is int:
+        return owner * 1_000_000 + i
+    if python_type is float:
+        return float(i)
+    if python_type is str:
+        return f"{column.table.name}-{owner}-{i}"[: getattr(column.type, "length", None) or 255]
+    if python_type is datetime:
+        return datetime(2025, 1, 1) + timedelta(minutes=i)
+    if python_type is date:
+        return date(2000, 1, 1) + timedelta(days=owner * 10_000 + i)
+    if python_type is time:
+        return time(i % 24, i % 60)
+    if python_type in (dict, list):
+        return python_type()
+    return str(i)
+
+
+def insert_rows(conn, table, count, owner, parents):
+    """
+    Строки таблицы: cabinet_id - owner, внешние ключи - на строки родителей
+    того же владельца, остальные обязательные колонки - фиктивные значения
+    """
+    rows = []
+    for i in range(count):
+        row = {}
+        for column in table.columns:
+            if column.primary_key:
+                continue
+            fk = next(iter(column.foreign_keys), None)
+            if column.name == "cabinet_id":
+                row[column.name] = owner
+            elif fk is not None and fk.column.table.name in parents:
+                parent_ids = parents[fk.column.table.name]
+                row[column.name] = parent_ids[i % len(parent_ids)]
+            elif not column.nullable and column.default is None and column.server_default is None:
+                row[column.name] = dummy_value(column, i, owner)
+        rows.append(row)
+    conn.execute(table.insert(), rows)
+    pk = next(iter(table.primary_key.columns))
+    return list(conn.execute(select(pk).order_by(pk.desc()).limit(count)).scalars())
+
+
+def seed_cabinet(session_factory, steps, cabinet_id):
+    """Кабинет с ROWS_PER_TABLE строками в каждой таблице данных"""
+    users = Base.metadata.tables["users"]
+    cabinets = Base.metadata.tables["wb_cabinets"]
+    with session_factory().connection() as conn:
+        parents = {
+            "users": insert_rows(conn, users, 1, cabinet_id, {}),
+            "wb_cabinets": [cabinet_id],
+        }
+        conn.execute(cabinets.insert(), [{"id": cabinet_id, "api_key": f"key-{cabinet_id}", "is_active": True}])
+        for step in reversed(steps):
+            parents[step.name] = insert_rows(conn, step.table, ROWS_PER_TABLE, cabinet_id, parents)
+        conn.commit()
+
+
+def count_rows(session_factory, steps, cabinet_id):
+    db = session_factory()
+    try:
+        return {
+            step.name: db.execute(
+                select(func.count()).select_from(step.table).where(step.condition(cabinet_id))
+            ).scalar()
+            for step in steps
+        }
+    finally:
+        db.close()
+
+
+class TestDiscoverTeardownSteps:
+    def test_covers_direct_and_nested_cabinet_tables(self, steps):
+        names = [step.name for step in steps]
+
+        for table in ("wb_orders", "wb_sales", "daily_sales_analytics", "export_tokens",
+                      "channel_reports", "cabinet_semantic_cores", "cabinet_users"):
+            assert table in names
+        # Таблицы без cabinet_id - через внешний ключ на таблицу кабинета
+        for table in ("competitor_products", "competitor_semantic_cores", "export_logs"):
+            assert table in names
+        assert "wb_cabinets" not in names
+        assert "users" not in names and "notification_settings" not in names
+
+    def test_children_before_parents(self, steps):
+        names = [step.name for step in steps]
+
+        assert names.index("competitor_products") < names.index("competitor_links")
+        assert names.index("export_logs") < names.index("export_tokens")
+        assert names.index("digest_history") < names.index("channel_reports")
+
+
+class TestCabinetTeardown:
+    def test_removes_every_cabinet_row_in_chunks(self, steps, session_factory, redis_client):
+        seed_cabinet(session_factory, steps, CABINET)
+        seed_cabinet(session_factory, steps, OTHER_CABINET)
+        purged = []
+        teardown = CabinetTeardown(
+            session_factory, redis_client, chunk_size=10, pause_seconds=0, rag_purger=purged.append,
+        )
+
+        progress = teardown.run(CABINET)
+
+        assert set(count_rows(session_factory, steps, CABINET).values()) == {0}
+        assert set(count_rows(session_factory, steps, OTHER_CABINET).values()) == {ROWS_PER_TABLE}
+        assert progress["status"] == "completed"
+        assert progress["deleted"] == {step.name: ROWS_PER_TABLE for step in steps}
+        # 25 строк порциями по 10 - три порции на таблицу
+        assert progress["chunks"] == 3 * len(steps)
+        assert purged == [CABINET]
+        db = session_factory()
+        assert db.get(WBCabinet, CABINET) is None
+        assert db.get(WBCabinet, OTHER_CABINET).is_active is True
+        db.close()
+        assert teardown.get_progress(CABINET)["status"] == "completed"
+
+    def test_resumes_after_failure(self, steps, session_factory, redis_client):
+        seed_cabinet(session_factory, steps, CABINET)
+        teardown = CabinetTeardown(
+            session_factory, redis_client, chunk_size=10, pause_seconds=0, rag_purger=lambda _: "skipped",
+        )
+        original_delete_chunk = teardown.delete_chunk
+        calls = {"count": 0}
+
+        def flaky_delete_chunk(db, step, cabinet_id):
+            calls["count"] += 1
+            if calls["count"] == 5:
+                raise RuntimeError("connection lost")
+            return original_delete_chunk(db, step, cabinet_id)
+
+        teardown.delete_chunk = flaky_delete_chunk
+        with pytest.raises(RuntimeError):
+            teardown.run(CABINET)
+
+        failed = teardown.get_progress(CABINET)
+        assert failed["status"] == "failed"
+        assert failed["error"] == "connection lost"
+        db = session_factory()
+        # Кабинет уже выключен из синхронизации, но еще не удален
+        assert db.get(WBCabinet, CABINET).is_active is False
+        db.close()
+
+        progress = teardown.run(CABINET)
+
+        assert progress["status"] == "completed"
+        assert set(count_rows(session_factory, steps, CABINET).values()) == {0}
+        assert progress["deleted"] == {step.name: ROWS_PER_TABLE for step in steps}
+
+    def test_keeps_cabinet_when_rag_purge_fails(self, steps, session_factory, redis_client):
+        seed_cabinet(session_factory, steps, CABINET)
+        rag_results = iter(["failed", "purged"])
+        teardown = CabinetTeardown(
+            session_factory, redis_client, chunk_size=10, pause_seconds=0,
+            rag_purger=lambda _: next(rag_results),
+        )
+
+        with pytest.raises(RuntimeError):
+            teardown.run(CABINET)
+
+        failed = teardown.get_progress(CABINET)
+        assert failed["status"] == "failed"
+        assert failed["rag"] == "failed"
+        assert failed["current_table"] == "rag_index"
+        db = session_factory()
+        # Строка кабинета остается, чтобы повтор задачи дочистил RAG-индекс
+        assert db.get(WBCabinet, CABINET) is not None
+        db.close()
+
+        progress = teardown.run(CABINET)
+
+        assert progress["status"] == "completed"
+        assert progress["rag"] == "purged"
+        db = session_factory()
+        assert db.get(WBCabinet, CABINET) is None
+        db.close()
+
+    def test_progress_missing_for_unknown_cabinet(self, redis_client):
+        assert CabinetTeardown(redis_client=redis_client).get_progress(404) is None
+
+
+class TestDeleteCabinetRoute:
+    @pytest.mark.asyncio
+    async def test_tears_down_inline_when_broker_unavailable(self, steps, session_factory, redis_client):
+        seed_cabinet(session_factory, steps, CABINET)
+        teardown = CabinetTeardown(
+            session_factory, redis_client, chunk_size=10, pause_seconds=0, rag_purger=lambda _: "skipped",
+        )
+        db = session_factory()
+
+        with patch("app.features.wb_api.tasks.teardown_cabinet_task.delay",
+                   side_effect=ConnectionError("broker down")), \
+                patch("app.features.wb_api.cabinet_teardown.CabinetTeardown", return_value=teardown):
+            result = await delete_wb_cabinet(CABINET, db=db)
+        db.close()
+
+        assert result["task_id"] is None
+        assert result["teardown"] == "completed"
+        assert set(count_rows(session_factory, steps, CABINET).values()) == {0}
+        db = session_factory()
+        assert db.get(WBCabinet, CABINET) is None
+        db.close()
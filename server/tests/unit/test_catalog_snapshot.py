@@ -0,0 +1,188 @@
+"""
+Тесты снапшота каталога из Google Sheets (фейковая таблица + fakeredis)
+"""
+
+import threading
+from unittest.mock import patch
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.services import catalog_snapshot
+from app.services.catalog_snapshot import CatalogSnapshotStore
+from app.services.sheets_service import GoogleSheetsService
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, name):
+        self.spreadsheet = spreadsheet
+        self.name = name
+
+    def get_all_records(self):
+        self.spreadsheet.reads.append(self.name)
+        return [dict(row) for row in self.spreadsheet.sheets[self.name]]
+
+
+class FakeSpreadsheet:
+    """Таблица с листами 'Категории' и 'Товары' и ревизией как у Drive API"""
+
+    def __init__(self):
+        self.revision = 1
+        self.reads = []
+        self.sheets = {
+            "Категории": [
+                {"ID": "jackets", "Название": "Пиджаки", "Порядок": 2, "Эмодзи": "🧥"},
+                {"ID": "dresses", "Название": "Платья", "Порядок": 1, "Эмодзи": "👗"},
+            ],
+            "Товары": [
+                product_row("101", "dresses", "Платье миди"),
+                product_row("102", "dresses", "Платье макси", active="НЕТ"),
+                product_row("201", "jackets ", "Пиджак"),
+            ],
+        }
+
+    def worksheet(self, name):
+        return FakeWorksheet(self, name)
+
+    def get_lastUpdateTime(self):
+        return f"2025-01-01T00:00:{self.revision:02d}Z"
+
+    def edit(self, sheet, rows):
+        self.sheets[sheet] = rows
+        self.revision += 1
+
+
+def product_row(product_id, category, name, active="ДА"):
+    return {
+        "ID товара": product_id,
+        "Категория": category,
+        "Название": name,
+        "Описание": f"Описание {name}",
+        "Размеры": "42-48",
+        "OZON": "",
+        "Ссылка": "",
+        "Фото 1": f"https://drive.google.com/file/d/photo{product_id}/view",
+        "Фото 2": "", "Фото 3": "", "Фото 4": "", "Фото 5": "", "Фото 6": "",
+        "Коллаж": "",
+        "Активен": active,
+    }
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+@pytest.fixture
+def spreadsheet():
+    return FakeSpreadsheet()
+
+
+def make_worker(spreadsheet, redis_client):
+    """Отдельный экземпляр сервиса = отдельный процесс с общим Redis"""
+    return GoogleSheetsService(spreadsheet=spreadsheet, store=CatalogSnapshotStore(redis_client))
+
+
+class TestCatalogSnapshot:
+    def test_lookups_served_from_indexed_snapshot(self, spreadsheet, redis_client):
+        service = make_worker(spreadsheet, redis_client)
+
+        categories = service.get_categories()
+        dresses = service.get_products_by_category("dresses")
+        jackets = service.get_products_by_category("jackets")
+        inactive = service.get_product_by_id("102")
+
+        assert [c["category_id"] for c in categories] == ["dresses", "jackets"]
+        assert [p["product_id"] for p in dresses] == ["101"]
+        assert [p["product_id"] for p in jackets] == ["201"]
+        assert inactive["is_active"] is False
+        assert dresses[0]["photo_1_url"] == "https://drive.google.com/uc?export=view&id=photo101"
+        assert service.get_product_by_id("999") is None
+        # Каждый лист прочитан один раз на весь каталог
+        assert spreadsheet.reads == ["Категории", "Товары"]
+
+    def test_other_workers_share_snapshot_without_reading_sheet(self, spreadsheet, redis_client):
+        first = make_worker(spreadsheet, redis_client)
+        first.get_categories()
+
+        second = make_worker(spreadsheet, redis_client)
+
+        assert second.get_product_by_id("101") == first.get_product_by_id("101")
+        assert second.snapshots.get().version == first.snapshots.get().version
+        assert spreadsheet.reads == ["Категории", "Товары"]
+
+    def test_refresh_rebuilds_only_when_revision_changes(self, spreadsheet, redis_client):
+        writer = make_worker(spreadsheet, redis_client)
+        reader = make_worker(spreadsheet, redis_client)
+        old_version = writer.snapshots.get().version
+        reader.get_categories()
+        spreadsheet.reads.clear()
+
+        assert writer.refresh_snapshot() is False
+        assert spreadsheet.reads == []
+
+        spreadsheet.edit("Товары", [product_row("301", "dresses", "Новое платье")])
+        assert writer.refresh_snapshot() is True
+
+        with patch.object(catalog_snapshot, "CATALOG_VERSION_CHECK_SECONDS", 0):
+            assert [p["product_id"] for p in reader.get_products_by_category("dresses")] == ["301"]
+        assert reader.snapshots.get().version != old_version
+        assert spreadsheet.reads == ["Категории", "Товары"]
+
+    def test_clear_cache_forces_rebuild(self, spreadsheet, redis_client):
+        service = make_worker(spreadsheet, redis_client)
+        version = service.snapshots.get().version
+
+        service.clear_cache()
+
+        assert service.snapshots.get().version != version
+        assert spreadsheet.reads == ["Категории", "Товары"] * 2
+
+    def test_redis_outage_keeps_last_snapshot(self, spreadsheet, redis_client):
+        service = make_worker(spreadsheet, redis_client)
+        service.get_categories()
+
+        with patch.object(catalog_snapshot, "CATALOG_VERSION_CHECK_SECONDS", 0), \
+                patch.object(redis_client, "get", side_effect=ConnectionError("redis down")):
+            assert [p["product_id"] for p in service.get_products_by_category("dresses")] == ["101"]
+
+    def test_cold_start_waits_for_snapshot_built_by_other_worker(self, spreadsheet, redis_client):
+        builder = make_worker(spreadsheet, redis_client)
+        reader = make_worker(spreadsheet, redis_client)
+        # Другой процесс взял блокировку и собирает снапшот
+        redis_client.set(catalog_snapshot.LOCK_KEY, "1")
+
+        def build():
+            redis_client.delete(catalog_snapshot.LOCK_KEY)
+            builder.refresh_snapshot()
+
+        timer = threading.Timer(0.3, build)
+        timer.start()
+        try:
+            dresses = reader.get_products_by_category("dresses")
+        finally:
+            timer.join()
+
+        assert [p["product_id"] for p in dresses] == ["101"]
+        assert spreadsheet.reads == ["Категории", "Товары"]
+
+    def test_missing_snapshot_is_not_cached_as_checked(self, spreadsheet, redis_client):
+        reader = make_worker(spreadsheet, redis_client)
+        redis_client.set(catalog_snapshot.LOCK_KEY, "1")
+
+        with patch.object(catalog_snapshot, "CATALOG_COLD_START_WAIT", 0.3):
+            assert reader.get_categories() == []
+
+        redis_client.delete(catalog_snapshot.LOCK_KEY)
+        make_worker(spreadsheet, redis_client).refresh_snapshot()
+
+        # Следующий запрос сразу идет в Redis, а не ждет CATALOG_VERSION_CHECK_SECONDS
+        with patch.object(catalog_snapshot, "CATALOG_VERSION_CHECK_SECONDS", 3600):
+            assert [c["category_id"] for c in reader.get_categories()] == ["dresses", "jackets"]
+
+    def test_uninitialized_sheets_return_empty_catalog(self, redis_client):
+        service = GoogleSheetsService(spreadsheet=None, store=CatalogSnapshotStore(redis_client))
+
+        assert service.get_categories() == []
+        assert service.get_product_by_id("101") is None
@@ -0,0 +1,85 @@
+"""
+Тесты ChartRenderer: ключ графика, кэш в Redis, единственный рендер и SVG
+"""
+
+import asyncio
+import base64
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("matplotlib")
+
+from app.features.bot_api import chart_renderer
+from app.features.bot_api.chart_renderer import ChartRenderer, chart_id_for
+
+DAY_KEYS = ["2025-01-01", "2025-01-02", "2025-01-03"]
+SERIES = {"orders": [5, 7, 3], "buyouts": [2, 4, 1], "returns": [0, 1, 0]}
+
+
+@pytest.fixture
+def renderer():
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield ChartRenderer(redis_client=fakeredis.FakeRedis(decode_responses=True), executor=executor)
+    executor.shutdown()
+
+
+def counting_render():
+    calls = []
+    original = chart_renderer.render_trends_chart
+
+    def render(day_keys, series, fmt="png"):
+        calls.append(fmt)
+        return original(day_keys, series, fmt)
+
+    return calls, patch.object(chart_renderer, "render_trends_chart", render)
+
+
+class TestChartRenderer:
+    """Тесты ChartRenderer"""
+
+    def test_chart_id_depends_on_cabinet_data_and_format(self):
+        chart_id = chart_id_for(1, DAY_KEYS, SERIES, "png")
+
+        assert chart_id == chart_id_for(1, list(DAY_KEYS), dict(SERIES), "png")
+        assert chart_id != chart_id_for(2, DAY_KEYS, SERIES, "png")
+        assert chart_id != chart_id_for(1, DAY_KEYS, SERIES, "svg")
+        assert chart_id != chart_id_for(1, DAY_KEYS, {**SERIES, "orders": [5, 7, 4]}, "png")
+
+    @pytest.mark.asyncio
+    async def test_chart_served_by_reference_and_cached(self, renderer):
+        calls, render_patch = counting_render()
+        with render_patch:
+            first = await renderer.get_or_render(1, DAY_KEYS, SERIES)
+            second = await renderer.get_or_render(1, DAY_KEYS, SERIES)
+
+        assert calls == ["png"]
+        assert first == second
+        assert first["data"] is None
+        assert first["url"] == f"/api/v1/bot/analytics/charts/{first['chart_id']}"
+        image, media_type = renderer.get_chart(first["chart_id"])
+        assert media_type == "image/png"
+        assert image.startswith(b"\x89PNG")
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_render_once(self, renderer):
+        calls, render_patch = counting_render()
+        with render_patch:
+            results = await asyncio.gather(*(renderer.get_or_render(1, DAY_KEYS, SERIES) for _ in range(5)))
+
+        assert calls == ["png"]
+        assert len({result["chart_id"] for result in results}) == 1
+
+    @pytest.mark.asyncio
+    async def test_svg_and_inline_data(self, renderer):
+        chart = await renderer.get_or_render(1, DAY_KEYS, SERIES, fmt="svg", inline=True)
+
+        assert chart["media_type"] == "image/svg+xml"
+        assert b"<svg" in base64.b64decode(chart["data"])
+        with pytest.raises(ValueError):
+            await renderer.get_or_render(1, DAY_KEYS, SERIES, fmt="gif")
+
+    def test_expired_chart_not_found(self, renderer):
+        assert renderer.get_chart("missing") is None
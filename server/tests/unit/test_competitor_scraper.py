@@ -0,0 +1,319 @@
+"""
+Тесты пула браузеров, JSON API WB и параллельного скрапинга конкурентов.
+
+Фикстуры в tests/fixtures/competitors - сохраненные (сокращенные) страницы и
+JSON-ответы WB; их отдает локальный HTTP сервер. Тесты с настоящим Chrome
+пропускаются, если chromedriver не установлен.
+"""
+
+import asyncio
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.features.competitors import scraper, wb_card_api
+from app.features.competitors.browser_pool import BrowserPool, BrowserPoolTimeout
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "..", "fixtures", "competitors")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def make_fake_driver():
+    driver = Mock()
+    driver.get.return_value = None
+    return driver
+
+
+class TestBrowserPool:
+    """Тесты BrowserPool на фейковых драйверах"""
+
+    def test_driver_reused_between_acquires(self):
+        """Прогретый браузер выдается повторно, а не создается заново"""
+        factory = Mock(side_effect=make_fake_driver)
+        pool = BrowserPool(factory, size=2)
+
+        with pool.acquire() as first:
+            pass
+        with pool.acquire() as second:
+            pass
+
+        assert first is second
+        assert factory.call_count == 1
+        first.get.assert_called_with("about:blank")
+
+    def test_broken_driver_replaced(self):
+        """Браузер, не прошедший сброс, закрывается и не возвращается в пул"""
+        broken = make_fake_driver()
+        broken.get.side_effect = Exception("session deleted")
+        factory = Mock(side_effect=[broken, make_fake_driver()])
+        pool = BrowserPool(factory, size=1)
+
+        with pool.acquire():
+            pass
+        assert pool.idle_count == 0
+        broken.quit.assert_called_once()
+
+        with pool.acquire() as driver:
+            assert driver is not broken
+
+    def test_driver_recycled_after_max_uses(self):
+        """Браузер перезапускается после max_uses выдач"""
+        factory = Mock(side_effect=make_fake_driver)
+        pool = BrowserPool(factory, size=1, max_uses=2)
+
+        for _ in range(3):
+            with pool.acquire():
+                pass
+
+        assert factory.call_count == 2
+
+    def test_acquire_timeout_when_exhausted(self):
+        """Без свободного браузера acquire падает по таймауту"""
+        pool = BrowserPool(Mock(side_effect=make_fake_driver), size=1)
+
+        with pool.acquire():
+            with pytest.raises(BrowserPoolTimeout):
+                with pool.acquire(timeout=0.05):
+                    pass
+
+    def test_close_quits_idle_drivers(self):
+        """close() закрывает простаивающие браузеры"""
+        pool = BrowserPool(Mock(side_effect=make_fake_driver), size=2)
+        with pool.acquire() as driver:
+            pass
+
+        pool.close()
+
+        driver.quit.assert_called_once()
+        assert pool.idle_count == 0
+
+
+class TestScrapeProductsConcurrently:
+    """Тесты параллельного обхода страниц товаров"""
+
+    @staticmethod
+    def slow_scrape(delay):
+        active = {"now": 0, "max": 0}
+        lock = threading.Lock()
+
+        def scrape(url, driver):
+            with lock:
+                active["now"] += 1
+                active["max"] = max(active["max"], active["now"])
+            time.sleep(delay)
+            with lock:
+                active["now"] -= 1
+            return {"product_url": url, "nm_id": url.rsplit("/", 1)[-1]}
+
+        return scrape, active
+
+    def test_concurrency_bounded_by_pool_size(self):
+        """Страницы обходятся параллельно, но не больше size одновременно"""
+        scrape, active = self.slow_scrape(0.1)
+        factory = Mock(side_effect=make_fake_driver)
+        pool = BrowserPool(factory, size=3)
+        urls = [f"https://www.wildberries.ru/catalog/{i}" for i in range(9)]
+
+        started = time.monotonic()
+        with patch.object(scraper, "scrape_product_data", side_effect=scrape):
+            results = scraper.scrape_products_concurrently(urls, pool, time_budget=10)
+        elapsed = time.monotonic() - started
+
+        assert [r["product_url"] for r in results] == urls
+        assert active["max"] == 3
+        assert factory.call_count == 3
+        # 9 страниц по 0.1 с в 3 потока, а не 0.9 с последовательно
+        assert elapsed < 0.6
+
+    def test_time_budget_skips_remaining_products(self):
+        """После исчерпания бюджета новые страницы не запускаются"""
+        scrape, _ = self.slow_scrape(0.2)
+        pool = BrowserPool(Mock(side_effect=make_fake_driver), size=1)
+        urls = [f"https://www.wildberries.ru/catalog/{i}" for i in range(10)]
+
+        with patch.object(scraper, "scrape_product_data", side_effect=scrape):
+            results = scraper.scrape_products_concurrently(urls, pool, time_budget=0.3)
+
+        collected = [r for r in results if r]
+        assert 1 <= len(collected) < len(urls)
+        assert results[-1] is None
+
+
+class TestWBCardParsers:
+    """Тесты разбора JSON-ответов WB"""
+
+    def test_parse_card_detail_v4(self):
+        """v4: цены из sizes[].price в копейках, старая цена только при скидке"""
+        details = wb_card_api.parse_card_detail(load_fixture("card_detail_v4.json"))
+
+        assert details[100001] == {
+            "name": "Платье летнее",
+            "brand": "TestBrand",
+            "current_price": 1990.0,
+            "original_price": 3500.0,
+            "rating": 4.8,
+            "category": "платье",
+        }
+        assert details[100002]["current_price"] == 4200.0
+        assert details[100002]["original_price"] is None
+        # Нет в наличии - цены нет, рейтинга тоже
+        assert details[100003]["current_price"] is None
+        assert details[100003]["rating"] is None
+
+    def test_parse_card_detail_v2_legacy_prices(self):
+        """v2: data.products и salePriceU/priceU"""
+        details = wb_card_api.parse_card_detail(load_fixture("card_detail_v2.json"))
+
+        assert details[100001]["current_price"] == 1990.0
+        assert details[100001]["original_price"] == 3500.0
+
+    def test_parse_card_info(self):
+        info = wb_card_api.parse_card_info(load_fixture("card_info_100001.json"))
+
+        assert info == {
+            "name": "Платье летнее",
+            "brand": "TestBrand",
+            "category": "Платья",
+            "description": "Легкое платье из хлопка.",
+        }
+
+    def test_build_product_matches_selenium_shape(self):
+        """Товар из JSON имеет те же поля, что и scrape_product_data"""
+        details = wb_card_api.parse_card_detail(load_fixture("card_detail_v4.json"))
+        info = wb_card_api.parse_card_info(load_fixture("card_info_100001.json"))
+        url = "https://www.wildberries.ru/catalog/100001/detail.aspx"
+
+        product = wb_card_api.build_product(url, 100001, details[100001], info)
+
+        assert set(product) == {
+            "product_url", "nm_id", "name", "current_price", "original_price",
+            "brand", "category", "rating", "description",
+        }
+        assert product["nm_id"] == "100001"
+        assert product["category"] == "Платья"
+        assert wb_card_api.build_product(url, 100001, None, None) is None
+
+    def test_basket_host_and_info_url(self):
+        assert wb_card_api.basket_host(100001) == "basket-01.wbbasket.ru"
+        assert wb_card_api.basket_host(15_000_000) == "basket-02.wbbasket.ru"
+        assert wb_card_api.basket_host(999_999_999) == "basket-26.wbbasket.ru"
+        assert wb_card_api.card_info_url(123456789) == (
+            "https://basket-09.wbbasket.ru/vol1234/part123456/123456789/info/ru/card.json"
+        )
+
+
+class TestScrapeProductsJsonMode:
+    """Тесты режима JSON API с Selenium-добором"""
+
+    URLS = [f"https://www.wildberries.ru/catalog/{nm_id}/detail.aspx" for nm_id in (100001, 100002, 100003)]
+
+    def test_fetch_products_json_from_fixture_server(self, fixture_server):
+        """cards/detail одним запросом на пачку, card.json по каждому товару"""
+        with patch.object(wb_card_api, "CARD_DETAIL_URL", f"{fixture_server}/cards/v4/detail"), \
+                patch.object(wb_card_api, "card_info_url", lambda nm_id: f"{fixture_server}/info/{nm_id}"):
+            products = asyncio.run(wb_card_api.fetch_products_json(self.URLS))
+
+        assert products[self.URLS[0]]["description"] == "Легкое платье из хлопка."
+        assert products[self.URLS[0]]["current_price"] == 1990.0
+        # card.json отсутствует - категория из entity, описания нет
+        assert products[self.URLS[1]]["category"] == "платье"
+        assert products[self.URLS[1]]["description"] is None
+        assert products[self.URLS[2]]["current_price"] is None
+
+    def test_selenium_fallback_only_for_incomplete_products(self):
+        """Selenium обходит только товары без основных полей в JSON"""
+        details = wb_card_api.parse_card_detail(load_fixture("card_detail_v4.json"))
+        json_products = {
+            url: wb_card_api.build_product(url, nm_id, details[nm_id], None)
+            for url, nm_id in zip(self.URLS, (100001, 100002, 100003))
+        }
+        selenium_product = {"nm_id": "100003", "name": "Платье макси", "current_price": 2500.0}
+        pool = BrowserPool(Mock(side_effect=make_fake_driver), size=1)
+
+        async def fake_fetch(urls):
+            return json_products
+
+        with patch.object(scraper, "fetch_products_json", side_effect=fake_fetch), \
+                patch.object(scraper, "scrape_products_concurrently", return_value=[selenium_product]) as selenium:
+            results = scraper.scrape_products(self.URLS, pool, mode="json")
+
+        selenium.assert_called_once_with([self.URLS[2]], pool)
+        assert results[0]["current_price"] == 1990.0
+        assert results[2] is selenium_product
+
+    def test_json_api_failure_falls_back_to_selenium(self):
+        pool = BrowserPool(Mock(side_effect=make_fake_driver), size=1)
+
+        with patch.object(scraper, "fetch_products_json", side_effect=RuntimeError("dns")), \
+                patch.object(scraper, "scrape_products_concurrently", return_value=[None, None, None]) as selenium:
+            results = scraper.scrape_products(self.URLS, pool, mode="json")
+
+        selenium.assert_called_once_with(self.URLS, pool)
+        assert results == [None, None, None]
+
+
+class _FixtureHandler(SimpleHTTPRequestHandler):
+    """
+    Отдает страницу бренда, одну карточку для любого /catalog/<nm_id>/...,
+    ответ cards/detail и card.json по /info/<nm_id> (если есть фикстура).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=FIXTURES_DIR, **kwargs)
+
+    def translate_path(self, path):
+        if re.match(r"^/catalog/\d+", path):
+            path = "/product.html"
+        elif path.startswith("/cards/"):
+            path = "/card_detail_v4.json"
+        elif path.startswith("/info/"):
+            path = f"/card_info_{path.rsplit('/', 1)[-1]}.json"
+        elif path.startswith("/brands/"):
+            path = "/brand.html"
+        return super().translate_path(path)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def fixture_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FixtureHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.mark.skipif(shutil.which("chromedriver") is None, reason="chromedriver не установлен")
+class TestScrapeCompetitorWithChrome:
+    """Сквозной скрапинг сохраненных страниц WB настоящим Chrome"""
+
+    def test_scrape_competitor_from_fixture_pages(self, fixture_server):
+        pool = BrowserPool(lambda: scraper.get_driver(headless=True), size=2)
+        try:
+            with patch.object(scraper, "SCRAPE_MODE", "selenium"):
+                result = scraper.scrape_competitor(f"{fixture_server}/brands/testbrand", max_products=3, pool=pool)
+        finally:
+            pool.close()
+
+        assert result["success_count"] == 3
+        assert result["competitor_name"] == "TestBrand"
+        product = result["products"][0]
+        assert product["current_price"] == 1990
+        assert product["original_price"] == 3500
+        assert product["category"] == "Платья"
+        assert product["rating"] == 4.8
+        assert product["description"] == "Легкое платье из хлопка."
+        assert pool.created == 2
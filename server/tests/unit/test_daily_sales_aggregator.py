@@ -0,0 +1,128 @@
+"""
+Тесты агрегации заказов в daily_sales_analytics: GROUP BY в БД и bulk upsert
+"""
+
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.features.stock_alerts.models import DailySalesAnalytics
+from app.features.stock_alerts.sales_aggregator import DailySalesAggregator
+from app.features.wb_api.models import WBCabinet, WBOrder
+
+
+@contextmanager
+def count_statements(session):
+    """Счетчик SQL запросов, выполненных через сессию"""
+    statements = []
+    engine = session.get_bind()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def seed_orders(db_session, days, orders_per_day, products=5):
+    """Заказы за последние days дней по products товарам, двум складам и двум размерам"""
+    cabinet = WBCabinet(api_key=f"agg-{days}-{orders_per_day}", name="Test")
+    db_session.add(cabinet)
+    db_session.flush()
+
+    orders = []
+    for day in range(1, days + 1):
+        order_day = date.today() - timedelta(days=day)
+        for index in range(orders_per_day):
+            orders.append(WBOrder(
+                cabinet_id=cabinet.id,
+                order_id=f"{day}-{index}",
+                nm_id=100 + index % products,
+                warehouse_from="Коледино" if index % 2 else None,
+                size="M" if index % 3 else "",
+                quantity=2 if index % 4 == 0 else None,
+                order_date=datetime.combine(order_day, time(hour=index % 24, minute=30)),
+            ))
+    db_session.add_all(orders)
+    db_session.commit()
+    return cabinet
+
+
+def analytics_by_key(db_session, cabinet_id):
+    return {
+        (row.nm_id, row.warehouse_name, row.size, row.date): (row.orders_count, row.quantity_ordered)
+        for row in db_session.query(DailySalesAnalytics).filter(DailySalesAnalytics.cabinet_id == cabinet_id)
+    }
+
+
+class TestDailySalesAggregator:
+    """Тесты DailySalesAggregator"""
+
+    @pytest.mark.asyncio
+    async def test_aggregate_orders_for_date_groups_in_database(self, db_session):
+        cabinet = seed_orders(db_session, days=1, orders_per_day=12, products=1)
+        yesterday = date.today() - timedelta(days=1)
+
+        result = await DailySalesAggregator(db_session).aggregate_orders_for_date(cabinet.id, yesterday)
+
+        assert result == {"status": "success", "date": str(yesterday), "records_processed": 12, "unique_positions": 4}
+        analytics = analytics_by_key(db_session, cabinet.id)
+        # Пустой склад/размер заменяются значениями по умолчанию, quantity=None считается за 1
+        assert analytics[(100, "Неизвестный склад", "ONE SIZE", yesterday)] == (2, 3)
+        assert analytics[(100, "Коледино", "M", yesterday)] == (4, 4)
+        assert sum(count for count, _ in analytics.values()) == 12
+
+    @pytest.mark.asyncio
+    async def test_reaggregation_updates_existing_rows(self, db_session):
+        cabinet = seed_orders(db_session, days=1, orders_per_day=4, products=1)
+        yesterday = date.today() - timedelta(days=1)
+        aggregator = DailySalesAggregator(db_session)
+        await aggregator.aggregate_orders_for_date(cabinet.id, yesterday)
+
+        db_session.add(WBOrder(
+            cabinet_id=cabinet.id, order_id="late", nm_id=100, warehouse_from="Коледино", size="M",
+            order_date=datetime.combine(yesterday, time(23, 0)),
+        ))
+        db_session.commit()
+        await aggregator.aggregate_orders_for_date(cabinet.id, yesterday)
+
+        analytics = analytics_by_key(db_session, cabinet.id)
+        assert len(analytics) == 4
+        assert analytics[(100, "Коледино", "M", yesterday)] == (2, 2)
+
+    @pytest.mark.asyncio
+    async def test_backfill_uses_fixed_number_of_statements(self, db_session):
+        """Backfill N дней - один SELECT и один INSERT независимо от числа дней и заказов"""
+        small_id = seed_orders(db_session, days=2, orders_per_day=5).id
+        large_id = seed_orders(db_session, days=30, orders_per_day=40).id
+        aggregator = DailySalesAggregator(db_session)
+
+        with count_statements(db_session) as small_statements:
+            small_result = await aggregator.aggregate_last_n_days(small_id, days=30)
+        with count_statements(db_session) as large_statements:
+            large_result = await aggregator.aggregate_last_n_days(large_id, days=30)
+
+        assert len(large_statements) == len(small_statements) == 2
+        assert large_result["total_records"] == 1200
+        assert len(large_result["daily_results"]) == 30
+        assert all(day["records_processed"] == 40 for day in large_result["daily_results"])
+        assert small_result["daily_results"][5]["records_processed"] == 0
+
+    @pytest.mark.asyncio
+    async def test_backfill_matches_per_day_aggregation(self, db_session):
+        cabinet = seed_orders(db_session, days=7, orders_per_day=25)
+        aggregator = DailySalesAggregator(db_session)
+
+        await aggregator.aggregate_last_n_days(cabinet.id, days=7)
+        backfilled = analytics_by_key(db_session, cabinet.id)
+        db_session.query(DailySalesAnalytics).delete()
+        db_session.commit()
+        for day in range(1, 8):
+            await aggregator.aggregate_orders_for_date(cabinet.id, date.today() - timedelta(days=day))
+
+        assert analytics_by_key(db_session, cabinet.id) == backfilled
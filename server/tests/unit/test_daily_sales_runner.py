@@ -0,0 +1,165 @@
+"""
+Тесты DailySalesRunner: параллельная обработка кабинетов, бюджет времени и отчеты
+"""
+
+import asyncio
+import threading
+import time
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.features.notifications.models import NotificationSettings
+from app.features.stock_alerts.daily_runner import DailySalesRunner
+from app.features.stock_alerts.models import StockAlertHistory
+from app.features.stock_alerts.notification_service import StockAlertNotificationService
+from app.features.stock_alerts.sales_aggregator import DailySalesAggregator
+from app.features.stock_alerts.stock_analyzer import DynamicStockAnalyzer
+from app.features.user.models import User
+from app.features.wb_api.models import WBCabinet
+from app.features.wb_api.models_cabinet_users import CabinetUser
+
+
+def seed_cabinets(db_session, count, users_per_cabinet=1):
+    cabinet_ids = []
+    for index in range(count):
+        cabinet = WBCabinet(api_key=f"runner-{index}", name=f"Cabinet {index}")
+        db_session.add(cabinet)
+        db_session.flush()
+        for user_index in range(users_per_cabinet):
+            user = User(
+                telegram_id=index * 100 + user_index + 1,
+                first_name="Test",
+                bot_webhook_url="http://bot/webhook"
+            )
+            db_session.add(user)
+            db_session.flush()
+            db_session.add(CabinetUser(cabinet_id=cabinet.id, user_id=user.id))
+            db_session.add(NotificationSettings(user_id=user.id, critical_stocks_enabled=True))
+        cabinet_ids.append(cabinet.id)
+    db_session.commit()
+    return cabinet_ids
+
+
+@pytest.fixture
+def session_factory(db_session):
+    return sessionmaker(autocommit=False, autoflush=False, bind=db_session.get_bind())
+
+
+class TestDailySalesRunner:
+    """Тесты DailySalesRunner"""
+
+    @pytest.mark.asyncio
+    async def test_cabinets_processed_concurrently_within_limit(self, db_session, session_factory):
+        cabinet_ids = seed_cabinets(db_session, count=6)
+        active = {"now": 0, "max": 0}
+        lock = threading.Lock()
+
+        def slow_analysis(self, cabinet_id, perspective_days=3):
+            # Синхронный запрос к БД: в общем event loop кабинеты выстроились бы в очередь
+            with lock:
+                active["now"] += 1
+                active["max"] = max(active["max"], active["now"])
+            time.sleep(0.1)
+            with lock:
+                active["now"] -= 1
+            return []
+
+        runner = DailySalesRunner(session_factory, concurrency=3, cabinet_time_budget=10)
+        started = time.monotonic()
+        with patch.object(DynamicStockAnalyzer, "analyze_stock_positions_sync", slow_analysis):
+            result = await runner.run(date.today() - timedelta(days=1))
+        elapsed = time.monotonic() - started
+
+        assert active["max"] == 3
+        # 6 кабинетов по 0.1 с в 3 слота, а не 0.6 с последовательно
+        assert elapsed < 0.5
+        assert [report["cabinet_id"] for report in result["cabinets"]] == cabinet_ids
+        assert result["aggregation"] == {"cabinets_processed": 6, "cabinets_failed": 0}
+        assert all(report["status"] == "success" for report in result["cabinets"])
+        assert all(report["users_checked"] == 1 for report in result["cabinets"])
+        assert all(report["duration_ms"] >= 100 for report in result["cabinets"])
+
+    @pytest.mark.asyncio
+    async def test_huge_cabinet_limited_by_time_budget(self, db_session, session_factory):
+        """Кабинет с большим числом пользователей не задерживает остальные"""
+        huge_id, *other_ids = seed_cabinets(db_session, count=3, users_per_cabinet=1)
+        db_session.add_all([
+            CabinetUser(cabinet_id=huge_id, user_id=user_id) for user_id in range(1000, 1020)
+        ])
+        db_session.add_all([
+            User(id=user_id, telegram_id=user_id, first_name="Big", bot_webhook_url="http://bot/webhook")
+            for user_id in range(1000, 1020)
+        ])
+        db_session.commit()
+
+        async def alerts(self, user_id, bot_webhook_url, prepared):
+            await asyncio.sleep(0.05)
+            return []
+
+        runner = DailySalesRunner(session_factory, concurrency=2, cabinet_time_budget=0.3)
+        with patch.object(StockAlertNotificationService, "send_alerts", alerts):
+            result = await runner.run(date.today() - timedelta(days=1))
+
+        reports = {report["cabinet_id"]: report for report in result["cabinets"]}
+        assert reports[huge_id]["status"] == "timeout"
+        assert 0 < reports[huge_id]["users_checked"] < 21
+        assert all(reports[cabinet_id]["status"] == "success" for cabinet_id in other_ids)
+        assert result["alerts"]["cabinets_failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failures_reported_per_cabinet(self, db_session, session_factory):
+        failing_id, ok_id = seed_cabinets(db_session, count=2)
+        original = DailySalesAggregator.aggregate_date_range_sync
+
+        def aggregate(self, cabinet_id, date_from, date_to):
+            if cabinet_id == failing_id:
+                return {"status": "error", "error": "deadlock detected"}
+            return original(self, cabinet_id, date_from, date_to)
+
+        async def alerts(self, user_id, bot_webhook_url, prepared):
+            raise RuntimeError("webhook down")
+
+        runner = DailySalesRunner(session_factory, concurrency=2)
+        with patch.object(DailySalesAggregator, "aggregate_date_range_sync", aggregate), \
+                patch.object(StockAlertNotificationService, "send_alerts", alerts):
+            result = await runner.run(date.today() - timedelta(days=1))
+
+        reports = {report["cabinet_id"]: report for report in result["cabinets"]}
+        assert reports[failing_id]["status"] == "aggregation_failed"
+        assert reports[failing_id]["error"] == "deadlock detected"
+        assert reports[ok_id]["status"] == "success"
+        assert reports[ok_id]["users_failed"] == 1
+        assert result["aggregation"] == {"cabinets_processed": 1, "cabinets_failed": 1}
+
+    @pytest.mark.asyncio
+    async def test_webhooks_sent_from_runner_loop(self, db_session, session_factory):
+        """Анализ - в потоках, webhook-и - в event loop раннера (без loop на кабинет)"""
+        cabinet_ids = seed_cabinets(db_session, count=2)
+        runner_loop = asyncio.get_running_loop()
+        analysis_threads, webhooks = set(), []
+
+        def analysis(self, cabinet_id, perspective_days=3):
+            analysis_threads.add(threading.get_ident())
+            return [{
+                "nm_id": cabinet_id, "name": "Платье", "brand": "Brand", "warehouse_name": "Коледино",
+                "size": "M", "current_stock": 1, "orders_last_24h": 30, "days_remaining": 1.0,
+            }]
+
+        async def webhook(self, user_id, webhook_url, notification_data):
+            webhooks.append((asyncio.get_running_loop(), threading.get_ident(), notification_data["data"]["nm_id"]))
+            return {"status": "success"}
+
+        runner = DailySalesRunner(session_factory, concurrency=2, cabinet_time_budget=10)
+        with patch.object(DynamicStockAnalyzer, "analyze_stock_positions_sync", analysis), \
+                patch.object(StockAlertNotificationService, "send_webhook_notification", webhook):
+            result = await runner.run(date.today() - timedelta(days=1))
+
+        assert result["alerts"]["total_alerts_sent"] == 2
+        assert sorted(nm_id for _, _, nm_id in webhooks) == cabinet_ids
+        assert all(loop is runner_loop and thread == threading.get_ident() for loop, thread, _ in webhooks)
+        assert threading.get_ident() not in analysis_threads
+        history = db_session.query(StockAlertHistory).filter(StockAlertHistory.cabinet_id.in_(cabinet_ids)).count()
+        assert history == 2
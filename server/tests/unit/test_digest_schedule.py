@@ -0,0 +1,107 @@
+"""
+Тесты расписания сводок: next_digest_at с учетом timezone и DST, выборка
+наступивших каналов
+"""
+
+from datetime import datetime, time as dt_time, timedelta
+
+import pytest
+
+from app.features.digest.crud import ChannelReportCRUD
+from app.features.digest.models import ChannelReport
+from app.features.digest.schedule import (
+    backfill_next_digest_at,
+    claim_due_channels,
+    next_digest_at,
+)
+
+
+class TestNextDigestAt:
+    def test_fixed_offset_timezone(self):
+        after = datetime(2025, 3, 30, 5, 0)
+
+        assert next_digest_at(dt_time(9, 0), "Europe/Moscow", after) == datetime(2025, 3, 30, 6, 0)
+        # Ровно в момент отправки - уже следующие сутки
+        assert next_digest_at(dt_time(9, 0), "Europe/Moscow", datetime(2025, 3, 30, 6, 0)) == datetime(2025, 3, 31, 6, 0)
+        assert next_digest_at(dt_time(9, 0), "Asia/Kolkata", after) == datetime(2025, 3, 31, 3, 30)
+
+    def test_offset_follows_dst(self):
+        # Берлин: 30.03.2025 переход CET (+1) -> CEST (+2)
+        assert next_digest_at(dt_time(9, 0), "Europe/Berlin", datetime(2025, 3, 29, 0, 0)) == datetime(2025, 3, 29, 8, 0)
+        assert next_digest_at(dt_time(9, 0), "Europe/Berlin", datetime(2025, 3, 29, 8, 0)) == datetime(2025, 3, 30, 7, 0)
+
+    def test_nonexistent_local_time_shifted_forward(self):
+        # 02:30 30.03.2025 в Берлине не существует - отправка в 03:30 CEST
+        due = next_digest_at(dt_time(2, 30), "Europe/Berlin", datetime(2025, 3, 29, 12, 0))
+
+        assert due == datetime(2025, 3, 30, 1, 30)
+
+    def test_ambiguous_local_time_sent_once(self):
+        # 02:30 26.10.2025 в Берлине бывает дважды - берется первое наступление
+        first = next_digest_at(dt_time(2, 30), "Europe/Berlin", datetime(2025, 10, 25, 12, 0))
+        second = next_digest_at(dt_time(2, 30), "Europe/Berlin", first)
+
+        assert first == datetime(2025, 10, 26, 0, 30)
+        assert second == datetime(2025, 10, 27, 1, 30)
+
+    def test_local_date_ahead_of_utc(self):
+        # Окленд +13: 08:00 местного 01.01 - это 19:00 UTC 31.12
+        due = next_digest_at(dt_time(8, 0), "Pacific/Auckland", datetime(2024, 12, 31, 12, 0))
+
+        assert due == datetime(2024, 12, 31, 19, 0)
+
+
+class TestClaimDueChannels:
+    def create(self, db, chat_id, report_time, timezone="Europe/Moscow"):
+        return ChannelReportCRUD.create(
+            db=db,
+            user_id=1,
+            cabinet_id=1,
+            chat_id=chat_id,
+            chat_title=f"chat {chat_id}",
+            chat_type="channel",
+            report_time=report_time,
+            timezone=timezone,
+        )
+
+    def test_only_due_channels_claimed_once(self, db_session):
+        now = datetime.utcnow().replace(second=0, microsecond=0)
+        due = self.create(db_session, 1, dt_time(9, 0))
+        later = self.create(db_session, 2, dt_time(10, 0))
+        inactive = self.create(db_session, 3, dt_time(9, 0))
+        ChannelReportCRUD.update(db_session, inactive.id, is_active=False)
+        due.next_digest_at = now
+        db_session.commit()
+
+        assert claim_due_channels(db_session, now) == [due.id]
+        assert claim_due_channels(db_session, now) == []
+
+        db_session.expire_all()
+        assert due.next_digest_at > now
+        assert later.next_digest_at > now
+        assert inactive.next_digest_at is None
+
+    def test_long_missed_digest_rescheduled_without_sending(self, db_session):
+        now = datetime(2025, 6, 1, 12, 0)
+        channel = self.create(db_session, 1, dt_time(9, 0))
+        channel.next_digest_at = now - timedelta(hours=6)
+        db_session.commit()
+
+        assert claim_due_channels(db_session, now) == []
+        db_session.expire_all()
+        assert channel.next_digest_at == datetime(2025, 6, 2, 6, 0)
+
+    def test_backfill_and_reschedule_on_update(self, db_session):
+        now = datetime(2025, 6, 1, 12, 0)
+        db_session.add(ChannelReport(
+            user_id=1, cabinet_id=1, chat_id=1, report_time=dt_time(9, 0),
+            timezone="Europe/Moscow", is_active=True,
+        ))
+        db_session.commit()
+
+        assert backfill_next_digest_at(db_session, now) == 1
+        channel = db_session.query(ChannelReport).one()
+        assert channel.next_digest_at == datetime(2025, 6, 2, 6, 0)
+
+        ChannelReportCRUD.update(db_session, channel.id, timezone="Asia/Yekaterinburg")
+        assert channel.next_digest_at.time() == dt_time(4, 0)
@@ -0,0 +1,224 @@
+"""
+Тесты liveness/readiness: зависимости-заглушки, которые отвечают медленно,
+падают или зависают, параллельный опрос, кэш и общая проверка для
+одновременных запросов
+"""
+
+import time
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from app.features.system import health
+from app.features.system.health import DependencyCheck, DependencySkipped, HealthChecker
+
+
+class StubDependency:
+    """Зависимость с управляемым поведением: задержка, ошибка, пропуск"""
+
+    def __init__(self, latency=0.0, error=None, skip=None, details=None):
+        self.latency = latency
+        self.error = error
+        self.skip = skip
+        self.details = details
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.skip:
+            raise DependencySkipped(self.skip)
+        if self.error:
+            raise self.error
+        return self.details
+
+
+def make_checker(timeout=0.2, cache_ttl=5.0, **deps):
+    critical = {"database", "redis", "celery_broker"}
+    return HealthChecker(
+        [DependencyCheck(name, probe, critical=name in critical) for name, probe in deps.items()],
+        timeout=timeout,
+        cache_ttl=cache_ttl,
+    )
+
+
+class TestHealthChecker:
+    @pytest.mark.asyncio
+    async def test_dependencies_probed_concurrently_with_latency(self):
+        deps = {name: StubDependency(latency=0.1) for name in ("database", "redis", "celery_broker", "gpt_service")}
+        deps["database"].details = {"dialect": "postgresql"}
+        checker = make_checker(**deps)
+
+        started = time.perf_counter()
+        report = await checker.check()
+        elapsed = time.perf_counter() - started
+
+        assert elapsed < 0.25  # параллельно, а не 4 x 0.1s
+        assert report["status"] == "healthy" and report["ready"] is True
+        database = report["dependencies"]["database"]
+        assert database["status"] == "up" and database["dialect"] == "postgresql"
+        assert all(dep["latency_ms"] >= 90 for dep in report["dependencies"].values())
+
+    @pytest.mark.asyncio
+    async def test_hanging_critical_dependency_times_out(self):
+        checker = make_checker(database=StubDependency(), redis=StubDependency(latency=5))
+
+        started = time.perf_counter()
+        report = await checker.check()
+
+        assert time.perf_counter() - started < 1
+        assert report["dependencies"]["redis"]["status"] == "timeout"
+        assert report["status"] == "unhealthy" and report["ready"] is False
+
+    @pytest.mark.asyncio
+    async def test_failing_optional_dependency_degrades_without_failing_readiness(self):
+        checker = make_checker(
+            database=StubDependency(),
+            gpt_service=StubDependency(error=ConnectionError("connection refused")),
+            pgvector=StubDependency(skip="sqlite database has no pgvector"),
+        )
+
+        report = await checker.check()
+
+        assert report["status"] == "degraded" and report["ready"] is True
+        assert report["dependencies"]["gpt_service"] == {
+            "critical": False, "status": "down", "error": "ConnectionError: connection refused",
+            "latency_ms": report["dependencies"]["gpt_service"]["latency_ms"],
+        }
+        assert report["dependencies"]["pgvector"]["status"] == "skipped"
+
+    @pytest.mark.asyncio
+    async def test_results_cached_and_concurrent_probes_share_one_check(self):
+        database = StubDependency(latency=0.05)
+        checker = make_checker(database=database, cache_ttl=5.0)
+
+        reports = await asyncio.gather(*(checker.check() for _ in range(20)))
+        again = await checker.check()
+
+        assert database.calls == 1
+        assert sum(not report["cached"] for report in reports) == 1
+        assert again["cached"] is True
+
+        checker._cached_at -= checker.cache_ttl  # TTL истек
+        await checker.check()
+        assert database.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_result_is_cached_too(self):
+        database = StubDependency(error=RuntimeError("too many connections"))
+        checker = make_checker(database=database)
+
+        first = await checker.check()
+        second = await checker.check()
+
+        assert first["ready"] is False and second["ready"] is False
+        assert database.calls == 1
+
+
+class TestHealthEndpoints:
+    @pytest.fixture
+    def stub_checker(self):
+        deps = {
+            "database": StubDependency(),
+            "redis": StubDependency(),
+            "gpt_service": StubDependency(error=ConnectionError("connection reset")),
+        }
+        with patch.object(health, "health_checker", make_checker(**deps)):
+            yield deps
+
+    def test_liveness_does_not_probe_dependencies(self, client, stub_checker):
+        response = client.client.get("/system/health/live")
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "alive"
+        assert all(dep.calls == 0 for dep in stub_checker.values())
+
+    def test_readiness_reports_each_dependency(self, client, stub_checker):
+        response = client.client.get("/system/health/ready")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == "degraded"
+        assert set(body["dependencies"]) == {"database", "redis", "gpt_service"}
+        assert body["dependencies"]["gpt_service"]["status"] == "down"
+
+    def test_readiness_fails_when_critical_dependency_down(self, client, stub_checker):
+        stub_checker["redis"].error = ConnectionError("redis is down")
+
+        for path in ("/system/health/ready", "/system/health"):
+            response = client.client.get(path)
+            assert response.status_code == 503
+            assert response.json()["dependencies"]["redis"]["status"] == "down"
+
+
+class TestDependencyProbes:
+    @pytest.mark.asyncio
+    async def test_database_probe_uses_engine(self):
+        assert (await health.check_database())["dialect"] == "sqlite"
+
+    @pytest.mark.asyncio
+    async def test_pgvector_skipped_outside_postgres(self):
+        with pytest.raises(DependencySkipped):
+            await health.check_pgvector()
+
+    @pytest.mark.asyncio
+    async def test_gpt_service_skipped_when_not_configured(self, monkeypatch):
+        monkeypatch.delenv("GPT_INTEGRATION_URL", raising=False)
+        with pytest.raises(DependencySkipped):
+            await health.check_gpt_service()
+
+
+class HangingEngine:
+    """Engine, у которого подключение висит до release (БД не отвечает)"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.dialect = type("Dialect", (), {"name": "postgresql"})()
+
+    def connect(self):
+        self.release.wait(5)
+        raise ConnectionError("database is gone")
+
+
+@pytest.fixture
+def fresh_probes():
+    with patch.object(health, "_probe_engine", None), patch.object(health, "_probe_executor", None):
+        yield
+        if health._probe_executor is not None:
+            health._probe_executor.shutdown(wait=False)
+
+
+class TestDatabaseProbeIsolation:
+    @pytest.mark.asyncio
+    async def test_hanging_database_does_not_leak_threads_into_default_executor(self, fresh_probes):
+        engine = HangingEngine()
+        threads_before = set(threading.enumerate())
+        checker = HealthChecker([DependencyCheck("database", health.check_database)], timeout=0.05)
+        try:
+            with patch.object(health, "_probe_engine", engine):
+                for _ in range(6):
+                    report = await checker.check(use_cache=False)
+                    assert report["dependencies"]["database"]["status"] == "timeout"
+
+                new_threads = set(threading.enumerate()) - threads_before
+                assert len(new_threads) <= health.PROBE_THREADS
+                assert all(thread.name.startswith("health-probe") for thread in new_threads)
+                # Общий executor свободен: зависшие пробы его не занимают
+                started = time.perf_counter()
+                await asyncio.wait_for(asyncio.to_thread(lambda: None), timeout=1)
+                assert time.perf_counter() - started < 0.5
+        finally:
+            engine.release.set()
+
+    def test_probe_engine_has_short_timeouts(self, fresh_probes):
+        with patch("app.core.database.DATABASE_URL", "postgresql://user:secret@db/wb"), \
+                patch.object(health, "create_engine") as create_engine:
+            health.probe_engine()
+
+        options = create_engine.call_args.kwargs
+        assert options["pool_timeout"] == health.HEALTH_CHECK_TIMEOUT
+        assert options["pool_size"] == health.PROBE_THREADS and options["max_overflow"] == 0
+        assert options["connect_args"]["connect_timeout"] >= 1
+        assert options["connect_args"]["options"] == f"-c statement_timeout={int(health.HEALTH_CHECK_TIMEOUT * 1000)}"
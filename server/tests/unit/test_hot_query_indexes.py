@@ -0,0 +1,77 @@
+"""
+Индексы горячих запросов: миграции 004+ и объявления в моделях совпадают,
+индексы строятся без блокировки записи
+"""
+
+import re
+from pathlib import Path
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from app.core.database import Base
+from app.features.wb_api import models, models_sales  # noqa: F401 - регистрация таблиц
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations"
+INDEX_MIGRATIONS = ("004_hot_query_indexes.sql", "005_listing_keyset_indexes.sql", "006_review_sentiment.sql")
+
+
+def normalize(sql):
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+@pytest.fixture(scope="module")
+def statements():
+    """Операторы миграций индексов в порядке применения"""
+    result = []
+    for name in INDEX_MIGRATIONS:
+        lines = (MIGRATIONS_DIR / name).read_text(encoding="utf-8").splitlines()
+        sql = "\n".join(line for line in lines if not line.lstrip().startswith("--"))
+        result.extend(normalize(statement) for statement in sql.split(";") if statement.strip())
+    return result
+
+
+@pytest.fixture(scope="module")
+def migration_indexes(statements):
+    """Индексы после применения всех миграций: имя -> CREATE INDEX"""
+    indexes = {}
+    for statement in statements:
+        if statement.startswith("CREATE INDEX"):
+            indexes[re.match(r"CREATE INDEX CONCURRENTLY IF NOT EXISTS (\w+)", statement).group(1)] = statement
+        elif statement.startswith("DROP INDEX"):
+            indexes.pop(statement.rsplit(" ", 1)[-1], None)
+    return indexes
+
+
+def model_indexes():
+    return {index.name: index for table in Base.metadata.tables.values() for index in table.indexes}
+
+
+def test_migration_matches_model_declarations(migration_indexes):
+    declared = model_indexes()
+
+    assert migration_indexes
+    for name, statement in migration_indexes.items():
+        assert name in declared, f"{name} нет в моделях - init_db() его не создаст"
+        expected = normalize(str(CreateIndex(declared[name]).compile(dialect=postgresql.dialect())))
+        assert statement == expected.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY IF NOT EXISTS", 1)
+
+
+def test_hot_query_indexes_declared_in_models_are_migrated(migration_indexes):
+    hot = {name for name in model_indexes() if name.startswith("idx_wb_")}
+
+    assert hot == set(migration_indexes)
+
+
+def test_index_changes_do_not_block_writes(statements):
+    for statement in statements:
+        if statement.startswith(("CREATE INDEX", "DROP INDEX")):
+            assert "CONCURRENTLY" in statement, statement
+        assert not statement.upper().startswith(("BEGIN", "START TRANSACTION"))
+
+
+def test_dropped_indexes_are_not_declared(statements):
+    dropped = {statement.rsplit(" ", 1)[-1] for statement in statements if statement.startswith("DROP INDEX")}
+
+    assert dropped and not dropped & set(model_indexes())
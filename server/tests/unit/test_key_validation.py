@@ -0,0 +1,213 @@
+"""
+Тесты валидации API ключей: параллельный обход кабинетов с фейковым WB API,
+общий кэш результатов и его подтверждение успешными запросами синхронизации
+"""
+
+import time
+import asyncio
+from collections import defaultdict
+from unittest.mock import AsyncMock, Mock, patch
+
+import httpx
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.features.wb_api import key_validation
+from app.features.wb_api.cabinet_manager import CabinetManager
+from app.features.wb_api.client import WBAPIClient
+from app.features.wb_api.key_validation import HostRateLimiter, KeyValidationCache, KeyValidator
+from app.features.wb_api.models import WBCabinet
+
+CABINETS = 30
+INVALID_KEYS = {"key-3", "key-13", "key-23"}
+
+
+class FakeWBServer:
+    """WB API: задержка ответа, 401 для отозванных ключей, лимит частоты на хост"""
+
+    def __init__(self, latency=0.02, host_rps=None, unavailable=(), rate_limited_once=False):
+        self.latency = latency
+        self.host_rps = host_rps
+        self.unavailable = set(unavailable)
+        self.rate_limited_once = rate_limited_once
+        self.calls = 0
+        self.rejected = 0
+        self.requests = defaultdict(list)
+        self.seen = set()
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        host = request.url.host
+        now = time.monotonic()
+        window = [at for at in self.requests[host] if now - at < 1.0]
+        self.requests[host] = window + [now]
+        token = request.headers["Authorization"].removeprefix("Bearer ")
+
+        if self.host_rps is not None and len(window) >= self.host_rps:
+            self.rejected += 1
+            return httpx.Response(429, headers={"Retry-After": "0.2"})
+        if self.rate_limited_once and token not in self.seen:
+            self.seen.add(token)
+            self.rejected += 1
+            return httpx.Response(429, headers={"Retry-After": "0.05"})
+
+        await asyncio.sleep(self.latency)
+        if token in self.unavailable:
+            return httpx.Response(503)
+        if token in INVALID_KEYS:
+            return httpx.Response(401, json={"title": "unauthorized", "detail": "token is revoked", "code": "401"})
+        return httpx.Response(200, json=[{"id": 1, "name": "Коледино"}])
+
+    def client(self):
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+
+
+@pytest.fixture
+def cache():
+    return KeyValidationCache(fakeredis.FakeRedis(decode_responses=True))
+
+
+@pytest.fixture
+def cabinets(db_session):
+    db_session.add_all([WBCabinet(api_key=f"key-{i}", name=f"Кабинет {i}") for i in range(CABINETS)])
+    db_session.commit()
+    return db_session.query(WBCabinet).order_by(WBCabinet.id).all()
+
+
+def make_manager(db, server, cache, concurrency, host_rps=1000):
+    validator = KeyValidator(
+        cache=cache,
+        http_client=server.client(),
+        limiter=HostRateLimiter(host_rps),
+        concurrency=concurrency,
+    )
+    manager = CabinetManager(db, validator=validator)
+    manager._remove_invalid_cabinet = AsyncMock(side_effect=lambda cabinet, result: {
+        "success": True, "valid": False, "cabinet_removed": True, "cabinet_id": cabinet.id,
+    })
+    return manager
+
+
+class TestValidationSweep:
+    @pytest.mark.asyncio
+    async def test_concurrent_sweep_is_faster_and_reuses_cache(self, db_session, cabinets):
+        sequential_server = FakeWBServer()
+        sequential = make_manager(db_session, sequential_server, KeyValidationCache(fakeredis.FakeRedis()), 1)
+        started = time.monotonic()
+        baseline = await sequential.validate_all_cabinets(use_cache=False)
+        sequential_seconds = time.monotonic() - started
+
+        server = FakeWBServer()
+        cache = KeyValidationCache(fakeredis.FakeRedis(decode_responses=True))
+        manager = make_manager(db_session, server, cache, 10)
+        first = await manager.validate_all_cabinets()
+        second = await manager.validate_all_cabinets()
+
+        assert baseline["valid_cabinets"] == first["valid_cabinets"] == CABINETS - len(INVALID_KEYS)
+        assert first["removed_cabinets"] == len(INVALID_KEYS)
+        removed = {call.args[0].api_key for call in manager._remove_invalid_cabinet.await_args_list}
+        assert removed == INVALID_KEYS
+        assert first["duration_seconds"] < sequential_seconds / 3
+        # Повторный обход в пределах TTL - без запросов к WB
+        assert server.calls == CABINETS
+        assert second["outbound_calls"] == 0
+        assert second["cached_results"] == CABINETS
+        assert second["valid_cabinets"] == CABINETS - len(INVALID_KEYS)
+
+    @pytest.mark.asyncio
+    async def test_host_rate_limit_respected(self, db_session, cabinets, cache):
+        server = FakeWBServer(latency=0, host_rps=20)
+        manager = make_manager(db_session, server, cache, 10, host_rps=15)
+
+        result = await manager.validate_all_cabinets()
+
+        assert server.rejected == 0
+        assert result["valid_cabinets"] == CABINETS - len(INVALID_KEYS)
+        assert result["duration_seconds"] >= (CABINETS - 1) / 15 * 0.9
+
+    @pytest.mark.asyncio
+    async def test_host_paused_on_429_and_retried(self, cache):
+        server = FakeWBServer(rate_limited_once=True)
+        validator = KeyValidator(cache=cache, http_client=server.client(), limiter=HostRateLimiter(1000))
+
+        results = await validator.validate_many(["key-1", "key-2", "key-3"])
+
+        assert [r["valid"] for r in results] == [True, True, False]
+        assert server.calls == 6
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_do_not_share_borrowed_client(self, cache):
+        server = FakeWBServer(latency=0.01)
+        clients = []
+        real_client = httpx.AsyncClient
+
+        def make_client(**kwargs):
+            client = real_client(transport=httpx.MockTransport(server.handle), **kwargs)
+            clients.append(client)
+            return client
+
+        validator = KeyValidator(cache=cache, limiter=HostRateLimiter(1000))
+        with patch.object(key_validation.httpx, "AsyncClient", side_effect=make_client), \
+                patch.object(server, "rate_limited_once", True):
+            # Обход закрывает свой клиент раньше, чем завершится одиночная проверка с 429
+            sweep, single = await asyncio.gather(
+                validator.validate_many(["key-1"]),
+                validator.validate("key-2", use_cache=False),
+            )
+
+        assert sweep[0]["valid"] is True and single["valid"] is True
+        assert validator._http is None
+        assert len(clients) == 2 and all(client.is_closed for client in clients)
+
+    @pytest.mark.asyncio
+    async def test_unavailable_api_keeps_cabinet_and_is_not_cached(self, db_session, cache):
+        cabinet = WBCabinet(api_key="key-1", name="Кабинет")
+        db_session.add(cabinet)
+        db_session.commit()
+        server = FakeWBServer(unavailable={"key-1"})
+        manager = make_manager(db_session, server, cache, 10)
+
+        with patch.object(key_validation, "KEY_VALIDATION_RETRY_DELAY", 0):
+            result = await manager.validate_and_cleanup_cabinet(cabinet)
+
+        assert result["valid"] is True and result["warning"] is True
+        assert server.calls == key_validation.KEY_VALIDATION_ATTEMPTS
+        assert cache.get("key-1") is None
+        manager._remove_invalid_cabinet.assert_not_awaited()
+
+
+class TestSyncConfirmsKey:
+    @pytest.mark.asyncio
+    async def test_successful_sync_request_refreshes_validation(self, cache):
+        cabinet = WBCabinet(id=1, api_key="key-1")
+        client = WBAPIClient(cabinet)
+        response = Mock(status_code=200)
+        response.json.return_value = []
+
+        with patch("app.features.wb_api.client.get_key_validation_cache", return_value=cache), \
+                patch.object(client, "_check_rate_limit", new_callable=AsyncMock), \
+                patch("httpx.AsyncClient.get", new_callable=AsyncMock, return_value=response):
+            await client._make_request("GET", "https://statistics-api.wildberries.ru/api/v1/supplier/orders", api_type="orders")
+
+        server = FakeWBServer()
+        result = await KeyValidator(cache=cache, http_client=server.client()).validate("key-1")
+
+        assert result["valid"] is True and result["cached"] is True
+        assert result["source"] == "sync"
+        assert server.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_unauthorized_sync_request_drops_cached_result(self, cache):
+        cache.set("key-3", {"valid": True, "status_code": 200})
+        client = WBAPIClient(WBCabinet(id=3, api_key="key-3"))
+        response = Mock(status_code=401)
+
+        with patch("app.features.wb_api.client.get_key_validation_cache", return_value=cache), \
+                patch.object(client, "_check_rate_limit", new_callable=AsyncMock), \
+                patch("httpx.AsyncClient.get", new_callable=AsyncMock, return_value=response), \
+                patch("asyncio.sleep", new_callable=AsyncMock):
+            with pytest.raises(Exception, match="Invalid API key"):
+                await client._make_request("GET", "https://statistics-api.wildberries.ru/api/v1/supplier/orders", api_type="orders")
+
+        assert cache.get("key-3") is None
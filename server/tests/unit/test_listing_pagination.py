@@ -0,0 +1,158 @@
+"""
+Тесты курсорной пагинации листингов: стабильный порядок (timestamp, id),
+отсутствие пропусков и повторов при вставках между страницами, совместимость
+с offset, непрозрачные курсоры
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.features.bot_api.service import STOCKS_CURSOR_KIND, BotAPIService
+from app.features.wb_api.models import WBCabinet, WBOrder, WBReview, WBStock
+from app.utils.pagination import InvalidCursorError, decode_cursor, encode_cursor, paginate
+
+START = datetime(2025, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def cabinet(db_session):
+    cabinet = WBCabinet(id=1, api_key="key-1", name="Кабинет")
+    db_session.add(cabinet)
+    db_session.commit()
+    return cabinet
+
+
+def add_orders(db, count, at=START, prefix="o", same_time=False):
+    for i in range(count):
+        order_date = at if same_time else at + timedelta(minutes=i)
+        db.add(WBOrder(cabinet_id=1, order_id=f"{prefix}-{i}", nm_id=i, order_date=order_date, status="active"))
+    db.commit()
+
+
+def orders_query(db):
+    return db.query(WBOrder).filter(WBOrder.cabinet_id == 1)
+
+
+def walk(db, limit, between_pages=None):
+    """Все страницы по курсору; between_pages(номер) вызывается перед каждой следующей"""
+    seen, after, page = [], None, 0
+    while True:
+        rows, after = paginate(orders_query(db), WBOrder.order_date, WBOrder.id, limit, after=after)
+        seen.extend(row.order_id for row in rows)
+        if after is None:
+            return seen
+        page += 1
+        if between_pages:
+            between_pages(page)
+        after = decode_cursor("orders", encode_cursor("orders", after))
+
+
+class TestKeysetPagination:
+    def test_pages_cover_rows_once_newest_first_with_undated_last(self, db_session, cabinet):
+        add_orders(db_session, 7, same_time=True)   # одинаковое время - порядок по id
+        add_orders(db_session, 5, at=START + timedelta(days=1), prefix="n")
+        db_session.add_all([WBOrder(cabinet_id=1, order_id=f"u-{i}", nm_id=i) for i in range(3)])
+        db_session.commit()
+
+        seen = walk(db_session, limit=4)
+
+        expected = [f"n-{i}" for i in reversed(range(5))] + [f"o-{i}" for i in reversed(range(7))] + \
+            [f"u-{i}" for i in reversed(range(3))]
+        assert seen == expected
+
+    def test_inserts_between_pages_do_not_shift_pages(self, db_session, cabinet):
+        add_orders(db_session, 30)
+
+        def sync_writes(page):
+            # Синхронизация добавляет свежие заказы - они выше курсора
+            add_orders(db_session, 3, at=START + timedelta(days=page), prefix=f"sync{page}")
+
+        seen = walk(db_session, limit=7, between_pages=sync_writes)
+
+        assert seen[:7] == [f"o-{i}" for i in reversed(range(23, 30))]
+        assert sorted(o for o in seen if o.startswith("o-")) == sorted(f"o-{i}" for i in range(30))
+        assert len(seen) == len(set(seen))
+
+    def test_offset_pages_use_same_order_and_return_cursor(self, db_session, cabinet):
+        add_orders(db_session, 12)
+
+        first, _ = paginate(orders_query(db_session), WBOrder.order_date, WBOrder.id, 5)
+        second, after = paginate(orders_query(db_session), WBOrder.order_date, WBOrder.id, 5, offset=5)
+        third, last = paginate(orders_query(db_session), WBOrder.order_date, WBOrder.id, 5, after=after)
+
+        assert [o.order_id for o in first + second + third] == [f"o-{i}" for i in reversed(range(12))]
+        assert last is None
+
+    def test_cursor_is_opaque_and_bound_to_listing(self):
+        cursor = encode_cursor("orders", (datetime(2025, 1, 1, 10, 30), 42))
+
+        assert "2025" not in cursor and "=" not in cursor
+        assert decode_cursor("orders", cursor) == (datetime(2025, 1, 1, 10, 30), 42)
+        with pytest.raises(InvalidCursorError):
+            decode_cursor("reviews", cursor)
+        with pytest.raises(InvalidCursorError):
+            decode_cursor("orders", "not-a-cursor")
+
+
+class TestListingRoutes:
+    def test_orders_walked_by_next_cursor_header(self, client, db_session, cabinet):
+        add_orders(db_session, 25)
+
+        response = client.get("/wb/cabinets/1/orders?date_from=2024-01-01&limit=10")
+        ids = [o["order_id"] for o in response.json()]
+        while "X-Next-Cursor" in response.headers:
+            response = client.get(
+                f"/wb/cabinets/1/orders?date_from=2024-01-01&limit=10&cursor={response.headers['X-Next-Cursor']}"
+            )
+            assert response.status_code == 200
+            ids += [o["order_id"] for o in response.json()]
+
+        assert ids == [f"o-{i}" for i in reversed(range(25))]
+
+    def test_legacy_offset_still_supported(self, client, db_session, cabinet):
+        add_orders(db_session, 25)
+
+        response = client.get("/wb/cabinets/1/orders?date_from=2024-01-01&limit=10&offset=20")
+
+        assert response.status_code == 200
+        assert [o["order_id"] for o in response.json()] == [f"o-{i}" for i in reversed(range(5))]
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_foreign_or_broken_cursor_rejected(self, client, db_session, cabinet):
+        db_session.add(WBReview(cabinet_id=1, review_id="r-1", rating=5, created_date=START))
+        db_session.commit()
+        orders_cursor = encode_cursor("orders", (START, 1))
+
+        assert client.get(f"/wb/cabinets/1/reviews?cursor={orders_cursor}").status_code == 400
+        assert client.get("/wb/cabinets/1/reviews?cursor=%%%").status_code == 400
+        assert client.get(f"/wb/cabinets/1/orders?date_from=2024-01-01&offset=5&cursor={orders_cursor}").status_code == 400
+
+
+class TestStocksReportCursor:
+    @pytest.mark.asyncio
+    async def test_equal_totals_paged_by_nm_id_without_gaps(self, db_session, cabinet):
+        # 12 товаров, у многих одинаковый суммарный остаток
+        db_session.add_all([
+            WBStock(cabinet_id=1, nm_id=nm_id, warehouse_name="Коледино", size="M", quantity=10 * (nm_id % 3) + 1)
+            for nm_id in range(100, 112)
+        ])
+        db_session.commit()
+        cache_manager = Mock(get_cached_data=AsyncMock(return_value=None), set_cached_data=AsyncMock())
+        service = BotAPIService(db_session, cache_manager=cache_manager, sync_service=Mock(), chart_renderer=Mock())
+        service.get_user_cabinet = AsyncMock(return_value=cabinet)
+        user = {"telegram_id": 1}
+
+        pages, after = [], None
+        while True:
+            result = await service.get_all_stocks_report(user, limit=5, after=after)
+            pagination = result["data"]["pagination"]
+            pages.append([p["nm_id"] for p in result["data"]["products"]])
+            if not pagination["next_cursor"]:
+                break
+            after = decode_cursor(STOCKS_CURSOR_KIND, pagination["next_cursor"], timestamp_type=int)
+
+        expected = sorted(range(100, 112), key=lambda nm_id: (-(10 * (nm_id % 3) + 1), nm_id))
+        assert [nm_id for page in pages for nm_id in page] == expected
+        assert [len(page) for page in pages] == [5, 5, 2]
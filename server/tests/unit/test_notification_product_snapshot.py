@@ -0,0 +1,141 @@
+"""
+Тесты снимка товаров для уведомлений: количество SQL запросов и корректность данных
+"""
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+
+from app.features.notifications.notification_service import NotificationService
+from app.features.notifications.product_snapshot import ProductSnapshot
+from app.features.wb_api.models import WBCabinet, WBOrder, WBProduct, WBReview, WBStock
+from app.features.wb_api.models_sales import WBSales
+
+
+@contextmanager
+def count_statements(session):
+    """Счетчик SQL запросов, выполненных через сессию"""
+    statements = []
+    engine = session.get_bind()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def seed_cabinet(db_session, products_count, orders_per_product=2):
+    """Кабинет с товарами, остатками, отзывами, заказами и продажами"""
+    now = datetime.now(timezone.utc)
+    cabinet = WBCabinet(api_key=f"key-{products_count}", name="Test", last_sync_at=now - timedelta(hours=1))
+    db_session.add(cabinet)
+    db_session.flush()
+
+    for index in range(products_count):
+        nm_id = 1000 + index
+        db_session.add(WBProduct(cabinet_id=cabinet.id, nm_id=nm_id, name=f"Товар {nm_id}", image_url=f"https://img/{nm_id}.jpg"))
+        db_session.add_all([
+            WBStock(cabinet_id=cabinet.id, nm_id=nm_id, size="S", warehouse_name="Коледино", quantity=5),
+            WBStock(cabinet_id=cabinet.id, nm_id=nm_id, size="S", warehouse_name="Казань", quantity=3),
+            WBStock(cabinet_id=cabinet.id, nm_id=nm_id, size="M", warehouse_name="Коледино", quantity=2),
+            WBReview(cabinet_id=cabinet.id, nm_id=nm_id, review_id=f"r{nm_id}-1", rating=5),
+            WBReview(cabinet_id=cabinet.id, nm_id=nm_id, review_id=f"r{nm_id}-2", rating=4),
+            WBReview(cabinet_id=cabinet.id, nm_id=nm_id, review_id=f"r{nm_id}-3", rating=None),
+            WBSales(cabinet_id=cabinet.id, nm_id=nm_id, sale_id=f"s{nm_id}-1", type="buyout", is_cancel=False, sale_date=now - timedelta(days=3)),
+            WBSales(cabinet_id=cabinet.id, nm_id=nm_id, sale_id=f"s{nm_id}-2", type="buyout", is_cancel=False, sale_date=now - timedelta(days=20)),
+            WBSales(cabinet_id=cabinet.id, nm_id=nm_id, sale_id=f"s{nm_id}-3", type="return", is_cancel=False, sale_date=now - timedelta(days=1)),
+        ])
+        for order_index in range(orders_per_product):
+            db_session.add(WBOrder(
+                cabinet_id=cabinet.id, nm_id=nm_id, order_id=f"o{nm_id}-{order_index}",
+                status="active" if order_index == 0 else "canceled",
+                total_price=1000, order_date=now
+            ))
+    db_session.commit()
+    return cabinet
+
+
+class TestProductSnapshot:
+    """Тесты ProductSnapshot"""
+
+    def test_build_uses_fixed_number_of_queries(self, db_session):
+        """Количество запросов не зависит от числа товаров"""
+        cabinet = seed_cabinet(db_session, products_count=30)
+        keys = [(cabinet.id, 1000 + index) for index in range(30)]
+
+        with count_statements(db_session) as statements:
+            snapshot = ProductSnapshot.build(db_session, keys)
+            infos = [snapshot.get_full_info(cabinet_id, nm_id) for cabinet_id, nm_id in keys]
+
+        # товары, остатки, отзывы, заказы, продажи
+        assert len(statements) == 5
+        assert len(infos) == 30
+
+    def test_full_info_values(self, db_session):
+        """Агрегаты совпадают с данными в БД"""
+        cabinet = seed_cabinet(db_session, products_count=2)
+
+        info = ProductSnapshot.build(db_session, [(cabinet.id, 1000)]).get_full_info(cabinet.id, 1000)
+
+        assert info["stocks"] == {"S": 8, "M": 2}
+        assert info["stocks_by_warehouse"] == {"Коледино": {"S": 5, "M": 2}, "Казань": {"S": 3}}
+        assert info["reviews_count"] == 3
+        assert info["avg_rating"] == 4.5
+        assert info["rating_distribution"][5] == pytest.approx(100 / 3)
+        assert info["orders_stats"] == {
+            "total_orders": 2, "active_orders": 1, "canceled_orders": 1,
+            "buyout_orders": 2, "return_orders": 1,
+        }
+        assert info["sales_periods"] == {"7_days": 1, "14_days": 1, "30_days": 2}
+        assert info["image_url"] == "https://img/1000.jpg"
+
+    def test_missing_product_returns_empty_info(self, db_session):
+        cabinet = seed_cabinet(db_session, products_count=1)
+
+        snapshot = ProductSnapshot.build(db_session, [(cabinet.id, 999999)])
+
+        assert snapshot.covers(cabinet.id, 999999)
+        assert snapshot.get_full_info(cabinet.id, 999999)["orders_stats"]["total_orders"] == 0
+
+
+class TestNotificationQueryCount:
+    """Количество запросов при формировании уведомлений"""
+
+    @pytest.mark.asyncio
+    async def test_new_orders_query_count_independent_of_orders(self, db_session):
+        """_get_new_orders не делает запросов на каждый заказ"""
+        service = NotificationService(db_session)
+        small = seed_cabinet(db_session, products_count=2)
+        large = seed_cabinet(db_session, products_count=20)
+        last_check = datetime.now(timezone.utc) - timedelta(days=1)
+
+        with count_statements(db_session) as small_statements:
+            small_events = await service._get_new_orders(1, [small.id], last_check)
+        with count_statements(db_session) as large_statements:
+            large_events = await service._get_new_orders(1, [large.id], last_check)
+
+        assert len(small_events) == 4
+        assert len(large_events) == 40
+        assert len(large_statements) == len(small_statements)
+        assert large_events[0]["data"]["rating"] == 4.5
+        assert large_events[0]["data"]["reviews_count"] == 2
+
+    def test_full_product_info_reads_run_snapshot(self, db_session):
+        """Внутри прогона _get_full_product_info не обращается к БД"""
+        service = NotificationService(db_session)
+        cabinet = seed_cabinet(db_session, products_count=5)
+        service._product_snapshot = ProductSnapshot.build(
+            db_session, [(cabinet.id, 1000 + index) for index in range(5)]
+        )
+
+        with count_statements(db_session) as statements:
+            for index in range(5):
+                service._get_full_product_info(cabinet.id, 1000 + index)
+
+        assert statements == []
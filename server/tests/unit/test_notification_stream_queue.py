@@ -0,0 +1,147 @@
+"""
+Тесты очереди уведомлений на Redis Streams: приоритеты по весам, пачки,
+восстановление после падения worker-а, повторы и метрики
+"""
+
+from collections import Counter
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.features.notifications.stream_queue import (
+    DEAD_LETTER_STREAM_KEY,
+    PRIORITIES,
+    StreamQueueManager,
+    parse_weights,
+)
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def worker(redis_client, name, **kwargs):
+    return StreamQueueManager(redis_client, consumer_name=name, **kwargs)
+
+
+def fill(queue, per_priority, priorities=PRIORITIES):
+    for priority in priorities:
+        for i in range(per_priority):
+            queue.enqueue({"id": f"{priority}-{i}", "priority": priority})
+
+
+class TestStreamQueueReads:
+    def test_batch_split_by_weights(self, redis_client):
+        queue = worker(redis_client, "w1")
+        fill(queue, 20)
+
+        batch = queue.read_batch(15)
+
+        assert Counter(entry.priority for entry in batch) == {"CRITICAL": 8, "HIGH": 4, "MEDIUM": 2, "LOW": 1}
+        # Внутри приоритета - порядок добавления
+        assert [e.notification["id"] for e in batch if e.priority == "HIGH"] == [f"HIGH-{i}" for i in range(4)]
+
+    def test_low_priority_not_starved_by_single_reads(self, redis_client):
+        queue = worker(redis_client, "w1")
+        fill(queue, 30)
+
+        seen = Counter(queue.read_batch(1)[0].priority for _ in range(15))
+
+        assert seen == {"CRITICAL": 8, "HIGH": 4, "MEDIUM": 2, "LOW": 1}
+
+    def test_empty_priorities_give_slots_to_others(self, redis_client):
+        queue = worker(redis_client, "w1")
+        fill(queue, 3, priorities=("CRITICAL",))
+        fill(queue, 20, priorities=("LOW",))
+
+        batch = queue.read_batch(10)
+        single = queue.read_batch(1)
+
+        assert Counter(entry.priority for entry in batch) == {"CRITICAL": 3, "LOW": 7}
+        assert [entry.priority for entry in single] == ["LOW"]
+        assert queue.read_batch(100) and queue.read_batch(5) == []
+
+    def test_parse_weights(self):
+        assert parse_weights("critical=10, LOW=0,unknown=3") == {"CRITICAL": 10, "HIGH": 1, "MEDIUM": 1, "LOW": 1}
+
+
+class TestStreamQueueDelivery:
+    def test_crashed_worker_notifications_reclaimed(self, redis_client):
+        crashed = worker(redis_client, "crashed", claim_min_idle_ms=0)
+        survivor = worker(redis_client, "survivor", claim_min_idle_ms=0)
+        fill(crashed, 2, priorities=("HIGH", "LOW"))
+
+        taken = crashed.read_batch(4)
+        # Воркер упал до ack: новых сообщений нет, но ни одно не потеряно
+        assert survivor.read_batch(10) == []
+        assert crashed.get_metrics()["total"] == {"backlog": 4, "lag": 0, "pending": 4}
+
+        reclaimed = survivor.reclaim_stale()
+
+        assert sorted(e.notification["id"] for e in reclaimed) == sorted(e.notification["id"] for e in taken)
+        assert survivor.ack(reclaimed) == 4
+        # Ack упавшего воркера после reclaim (он ожил) ничего не подтверждает повторно
+        assert crashed.ack(taken) == 0
+        assert survivor.get_metrics()["total"] == {"backlog": 0, "lag": 0, "pending": 0}
+
+    def test_fresh_pending_not_reclaimed(self, redis_client):
+        busy = worker(redis_client, "busy")
+        other = worker(redis_client, "other")
+        fill(busy, 1, priorities=("MEDIUM",))
+        busy.read_batch(1)
+
+        assert other.reclaim_stale() == []
+
+    def test_poison_notification_dead_lettered_after_max_deliveries(self, redis_client):
+        queue = worker(redis_client, "w1", claim_min_idle_ms=0, max_deliveries=2)
+        fill(queue, 1, priorities=("CRITICAL",))
+        queue.read_batch(1)
+
+        assert len(queue.reclaim_stale()) == 1   # 2-я выдача
+        assert queue.reclaim_stale() == []       # 3-я - в dead-letter
+
+        dead = redis_client.xrange(DEAD_LETTER_STREAM_KEY)
+        assert dead[0][1]["reason"] == "max_deliveries"
+        assert queue.get_metrics()["total"]["backlog"] == 0
+        assert queue.get_metrics()["dead_letter"] == 1
+
+    def test_requeue_until_max_retries(self, redis_client):
+        queue = worker(redis_client, "w1")
+        queue.enqueue({"id": "n1", "priority": "HIGH", "max_retries": 1})
+
+        first = queue.read_batch(1)[0]
+        assert queue.requeue(first) is True
+        second = queue.read_batch(1)[0]
+        assert second.notification["retry_count"] == 1
+        assert queue.requeue(second) is False
+
+        assert queue.read_batch(1) == []
+        assert redis_client.xrange(DEAD_LETTER_STREAM_KEY)[0][1]["reason"] == "max_retries"
+
+    def test_invalid_payload_dead_lettered(self, redis_client):
+        queue = worker(redis_client, "w1")
+        queue.ensure_groups()
+        redis_client.xadd(queue.streams["LOW"], {"data": "{not json"})
+
+        assert queue.read_batch(5) == []
+        assert queue.get_metrics()["low"]["backlog"] == 0
+        assert queue.get_metrics()["dead_letter"] == 1
+
+
+class TestStreamQueueMetrics:
+    def test_backlog_lag_pending_per_priority(self, redis_client):
+        queue = worker(redis_client, "w1")
+        fill(queue, 5, priorities=("CRITICAL", "MEDIUM"))
+        batch = queue.read_batch(4)
+        queue.ack(batch[:1])
+
+        metrics = queue.get_metrics()
+
+        delivered = Counter(entry.priority for entry in batch)
+        assert metrics["critical"]["pending"] + metrics["medium"]["pending"] == 3
+        assert metrics["critical"]["lag"] == 5 - delivered["CRITICAL"]
+        assert metrics["total"] == {"backlog": 9, "lag": 6, "pending": 3}
+        assert metrics["critical"]["oldest_age_seconds"] >= 0
+        assert metrics["low"] == {"backlog": 0, "lag": 0, "pending": 0, "oldest_age_seconds": None}
@@ -0,0 +1,171 @@
+"""
+Тесты локального классификатора отзывов: точность на размеченном наборе,
+отрицания и пустые pros/cons, классификация при синхронизации только
+новых и изменившихся отзывов, фильтры и агрегаты по колонкам в SQL
+"""
+
+import os
+import json
+from unittest.mock import Mock
+
+import pytest
+
+from app.features.bot_api.service import BotAPIService
+from app.features.wb_api import review_classifier
+from app.features.wb_api.models import WBCabinet, WBReview
+from app.features.wb_api.review_classifier import (
+    CLASSIFIER_VERSION, NEGATIVE, NEUTRAL, POSITIVE, classify, decode_topics, encode_topics, topic_filter,
+)
+from app.features.wb_api.sync_service import WBSyncService
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "..", "fixtures", "reviews")
+
+# Минимальные показатели на размеченном наборе
+MIN_SENTIMENT_ACCURACY = 0.85
+MIN_TOPIC_PRECISION = 0.9
+MIN_TOPIC_RECALL = 0.9
+
+
+def labeled_reviews():
+    with open(os.path.join(FIXTURES_DIR, "labeled_reviews.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def rating_only(rating):
+    """Прежняя классификация - только по оценке"""
+    return POSITIVE if rating >= 4 else NEGATIVE if rating <= 2 else NEUTRAL
+
+
+def feedback(review_id, text, rating, pros=None, cons=None):
+    """Отзыв в формате WB API"""
+    return {
+        "id": review_id, "text": text, "productValuation": rating, "pros": pros, "cons": cons,
+        "productDetails": {"nmId": 100}, "createdDate": "2025-01-01T12:00:00Z", "answer": None,
+    }
+
+
+@pytest.fixture
+def cabinet(db_session):
+    cabinet = WBCabinet(id=1, api_key="key-1", name="Кабинет")
+    db_session.add(cabinet)
+    db_session.commit()
+    return cabinet
+
+
+class TestAccuracy:
+    def test_sentiment_accuracy_on_labeled_set(self):
+        reviews = labeled_reviews()
+        predicted = [classify(r["text"], r["pros"], r["cons"], r["rating"]).sentiment for r in reviews]
+
+        accuracy = sum(p == r["sentiment"] for p, r in zip(predicted, reviews)) / len(reviews)
+        baseline = sum(rating_only(r["rating"]) == r["sentiment"] for r in reviews) / len(reviews)
+        assert accuracy >= MIN_SENTIMENT_ACCURACY
+        assert accuracy > baseline
+
+    def test_topic_precision_and_recall_on_labeled_set(self):
+        true_positive = false_positive = false_negative = 0
+        for review in labeled_reviews():
+            expected = set(review["topics"])
+            found = set(classify(review["text"], review["pros"], review["cons"], review["rating"]).topics)
+            true_positive += len(expected & found)
+            false_positive += len(found - expected)
+            false_negative += len(expected - found)
+
+        assert true_positive / (true_positive + false_positive) >= MIN_TOPIC_PRECISION
+        assert true_positive / (true_positive + false_negative) >= MIN_TOPIC_RECALL
+
+
+class TestClassify:
+    def test_negative_text_outweighs_high_rating(self):
+        result = classify("Пришел брак, шов разошелся", rating=5)
+        assert result.sentiment == NEGATIVE
+        assert set(result.topics) == {"quality"}
+
+    def test_negation_flips_sentiment(self):
+        assert classify("Рекомендую").sentiment == POSITIVE
+        assert classify("Не рекомендую").sentiment == NEGATIVE
+        assert classify("Без брака").score > 0
+        assert classify("Брака нет").score > 0
+
+    def test_longest_stem_wins(self):
+        assert classify("Удобно").sentiment == POSITIVE
+        assert classify("Неудобно").sentiment == NEGATIVE
+        # "великолепно" - не размер "велик"
+        assert classify("Великолепно").topics == ()
+
+    def test_empty_cons_are_ignored(self):
+        for cons in ("нет", "Нет.", "-", "Все устраивает", "не обнаружено", "Минусов нет"):
+            assert classify(None, cons=cons).score == 0, cons
+        assert classify(None, cons="Маломерит").sentiment == NEGATIVE
+
+    def test_score_bounded_and_topics_in_declared_order(self):
+        result = classify("ужас ужас ужас брак дырка пятно запах коробка размер", rating=1)
+        assert -1 < result.score < -0.8
+        assert list(result.topics) == [t for t in review_classifier.TOPICS if t in result.topics]
+
+    def test_topics_round_trip(self):
+        assert encode_topics(("size", "quality")) == ",size,quality,"
+        assert encode_topics(()) is None
+        assert decode_topics(",size,quality,") == ["size", "quality"]
+        assert decode_topics(None) == []
+
+
+class TestSyncClassification:
+    @pytest.mark.asyncio
+    async def test_only_new_changed_and_outdated_reviews_are_classified(self, db_session, cabinet, monkeypatch):
+        service = WBSyncService(db_session, cache_manager=Mock())
+        await service._process_reviews_batch(cabinet, [
+            feedback(1, "Отличное качество", 5),
+            feedback(2, "Брак, шов разошелся", 5),
+            feedback(3, "Норм", 4),
+        ])
+        stored = {r.review_id: r for r in db_session.query(WBReview).all()}
+        assert stored["1"].sentiment == POSITIVE and stored["1"].topics == ",quality,"
+        assert stored["2"].sentiment == NEGATIVE
+        assert {r.classifier_version for r in stored.values()} == {CLASSIFIER_VERSION}
+
+        stored["3"].classifier_version = CLASSIFIER_VERSION - 1
+        db_session.commit()
+        calls = Mock(wraps=review_classifier.classify)
+        monkeypatch.setattr(review_classifier, "classify", calls)
+        await service._process_reviews_batch(cabinet, [
+            feedback(1, "Отличное качество", 5),          # без изменений
+            feedback(2, "Брак, шов разошелся", 2),        # изменилась оценка
+            feedback(3, "Норм", 4),                       # прежняя версия словаря
+        ])
+
+        assert [call.args[0] for call in calls.call_args_list] == ["Брак, шов разошелся", "Норм"]
+        assert db_session.query(WBReview).filter(WBReview.classifier_version == CLASSIFIER_VERSION).count() == 3
+
+
+class TestSQLAggregates:
+    @pytest.fixture
+    def reviews(self, db_session, cabinet):
+        samples = [
+            ("Маломерит, брак", 1), ("Шов разошелся, брак", 5), ("Размер подошел", 5),
+            ("Отлично", 5), ("Обычная футболка", 3),
+        ]
+        for i, (text, rating) in enumerate(samples):
+            review = WBReview(cabinet_id=1, nm_id=100, review_id=f"r-{i}", text=text, rating=rating, is_answered=False)
+            review_classifier.apply_classification(review)
+            db_session.add(review)
+        db_session.commit()
+
+    def test_topic_filter_in_sql(self, db_session, reviews):
+        texts = {r.text for r in db_session.query(WBReview).filter(topic_filter(WBReview.topics, "size"))}
+        assert texts == {"Маломерит, брак", "Размер подошел"}
+
+    @pytest.mark.asyncio
+    async def test_reviews_summary_filters_and_aggregates_stored_columns(self, db_session, cabinet, reviews):
+        service = BotAPIService(db_session, cache_manager=Mock(), sync_service=Mock(), chart_renderer=Mock())
+
+        data = await service._fetch_reviews_from_db(cabinet, 10, 0, sentiment=NEGATIVE)
+        topics = {r["text"]: r["topics"] for r in data["new_reviews"]}
+        assert topics == {"Маломерит, брак": ["size", "quality"], "Шов разошелся, брак": ["quality"]}
+
+        statistics = data["statistics"]
+        assert statistics["sentiment"] == {POSITIVE: 2, NEUTRAL: 1, NEGATIVE: 2}
+        assert statistics["topics"] == {"quality": 2, "size": 2}
+
+        data = await service._fetch_reviews_from_db(cabinet, 10, 0, topic="size")
+        assert {r["text"] for r in data["new_reviews"]} == {"Маломерит, брак", "Размер подошел"}
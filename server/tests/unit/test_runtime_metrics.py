@@ -0,0 +1,246 @@
+"""
+Тесты метрик процесса: шарды по потокам, гистограммы, окно
+requests_per_minute, сессии, объединение снимков процессов через Redis
+и эндпоинты /stats/analytics и /stats/metrics
+"""
+
+import os
+import json
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.core import metrics
+from app.core.metrics import MetricsRegistry
+from app.features.stats import routes as stats_routes
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry(redis_client=fakeredis.FakeRedis(decode_responses=True), process_id="test:1")
+
+
+@pytest.fixture
+def app_metrics():
+    """Глобальный реестр приложения на fakeredis, без накопленных значений"""
+    redis_client = fakeredis.FakeRedis(decode_responses=True)
+    with patch.object(metrics.registry, "_redis", redis_client):
+        metrics.registry.reset()
+        yield redis_client
+        metrics.registry.reset()
+
+
+class TestRegistry:
+    def test_threads_write_own_shards_without_lost_updates(self, registry):
+        counter = registry.counter("jobs_total", "Jobs", ("kind",))
+        histogram = registry.histogram("job_seconds", "Job time", ("kind",), buckets=(0.1, 1.0))
+
+        def work():
+            for i in range(5000):
+                counter.inc("a")
+                histogram.observe(0.05 if i % 2 else 0.5, "a")
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        collected = registry.collect(include_remote=False)
+        assert collected["counters"][("jobs_total", ("a",))] == 40000
+        buckets = collected["histograms"][("job_seconds", ("a",))]
+        assert buckets[:-1] == [20000, 20000, 0]
+        assert buckets[-1] == pytest.approx(20000 * 0.05 + 20000 * 0.5)
+        assert len(registry._shards) == 8
+
+    def test_prometheus_text_format(self, registry):
+        counter = registry.counter("http_requests_total", "Requests", ("route", "status"))
+        histogram = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+        counter.inc('/a"b', "200", amount=3)
+        histogram.observe(0.1, "/a")
+        histogram.observe(0.5, "/a")
+        histogram.observe(7, "/a")
+        registry.gauge_callback("pool_connections", "Pool", lambda: [({"state": "size"}, 5)])
+
+        text = registry.render_prometheus(registry.collect(include_remote=False))
+
+        assert "# TYPE http_requests_total counter" in text
+        assert 'http_requests_total{route="/a\\"b",status="200"} 3' in text
+        assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{route="/a",le="1"} 2' in text
+        assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+        assert 'latency_seconds_sum{route="/a"} 7.6' in text
+        assert 'latency_seconds_count{route="/a"} 3' in text
+        assert 'pool_connections{state="size"} 5' in text
+        assert text.endswith("\n")
+
+    def test_requests_per_minute_window_and_sessions(self, registry):
+        with patch("app.core.metrics.time.time", return_value=1000.0):
+            registry.mark_request("1")
+            registry.mark_request("1")
+        with patch("app.core.metrics.time.time", return_value=1030.0):
+            registry.mark_request("2")
+            registry.mark_request()
+            collected = registry.collect(include_remote=False)
+        assert collected["requests_per_minute"] == 4
+        assert collected["active_sessions"] == 2
+
+        with patch("app.core.metrics.time.time", return_value=1065.0):
+            collected = registry.collect(include_remote=False)
+        assert collected["requests_per_minute"] == 2
+
+        with patch("app.core.metrics.time.time", return_value=1000.0 + metrics.ACTIVE_SESSION_WINDOW + 10):
+            collected = registry.collect(include_remote=False)
+        assert collected["active_sessions"] == 1
+        assert list(registry._shard().sessions) == ["2"]
+
+    def test_snapshots_of_other_processes_are_merged(self):
+        redis_client = fakeredis.FakeRedis(decode_responses=True)
+        api = MetricsRegistry(redis_client=redis_client, process_id="api:1")
+        worker = MetricsRegistry(redis_client=redis_client, process_id="worker:2")
+        for registry in (api, worker):
+            registry.counter("jobs_total", "Jobs", ("kind",)).inc("sync")
+            registry.histogram("stage_seconds", "Stage", ("stage",), buckets=(1.0,)).observe(0.5, "orders")
+            registry.mark_request("42")
+
+        api.publish(force=True)
+        worker.publish(force=True)
+        collected = api.collect()
+
+        assert collected["processes"] == 2
+        assert collected["counters"][("jobs_total", ("sync",))] == 2
+        assert collected["histograms"][("stage_seconds", ("orders",))] == [2, 0, 1.0]
+        assert collected["requests_per_minute"] == 2
+        assert collected["active_sessions"] == 1
+
+    def test_publish_is_throttled(self, registry):
+        registry.publish()
+        registry.counter("jobs_total", "Jobs").inc()
+        registry.publish()
+
+        snapshot = registry._remote_snapshots()
+        assert snapshot == []  # собственный снимок не складывается второй раз
+        raw = registry.redis.get(metrics.SNAPSHOT_KEY.format(process="test:1"))
+        assert '"counters": []' in raw
+
+    def test_snapshots_are_found_through_index_without_scanning(self):
+        redis_client = fakeredis.FakeRedis(decode_responses=True)
+        api = MetricsRegistry(redis_client=redis_client, process_id="api:1")
+        worker = MetricsRegistry(redis_client=redis_client, process_id="worker:2")
+        worker.counter("jobs_total", "Jobs").inc()
+        worker.publish(force=True)
+        # Снимок остановленного процесса истек по TTL, ключ остался в множестве
+        redis_client.sadd(metrics.SNAPSHOT_INDEX_KEY, metrics.SNAPSHOT_KEY.format(process="gone:3"))
+
+        with patch.object(redis_client, "scan_iter", side_effect=AssertionError("keyspace scan")):
+            collected = api.collect()
+
+        assert collected["processes"] == 2
+        assert collected["counters"][("jobs_total", ())] == 1
+        assert redis_client.smembers(metrics.SNAPSHOT_INDEX_KEY) == {metrics.SNAPSHOT_KEY.format(process="worker:2")}
+
+    @pytest.mark.asyncio
+    async def test_publish_async_writes_off_the_event_loop(self, registry):
+        writers = []
+        original = registry._write_snapshot
+
+        def write_snapshot():
+            writers.append(threading.get_ident())
+            original()
+
+        with patch.object(registry, "_write_snapshot", side_effect=write_snapshot):
+            await registry.publish_async()
+            await registry.publish_async()
+
+        assert len(writers) == 1  # второй вызов в пределах METRICS_PUBLISH_INTERVAL пропущен
+        assert writers[0] != threading.get_ident()
+        assert registry.redis.get(metrics.SNAPSHOT_KEY.format(process="test:1"))
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="fork is not available")
+    def test_forked_child_publishes_under_own_pid_from_zero(self):
+        registry = MetricsRegistry(redis_client=fakeredis.FakeRedis(decode_responses=True))
+        counter = registry.counter("jobs_total", "Jobs")
+        counter.inc(amount=5)
+        parent_process = registry.process_id
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                counter.inc()
+                snapshot = registry.local_snapshot()
+                os.write(write_fd, json.dumps(snapshot).encode())
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            child = json.loads(pipe.read())
+        os.waitpid(pid, 0)
+
+        assert child["process"] == f"{parent_process.rsplit(':', 1)[0]}:{pid}"
+        assert child["process"] != parent_process
+        # Дочерний процесс не повторяет счетчики родителя
+        assert child["counters"] == [["jobs_total", [], 1]]
+        assert registry.collect(include_remote=False)["counters"][("jobs_total", ())] == 5
+
+    def test_failing_gauge_does_not_break_collection(self, registry):
+        registry.gauge_callback("broken", "Broken", lambda: 1 / 0)
+        assert registry.collect(include_remote=False)["gauges"]["broken"] == []
+
+
+class TestApplicationMetrics:
+    def test_celery_queue_depth_is_cached(self, app_metrics):
+        app_metrics.rpush("sync_queue", "a", "b")
+        with patch.object(metrics, "_queue_depth_cache", (0.0, [])):
+            samples = dict((labels["queue"], value) for labels, value in metrics.celery_queue_samples())
+            app_metrics.rpush("sync_queue", "c")
+            cached = dict((labels["queue"], value) for labels, value in metrics.celery_queue_samples())
+
+        assert samples["sync_queue"] == 2
+        assert samples["celery"] == 0
+        assert cached["sync_queue"] == 2
+
+    def test_sync_stage_timer(self, app_metrics):
+        with patch("app.core.metrics.time.perf_counter", side_effect=[10.0, 13.0]):
+            with metrics.SYNC_STAGE_DURATION.time("orders"):
+                pass
+
+        collected = metrics.registry.collect(include_remote=False)
+        values = collected["histograms"][("wb_sync_stage_duration_seconds", ("orders",))]
+        assert values[-1] == 3.0
+        assert metrics.histogram_quantile(metrics.SYNC_STAGE_BUCKETS, values, 0.5) == 5.0
+
+    def test_endpoints_report_requests_by_route_template(self, client, app_metrics):
+        client.get("/api/v1/bot/dashboard", params={"telegram_id": 111})
+        client.get("/api/v1/bot/dashboard", params={"telegram_id": 222})
+        client.get("/no/such/path")
+
+        analytics = client.get("/stats/analytics").json()["analytics"]
+        text = client.get("/stats/metrics").text
+
+        assert analytics["requests_per_minute"] >= 3
+        assert analytics["active_sessions"] == 2
+        assert analytics["routes"]["GET /api/v1/bot/dashboard"]["count"] == 2
+        assert "size" in analytics["db_pool"] or "checkedout" in analytics["db_pool"]
+        assert 'http_request_duration_seconds_count{method="GET",route="/api/v1/bot/dashboard"} 2' in text
+        assert 'route="unmatched",status="404"' in text
+        assert "# TYPE celery_queue_depth gauge" in text
+
+    def test_rejected_requests_are_counted(self, client, app_metrics):
+        client.client.get("/stats/analytics")
+
+        collected = metrics.registry.collect(include_remote=False)
+        assert collected["counters"][("http_requests_total", ("GET", "unmatched", "403"))] == 1
+
+    def test_total_users_is_cached(self, client):
+        with patch.object(stats_routes, "_total_users_cache", {"value": None, "expires_at": 0.0}), \
+                patch("app.features.stats.routes.UserCRUD.get_total_users", return_value=7) as count:
+            first = client.get("/stats/").json()
+            second = client.get("/stats/").json()
+
+        assert first["total_users"] == second["total_users"] == 7
+        assert count.call_count == 1
@@ -0,0 +1,101 @@
+"""
+Тесты локального извлечения ключевых фраз для семантического ядра
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.features.semantic_core import keywords
+from app.features.semantic_core.keywords import (
+    KeywordExtractor,
+    build_keyword_clusters,
+    cluster_terms,
+    extract_candidates,
+    score_terms,
+    stem,
+)
+
+DESCRIPTIONS = [
+    "Платье женское летнее из хлопка. Летнее платье свободного кроя, не мнется. Идеально для офиса.",
+    "Летнее платье миди из натурального хлопка. Платье не мнется и не садится после стирки.",
+    "Женское платье из хлопка для офиса и прогулок. Летнее платье с поясом.",
+    "Хлопковое платье на лето, подойдет для подарка. Ткань дышит, не мнется.",
+    "Вечернее платье из шелка с открытой спиной. Эксклюзивный дизайн.",
+]
+
+
+@pytest.fixture
+def extractor():
+    return KeywordExtractor(redis_client=fakeredis.FakeRedis(decode_responses=True))
+
+
+class TestExtraction:
+    def test_word_forms_share_stem(self):
+        assert stem("платье") == stem("платья") == stem("платьем")
+        assert stem("летнее") == stem("летний")
+
+    def test_ngrams_do_not_cross_punctuation_and_skip_stopwords(self):
+        terms = extract_candidates("Платье из хлопка. Для офиса")["terms"]
+
+        phrases = {surface for surface, _ in terms.values()}
+        assert "платье хлопка" in phrases
+        assert "хлопка офиса" not in phrases
+        assert not any(word in phrases for word in ("из", "для"))
+
+    def test_extraction_cached_by_description_hash(self, extractor):
+        with patch.object(keywords, "extract_candidates", wraps=extract_candidates) as extract:
+            first = extractor.extract_many(DESCRIPTIONS + DESCRIPTIONS[:1])
+            second = extractor.extract_many(DESCRIPTIONS)
+
+        assert extract.call_count == len(DESCRIPTIONS)
+        assert first[:len(DESCRIPTIONS)] == second
+        assert extractor.stats == {"extracted": len(DESCRIPTIONS), "cached": len(DESCRIPTIONS)}
+
+    def test_broken_cache_falls_back_to_extraction(self):
+        class BrokenRedis:
+            def mget(self, keys):
+                raise ConnectionError("redis down")
+
+            def pipeline(self):
+                raise ConnectionError("redis down")
+
+        result = KeywordExtractor(redis_client=BrokenRedis()).extract_many(DESCRIPTIONS[:2])
+
+        assert len(result) == 2
+
+
+class TestClusters:
+    def test_niche_terms_ranked_first_and_one_offs_dropped(self, extractor):
+        terms = score_terms(extractor.extract_many(DESCRIPTIONS))
+
+        top = sorted(terms.values(), key=lambda term: term["score"], reverse=True)[0]
+        assert top["phrase"] == "платье"
+        assert top["documents"] == len(DESCRIPTIONS)
+        # "открытой спиной" есть только в одном описании
+        assert not any(term["phrase"] == "открытой спиной" for term in terms.values())
+
+    def test_phrases_grouped_under_head_keyword(self, extractor):
+        clusters = build_keyword_clusters(DESCRIPTIONS, extractor=extractor)
+
+        by_keyword = {cluster["keyword"]: cluster for cluster in clusters}
+        assert clusters[0]["keyword"] == "платье"
+        assert "летнее платье" in by_keyword["платье"]["phrases"]
+        assert "мнется" in by_keyword
+        assert len({tuple(cluster["phrases"]) for cluster in clusters}) == len(clusters)
+
+    def test_clusters_are_compact(self):
+        descriptions = [
+            f"Платье модель {i}. Летнее платье из хлопка, размер {40 + i % 10}. "
+            f"Подходит для офиса и прогулок, не мнется, ткань дышит. Артикул {1000 + i}."
+            for i in range(300)
+        ]
+        extractor = KeywordExtractor(redis_client=fakeredis.FakeRedis(decode_responses=True))
+
+        clusters = cluster_terms(score_terms(extractor.extract_many(descriptions)), max_clusters=20)
+
+        assert len(clusters) <= 20
+        assert all(len(cluster["phrases"]) <= keywords.PHRASES_PER_CLUSTER for cluster in clusters)
+        assert len(str(clusters)) < len("\n---\n".join(descriptions)) / 10
@@ -0,0 +1,173 @@
+"""
+Тесты потока событий синхронизации: at-least-once доставка через consumer group,
+восстановление после падения consumer-а и идемпотентная отправка уведомлений.
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.features.notifications import sync_event_stream
+from app.features.notifications.notification_service import NotificationService
+from app.features.notifications.sync_event_stream import SyncEventConsumer, publish_sync_event
+from app.features.user.models import User
+from app.features.wb_api.models import WBCabinet, WBOrder
+from app.features.wb_api.models_cabinet_users import CabinetUser
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def publish(redis_client, cabinet_id=1, previous_sync_at=None):
+    return publish_sync_event(
+        redis_client,
+        cabinet_id=cabinet_id,
+        previous_sync_at=previous_sync_at or datetime(2025, 1, 1, 12, 0),
+        synced_at=datetime(2025, 1, 1, 13, 0),
+        is_first_sync=False,
+        change_counts={"orders": 2},
+    )
+
+
+class TestSyncEventConsumer:
+    """Тесты SyncEventConsumer на fakeredis"""
+
+    @pytest.mark.asyncio
+    async def test_event_decoded_and_acked(self, redis_client):
+        handled = []
+
+        async def handler(event, ledger):
+            handled.append(event)
+
+        event_id = publish(redis_client, cabinet_id=7)
+        stats = await SyncEventConsumer(redis_client, handler, "worker-1").consume()
+
+        assert stats["processed"] == 1
+        assert handled[0]["event_id"] == event_id
+        assert handled[0]["cabinet_id"] == 7
+        assert handled[0]["previous_sync_at"] == datetime(2025, 1, 1, 12, 0)
+        assert handled[0]["changes"] == {"orders": 2}
+        assert redis_client.xpending(sync_event_stream.STREAM_KEY, sync_event_stream.CONSUMER_GROUP)["pending"] == 0
+
+    @pytest.mark.asyncio
+    async def test_crashed_consumer_message_reclaimed_once(self, redis_client):
+        """Сообщение упавшего consumer-а забирает другой и обрабатывает ровно один раз"""
+        handled = []
+
+        async def handler(event, ledger):
+            handled.append(event["event_id"])
+
+        event_id = publish(redis_client)
+        crashed = SyncEventConsumer(redis_client, handler, "worker-crashed")
+        crashed.ensure_group()
+        # Прочитал и упал до обработки: сообщение висит в PEL
+        assert [message[0] for message in crashed.read_new()] == [event_id]
+
+        # Пока сообщение не простояло claim_min_idle_ms, его никто не забирает
+        assert (await SyncEventConsumer(redis_client, handler, "worker-2").consume())["processed"] == 0
+
+        recovered = SyncEventConsumer(redis_client, handler, "worker-2", claim_min_idle_ms=0)
+        assert (await recovered.consume())["processed"] == 1
+        assert (await recovered.consume())["processed"] == 0
+        assert handled == [event_id]
+
+    @pytest.mark.asyncio
+    async def test_failed_handler_retried_without_resending(self, redis_client):
+        """Повторная доставка не отправляет уже отправленные уведомления"""
+        sent = []
+        attempts = {"count": 0}
+
+        async def handler(event, ledger):
+            attempts["count"] += 1
+            for member in ("1:new_order:o1", "1:new_order:o2"):
+                if not ledger.is_delivered(member):
+                    sent.append(member)
+                    ledger.mark_delivered(member)
+                if attempts["count"] == 1:
+                    raise RuntimeError("webhook timeout")
+
+        publish(redis_client)
+        consumer = SyncEventConsumer(redis_client, handler, "worker-1", claim_min_idle_ms=0)
+
+        assert (await consumer.consume())["failed"] == 1
+        assert (await consumer.consume())["processed"] == 1
+        assert sent == ["1:new_order:o1", "1:new_order:o2"]
+
+    @pytest.mark.asyncio
+    async def test_processed_but_not_acked_is_skipped(self, redis_client):
+        """Упали между обработкой и XACK - при повторной доставке обработчик не вызывается"""
+        handler = AsyncMock()
+        event_id = publish(redis_client)
+        consumer = SyncEventConsumer(redis_client, handler, "worker-1", claim_min_idle_ms=0)
+
+        with patch.object(consumer, "_ack", side_effect=ConnectionError("redis gone")):
+            with pytest.raises(ConnectionError):
+                await consumer.consume()
+
+        stats = await consumer.consume()
+
+        assert stats["skipped"] == 1
+        handler.assert_awaited_once()
+        assert redis_client.exists(sync_event_stream.DONE_KEY.format(event_id=event_id))
+
+    @pytest.mark.asyncio
+    async def test_poison_event_moved_to_dead_letter(self, redis_client):
+        handler = AsyncMock(side_effect=ValueError("bad event"))
+        publish(redis_client)
+        consumer = SyncEventConsumer(redis_client, handler, "worker-1", claim_min_idle_ms=0, max_deliveries=2)
+
+        results = [await consumer.consume() for _ in range(3)]
+
+        assert [r["failed"] for r in results] == [1, 1, 0]
+        assert results[2]["dead_lettered"] == 1
+        assert redis_client.xlen(sync_event_stream.DEAD_LETTER_STREAM_KEY) == 1
+        assert consumer.get_lag()["pending"] == 0
+
+
+class TestSyncCompletedNotifications:
+    """Обработка события NotificationService с отметками доставки"""
+
+    @pytest.mark.asyncio
+    async def test_redelivered_event_does_not_duplicate_notifications(self, db_session, redis_client):
+        now = datetime.utcnow()
+        user = User(telegram_id=555, first_name="Test", bot_webhook_url="http://bot/webhook")
+        cabinet = WBCabinet(api_key="stream-key", name="Test", last_sync_at=now)
+        db_session.add_all([user, cabinet])
+        db_session.flush()
+        db_session.add(CabinetUser(cabinet_id=cabinet.id, user_id=user.id, first_sync_completed=True))
+        db_session.add_all([
+            WBOrder(cabinet_id=cabinet.id, nm_id=1, order_id=f"o{index}", status="active",
+                    total_price=1000, customer_price=900, spp_percent=10, discount_percent=5,
+                    order_date=now, created_at=now)
+            for index in range(2)
+        ])
+        db_session.commit()
+
+        send_simple = AsyncMock(return_value={"success": True})
+        crashes = {"left": 1}
+
+        async def handler(event, ledger):
+            service = NotificationService(db_session)
+            await service.process_sync_completed(event["cabinet_id"], event["previous_sync_at"], delivery_ledger=ledger)
+            db_session.commit()
+            if crashes["left"]:
+                crashes["left"] -= 1
+                raise RuntimeError("worker killed")
+
+        publish(redis_client, cabinet_id=cabinet.id, previous_sync_at=now - timedelta(hours=1))
+        consumer = SyncEventConsumer(redis_client, handler, "worker-1", claim_min_idle_ms=0)
+
+        with patch("app.core.redis.get_redis_client", return_value=redis_client), \
+                patch.object(NotificationService, "_send_simple_notification", send_simple), \
+                patch.object(NotificationService, "send_sync_completion_notification", AsyncMock(return_value={"success": True})), \
+                patch.object(NotificationService, "_save_notification_to_history"):
+            assert (await consumer.consume())["failed"] == 1
+            assert (await consumer.consume())["processed"] == 1
+
+        sent_orders = [call.args[1]["order_id"] for call in send_simple.await_args_list if call.args[1]["type"] == "new_order"]
+        assert sorted(sent_orders) == ["o0", "o1"]